@@ -10,6 +10,7 @@ WAFFLE_NAMESPACE = u'studio'
 # Switches
 ENABLE_ACCESSIBILITY_POLICY_PAGE = u'enable_policy_page'
 ENABLE_CHECKLISTS_PAGE = u'enable_checklists_page'
+ENABLE_STREAMING_EXPORT = u'enable_streaming_export'
 
 
 def waffle():
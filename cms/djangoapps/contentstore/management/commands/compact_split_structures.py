@@ -0,0 +1,81 @@
+"""
+Script for removing the unreachable history of split modulestore course structures.
+"""
+from __future__ import print_function
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.split_mongo.structure_compaction import StructureCompactor
+
+
+class Command(BaseCommand):
+    """
+    Command for compacting the split modulestore structures collection.
+    """
+    help = '''
+    Remove the split modulestore structures that are not the head of a course or library branch,
+    nor one of the versions before a head that are kept, nor the original version of those.
+    If |--commit| is not provided, reports how many structures would be removed.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-versions',
+            type=int,
+            default=10,
+            help='The number of versions before each branch head to keep',
+        )
+        parser.add_argument(
+            '--min-age-days',
+            type=int,
+            default=1,
+            help='Keep the structures created within this many days',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='The number of structures to remove at once')
+        parser.add_argument(
+            '--batch-delay',
+            type=float,
+            default=1.0,
+            help='The number of seconds to wait between batches of removals',
+        )
+        parser.add_argument(
+            '--archive',
+            action='store_true',
+            help='Copy the removed structures to the structures_archive collection',
+        )
+        parser.add_argument('--commit', action='store_true', help='Commit to removing the structures')
+
+    def handle(self, *args, **options):
+        if options['keep_versions'] < 0 or options['min_age_days'] < 0 or options['batch_size'] < 1:
+            raise CommandError(
+                '--keep-versions and --min-age-days must not be negative, and --batch-size must be positive.'
+            )
+
+        # pylint: disable=protected-access
+        split_modulestore = modulestore()._get_modulestore_by_type(ModuleStoreEnum.Type.split)
+        if split_modulestore is None:
+            raise CommandError('There is no split modulestore to compact.')
+
+        compactor = StructureCompactor(
+            split_modulestore.db_connection,
+            keep_versions=options['keep_versions'],
+            min_age=timedelta(days=options['min_age_days']),
+            batch_size=options['batch_size'],
+            batch_delay=options['batch_delay'],
+        )
+
+        if options['commit']:
+            removed = compactor.compact(archive=options['archive'])
+            print('Removed {} unreachable structures.'.format(removed))
+        else:
+            report = compactor.report()
+            print('Dry run. Of {} structures, {} are reachable.'.format(
+                report.total_structures, report.reachable_structures
+            ))
+            print('{} unreachable structures, of about {} bytes, would have been removed.'.format(
+                report.unreachable_structures, report.estimated_size
+            ))
@@ -1,6 +1,7 @@
 """
 Script for importing courseware from XML format
 """
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from django_comment_common.utils import are_permissions_roles_seeded, seed_permissions_roles
 from lms.djangoapps.dashboard.git_import import DEFAULT_PYTHON_LIB_FILENAME
@@ -34,6 +35,11 @@ class Command(BaseCommand):
         parser.add_argument('--python-lib-filename',
                             default=DEFAULT_PYTHON_LIB_FILENAME,
                             help='Filename of the course code library (if it exists)')
+        parser.add_argument('--static-upload-workers',
+                            type=int,
+                            default=settings.COURSE_IMPORT_STATIC_UPLOAD_WORKERS,
+                            help='Number of threads uploading static content while the course is imported '
+                                 '(0 uploads it before the course is imported)')
 
     def handle(self, *args, **options):
         data_dir = options['data_directory']
@@ -66,6 +72,8 @@ class Command(BaseCommand):
             do_import_static=do_import_static, do_import_python_lib=do_import_python_lib,
             create_if_not_present=True,
             python_lib_filename=python_lib_filename,
+            static_upload_workers=options['static_upload_workers'],
+            thumbnail_workers=settings.COURSE_IMPORT_THUMBNAIL_WORKERS,
         )
 
         for course in course_items:
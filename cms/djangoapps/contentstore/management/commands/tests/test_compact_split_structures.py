@@ -0,0 +1,95 @@
+"""
+Tests for the compact_split_structures management command
+"""
+from datetime import datetime, timedelta
+
+import mock
+from django.core.management import call_command, CommandError
+from pytz import UTC
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory, LibraryFactory
+
+
+class TestCompactSplitStructures(ModuleStoreTestCase):
+    """
+    Tests for the compact_split_structures management command
+    """
+    def setUp(self):
+        super(TestCompactSplitStructures, self).setUp()
+        self.course = CourseFactory.create(default_store=ModuleStoreEnum.Type.split)
+        for index in range(3):
+            self.course.display_name = u'Course {}'.format(index)
+            self.course = self.store.update_item(self.course, self.user.id)
+
+        # pylint: disable=protected-access
+        self.split_store = self.store._get_modulestore_by_type(ModuleStoreEnum.Type.split)
+        self.db_connection = self.split_store.db_connection
+
+        # Treat all of the structures as old enough to remove.
+        patcher = mock.patch('xmodule.modulestore.split_mongo.structure_compaction.datetime')
+        mock_datetime = patcher.start()
+        mock_datetime.now.return_value = datetime.now(UTC) + timedelta(days=2)
+        self.addCleanup(patcher.stop)
+
+    def test_invalid_arguments(self):
+        with self.assertRaisesRegexp(CommandError, 'must not be negative'):
+            call_command('compact_split_structures', '--keep-versions', '-1')
+
+    def test_dry_run(self):
+        structure_count = self.db_connection.structures.count()
+        call_command('compact_split_structures', '--keep-versions', '0')
+        self.assertEqual(self.db_connection.structures.count(), structure_count)
+
+    def test_compact(self):
+        structure_count = self.db_connection.structures.count()
+        heads = set(self.split_store.get_course_index_info(self.course.id)['versions'].values())
+
+        call_command(
+            'compact_split_structures', '--keep-versions', '0', '--batch-delay', '0', '--archive', '--commit'
+        )
+
+        remaining = set(structure['_id'] for structure in self.db_connection.structures.find({}, {'_id': True}))
+        self.assertTrue(heads.issubset(remaining))
+        self.assertLess(len(remaining), structure_count)
+        archive = self.db_connection.database[self.db_connection.structures.name + '_archive']
+        self.assertEqual(archive.count(), structure_count - len(remaining))
+        self.addCleanup(archive.drop)
+
+        # The course can still be read, and written.
+        course = self.store.get_course(self.course.id)
+        self.assertEqual(course.display_name, u'Course 2')
+        course.display_name = u'Compacted course'
+        self.store.update_item(course, self.user.id)
+        self.assertEqual(self.store.get_course(self.course.id).display_name, u'Compacted course')
+
+    def test_keep_versions(self):
+        call_command('compact_split_structures', '--keep-versions', '1', '--batch-delay', '0', '--commit')
+
+        for head in self.split_store.get_course_index_info(self.course.id)['versions'].values():
+            structure = self.db_connection.structures.find_one({'_id': head})
+            self.assertIsNotNone(self.db_connection.structures.find_one({'_id': structure['previous_version']}))
+            self.assertIsNotNone(self.db_connection.structures.find_one({'_id': structure['original_version']}))
+
+    def test_pinned_library_versions_are_kept(self):
+        library = LibraryFactory.create(user_id=self.user.id)
+        library_key = library.location.library_key
+        pinned_version = self.split_store.get_course_index_info(library_key)['versions']['library']
+        for __ in range(2):
+            ItemFactory.create(
+                category='html', parent_location=library.location, user_id=self.user.id, publish_item=False
+            )
+        ItemFactory.create(
+            category='library_content',
+            parent_location=self.course.location,
+            user_id=self.user.id,
+            publish_item=False,
+            source_library_id=unicode(library_key),
+            source_library_version=unicode(pinned_version),
+        )
+
+        call_command('compact_split_structures', '--keep-versions', '0', '--batch-delay', '0', '--commit')
+
+        self.assertNotEqual(self.split_store.get_course_index_info(library_key)['versions']['library'], pinned_version)
+        self.assertIsNotNone(self.db_connection.structures.find_one({'_id': pinned_version}))
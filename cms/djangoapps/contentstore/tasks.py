@@ -8,6 +8,7 @@ import json
 import os
 import shutil
 import tarfile
+from contextlib import contextmanager
 from datetime import datetime
 from tempfile import NamedTemporaryFile, mkdtemp
 
@@ -36,21 +37,29 @@ from user_tasks.models import UserTaskArtifact, UserTaskStatus
 from user_tasks.tasks import UserTask
 
 import dogstats_wrapper as dog_stats_api
+from contentstore.config.waffle import ENABLE_STREAMING_EXPORT, waffle
 from contentstore.courseware_index import CoursewareSearchIndexer, LibrarySearchIndexer, SearchIndexingError
 from contentstore.storage import course_import_export_storage
 from contentstore.utils import initialize_permissions, reverse_usage_url
 from course_action_state.models import CourseRerunState
 from models.settings.course_metadata import CourseMetadata
+from openedx.core.djangoapps.contentserver.caching import del_cached_course_content
+from openedx.core.djangoapps.contentserver.image_variants import get_image_variants
 from openedx.core.djangoapps.embargo.models import CountryAccessRule, RestrictedCourse
 from openedx.core.lib.extract_tar import safetar_extractall
 from student.auth import has_course_author_access
+from xmodule.contentstore.content import StaticContent
 from xmodule.contentstore.django import contentstore
 from xmodule.course_module import CourseFields
 from xmodule.exceptions import SerializationError
 from xmodule.modulestore import COURSE_ROOT, LIBRARY_ROOT
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.exceptions import DuplicateCourseError, ItemNotFoundError
-from xmodule.modulestore.xml_exporter import export_course_to_xml, export_library_to_xml
+from xmodule.modulestore.xml_exporter import (
+    export_course_to_xml,
+    export_courselike_to_tarball,
+    export_library_to_xml
+)
 from xmodule.modulestore.xml_importer import import_course_from_xml, import_library_from_xml
 from xmodule.video_module.transcripts_utils import (
     Transcript,
@@ -469,6 +478,29 @@ def update_library_index(library_id, triggered_time_isoformat):
         LOGGER.debug(u'Search indexing successful for library %s', library_id)
 
 
+@task()
+def generate_image_variants(asset_key_string, replaced_digest=None):
+    """
+    Generates the resized and re-encoded variants of an uploaded course image, and deletes
+    those of the image it replaced, if it replaced one with different contents.
+    """
+    image_variants = get_image_variants()
+    if image_variants is None:
+        return
+
+    asset_key = StaticContent.get_location_from_path(asset_key_string)
+    try:
+        content = contentstore().find(asset_key)
+    except NotFoundError:
+        LOGGER.warning(u'Image %s was deleted before its variants were generated', asset_key_string)
+        return
+
+    if replaced_digest and replaced_digest != content.content_digest:
+        image_variants.delete(asset_key.course_key, replaced_digest)
+    locations = image_variants.generate(content)
+    LOGGER.info(u'Generated %d variants of image %s', len(locations), asset_key_string)
+
+
 @task()
 def push_course_update_task(course_key_string, course_subscription_id, course_display_name):
     """
@@ -536,9 +568,12 @@ def export_olx(self, user_id, course_key_string, language):
 
     try:
         self.status.set_state(u'Exporting')
-        tarball = create_export_tarball(courselike_module, courselike_key, {}, self.status)
         artifact = UserTaskArtifact(status=self.status, name=u'Output')
-        artifact.file.save(name=os.path.basename(tarball.name), content=File(tarball))  # pylint: disable=no-member
+        if waffle().is_enabled(ENABLE_STREAMING_EXPORT):
+            stream_export_tarball(courselike_module, courselike_key, artifact, {}, self.status)
+        else:
+            tarball = create_export_tarball(courselike_module, courselike_key, {}, self.status)
+            artifact.file.save(name=os.path.basename(tarball.name), content=File(tarball))  # pylint: disable=no-member
         artifact.save()
     # catch all exceptions so we can record useful error messages
     except Exception as exception:  # pylint: disable=broad-except
@@ -559,18 +594,83 @@ def create_export_tarball(course_module, course_key, context, status=None):
     root_dir = path(mkdtemp())
 
     try:
-        if isinstance(course_key, LibraryLocator):
-            export_library_to_xml(modulestore(), contentstore(), course_key, root_dir, name)
-        else:
-            export_course_to_xml(modulestore(), contentstore(), course_module.id, root_dir, name)
+        with _handle_export_errors(course_key, context, status):
+            if isinstance(course_key, LibraryLocator):
+                export_library_to_xml(modulestore(), contentstore(), course_key, root_dir, name)
+            else:
+                export_course_to_xml(modulestore(), contentstore(), course_module.id, root_dir, name)
+
+            if status:
+                status.set_state(u'Compressing')
+                status.increment_completed_steps()
+            LOGGER.debug(u'tar file being generated at %s', export_file.name)
+            with tarfile.open(name=export_file.name, mode='w:gz') as tar_file:
+                tar_file.add(root_dir / name, arcname=name)
+    finally:
+        if os.path.exists(root_dir / name):
+            shutil.rmtree(root_dir / name)
+
+    return export_file
 
+
+def stream_export_tarball(course_module, course_key, artifact, context, status=None):
+    """
+    Exports the course or library straight into a .tar.gz file in the storage of
+    the given artifact, and sets it as the artifact's file.
+
+    Unlike `create_export_tarball`, the export isn't staged on the local disk: the
+    archive is written to the storage as the course is exported, and each phase of
+    the export is reported as the state of the status.
+
+    Updates the context with any error information if applicable.
+    """
+    name = course_module.url_name
+    storage = artifact.file.storage  # pylint: disable=no-member
+    file_name = storage.get_available_name(
+        artifact.file.field.generate_filename(artifact, name + u'.tar.gz')  # pylint: disable=no-member
+    )
+    try:
+        # Local storages need the directory of the file to exist.
+        file_dir = os.path.dirname(storage.path(file_name))
+        if not os.path.exists(file_dir):
+            os.makedirs(file_dir)
+    except NotImplementedError:
+        pass
+
+    if not isinstance(course_key, LibraryLocator):
+        course_key = course_module.id
+
+    def report_progress(phase):
+        """
+        Show the phase of the export as the state of the task.
+        """
         if status:
-            status.set_state(u'Compressing')
-            status.increment_completed_steps()
-        LOGGER.debug(u'tar file being generated at %s', export_file.name)
-        with tarfile.open(name=export_file.name, mode='w:gz') as tar_file:
-            tar_file.add(root_dir / name, arcname=name)
+            status.set_state(phase)
+
+    try:
+        with _handle_export_errors(course_key, context, status):
+            LOGGER.debug(u'tar file being streamed to %s', file_name)
+            with storage.open(file_name, 'wb') as export_file:
+                export_courselike_to_tarball(
+                    modulestore(), contentstore(), course_key, export_file, name, progress_callback=report_progress
+                )
+    except Exception:
+        storage.delete(file_name)
+        raise
 
+    if status:
+        status.increment_completed_steps()
+    artifact.file.name = file_name  # pylint: disable=no-member
+
+
+@contextmanager
+def _handle_export_errors(course_key, context, status=None):
+    """
+    Updates the context and fails the status, if any, with information about
+    an error raised while exporting the course, then re-raises it.
+    """
+    try:
+        yield
     except SerializationError as exc:
         LOGGER.exception(u'There was an error exporting %s', course_key, exc_info=True)
         parent = None
@@ -602,11 +702,6 @@ def create_export_tarball(course_module, course_key, context, status=None):
         if status:
             status.fail(json.dumps({'raw_error_msg': context['raw_err_msg']}))
         raise
-    finally:
-        if os.path.exists(root_dir / name):
-            shutil.rmtree(root_dir / name)
-
-    return export_file
 
 
 class CourseImportTask(UserTask):  # pylint: disable=abstract-method
@@ -792,12 +887,18 @@ def import_olx(self, user_id, course_key_string, archive_path, archive_name, lan
                 settings.GITHUB_REPO_ROOT, [dirpath],
                 load_error_modules=False,
                 static_content_store=contentstore(),
-                target_id=courselike_key
+                target_id=courselike_key,
+                static_upload_workers=settings.COURSE_IMPORT_STATIC_UPLOAD_WORKERS,
+                thumbnail_workers=settings.COURSE_IMPORT_THUMBNAIL_WORKERS,
             )
 
         new_location = courselike_items[0].location
         LOGGER.debug(u'new course at %s', new_location)
 
+        if is_course:
+            # The import replaced the course's assets, so forget what's cached of them.
+            del_cached_course_content(courselike_key)
+
         LOGGER.info(u'Course import %s: Course import successful', courselike_key)
     except Exception as exception:   # pylint: disable=broad-except
         LOGGER.exception(u'error importing course', exc_info=True)
@@ -3,9 +3,18 @@ Tests core caching facilities.
 """
 
 from django.test import TestCase
+from mock import ANY, patch
 from opaque_keys.edx.locator import AssetLocator, CourseLocator
 
-from openedx.core.djangoapps.contentserver.caching import del_cached_content, get_cached_content, set_cached_content
+from openedx.core.djangoapps.contentserver.caching import (
+    CONTENT_METADATA_CACHE_TIMEOUT,
+    StaticContentMetadata,
+    del_cached_content,
+    get_cached_content,
+    get_cached_content_metadata,
+    set_cached_content,
+    set_cached_content_metadata
+)
 
 
 class Content(object):
@@ -43,3 +52,20 @@ class CachingTestCase(TestCase):
                          'should not be stored in cache with unicodeLocation')
         self.assertEqual(None, get_cached_content(self.nonUnicodeLocation),
                          'should not be stored in cache with nonUnicodeLocation')
+
+    def test_delete_metadata(self):
+        metadata = StaticContentMetadata(self.unicodeLocation, 'digest', 10, None, False, 'image/jpeg')
+        set_cached_content(self.mockAsset)
+        set_cached_content_metadata(metadata)
+        self.assertEqual(metadata, get_cached_content_metadata(self.nonUnicodeLocation))
+        del_cached_content(self.nonUnicodeLocation)
+        self.assertEqual(None, get_cached_content_metadata(self.unicodeLocation),
+                         'should not be stored in cache with unicodeLocation')
+        self.assertEqual(None, get_cached_content(self.unicodeLocation),
+                         'should not be stored in cache with unicodeLocation')
+
+    def test_metadata_timeout(self):
+        metadata = StaticContentMetadata(self.unicodeLocation, 'digest', 10, None, False, 'image/jpeg')
+        with patch('openedx.core.djangoapps.contentserver.caching.CONTENT_CACHE') as mock_cache:
+            set_cached_content_metadata(metadata)
+        mock_cache.set.assert_called_with(ANY, metadata, CONTENT_METADATA_CACHE_TIMEOUT, version=ANY)
@@ -5,6 +5,7 @@ from __future__ import absolute_import, division, print_function
 
 import copy
 import json
+import tarfile
 from uuid import uuid4
 
 import mock
@@ -16,6 +17,7 @@ from organizations.models import OrganizationCourse
 from organizations.tests.factories import OrganizationFactory
 from user_tasks.models import UserTaskArtifact, UserTaskStatus
 
+from contentstore.config.waffle import ENABLE_STREAMING_EXPORT, waffle
 from contentstore.tasks import export_olx, rerun_course
 from contentstore.tests.test_libraries import LibraryTestCase
 from contentstore.tests.utils import CourseTestCase
@@ -62,6 +64,36 @@ class ExportCourseTestCase(CourseTestCase):
         result = export_olx.delay(self.user.id, key, u'en')
         self._assert_failed(result, json.dumps({u'raw_error_msg': u'Boom!'}))
 
+    def test_streaming_success(self):
+        """
+        Verify that a course export task streaming the archive to the storage succeeds
+        """
+        key = str(self.course.location.course_key)
+        with waffle().override(ENABLE_STREAMING_EXPORT, active=True):
+            result = export_olx.delay(self.user.id, key, u'en')
+        status = UserTaskStatus.objects.get(task_id=result.id)
+        self.assertEqual(status.state, UserTaskStatus.SUCCEEDED)
+        self.assertEqual(status.completed_steps, 1)
+        artifacts = UserTaskArtifact.objects.filter(status=status)
+        self.assertEqual(len(artifacts), 1)
+        output = artifacts[0]
+        self.assertEqual(output.name, 'Output')
+        with tarfile.open(fileobj=output.file, mode='r:gz') as tar_file:
+            names = tar_file.getnames()
+        url_name = self.course.url_name
+        self.assertIn(url_name + '/course.xml', names)
+        self.assertIn(url_name + '/policies/assets.json', names)
+
+    @mock.patch('contentstore.tasks.export_courselike_to_tarball', side_effect=side_effect_exception)
+    def test_streaming_exception(self, mock_export):  # pylint: disable=unused-argument
+        """
+        The streaming export task should fail gracefully if an exception is thrown
+        """
+        key = str(self.course.location.course_key)
+        with waffle().override(ENABLE_STREAMING_EXPORT, active=True):
+            result = export_olx.delay(self.user.id, key, u'en')
+        self._assert_failed(result, json.dumps({u'raw_error_msg': u'Boom!'}))
+
     def test_invalid_user_id(self):
         """
         Verify that attempts to export a course as an invalid user fail
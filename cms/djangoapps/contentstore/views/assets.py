@@ -20,10 +20,12 @@ from xmodule.exceptions import NotFoundError
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.exceptions import ItemNotFoundError
 
+from contentstore.tasks import generate_image_variants
 from contentstore.utils import reverse_course_url
 from contentstore.views.exception import AssetNotFoundException, AssetSizeTooLargeException
 from edxmako.shortcuts import render_to_response
 from openedx.core.djangoapps.contentserver.caching import del_cached_content
+from openedx.core.djangoapps.contentserver.image_variants import get_image_variants
 from student.auth import has_course_author_access
 from util.date_utils import get_default_time_display
 from util.json_request import JsonResponse
@@ -378,9 +380,22 @@ def update_course_run_asset(course_key, upload_file):
     if _check_thumbnail_uploaded(thumbnail_content):
         content.thumbnail_location = thumbnail_location
 
+    # Note the digest of any image this one replaces, so that its variants can be deleted.
+    image_variants = get_image_variants()
+    replaced_digest = None
+    if image_variants is not None and image_variants.can_vary(content.content_type):
+        replaced_content = contentstore().find(content.location, throw_on_not_found=False, as_stream=True)
+        if replaced_content is not None:
+            replaced_digest = replaced_content.content_digest
+            replaced_content.close()
+
     contentstore().save(content)
     del_cached_content(content.location)
 
+    if image_variants is not None and image_variants.can_vary(content.content_type):
+        # Resizing and re-encoding the image would hold up the upload, so it's done in the background.
+        generate_image_variants.delay(text_type(content.location), replaced_digest=replaced_digest)
+
     return content
 
 
@@ -526,6 +541,7 @@ def _update_asset(request, course_key, asset_key):
         contentstore().set_attr(asset_key, 'locked', modified_asset['locked'])
         # delete the asset from the cache so we check the lock status the next time it is requested.
         del_cached_content(asset_key)
+        _update_image_variants_lock(asset_key, course_key)
         return JsonResponse(modified_asset, status=201)
 
 
@@ -541,6 +557,9 @@ def delete_asset(course_key, asset_key):
     _delete_thumbnail(content.thumbnail_location, course_key, asset_key)
     contentstore().delete(content.get_id())
     del_cached_content(content.location)
+    # The variants are shared with any other image with the same contents, so this is done
+    # once the image itself is deleted.
+    _delete_image_variants(content, course_key)
 
 
 def _check_existence_and_get_asset_content(asset_key):
@@ -567,6 +586,24 @@ def _delete_thumbnail(thumbnail_location, course_key, asset_key):
             logging.warning('Could not delete thumbnail: %s', thumbnail_location)
 
 
+def _delete_image_variants(content, course_key):
+    image_variants = get_image_variants()
+    if image_variants is not None and image_variants.can_vary(content.content_type) and content.content_digest:
+        image_variants.delete(course_key, content.content_digest)
+
+
+def _update_image_variants_lock(asset_key, course_key):
+    image_variants = get_image_variants()
+    if image_variants is None:
+        return
+    content = contentstore().find(asset_key, throw_on_not_found=False, as_stream=True)
+    if content is None:
+        return
+    content.close()
+    if image_variants.can_vary(content.content_type) and content.content_digest:
+        image_variants.update_lock(course_key, content.content_digest)
+
+
 def _get_asset_json(display_name, content_type, date, location, thumbnail_location, locked):
     '''
     Helper method for formatting the asset information to send to client.
@@ -349,6 +349,37 @@ class UploadTestCase(AssetsTestCase):
         resp = self.upload_asset("test_image", asset_type="image")
         self.assertEquals(resp.status_code, 200)
 
+    @override_settings(COURSE_IMAGE_VARIANTS={'ENABLED': True, 'WIDTHS': [20, 100], 'FORMATS': ['webp', 'jpeg']})
+    def test_upload_image_variants(self):
+        resp = self.upload_asset("test_image", asset_type="image")
+        self.assertEquals(resp.status_code, 200)
+        asset_location = StaticContent.get_location_from_path(json.loads(resp.content)['asset']['url'])
+        content = contentstore().find(asset_location)
+
+        for name, content_type in (
+                ('{}.webp', 'image/webp'),
+                ('{}-20w.webp', 'image/webp'),
+                ('{}-20w.jpg', 'image/jpeg'),
+        ):
+            variant_location = StaticContent.compute_location(
+                self.course.id, name.format(content.content_digest), is_thumbnail=True
+            )
+            self.assertEquals(contentstore().find(variant_location).content_type, content_type)
+
+        # Images are never scaled up, and a variant of the image's own size and format would be a copy.
+        for name in ('{}-100w.webp', '{}.jpg'):
+            variant_location = StaticContent.compute_location(
+                self.course.id, name.format(content.content_digest), is_thumbnail=True
+            )
+            self.assertIsNone(contentstore().find(variant_location, throw_on_not_found=False))
+
+    @override_settings(COURSE_IMAGE_VARIANTS={'ENABLED': True, 'WIDTHS': [20], 'FORMATS': ['webp']})
+    @mock.patch('contentstore.views.assets.generate_image_variants')
+    def test_upload_file_without_variants(self, mock_generate_image_variants):
+        resp = self.upload_asset()
+        self.assertEquals(resp.status_code, 200)
+        self.assertFalse(mock_generate_image_variants.delay.called)
+
     def test_no_file(self):
         resp = self.client.post(self.url, {"name": "file.txt"}, "application/json")
         self.assertEquals(resp.status_code, 400)
@@ -490,6 +521,27 @@ class LockAssetTestCase(AssetsTestCase):
         self.assertFalse(resp_asset['locked'])
         verify_asset_locked_state(False)
 
+    @override_settings(COURSE_IMAGE_VARIANTS={'ENABLED': True, 'WIDTHS': [20], 'FORMATS': ['webp']})
+    def test_locking_image_variants(self):
+        """
+        Tests that the variants of an image are locked and unlocked along with it.
+        """
+        resp = self.upload_asset("test_image", asset_type="image")
+        self.assertEquals(resp.status_code, 200)
+        asset_json = json.loads(resp.content)['asset']
+        asset_location = StaticContent.get_location_from_path(asset_json['url'])
+        variant_location = StaticContent.compute_location(
+            self.course.id, '{}-20w.webp'.format(contentstore().find(asset_location).content_digest), is_thumbnail=True
+        )
+        self.assertFalse(contentstore().find(variant_location).locked)
+
+        url = reverse_course_url('assets_handler', self.course.id, kwargs={'asset_key_string': unicode(asset_location)})
+        for lock in (True, False):
+            asset_json['locked'] = lock
+            resp = self.client.post(url, json.dumps(asset_json), "application/json")
+            self.assertEqual(resp.status_code, 201)
+            self.assertEqual(contentstore().find(variant_location).locked, lock)
+
 
 class DeleteAssetTestCase(AssetsTestCase):
     """
@@ -546,6 +598,28 @@ class DeleteAssetTestCase(AssetsTestCase):
             resp = self.client.delete(test_url, HTTP_ACCEPT="application/json")
             self.assertEquals(resp.status_code, 204)
 
+    @override_settings(COURSE_IMAGE_VARIANTS={'ENABLED': True, 'WIDTHS': [20], 'FORMATS': ['webp']})
+    def test_delete_image_with_shared_variants(self):
+        """
+        Tests that the variants of an image are kept while another image with the same contents uses them.
+        """
+        urls = []
+        for name in ('shared_image_1', 'shared_image_2'):
+            response = self.client.post(self.url, {"name": name, "file": self.get_sample_asset(name, "image")})
+            self.assertEquals(response.status_code, 200)
+            urls.append(json.loads(response.content)['asset']['url'])
+        content = contentstore().find(StaticContent.get_location_from_path(urls[0]))
+        variant_location = StaticContent.compute_location(
+            self.course.id, '{}-20w.webp'.format(content.content_digest), is_thumbnail=True
+        )
+
+        for url, variant_kept in zip(urls, (True, False)):
+            test_url = reverse_course_url('assets_handler', self.course.id, kwargs={'asset_key_string': unicode(url)})
+            resp = self.client.delete(test_url, HTTP_ACCEPT="application/json")
+            self.assertEquals(resp.status_code, 204)
+            variant = contentstore().find(variant_location, throw_on_not_found=False)
+            self.assertEqual(variant is not None, variant_kept)
+
     def test_delete_asset_with_invalid_asset(self):
         """ Tests the sad path :( """
         test_url = reverse_course_url(
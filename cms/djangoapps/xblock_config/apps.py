@@ -17,6 +17,7 @@ class XBlockConfig(AppConfig):
     verbose_name = u'XBlock Configuration'
 
     def ready(self):
+        from capa.safe_exec.django_integration import configure_safe_exec
         from openedx.core.lib.xblock_utils import xblock_local_resource_url
 
         # In order to allow descriptors to use a handler url, we need to
@@ -25,3 +26,7 @@ class XBlockConfig(AppConfig):
         # https://openedx.atlassian.net/wiki/display/PLAT/Convert+from+Storage-centric+runtimes+to+Application-centric+runtimes
         xmodule.x_module.descriptor_global_handler_url = cms.lib.xblock.runtime.handler_url
         xmodule.x_module.descriptor_global_local_resource_url = xblock_local_resource_url
+
+        # Configure the sandbox worker pool and result cache in every process,
+        # not only in those that serve requests.
+        configure_safe_exec()
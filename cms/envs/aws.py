@@ -170,6 +170,12 @@ if 'loc_cache' not in CACHES:
         'LOCATION': 'edx_location_mem_cache',
     }
 
+COURSE_STRUCTURE_MEMORY_CACHE_MAX_BYTES = ENV_TOKENS.get(
+    'COURSE_STRUCTURE_MEMORY_CACHE_MAX_BYTES', COURSE_STRUCTURE_MEMORY_CACHE_MAX_BYTES
+)
+CONTENTSERVER_DISK_CACHE.update(ENV_TOKENS.get('CONTENTSERVER_DISK_CACHE', {}))
+COURSE_IMAGE_VARIANTS.update(ENV_TOKENS.get('COURSE_IMAGE_VARIANTS', {}))
+
 SESSION_COOKIE_DOMAIN = ENV_TOKENS.get('SESSION_COOKIE_DOMAIN')
 SESSION_COOKIE_HTTPONLY = ENV_TOKENS.get('SESSION_COOKIE_HTTPONLY', True)
 SESSION_ENGINE = ENV_TOKENS.get('SESSION_ENGINE', SESSION_ENGINE)
@@ -360,6 +366,11 @@ else:
 
 USER_TASKS_ARTIFACT_STORAGE = COURSE_IMPORT_EXPORT_STORAGE
 
+COURSE_IMPORT_STATIC_UPLOAD_WORKERS = ENV_TOKENS.get(
+    'COURSE_IMPORT_STATIC_UPLOAD_WORKERS', COURSE_IMPORT_STATIC_UPLOAD_WORKERS
+)
+COURSE_IMPORT_THUMBNAIL_WORKERS = ENV_TOKENS.get('COURSE_IMPORT_THUMBNAIL_WORKERS', COURSE_IMPORT_THUMBNAIL_WORKERS)
+
 DATABASES = AUTH_TOKENS['DATABASES']
 
 # The normal database user does not have enough permissions to run migrations.
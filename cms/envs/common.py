@@ -592,6 +592,32 @@ MODULESTORE = {
     }
 }
 
+# Maximum size, in bytes, of the per-process cache of pickled split
+# modulestore course structures that sits in front of the
+# 'course_structure_cache' django cache. 0 disables the in-process cache.
+COURSE_STRUCTURE_MEMORY_CACHE_MAX_BYTES = 0
+
+# A cache, on local disk, of the contents of the course assets served by the contentserver
+# that are too large for memcache.  Set DIRECTORY to enable it.  If X_ACCEL_REDIRECT_PREFIX
+# is set, cached assets are sent by the web server, which must serve DIRECTORY internally
+# under that URL prefix.
+CONTENTSERVER_DISK_CACHE = {
+    'DIRECTORY': None,
+    'MAX_SIZE': 10 * 1024 * 1024 * 1024,
+    'X_ACCEL_REDIRECT_PREFIX': None,
+}
+
+# Resized and re-encoded variants of the JPEG, PNG, BMP and TIFF images uploaded to courses, which
+# Studio generates in the background and the contentserver serves in place of the originals when a
+# request asks for a width (?w=640) or for a format (?format=webp, or by its Accept header).  FORMATS
+# are in order of preference.  Studio and the LMS must have the same configuration.
+COURSE_IMAGE_VARIANTS = {
+    'ENABLED': False,
+    'WIDTHS': [320, 640, 1280],
+    'FORMATS': ['webp', 'jpeg'],
+    'QUALITY': 80,
+}
+
 # Modulestore-level field override providers. These field override providers don't
 # require student context.
 MODULESTORE_FIELD_OVERRIDE_PROVIDERS = ()
@@ -609,6 +635,29 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # Persistent, pre-warmed sandbox worker processes.
+    'worker_pool': {
+        # How many workers each process can run.  0 disables the pool.
+        'size': 0,
+        # How many executions a worker runs before it is replaced.
+        'max_executions': 100,
+        # How much memory, in bytes, a worker can use before it is replaced.
+        'max_memory': 256 * 1024 * 1024,
+    },
+
+    # Caching of the results of sandboxed code.
+    'result_cache': {
+        # How many results each process caches in memory.  0 disables it.
+        'max_entries': 1000,
+        # How much memory, in bytes, the results cached in each process can use.
+        'max_bytes': 32 * 1024 * 1024,
+        # Results larger than this, in bytes, aren't cached.  None means no maximum.
+        'max_result_size': 1024 * 1024,
+        # The name of a cache in CACHES that all processes share, instead of
+        # the default cache.
+        'backend': None,
+    },
 }
 
 ############################ DJANGO_BUILTINS ################################
@@ -676,6 +725,13 @@ MESSAGE_STORAGE = 'django.contrib.messages.storage.session.SessionStorage'
 
 COURSE_IMPORT_EXPORT_STORAGE = 'django.core.files.storage.FileSystemStorage'
 
+# The number of threads that upload a course's static files, streaming them from disk,
+# while its blocks are imported.  0, the default, uploads the static files one at a time,
+# before the blocks.
+COURSE_IMPORT_STATIC_UPLOAD_WORKERS = 0
+# The number of threads that build the thumbnails of the images uploaded by those threads.
+COURSE_IMPORT_THUMBNAIL_WORKERS = 2
+
 ##### EMBARGO #####
 EMBARGO_SITE_REDIRECT_URL = None
 
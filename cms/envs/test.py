@@ -131,6 +131,9 @@ LMS_ROOT_URL = "http://{}".format(LMS_BASE)
 FEATURES['PREVIEW_LMS_BASE'] = "preview.localhost"
 
 
+# Don't cache the results of sandboxed code in memory, across tests.
+CODE_JAIL['result_cache']['max_entries'] = 0
+
 CACHES = {
     # This is the cache used for most things. Askbot will not work without a
     # functioning cache -- it relies on caching to load its settings in places.
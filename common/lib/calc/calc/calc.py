@@ -2,6 +2,10 @@
 Parser and evaluator for FormulaResponse and NumericalResponse
 
 Uses pyparsing to parse. Main function as of now is evaluator().
+
+Parsed expressions are kept, as CompiledExpression objects, in a bounded
+cache, so that an expression that is evaluated many times (for
+instance, once per sample of a FormulaResponse) is only parsed once.
 """
 
 import math
@@ -81,6 +85,16 @@ SUFFIXES = {
     '%': 0.01,
 }
 
+# Default functions that can be applied to NumPy arrays of values, as well
+# as to single values, with the same results for each value.
+VECTORIZED_FUNCTIONS = frozenset(
+    function for name, function in DEFAULT_FUNCTIONS.iteritems()
+    if name not in ('arccot', 'fact', 'factorial')
+)
+
+# The maximum number of compiled expressions kept by compile_expression.
+COMPILED_EXPRESSION_CACHE_SIZE = 1000
+
 
 class UndefinedVariable(Exception):
     """
@@ -244,35 +258,238 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
     if math_expr.strip() == "":
         return float('nan')
 
-    # Parse the tree.
-    check_parens(math_expr)
-    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
-    math_interpreter.parse_algebra()
+    return compile_expression(math_expr, case_sensitive).evaluate(variables, functions)
 
-    # Get our variables together.
-    all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
 
-    # ...and check them
-    math_interpreter.check_variables(all_variables, all_functions)
+def evaluator_samples(variables_list, functions, math_expr, case_sensitive=False):
+    """
+    Evaluate an expression for each of a list of dictionaries of variables.
 
-    # Create a recursion to evaluate the tree.
-    if case_sensitive:
-        casify = lambda x: x
-    else:
-        casify = lambda x: x.lower()  # Lowercase for case insens.
-
-    evaluate_actions = {
-        'number': eval_number,
-        'variable': lambda x: all_variables[casify(x[0])],
-        'function': lambda x: all_functions[casify(x[0])](x[1]),
-        'atom': eval_atom,
-        'power': eval_power,
-        'parallel': eval_parallel,
-        'product': eval_product,
-        'sum': eval_sum
-    }
+    Return the same list of values as calling `evaluator` with each of the
+    dictionaries would, or raise the error that the first failing call would
+    raise.  The expression is only parsed once, and is evaluated for all
+    the dictionaries together, with NumPy arrays of the variables' values,
+    when possible.
+    """
+    if math_expr.strip() == "":
+        return [float('nan')] * len(variables_list)
+
+    return compile_expression(math_expr, case_sensitive).evaluate_samples(variables_list, functions)
+
+
+def compile_expression(math_expr, case_sensitive=False):
+    """
+    Return the CompiledExpression for the given expression.
+
+    Compiled expressions are kept in a cache of at most
+    COMPILED_EXPRESSION_CACHE_SIZE (expression, case_sensitive) pairs,
+    which is emptied when it is full.
+    """
+    key = (math_expr, case_sensitive)
+    compiled_expression = _COMPILED_EXPRESSIONS.get(key)
+    if compiled_expression is None:
+        compiled_expression = CompiledExpression(math_expr, case_sensitive)
+        # calc is installed in the codejail sandbox without the rest of the
+        # platform, so it can't use xmodule's LRUCache.
+        if len(_COMPILED_EXPRESSIONS) >= COMPILED_EXPRESSION_CACHE_SIZE:
+            _COMPILED_EXPRESSIONS.clear()
+        _COMPILED_EXPRESSIONS[key] = compiled_expression
+    return compiled_expression
+
+
+class CompiledExpression(object):
+    """
+    An expression, parsed once, that can be evaluated for many values of
+    its variables.
+
+    The parse tree is turned into nested functions of the variables and
+    functions dictionaries, which compute the same values as the
+    `evaluate_actions` of the parse tree would.
+    """
+    def __init__(self, math_expr, case_sensitive=False):
+        """
+        Parse the given expression.
+
+        Raise UnmatchedParenthesis or a pyparsing exception if it can't be
+        parsed, as `evaluator` does.
+        """
+        check_parens(math_expr)
+        self.math_interpreter = ParseAugmenter(math_expr, case_sensitive)
+        self.math_interpreter.parse_algebra()
+
+        if case_sensitive:
+            casify = lambda x: x
+        else:
+            casify = lambda x: x.lower()  # Lowercase for case insens.
+        self._evaluate_tree = _compile_node(self.math_interpreter.tree, casify)
+
+    @property
+    def case_sensitive(self):
+        """
+        Whether the expression's variables and functions are case sensitive.
+        """
+        return self.math_interpreter.case_sensitive
+
+    def evaluate(self, variables, functions):
+        """
+        Evaluate the expression for the given variables and functions, as
+        `evaluator` does.
+        """
+        all_variables, all_functions = add_defaults(variables, functions, self.case_sensitive)
+        self.math_interpreter.check_variables(all_variables, all_functions)
+        return self._evaluate_tree(all_variables, all_functions, _call_function)
 
-    return math_interpreter.reduce_tree(evaluate_actions)
+    def evaluate_vectorized(self, variables, functions):
+        """
+        Evaluate the expression for arrays of values of its variables.
+
+        -Variables are passed as a dictionary from string to value, where
+         the values are NumPy arrays of the same shape, or python numbers.
+        -Unary functions are passed as a dictionary from string to function.
+         Functions other than the VECTORIZED_FUNCTIONS are applied to each of
+         the values of their argument.
+
+        Return an array of the expression's values. Errors, such as division
+        by zero, are not reported as they are by `evaluate`, but as NumPy
+        does for arrays.
+        """
+        all_variables, all_functions = add_defaults(variables, functions, self.case_sensitive)
+        self.math_interpreter.check_variables(all_variables, all_functions)
+        return self._evaluate_tree(all_variables, all_functions, _call_function_vectorized)
+
+    def evaluate_samples(self, variables_list, functions):
+        """
+        Evaluate the expression for each of a list of dictionaries of
+        variables, as `evaluator_samples` does.
+
+        The dictionaries are evaluated together with `evaluate_vectorized`.
+        If any of the values could differ from what `evaluate` returns (on
+        floating point errors) or the variables can't be put into float
+        arrays, each dictionary is evaluated with `evaluate` instead.
+        """
+        variables_list = list(variables_list)
+        names = set(variables_list[0]) if variables_list else set()
+        if len(variables_list) > 1 and all(set(variables) == names for variables in variables_list):
+            sample_variables = {
+                name: numpy.array([variables[name] for variables in variables_list])
+                for name in names
+            }
+            # Integer arrays don't follow Python's arithmetic (2 ** -1 is 0).
+            if all(values.dtype.kind in 'fc' for values in sample_variables.itervalues()):
+                try:
+                    with numpy.errstate(divide='raise', over='raise', invalid='raise'):
+                        values = self.evaluate_vectorized(sample_variables, functions)
+                    if numpy.ndim(values) == 0:
+                        return [values] * len(variables_list)
+                    if numpy.shape(values) == (len(variables_list),):
+                        return list(values)
+                except Exception:  # pylint: disable=broad-except
+                    # Evaluate the samples one at a time, to return or raise
+                    # exactly what `evaluate` does.
+                    pass
+
+        return [self.evaluate(variables, functions) for variables in variables_list]
+
+
+_COMPILED_EXPRESSIONS = {}
+
+
+def _call_function(function, value):
+    """
+    Apply a function to a value.
+    """
+    return function(value)
+
+
+def _call_function_vectorized(function, values):
+    """
+    Apply a function to an array of values.
+    """
+    if function in VECTORIZED_FUNCTIONS or isinstance(function, numpy.ufunc) or numpy.ndim(values) == 0:
+        return function(values)
+    return numpy.array([function(value) for value in values])
+
+
+def _compile_node(node, casify):
+    """
+    Return a function of (variables, functions, call_function) that computes
+    the value of the given node of the parse tree, as its `evaluate_actions`
+    in `evaluator` would.  `call_function` applies a function to its argument.
+    """
+    node_name = node.getName()
+    children = [_compile_node(child, casify) for child in node if isinstance(child, ParseResults)]
+
+    if node_name == 'number':
+        value = eval_number(node)
+        return lambda variables, functions, call_function: value
+
+    elif node_name == 'variable':
+        name = casify(node[0])
+        return lambda variables, functions, call_function: variables[name]
+
+    elif node_name == 'function':
+        name = casify(node[0])
+        argument = children[0]
+        return lambda variables, functions, call_function: call_function(
+            functions[name], argument(variables, functions, call_function)
+        )
+
+    elif node_name == 'atom':
+        # Ignore the parentheses.
+        return children[0]
+
+    elif node_name == 'power':
+        operands = list(reversed(children))
+
+        def evaluate_power(variables, functions, call_function):
+            """
+            Exponentiate the operands right to left, as `eval_power`.
+            """
+            return reduce(lambda a, b: b ** a, [operand(variables, functions, call_function) for operand in operands])
+        return evaluate_power
+
+    elif node_name == 'parallel':
+        if len(children) == 1:
+            return children[0]
+
+        def evaluate_parallel(variables, functions, call_function):
+            """
+            Compute the parallel resistors operator, as `eval_parallel`.
+            """
+            values = [operand(variables, functions, call_function) for operand in children]
+            if any(numpy.any(numpy.equal(value, 0)) for value in values):
+                if call_function is not _call_function:
+                    raise ZeroDivisionError('Parallel operator with a zero operand in a vectorized evaluation.')
+                return float('nan')
+            return 1. / sum(1. / value for value in values)
+        return evaluate_parallel
+
+    elif node_name in ('sum', 'product'):
+        if node_name == 'sum':
+            total, operations = 0.0, {'+': operator.add, '-': operator.sub}
+        else:
+            total, operations = 1.0, {'*': operator.mul, '/': operator.truediv}
+        terms = []
+        current_op = operator.add if node_name == 'sum' else operator.mul
+        compiled_children = iter(children)
+        for child in node:
+            if isinstance(child, ParseResults):
+                terms.append((current_op, next(compiled_children)))
+            else:
+                current_op = operations[child]
+
+        def evaluate_terms(variables, functions, call_function):
+            """
+            Add or multiply the terms, as `eval_sum` or `eval_product`.
+            """
+            result = total
+            for term_op, term in terms:
+                result = term_op(result, term(variables, functions, call_function))
+            return result
+        return evaluate_terms
+
+    else:  # pragma: no cover
+        raise Exception(u"Unknown branch name '{}'".format(node_name))
 
 
 def check_parens(formula):
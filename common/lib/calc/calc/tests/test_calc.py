@@ -552,3 +552,72 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({}, {}, "(1+2")
         with self.assertRaisesRegexp(calc.UnmatchedParenthesis, 'no matching opening parenthesis'):
             calc.evaluator({}, {}, "(1+2))")
+
+
+class CompiledExpressionTest(unittest.TestCase):
+    """
+    Run tests for calc.compile_expression and calc.evaluator_samples
+    """
+    SAMPLES = [{'x': x, 'y': y} for x, y in [(0.5, 2.0), (1.5, -3.0), (2.25, 0.75), (4.0, 1.0)]]
+
+    def assert_samples_match_evaluator(self, math_expr, samples=None, functions=None, case_sensitive=False):
+        """
+        Check that `evaluator_samples` returns what `evaluator` returns for
+        each sample.
+        """
+        samples = self.SAMPLES if samples is None else samples
+        functions = functions or {}
+        values = calc.evaluator_samples(samples, functions, math_expr, case_sensitive)
+        self.assertEqual(len(values), len(samples))
+        for variables, value in zip(samples, values):
+            expected = calc.evaluator(variables, functions, math_expr, case_sensitive)
+            if numpy.isnan(expected):
+                self.assertTrue(numpy.isnan(value))
+            else:
+                self.assertAlmostEqual(value, expected, delta=1e-12 * max(1, abs(expected)))
+
+    def test_compiled_expressions_are_cached(self):
+        compiled = calc.compile_expression('x^2 + y')
+        self.assertIs(calc.compile_expression('x^2 + y'), compiled)
+        self.assertIsNot(calc.compile_expression('x^2 + y', case_sensitive=True), compiled)
+
+    def test_compiled_expression_cache_is_bounded(self):
+        compiled = calc.compile_expression('x + 1')
+        for i in range(calc.COMPILED_EXPRESSION_CACHE_SIZE):
+            calc.compile_expression('x + {}'.format(i + 2))
+        self.assertIsNot(calc.compile_expression('x + 1'), compiled)
+
+    def test_samples(self):
+        for math_expr in (
+            '3', 'x', '-x + 2*y - 1', 'x/y * 3', 'x^y^2', 'x^0.5', '(x + y)^2', 'x||y',
+            'sin(x) + cos(y)^2', 'sqrt(y)', 'arccot(y) * x', 'fact(4) + x', '5%*x + 2*y', 'x*pi + e',
+        ):
+            self.assert_samples_match_evaluator(math_expr)
+
+    def test_samples_fallback(self):
+        # Division by zero and parallel zeros, in one of the samples.
+        samples = self.SAMPLES + [{'x': 0.0, 'y': 0.0}]
+        self.assert_samples_match_evaluator('x||y', samples)
+        with self.assertRaises(ZeroDivisionError):
+            calc.evaluator_samples(samples, {}, 'x/y')
+        # Integer values.
+        self.assert_samples_match_evaluator('x^(-y)', [{'x': 2, 'y': 1}, {'x': 4, 'y': 2}])
+        # Samples with different variables.
+        self.assert_samples_match_evaluator('x + 1', [{'x': 1.0}, {'x': 2.0, 'y': 1.0}])
+        # Functions that can't be applied to arrays.
+        self.assert_samples_match_evaluator('f(x)', functions={'f': lambda x: x if x > 1 else -x})
+        self.assert_samples_match_evaluator('fact(x*2)', [{'x': 1.0}, {'x': 2.5}])
+
+    def test_samples_errors(self):
+        self.assertTrue(all(numpy.isnan(value) for value in calc.evaluator_samples(self.SAMPLES, {}, ' ')))
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'z'):
+            calc.evaluator_samples(self.SAMPLES, {}, 'x + z')
+        with self.assertRaises(calc.UnmatchedParenthesis):
+            calc.evaluator_samples(self.SAMPLES, {}, '(x + y')
+        with self.assertRaisesRegexp(ValueError, 'factorial'):
+            calc.evaluator_samples(self.SAMPLES, {}, 'fact(x)')
+
+    def test_samples_case_sensitivity(self):
+        samples = [{'x': 1.0, 'X': 2.0}, {'x': 3.0, 'X': 5.0}]
+        self.assertEqual(calc.evaluator_samples(samples, {}, 'x + X', case_sensitive=True), [3.0, 8.0])
+        self.assert_samples_match_evaluator('x - X', samples, case_sensitive=True)
@@ -13,6 +13,7 @@ Main module which shows problems (of "capa" type).
 This is used by capa_module.
 """
 
+import hashlib
 import logging
 import os.path
 import re
@@ -33,6 +34,7 @@ from capa.safe_exec import safe_exec
 from capa.util import contextualize_text, convert_files_to_filenames
 from openedx.core.djangolib.markup import HTML
 from xmodule.stringify import stringify_children
+from xmodule.util.lru_cache import LRUCache
 
 # extra things displayed after "show answers" is pressed
 solution_tags = ['solution']
@@ -58,6 +60,10 @@ html_transforms = {
     'math': {'tag': 'span'},
 }
 
+# How many parsed problem trees, and preprocessed trees of problems, are
+# kept, to be copied by new problems.
+PROBLEM_TREE_CACHE_SIZE = 1000
+
 # These should be removed from HTML output, including all subelements
 html_problem_semantics = [
     "codeparam",
@@ -178,13 +184,10 @@ class LoncapaProblem(object):
         problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
         self.problem_text = problem_text
 
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
-
-        self.make_xml_compatible(self.tree)
-
-        # handle any <include file="foo"> tags
-        self._process_includes()
+        # parse problem XML file into an element tree, compatible and with
+        # any <include file="foo"> tags handled, and pre-parse it: this modifies
+        # it to add ID's and perform some in-place transformations
+        self.tree, self.problem_data = self._parse_problem_tree(problem_text)
 
         # construct script processor context (eg for customresponse problems)
         if minimal_init:
@@ -192,11 +195,10 @@ class LoncapaProblem(object):
         else:
             self.context = self._extract_context(self.tree)
 
-        # Pre-parse the XML tree: modifies it to add ID's and perform some in-place
-        # transformations.  This also creates the dict (self.responders) of Response
-        # instances for each question in the problem. The dict has keys = xml subtree of
-        # Response, values = Response instance
-        self.problem_data = self._preprocess_problem(self.tree, minimal_init)
+        # Create the dict (self.responders) of Response instances for each question
+        # in the problem. The dict has keys = xml subtree of Response, values = Response
+        # instance
+        self._create_responders(self.tree, minimal_init)
 
         if not minimal_init:
             if not self.student_answers:  # True when student_answers is an empty dict
@@ -217,6 +219,43 @@ class LoncapaProblem(object):
             if extract_tree:
                 self.extracted_tree = self._extract_html(self.tree)
 
+    def _parse_problem_tree(self, problem_text):
+        """
+        Return a tuple of a new XML tree of the problem text, made compatible,
+        with its includes processed and preprocessed by _preprocess_problem,
+        and of the problem's a11y data.
+
+        None of this depends on the seed or state of the problem, so the trees
+        of problems without includes are parsed once, kept in a cache keyed by
+        the problem text, and copied for each new problem.  Preprocessed trees,
+        and their a11y data, are kept in a cache keyed by the problem text and
+        id.
+        """
+        if isinstance(problem_text, unicode):
+            text_hash = hashlib.sha1(problem_text.encode('utf-8')).hexdigest()
+        else:
+            text_hash = hashlib.sha1(problem_text).hexdigest()
+        preprocessed_key = (text_hash, self.problem_id)
+        cached_preprocessed = _PREPROCESSED_PROBLEM_TREES.get(preprocessed_key)
+        if cached_preprocessed is not None:
+            return deepcopy(cached_preprocessed)
+
+        cached_tree = _PROBLEM_TREES.get(text_hash)
+        if cached_tree is not None:
+            self.tree = deepcopy(cached_tree)
+        else:
+            self.tree = etree.XML(problem_text)
+            self.make_xml_compatible(self.tree)
+            # Included files can change, so trees with includes aren't cached.
+            if self.tree.find('.//include') is not None:
+                self._process_includes()
+                return self.tree, self._preprocess_problem(self.tree)
+            _PROBLEM_TREES.set(text_hash, deepcopy(self.tree))
+
+        problem_data = self._preprocess_problem(self.tree)
+        _PREPROCESSED_PROBLEM_TREES.set(preprocessed_key, deepcopy((self.tree, problem_data)))
+        return self.tree, problem_data
+
     def make_xml_compatible(self, tree):
         """
         Adjust tree xml in-place for compatibility before creating
@@ -421,6 +460,40 @@ class LoncapaProblem(object):
         """
         return all('filesubmission' not in responder.allowed_inputfields for responder in self.responders.values())
 
+    def supports_batch_grading(self):
+        """
+        Checks that all the response types of this problem can grade many
+        submissions at once, with `grade_answers_batch`.
+        """
+        return all(responder.batch_gradable for responder in self.responders.values())
+
+    def grade_answers_batch(self, answers_list):
+        """
+        Grade many submissions to this problem at once, without changing the
+        problem's state.  Used to grade many learners' answers, e.g. when
+        rescoring; the submissions must all be for this problem's seed, so
+        callers should group them by seed.
+
+        `answers_list` is a list of dicts of answers, as passed to `grade_answers`.
+
+        Returns a list with, for each dict of answers, either its CorrectMap or
+        the first StudentInputError or ResponseError that grading it raised.
+        Hints are not computed.
+        """
+        if not self.supports_batch_grading():
+            raise responsetypes.LoncapaProblemError("This problem does not support batch grading.")
+
+        answers_list = [convert_files_to_filenames(answers) for answers in answers_list]
+        results = [CorrectMap() for _ in answers_list]
+        for responder in self.responders.values():
+            for index, result in enumerate(responder.get_score_batch(answers_list)):
+                if isinstance(results[index], CorrectMap):
+                    if isinstance(result, CorrectMap):
+                        results[index].update(result)
+                    else:
+                        results[index] = result
+        return results
+
     def get_grade_from_current_answers(self, student_answers):
         """
         Gets the grade for the currently-saved problem state, but does not save it
@@ -1009,20 +1082,18 @@ class LoncapaProblem(object):
 
         return tree
 
-    def _preprocess_problem(self, tree, minimal_init):  # private
+    def _preprocess_problem(self, tree):  # private
         """
         Assign IDs to all the responses
         Assign sub-IDs to all entries (textline, schematic, etc.)
+        Assign IDs to all the solutions
         Annoted correctness and value
         In-place transformation
 
-        Also create capa Response instances for each responsetype and save as self.responders
-
-        Obtain all responder answers and save as self.responder_answers dict (key = response)
+        Returns the a11y data of the entries.
         """
         response_id = 1
         problem_data = {}
-        self.responders = {}
         for response in tree.xpath('//' + "|//".join(responsetypes.registry.registered_tags())):
             responsetype_id = self.problem_id + "_" + str(response_id)
             # create and save ID for this response
@@ -1030,11 +1101,7 @@ class LoncapaProblem(object):
             response_id += 1
 
             answer_id = 1
-            input_tags = inputtypes.registry.registered_tags()
-            inputfields = tree.xpath(
-                "|".join(['//' + response.tag + '[@id=$id]//' + x for x in input_tags]),
-                id=responsetype_id
-            )
+            inputfields = self._response_inputfields(tree, response)
 
             # assign one answer_id for each input type
             for entry in inputfields:
@@ -1045,6 +1112,27 @@ class LoncapaProblem(object):
 
             self.response_a11y_data(response, inputfields, responsetype_id, problem_data)
 
+        # <solution>...</solution> may not be associated with any specific response; give
+        # IDs for those separately
+        # TODO: We should make the namespaces consistent and unique (e.g. %s_problem_%i).
+        solution_id = 1
+        for solution in tree.findall('.//solution'):
+            solution.attrib['id'] = "%s_solution_%i" % (self.problem_id, solution_id)
+            solution_id += 1
+
+        return problem_data
+
+    def _create_responders(self, tree, minimal_init):  # private
+        """
+        Create capa Response instances for each responsetype of the preprocessed
+        tree and save as self.responders
+
+        Obtain all responder answers and save as self.responder_answers dict (key = response)
+        """
+        self.responders = {}
+        for response in tree.xpath('//' + "|//".join(responsetypes.registry.registered_tags())):
+            inputfields = self._response_inputfields(tree, response)
+
             # instantiate capa Response
             responsetype_cls = responsetypes.registry.get_class_for_tag(response.tag)
             responder = responsetype_cls(
@@ -1065,15 +1153,16 @@ class LoncapaProblem(object):
                               self.responders[response])  # FIXME
                     raise
 
-            # <solution>...</solution> may not be associated with any specific response; give
-            # IDs for those separately
-            # TODO: We should make the namespaces consistent and unique (e.g. %s_problem_%i).
-            solution_id = 1
-            for solution in tree.findall('.//solution'):
-                solution.attrib['id'] = "%s_solution_%i" % (self.problem_id, solution_id)
-                solution_id += 1
-
-        return problem_data
+    def _response_inputfields(self, tree, response):  # private
+        """
+        Returns the entries (textline, schematic, etc.) of the given response,
+        which must have an ID.
+        """
+        input_tags = inputtypes.registry.registered_tags()
+        return tree.xpath(
+            "|".join(['//' + response.tag + '[@id=$id]//' + x for x in input_tags]),
+            id=response.get('id')
+        )
 
     def response_a11y_data(self, response, inputfields, responsetype_id, problem_data):
         """
@@ -1168,3 +1257,10 @@ class LoncapaProblem(object):
                 'label': HTML(label.strip()) if label else '',
                 'descriptions': descriptions
             }
+
+
+# Parsed problem trees, which must not be changed.
+_PROBLEM_TREES = LRUCache(max_entries=PROBLEM_TREE_CACHE_SIZE)
+
+# Preprocessed problem trees, and their a11y data, which must not be changed.
+_PREPROCESSED_PROBLEM_TREES = LRUCache(max_entries=PROBLEM_TREE_CACHE_SIZE)
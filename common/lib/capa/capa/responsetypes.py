@@ -40,13 +40,14 @@ import capa.safe_exec as safe_exec
 import capa.xqueue_interface as xqueue_interface
 import dogstats_wrapper as dog_stats_api
 # specific library imports
-from calc import UndefinedVariable, UnmatchedParenthesis, evaluator
+from calc import UndefinedVariable, UnmatchedParenthesis, evaluator, evaluator_samples
 from cmath import isnan
 from openedx.core.djangolib.markup import HTML, Text
 
 from . import correctmap
 from .registry import TagRegistry
 from .util import (
+    compare_many_with_tolerance,
     compare_with_tolerance,
     contextualize_text,
     convert_files_to_filenames,
@@ -157,6 +158,10 @@ class LoncapaResponse(object):
     # By default, we set this to False, allowing subclasses to override as appropriate.
     multi_device_support = False
 
+    # Whether `get_score_batch` can grade this response type's answers without
+    # side effects, so that LoncapaProblem can grade many submissions at once.
+    batch_gradable = False
+
     def __init__(self, xml, inputfields, context, system, capa_module, minimal_init):
         """
         Init is passed the following arguments:
@@ -547,6 +552,24 @@ class LoncapaResponse(object):
         """
         pass
 
+    def get_score_batch(self, student_answers_list):
+        """
+        Grade many submissions to this response, as `get_score` does for one.
+
+        Returns a list with, for each dict of student answers, either its
+        CorrectMap or the StudentInputError or ResponseError that grading it
+        raised.  Hints are not computed.
+
+        Response types can override this to share work between submissions.
+        """
+        results = []
+        for student_answers in student_answers_list:
+            try:
+                results.append(self.get_score(student_answers))
+            except (StudentInputError, ResponseError) as err:
+                results.append(err)
+        return results
+
     @abc.abstractmethod
     def get_answers(self):
         """
@@ -666,6 +689,7 @@ class ChoiceResponse(LoncapaResponse):
     allowed_inputfields = ['checkboxgroup', 'radiogroup']
     correct_choices = None
     multi_device_support = True
+    batch_gradable = True
 
     def setup_response(self):
         self.assign_choice_names()
@@ -990,6 +1014,7 @@ class MultipleChoiceResponse(LoncapaResponse):
     allowed_inputfields = ['choicegroup']
     correct_choices = None
     multi_device_support = True
+    batch_gradable = True
 
     def setup_response(self):
         """
@@ -1429,6 +1454,7 @@ class OptionResponse(LoncapaResponse):
     allowed_inputfields = ['optioninput']
     answer_fields = None
     multi_device_support = True
+    batch_gradable = True
 
     def setup_response(self):
         self.answer_fields = self.inputfields
@@ -1504,6 +1530,7 @@ class NumericalResponse(LoncapaResponse):
     required_attributes = ['answer']
     max_inputfields = 1
     multi_device_support = True
+    batch_gradable = True
 
     def __init__(self, *args, **kwargs):
         self.correct_answer = ''
@@ -1572,23 +1599,11 @@ class NumericalResponse(LoncapaResponse):
 
         return correct_ans
 
-    def get_score(self, student_answers):
+    def _student_float(self, student_answer):
         """
-        Grade a numeric response.
+        Evaluate a student's numerical answer, raising a StudentInputError
+        with a message for the student if it can't be.
         """
-        if self.answer_id not in student_answers:
-            return CorrectMap(self.answer_id, 'incorrect')
-
-        # Make sure we're using an approved partial credit style.
-        # Currently implemented: 'close' and 'list'
-        if self.has_partial_credit:
-            graders = ['list', 'close']
-            for style in self.credit_type:
-                if style not in graders:
-                    raise LoncapaProblemError('partial_credit attribute should be one of: ' + ','.join(graders))
-
-        student_answer = student_answers[self.answer_id]
-
         _ = self.capa_system.i18n.ugettext
         general_exception = StudentInputError(
             _(u"Could not interpret '{student_answer}' as a number.").format(student_answer=cgi.escape(student_answer))
@@ -1627,7 +1642,80 @@ class NumericalResponse(LoncapaResponse):
         except Exception:
             raise general_exception
         # End `evaluator` block -- we figured out the student's answer!
+        return student_float
+
+    def get_score_batch(self, student_answers_list):
+        """
+        Grade many numeric responses, comparing all the answers to the staff
+        answer together.  Range tolerances and partial credit are graded one
+        submission at a time.
+        """
+        if self.range_tolerance or self.has_partial_credit:
+            return super(NumericalResponse, self).get_score_batch(student_answers_list)
+
+        results = [None] * len(student_answers_list)
+        indices, student_floats = [], []
+        for index, student_answers in enumerate(student_answers_list):
+            if self.answer_id not in student_answers:
+                results[index] = CorrectMap(self.answer_id, 'incorrect')
+                continue
+            try:
+                student_floats.append(self._student_float(student_answers[self.answer_id]))
+                indices.append(index)
+            except StudentInputError as err:
+                results[index] = err
+        if not student_floats:
+            return results
 
+        try:
+            correct_float = self.get_staff_ans(self.correct_answer)
+        except StudentInputError as err:
+            for index in indices:
+                results[index] = err
+            return results
+
+        # The staff's additional answers, or the errors evaluating them, in
+        # the order get_score compares with them.
+        additional_floats = []
+        for answer in self.additional_answers:
+            try:
+                additional_floats.append(self.get_staff_ans(answer))
+            except StudentInputError as err:
+                additional_floats.append(err)
+
+        comparisons = compare_many_with_tolerance(student_floats, correct_float, self.tolerance)
+        for index, student_float, is_correct in zip(indices, student_floats, comparisons):
+            results[index] = CorrectMap(self.answer_id, 'correct' if is_correct else 'incorrect')
+            if is_correct:
+                continue
+            for staff_answer in additional_floats:
+                if isinstance(staff_answer, StudentInputError):
+                    results[index] = staff_answer
+                    break
+                if complex(student_float) == staff_answer:
+                    results[index] = CorrectMap(self.answer_id, 'correct')
+                    break
+        return results
+
+    def get_score(self, student_answers):
+        """
+        Grade a numeric response.
+        """
+        if self.answer_id not in student_answers:
+            return CorrectMap(self.answer_id, 'incorrect')
+
+        # Make sure we're using an approved partial credit style.
+        # Currently implemented: 'close' and 'list'
+        if self.has_partial_credit:
+            graders = ['list', 'close']
+            for style in self.credit_type:
+                if style not in graders:
+                    raise LoncapaProblemError('partial_credit attribute should be one of: ' + ','.join(graders))
+
+        student_answer = student_answers[self.answer_id]
+        student_float = self._student_float(student_answer)
+
+        _ = self.capa_system.i18n.ugettext
         tree = self.xml
 
         # What multiple of the tolerance is worth partial credit?
@@ -1868,6 +1956,7 @@ class StringResponse(LoncapaResponse):
     max_inputfields = 1
     correct_answer = []
     multi_device_support = True
+    batch_gradable = True
 
     def setup_response_backward(self):
         self.correct_answer = [
@@ -1905,6 +1994,45 @@ class StringResponse(LoncapaResponse):
             correct = self.check_string(self.correct_answer, student_answer)
         return CorrectMap(self.answer_id, 'correct' if correct else 'incorrect')
 
+    def get_score_batch(self, student_answers_list):
+        """
+        Grade many string responses, compiling the regular expression, or
+        building the set of expected answers, once for all of them.
+        """
+        if self.backward:
+            return super(StringResponse, self).get_score_batch(student_answers_list)
+
+        if self.regexp:
+            flags = re.IGNORECASE if self.case_insensitive else 0
+            try:
+                regexp = re.compile('^' + '|'.join(self.correct_answer) + '$', flags=flags | re.UNICODE)
+            except Exception as err:  # pylint: disable=broad-except
+                _ = self.capa_system.i18n.ugettext
+                msg = u'[courseware.capa.responsetypes.stringresponse] {error}: {message}'.format(
+                    error=_('error'),
+                    message=text_type(err)
+                )
+                log.error(msg, exc_info=True)
+                regexp, regexp_error = None, ResponseError(msg)
+            matches = lambda given: bool(re.search(regexp, given))
+        elif self.case_insensitive:
+            expected = set(answer.lower() for answer in self.correct_answer)
+            matches = lambda given: given.lower() in expected
+        else:
+            expected = set(self.correct_answer)
+            matches = lambda given: given in expected
+
+        results = []
+        for student_answers in student_answers_list:
+            given = student_answers.get(self.answer_id, '').strip()
+            if not given:
+                results.append(CorrectMap(self.answer_id, 'incorrect'))
+            elif self.regexp and regexp is None:
+                results.append(regexp_error)
+            else:
+                results.append(CorrectMap(self.answer_id, 'correct' if matches(given) else 'incorrect'))
+        return results
+
     def check_string_backward(self, expected, given):
         if self.case_insensitive:
             return given.lower() in [i.lower() for i in expected]
@@ -3041,6 +3169,7 @@ class FormulaResponse(LoncapaResponse):
     required_attributes = ['answer', 'samples']
     max_inputfields = 1
     multi_device_support = True
+    batch_gradable = True
 
     def __init__(self, *args, **kwargs):
         self.correct_answer = ''
@@ -3087,6 +3216,35 @@ class FormulaResponse(LoncapaResponse):
         )
         return CorrectMap(self.answer_id, correctness)
 
+    def get_score_batch(self, student_answers_list):
+        """
+        Grade many formula responses at the same random samples, evaluating
+        the staff answer once for all of them.
+        """
+        var_dict_list = self.randomize_variables(self.samples)
+        instructor_result = instructor_error = None
+        results = []
+        for student_answers in student_answers_list:
+            if self.answer_id not in student_answers:
+                results.append(CorrectMap(self.answer_id, 'incorrect'))
+                continue
+            try:
+                student_result = self.tupleize_answers(student_answers[self.answer_id], var_dict_list)
+                if instructor_result is None and instructor_error is None:
+                    try:
+                        instructor_result = self.tupleize_answers(self.correct_answer, var_dict_list)
+                    except StudentInputError as err:
+                        instructor_error = err
+                if instructor_error is not None:
+                    raise instructor_error
+            except StudentInputError as err:
+                results.append(err)
+                continue
+            correct = all(compare_with_tolerance(student, instructor, self.tolerance)
+                          for student, instructor in zip(student_result, instructor_result))
+            results.append(CorrectMap(self.answer_id, 'correct' if correct else 'incorrect'))
+        return results
+
     def tupleize_answers(self, answer, var_dict_list):
         """
         Takes in an answer and a list of dictionaries mapping variables to values.
@@ -3095,64 +3253,62 @@ class FormulaResponse(LoncapaResponse):
         """
         _ = self.capa_system.i18n.ugettext
 
-        out = []
-        for var_dict in var_dict_list:
-            try:
-                out.append(evaluator(
-                    var_dict,
-                    dict(),
-                    answer,
-                    case_sensitive=self.case_sensitive,
-                ))
-            except UndefinedVariable as err:
-                log.debug(
-                    'formularesponse: undefined variable in formula=%s',
-                    cgi.escape(answer)
-                )
-                raise StudentInputError(
-                    _("Invalid input: {bad_input} not permitted in answer.").format(bad_input=text_type(err))
-                )
-            except UnmatchedParenthesis as err:
+        try:
+            # The answer is parsed once and evaluated for all the samples together.
+            return evaluator_samples(
+                var_dict_list,
+                dict(),
+                answer,
+                case_sensitive=self.case_sensitive,
+            )
+        except UndefinedVariable as err:
+            log.debug(
+                'formularesponse: undefined variable in formula=%s',
+                cgi.escape(answer)
+            )
+            raise StudentInputError(
+                _("Invalid input: {bad_input} not permitted in answer.").format(bad_input=text_type(err))
+            )
+        except UnmatchedParenthesis as err:
+            log.debug(
+                'formularesponse: unmatched parenthesis in formula=%s',
+                cgi.escape(answer)
+            )
+            raise StudentInputError(
+                err.args[0]
+            )
+        except ValueError as err:
+            if 'factorial' in text_type(err):
+                # This is thrown when fact() or factorial() is used in a formularesponse answer
+                #   that tests on negative and/or non-integer inputs
+                # text_type(err) will be: `factorial() only accepts integral values` or
+                # `factorial() not defined for negative values`
                 log.debug(
-                    'formularesponse: unmatched parenthesis in formula=%s',
+                    ('formularesponse: factorial function used in response '
+                     'that tests negative and/or non-integer inputs. '
+                     'Provided answer was: %s'),
                     cgi.escape(answer)
                 )
                 raise StudentInputError(
-                    err.args[0]
+                    _("Factorial function not permitted in answer "
+                      "for this problem. Provided answer was: "
+                      "{bad_input}").format(bad_input=cgi.escape(answer))
                 )
-            except ValueError as err:
-                if 'factorial' in text_type(err):
-                    # This is thrown when fact() or factorial() is used in a formularesponse answer
-                    #   that tests on negative and/or non-integer inputs
-                    # text_type(err) will be: `factorial() only accepts integral values` or
-                    # `factorial() not defined for negative values`
-                    log.debug(
-                        ('formularesponse: factorial function used in response '
-                         'that tests negative and/or non-integer inputs. '
-                         'Provided answer was: %s'),
-                        cgi.escape(answer)
-                    )
-                    raise StudentInputError(
-                        _("Factorial function not permitted in answer "
-                          "for this problem. Provided answer was: "
-                          "{bad_input}").format(bad_input=cgi.escape(answer))
-                    )
-                # If non-factorial related ValueError thrown, handle it the same as any other Exception
-                log.debug('formularesponse: error %s in formula', err)
-                raise StudentInputError(
-                    _("Invalid input: Could not parse '{bad_input}' as a formula.").format(
-                        bad_input=cgi.escape(answer)
-                    )
+            # If non-factorial related ValueError thrown, handle it the same as any other Exception
+            log.debug('formularesponse: error %s in formula', err)
+            raise StudentInputError(
+                _("Invalid input: Could not parse '{bad_input}' as a formula.").format(
+                    bad_input=cgi.escape(answer)
                 )
-            except Exception as err:
-                # traceback.print_exc()
-                log.debug('formularesponse: error %s in formula', err)
-                raise StudentInputError(
-                    _("Invalid input: Could not parse '{bad_input}' as a formula").format(
-                        bad_input=cgi.escape(answer)
-                    )
+            )
+        except Exception as err:
+            # traceback.print_exc()
+            log.debug('formularesponse: error %s in formula', err)
+            raise StudentInputError(
+                _("Invalid input: Could not parse '{bad_input}' as a formula").format(
+                    bad_input=cgi.escape(answer)
                 )
-        return out
+            )
 
     def randomize_variables(self, samples):
         """
@@ -0,0 +1,36 @@
+"""
+Django integration for the capa sandbox worker pool and result cache.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+from . import result_cache, worker_pool
+
+
+def configure_safe_exec():
+    """
+    Configure the sandbox worker pool and the result cache from the
+    "worker_pool" and "result_cache" keys of the CODE_JAIL setting.
+
+    Called when the apps are ready, so that every process that runs capa
+    problems is configured, including celery workers, which never run
+    middleware.
+    """
+    code_jail_settings = getattr(settings, 'CODE_JAIL', {})
+
+    pool_settings = code_jail_settings.get('worker_pool', {})
+    worker_pool.configure(
+        pool_settings.get('size', 0),
+        max_executions=pool_settings.get('max_executions'),
+        max_memory=pool_settings.get('max_memory'),
+    )
+
+    cache_settings = code_jail_settings.get('result_cache', {})
+    backend = cache_settings.get('backend')
+    result_cache.configure(
+        max_entries=cache_settings.get('max_entries'),
+        max_bytes=cache_settings.get('max_bytes'),
+        max_result_size=cache_settings.get('max_result_size'),
+        backend=caches[backend] if backend else None,
+    )
+
@@ -0,0 +1,172 @@
+"""
+A two-tier cache of safe_exec results.
+
+Results are cached in a bounded, in-process LRU cache, in front of a shared
+cache (the `cache` passed to safe_exec, or a dedicated backend set by
+`configure`).  Results larger than a maximum size are not cached at all, so
+that they can't evict many smaller, hot results.
+"""
+import json
+import logging
+import os
+from contextlib import contextmanager
+
+from dogapi import dog_stats_api
+from xmodule.util.lru_cache import LRUCache
+
+log = logging.getLogger(__name__)
+
+# Result cache settings, as set by `configure`.
+RESULT_CACHE_SETTINGS = {
+    # How many results the in-process cache holds.  0 disables it.
+    'max_entries': 0,
+    # The maximum total size, in bytes, of the results in the in-process cache.
+    'max_bytes': 32 * 1024 * 1024,
+    # The maximum size, in bytes, of a cached result.  None means no maximum.
+    'max_result_size': None,
+    # A shared cache used instead of the one passed to safe_exec, or None.
+    'backend': None,
+}
+
+CACHE_METRIC_NAME = 'capa.safe_exec.cache'
+
+
+def configure(max_entries=None, max_bytes=None, max_result_size=None, backend=None):
+    """
+    Configure the result cache, in the manner of `codejail.jail_code.configure`.
+    """
+    if max_entries is not None:
+        RESULT_CACHE_SETTINGS['max_entries'] = max_entries
+    if max_bytes is not None:
+        RESULT_CACHE_SETTINGS['max_bytes'] = max_bytes
+    RESULT_CACHE_SETTINGS['max_result_size'] = max_result_size
+    RESULT_CACHE_SETTINGS['backend'] = backend
+    _LOCAL_CACHES.clear()
+
+
+def get_result_cache(cache):
+    """
+    Return the two-tier result cache to use in front of the given shared cache.
+    """
+    local_cache = _LOCAL_CACHES.get(os.getpid())
+    if local_cache is None and RESULT_CACHE_SETTINGS['max_entries'] > 0:
+        # A forked process (such as a web server worker) gets its own cache.
+        _LOCAL_CACHES.clear()
+        local_cache = _LOCAL_CACHES[os.getpid()] = LocalResultCache(
+            RESULT_CACHE_SETTINGS['max_entries'], RESULT_CACHE_SETTINGS['max_bytes'],
+        )
+    return SafeExecResultCache(
+        RESULT_CACHE_SETTINGS['backend'] or cache,
+        local_cache=local_cache,
+        max_result_size=RESULT_CACHE_SETTINGS['max_result_size'],
+    )
+
+
+@contextmanager
+def recording_writes():
+    """
+    Record the results cached in this process within the context, rather than
+    caching them, as (key, result) pairs in the yielded list.
+
+    A process grading problems for another one uses this to return the
+    results it would have cached, so that the other process caches them.
+    """
+    writes = []
+    _RECORDED_WRITES.append(writes)
+    try:
+        yield writes
+    finally:
+        _RECORDED_WRITES.remove(writes)
+
+
+class SafeExecResultCache(object):
+    """
+    A cache of safe_exec results, with an optional in-process cache in
+    front of a shared cache.
+
+    Results are (exception message, globals) pairs.
+    """
+    def __init__(self, shared_cache, local_cache=None, max_result_size=None):
+        self.shared_cache = shared_cache
+        self.local_cache = local_cache
+        self.max_result_size = max_result_size
+
+    def get(self, key):
+        """
+        Return the cached result for the key, or None.
+        """
+        if self.local_cache is not None:
+            result = self.local_cache.get(key)
+            if result is not None:
+                self._record('local_hit')
+                return result
+
+        result = self.shared_cache.get(key)
+        if result is None:
+            self._record('miss')
+            return None
+
+        self._record('shared_hit')
+        if self.local_cache is not None:
+            self.local_cache.set(key, result)
+        return result
+
+    def set(self, key, result):
+        """
+        Cache a result, unless it is larger than the maximum result size.
+        """
+        if _RECORDED_WRITES:
+            _RECORDED_WRITES[-1].append((key, result))
+            return
+        if self.max_result_size is not None or self.local_cache is not None:
+            size = len(json.dumps(result))
+            if self.max_result_size is not None and size > self.max_result_size:
+                self._record('too_large')
+                log.info('Not caching a safe_exec result of %d bytes', size)
+                return
+        self.shared_cache.set(key, result)
+        if self.local_cache is not None:
+            self.local_cache.set(key, result)
+
+    def _record(self, outcome):
+        """
+        Record the outcome of a cache operation, for hit rate metrics.
+        """
+        CACHE_STATS[outcome] = CACHE_STATS.get(outcome, 0) + 1
+        dog_stats_api.increment(CACHE_METRIC_NAME, tags=[u'result:{}'.format(outcome)])
+
+
+class LocalResultCache(LRUCache):
+    """
+    A thread-safe, in-process LRU cache of safe_exec results, bounded by
+    both the number and the total serialized size of the results.
+
+    Results are stored serialized, so that callers can't change them.
+    """
+    def __init__(self, max_entries, max_bytes):
+        super(LocalResultCache, self).__init__(max_entries=max_entries, max_size=max_bytes)
+
+    def get(self, key):  # pylint: disable=arguments-differ
+        """
+        Return the result for the key, or None, and mark it as recently used.
+        """
+        serialized = super(LocalResultCache, self).get(key)
+        if serialized is None:
+            return None
+        return tuple(json.loads(serialized))
+
+    def set(self, key, result):  # pylint: disable=arguments-differ
+        """
+        Cache a result, evicting the least recently used ones as needed.
+        """
+        serialized = json.dumps(result)
+        super(LocalResultCache, self).set(key, serialized, len(serialized))
+
+
+# Counts of the outcomes of cache operations in this process.
+CACHE_STATS = {}
+
+_LOCAL_CACHES = {}
+
+# The lists that `recording_writes` records results to, innermost last.
+_RECORDED_WRITES = []
@@ -3,7 +3,7 @@
 from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
-from . import lazymod
+from . import lazymod, result_cache, worker_pool
 from dogapi import dog_stats_api
 from six import text_type
 
@@ -50,6 +50,9 @@ for name, modname in ASSUMED_IMPORTS:
 
 LAZY_IMPORTS = "".join(LAZY_IMPORTS)
 
+# The modules that sandbox workers import before running any code.
+WORKER_PRELOAD_MODULES = ["random", "sys"] + [modname for _, modname in ASSUMED_IMPORTS]
+
 
 def update_hash(hasher, obj):
     """
@@ -103,7 +106,7 @@ def safe_exec(
 
     `cache` is an object with .get(key) and .set(key, value) methods.  It will be used
     to cache the execution, taking into account the code, the values of the globals,
-    and the random seed.
+    and the random seed.  See `result_cache` for the in-process cache in front of it.
 
     `slug` is an arbitrary string, a description that's meaningful to the
     caller, that will be used in log messages.
@@ -113,6 +116,7 @@ def safe_exec(
     """
     # Check the cache for a previous result.
     if cache:
+        cache = result_cache.get_result_cache(cache)
         safe_globals = json_safe(globals_dict)
         md5er = hashlib.md5()
         md5er.update(repr(code))
@@ -132,7 +136,10 @@ def safe_exec(
     code_prolog = CODE_PROLOG % random_seed
 
     # Decide which code executor to use.
-    if unsafely:
+    pool = worker_pool.get_worker_pool(unsafely, WORKER_PRELOAD_MODULES)
+    if pool is not None:
+        exec_fn = pool.safe_exec
+    elif unsafely:
         exec_fn = codejail_not_safe_exec
     else:
         exec_fn = codejail_safe_exec
@@ -0,0 +1,86 @@
+"""Test result_cache.py"""
+
+import unittest
+
+from capa.safe_exec import result_cache, safe_exec
+from capa.safe_exec.tests.test_safe_exec import DictCache
+
+
+class TestResultCache(unittest.TestCase):
+    """Test the two-tier result cache of safe_exec."""
+
+    def setUp(self):
+        super(TestResultCache, self).setUp()
+        result_cache.configure(max_entries=2, max_bytes=1024, max_result_size=200)
+        self.addCleanup(result_cache.configure, max_entries=0)
+        self.shared_cache = DictCache()
+
+    def test_local_hit(self):
+        g = {}
+        safe_exec("a = 17", g, cache=self.shared_cache)
+        self.assertEqual(g['a'], 17)
+
+        # The in-process cache answers, even if the shared cache is emptied.
+        self.shared_cache.cache.clear()
+        stats = dict(result_cache.CACHE_STATS)
+        g = {}
+        safe_exec("a = 17", g, cache=self.shared_cache)
+        self.assertEqual(g['a'], 17)
+        self.assertEqual(result_cache.CACHE_STATS['local_hit'], stats.get('local_hit', 0) + 1)
+
+    def test_results_are_not_shared(self):
+        g = {}
+        safe_exec("a = [1, 2]", g, cache=self.shared_cache)
+        g['a'].append(3)
+        self.shared_cache.cache.clear()
+        g = {}
+        safe_exec("a = [1, 2]", g, cache=self.shared_cache)
+        self.assertEqual(g['a'], [1, 2])
+
+    def test_all_globals_in_key(self):
+        g = {'anonymous_student_id': 'learner1', 'x': 2}
+        safe_exec("y = x * 2", g, cache=self.shared_cache)
+        g = {'anonymous_student_id': 'learner2', 'x': 2}
+        safe_exec("y = x * 2", g, cache=self.shared_cache)
+        self.assertEqual(len(self.shared_cache.cache), 2)
+
+    def test_cached_result_matches_run(self):
+        run_globals = {'x': 2, 't': (1, 2)}
+        safe_exec("del x\ny = 1", run_globals, cache=self.shared_cache)
+        cached_globals = {'x': 2, 't': (1, 2)}
+        safe_exec("del x\ny = 1", cached_globals, cache=self.shared_cache)
+        self.assertEqual(len(self.shared_cache.cache), 1)
+        self.assertEqual(cached_globals, run_globals)
+
+    def test_max_result_size(self):
+        g = {}
+        safe_exec("a = 'x' * 500", g, cache=self.shared_cache)
+        self.assertEqual(len(g['a']), 500)
+        self.assertEqual(self.shared_cache.cache, {})
+
+    def test_lru_eviction(self):
+        local_cache = result_cache.LocalResultCache(max_entries=2, max_bytes=40)
+        local_cache.set('a', (None, {'a': 1}))
+        local_cache.set('b', (None, {'b': 2}))
+        self.assertEqual(local_cache.get('a'), (None, {'a': 1}))
+        local_cache.set('c', (None, {'c': 3}))
+        self.assertIsNone(local_cache.get('b'))
+        self.assertEqual(len(local_cache), 2)
+
+        # Results are evicted to stay under the size limit, too.
+        local_cache.set('d', (None, {'d': 'x' * 20}))
+        self.assertEqual(len(local_cache), 1)
+        self.assertLessEqual(local_cache.size, 40)
+
+    def test_recording_writes(self):
+        g = {}
+        with result_cache.recording_writes() as writes:
+            safe_exec("a = 17", g, cache=self.shared_cache)
+        self.assertEqual(g['a'], 17)
+
+        # The result is recorded instead of cached, and can be cached later.
+        self.assertEqual(self.shared_cache.cache, {})
+        self.assertEqual([result for _, result in writes], [(None, {'a': 17})])
+        for key, result in writes:
+            result_cache.get_result_cache(self.shared_cache).set(key, result)
+        self.assertEqual(self.shared_cache.cache.values(), [(None, {'a': 17})])
@@ -94,15 +94,15 @@ class TestSafeOrNot(unittest.TestCase):
 class DictCache(object):
     """A cache implementation over a simple dict, for testing."""
 
-    def __init__(self, d):
-        self.cache = d
+    def __init__(self, d=None):
+        self.cache = {} if d is None else d
 
     def get(self, key):
         # Actual cache implementations have limits on key length
         assert len(key) <= 250
         return self.cache.get(key)
 
-    def set(self, key, value):
+    def set(self, key, value, timeout=None):  # pylint: disable=unused-argument
         # Actual cache implementations have limits on key length
         assert len(key) <= 250
         self.cache[key] = value
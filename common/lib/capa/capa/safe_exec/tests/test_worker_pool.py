@@ -0,0 +1,156 @@
+"""Test worker_pool.py"""
+
+import os.path
+import random
+import shutil
+import threading
+import unittest
+
+from codejail.safe_exec import SafeExecException
+from mock import patch
+from six import text_type
+
+from capa.safe_exec import safe_exec, worker_pool
+
+
+class TestSandboxWorkerPool(unittest.TestCase):
+    """
+    Test the sandbox worker pool, with unsafe workers.
+    """
+    def setUp(self):
+        super(TestSandboxWorkerPool, self).setUp()
+        self.pool = worker_pool.SandboxWorkerPool(2, max_executions=3, max_memory=1024 ** 3, unsafely=True)
+        self.addCleanup(self.pool.stop)
+
+    def test_set_values(self):
+        g = {'b': 2}
+        self.pool.safe_exec("a = 17 + b", g)
+        self.assertEqual(g, {'a': 19, 'b': 2})
+
+    def test_raising_exceptions(self):
+        g = {}
+        with self.assertRaises(SafeExecException) as cm:
+            self.pool.safe_exec("1/0", g)
+        self.assertIn("ZeroDivisionError", text_type(cm.exception))
+
+    def test_executions_are_isolated(self):
+        g = {}
+        self.pool.safe_exec("import math; math.pi = 3", g)
+        self.pool.safe_exec("import math; a = math.pi", g)
+        self.assertNotEqual(g['a'], 3)
+
+    def test_python_path_and_extra_files(self):
+        pylib = os.path.dirname(__file__) + "/test_files/pylib"
+        g = {}
+        self.pool.safe_exec(
+            "import constant; a = constant.THE_CONST; b = open('extra.txt').read()",
+            g, python_path=[pylib], extra_files=[("extra.txt", "extra contents")],
+        )
+        self.assertEqual(g['b'], "extra contents")
+        self.assertIn('a', g)
+
+    def test_workers_are_reused_and_recycled(self):
+        worker_pids = []
+        for _ in range(4):
+            g = {}
+            self.pool.safe_exec("import os; pid = os.getppid()", g)
+            worker_pids.append(g['pid'])
+        self.assertEqual(len(set(worker_pids[:3])), 1)
+        self.assertNotEqual(worker_pids[3], worker_pids[0])
+
+    def test_memory_recycling(self):
+        self.pool.max_memory = 0
+        g = {}
+        self.pool.safe_exec("import os; pid = os.getppid()", g)
+        first_pid = g['pid']
+        self.pool.safe_exec("import os; pid = os.getppid()", g)
+        self.assertNotEqual(g['pid'], first_pid)
+
+    def test_python_path_copied_once_per_worker(self):
+        pylib = os.path.dirname(__file__) + "/test_files/pylib"
+        with patch('capa.safe_exec.worker_pool.shutil.copytree', wraps=shutil.copytree) as mock_copytree:
+            for _ in range(2):
+                g = {}
+                self.pool.safe_exec("import constant; a = constant.THE_CONST", g, python_path=[pylib])
+                self.assertIn('a', g)
+        self.assertEqual(mock_copytree.call_count, 1)
+
+    def test_dead_idle_worker_is_replaced(self):
+        self.pool.safe_exec("a = 1", {})
+        worker = self.pool._idle_workers.get_nowait()  # pylint: disable=protected-access
+        worker.process.kill()
+        worker.process.wait()
+        self.pool._idle_workers.put(worker)  # pylint: disable=protected-access
+        g = {}
+        self.pool.safe_exec("import os; pid = os.getppid()", g)
+        self.assertNotEqual(g['pid'], worker.process.pid)
+
+    def test_worker_failure_is_the_result(self):
+        # The code kills its worker, which must not run it again with codejail.
+        with patch('capa.safe_exec.worker_pool.codejail_not_safe_exec') as mock_codejail:
+            with self.assertRaises(SafeExecException) as cm:
+                self.pool.safe_exec("import os, signal; os.kill(os.getppid(), signal.SIGKILL)", {})
+        self.assertIn("sandbox worker", text_type(cm.exception))
+        self.assertFalse(mock_codejail.called)
+
+    def test_start_failure_falls_back_to_codejail(self):
+        with patch('capa.safe_exec.worker_pool.SandboxWorker', side_effect=OSError):
+            g = {}
+            self.pool.safe_exec("a = 17", g)
+        self.assertEqual(g['a'], 17)
+
+    def test_realtime_limit(self):
+        worker = worker_pool.SandboxWorker(True, ())
+        self.addCleanup(worker.stop)
+        request = {
+            'code': "import time\nwhile True: time.sleep(0.1)",
+            'globals': {},
+            'python_path': [],
+            'tmpdir': os.path.dirname(__file__),
+            'limits': {'REALTIME': 1},
+        }
+        response = worker.execute(request)
+        self.assertIn("longer than 1 seconds", response['error'])
+
+    def test_unresponsive_worker_is_killed(self):
+        worker = worker_pool.SandboxWorker(True, ())
+        self.addCleanup(worker.stop)
+        with self.assertRaises(worker_pool.WorkerError):
+            worker._read_response(0.1)  # pylint: disable=protected-access
+        self.assertIsNotNone(worker.process.wait())
+
+    def test_waiting_for_a_retired_worker(self):
+        pool = worker_pool.SandboxWorkerPool(1, max_executions=3, max_memory=1024 ** 3, unsafely=True)
+        self.addCleanup(pool.stop)
+        worker = pool._get_worker()  # pylint: disable=protected-access
+        workers = []
+        waiter = threading.Thread(target=lambda: workers.append(pool._get_worker()))  # pylint: disable=protected-access
+        waiter.start()
+        pool._retire(worker)  # pylint: disable=protected-access
+        waiter.join(30)
+        self.assertEqual(len(workers), 1)
+        self.assertIsNot(workers[0], worker)
+        pool._retire(workers[0])  # pylint: disable=protected-access
+
+
+class TestSafeExecWithWorkerPool(unittest.TestCase):
+    """
+    Test safe_exec with the worker pool configured.
+    """
+    def setUp(self):
+        super(TestSafeExecWithWorkerPool, self).setUp()
+        worker_pool.configure(1)
+        self.addCleanup(worker_pool.configure, 0)
+
+    def test_random_seeding(self):
+        r = random.Random(17)
+        rnums = [r.randint(0, 999) for _ in xrange(100)]
+        g = {}
+        safe_exec("rnums = [random.randint(0, 999) for _ in xrange(100)]", g, random_seed=17, unsafely=True)
+        self.assertEqual(g['rnums'], rnums)
+
+    def test_assumed_imports(self):
+        g = {}
+        safe_exec("a = int(math.pi) + int(numpy.sqrt(4))", g, unsafely=True)
+        self.assertEqual(g['a'], 5)
+        self.assertIsNotNone(worker_pool.get_worker_pool(True))
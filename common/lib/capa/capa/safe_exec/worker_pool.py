@@ -0,0 +1,473 @@
+"""
+A pool of persistent, pre-warmed sandbox worker processes for safe_exec.
+
+Starting a sandboxed Python interpreter, and importing numpy, scipy and the
+other modules that capa code assumes, takes a large part of each codejail
+execution.  A worker is a sandboxed interpreter, started the same way as
+codejail starts it, that imports those modules once and then runs many
+executions.  Each execution runs in a child process forked from the worker,
+with codejail's resource limits, so that no state is shared between
+executions, and the worker itself only ever runs trusted code.
+
+Workers are recycled after a number of executions, or when their memory use
+grows past a limit.  The files of the python path of the executions are
+copied once per worker, rather than for each execution.  The pool is
+disabled until `configure` is called with a positive size.
+"""
+import json
+import logging
+import os
+import os.path
+import select
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from Queue import Empty, Queue
+
+from codejail import jail_code
+from codejail.safe_exec import SafeExecException, json_safe
+from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
+from codejail.safe_exec import safe_exec as codejail_safe_exec
+
+log = logging.getLogger(__name__)
+
+# Pool settings, as set by `configure`.
+POOL_SETTINGS = {
+    # How many workers to run for each kind (safe or unsafe) of execution.
+    'size': 0,
+    # How many executions a worker runs before it is replaced.
+    'max_executions': 100,
+    # The maximum resident memory of a worker, in bytes, before it is replaced.
+    'max_memory': 256 * 1024 * 1024,
+}
+
+# How many seconds a worker may take to start, or to respond beyond the
+# REALTIME limit of an execution, before it is killed.
+WORKER_START_TIMEOUT = 60
+WORKER_RESPONSE_GRACE = 5
+
+# How often, in seconds, a request waiting for an idle worker checks
+# whether it can start a new one instead.
+IDLE_WORKER_POLL_INTERVAL = 0.5
+
+# The code run by each worker process.  It imports the given modules, then
+# reads one JSON request per line on stdin, runs it in a forked child, and
+# writes one JSON response per line on stdout.
+WORKER_CODE = """\
+import json, os, resource, select, signal, sys, traceback
+
+for modname in json.loads(sys.argv[1]):
+    try:
+        __import__(modname)
+    except Exception:
+        pass
+
+RLIMITS = {'CPU': resource.RLIMIT_CPU, 'VMEM': resource.RLIMIT_AS, 'FSIZE': resource.RLIMIT_FSIZE}
+OK_TYPES = (type(None), int, long, float, str, unicode, list, tuple, dict)
+
+
+def jsonable(value):
+    if not isinstance(value, OK_TYPES):
+        return False
+    try:
+        json.dumps(value)
+    except Exception:
+        return False
+    return True
+
+
+def run_child(request, result_fd):
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    os.chdir(request['tmpdir'])
+    os.environ['TMPDIR'] = os.path.join(request['tmpdir'], 'tmp')
+    for pydir in request['python_path']:
+        sys.path.append(pydir)
+    for name, limit in request['limits'].items():
+        if limit and name in RLIMITS:
+            resource.setrlimit(RLIMITS[name], (limit, limit))
+    if request['limits']:
+        resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+    try:
+        globals_dict = request['globals']
+        exec compile(request['code'], '<jailed code>', 'exec') in globals_dict
+        result = {'globals': dict(
+            (key, value) for key, value in globals_dict.items()
+            if key != '__builtins__' and jsonable(value)
+        )}
+    except BaseException:
+        result = {'error': traceback.format_exc()}
+    output = json.dumps(result)
+    while output:
+        output = output[os.write(result_fd, output):]
+
+
+def execute(request):
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read_fd)
+            run_child(request, write_fd)
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    chunks = []
+    timeout = request['limits'].get('REALTIME') or None
+    deadline = None if timeout is None else os.times()[4] + timeout
+    timed_out = False
+    while True:
+        remaining = None if deadline is None else deadline - os.times()[4]
+        if remaining is not None and (remaining <= 0 or not select.select([read_fd], [], [], remaining)[0]):
+            timed_out = True
+            os.kill(pid, signal.SIGKILL)
+            break
+        chunk = os.read(read_fd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(read_fd)
+    _, status = os.waitpid(pid, 0)
+    # Whatever a child that was killed, or that didn't exit normally, wrote
+    # to its result pipe may have been written by the jailed code itself.
+    if timed_out:
+        return {'error': 'the sandboxed process ran for longer than %s seconds' % timeout}
+    if status != 0:
+        return {'error': 'the sandboxed process exited with status %d' % status}
+    try:
+        return json.loads(''.join(chunks))
+    except ValueError:
+        return {'error': 'the sandboxed process exited without a result'}
+
+
+sys.stdout.write(json.dumps({'ready': True}) + '\\n')
+sys.stdout.flush()
+for line in iter(sys.stdin.readline, ''):
+    response = execute(json.loads(line))
+    response['maxrss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    sys.stdout.write(json.dumps(response) + '\\n')
+    sys.stdout.flush()
+"""
+
+
+class WorkerError(Exception):
+    """
+    A sandbox worker failed, independently of the code it was running.
+    """
+    pass
+
+
+def configure(size, max_executions=None, max_memory=None):
+    """
+    Configure the worker pools, in the manner of `codejail.jail_code.configure`.
+
+    A `size` of 0 disables the pools.
+    """
+    POOL_SETTINGS['size'] = size
+    if max_executions is not None:
+        POOL_SETTINGS['max_executions'] = max_executions
+    if max_memory is not None:
+        POOL_SETTINGS['max_memory'] = max_memory
+    _POOLS.clear()
+
+
+def get_worker_pool(unsafely, preload_modules=()):
+    """
+    Return the worker pool of this process for safe or unsafe executions,
+    or None if the pools are disabled.
+    """
+    if POOL_SETTINGS['size'] <= 0:
+        return None
+    # codejail runs the code unsafely when the sandbox isn't configured.
+    unsafely = unsafely or not jail_code.is_configured('python')
+    pool = _POOLS.get(unsafely)
+    # A forked process (such as a web server worker) needs its own pool.
+    if pool is None or pool.pid != os.getpid():
+        pool = _POOLS[unsafely] = SandboxWorkerPool(
+            POOL_SETTINGS['size'],
+            POOL_SETTINGS['max_executions'],
+            POOL_SETTINGS['max_memory'],
+            unsafely=unsafely,
+            preload_modules=preload_modules,
+        )
+    return pool
+
+
+class SandboxWorker(object):
+    """
+    A persistent worker process, which runs executions in forked children.
+    """
+    def __init__(self, unsafely, preload_modules):
+        self.unsafely = unsafely
+        self.executions = 0
+        self.memory = 0
+        # The directory of the worker's copies of python path entries, by path.
+        self.tmpdir = tempfile.mkdtemp(prefix='codejail-worker-')
+        os.chmod(self.tmpdir, 0o755)
+        self._python_path_copies = {}
+        if unsafely:
+            command = [sys.executable, '-B']
+            env = dict(os.environ, PYTHONPATH=os.pathsep.join(path for path in sys.path if path))
+        else:
+            python_command = jail_code.COMMANDS['python']
+            command = []
+            if python_command['user']:
+                command.extend(['sudo', '-u', python_command['user']])
+            command.extend(python_command['cmdline_start'])
+            env = {}
+        command.extend(['-c', WORKER_CODE, json.dumps(list(preload_modules))])
+        with open(os.devnull, 'w') as devnull:
+            self.process = subprocess.Popen(
+                command, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=devnull,
+                close_fds=True,
+            )
+        self._output = ''
+        try:
+            self._read_response(WORKER_START_TIMEOUT)
+        except WorkerError:
+            self.stop()
+            raise
+
+    def execute(self, request):
+        """
+        Run a request in the worker, and return its response.
+        """
+        self.executions += 1
+        try:
+            self.process.stdin.write(json.dumps(request) + '\n')
+            self.process.stdin.flush()
+        except (IOError, OSError) as error:
+            raise WorkerError('Could not send the code to the sandbox worker: {}'.format(error))
+        realtime = request['limits'].get('REALTIME')
+        response = self._read_response(realtime + WORKER_RESPONSE_GRACE if realtime else None)
+        self.memory = response.pop('maxrss', 0)
+        return response
+
+    def _read_response(self, timeout=None):
+        """
+        Read a response line from the worker, killing the worker if it
+        doesn't write one within `timeout` seconds.
+        """
+        deadline = None if timeout is None else os.times()[4] + timeout
+        stdout_fd = self.process.stdout.fileno()
+        while '\n' not in self._output:
+            if deadline is not None:
+                remaining = deadline - os.times()[4]
+                if remaining <= 0 or not select.select([stdout_fd], [], [], remaining)[0]:
+                    self.kill()
+                    raise WorkerError('The sandbox worker did not respond within {} seconds'.format(timeout))
+            chunk = os.read(stdout_fd, 65536)
+            if not chunk:
+                break
+            self._output += chunk
+        line, _, self._output = self._output.partition('\n')
+        try:
+            return json.loads(line)
+        except ValueError:
+            raise WorkerError('The sandbox worker exited with status {}'.format(self.process.poll()))
+
+    def python_path(self, python_path, extra_names):
+        """
+        Return the sys.path entries of an execution with the given python path.
+
+        As codejail does, the directories and files of the python path are
+        copied for the execution, but only the first time the worker uses
+        them.  Entries named like the extra files of the execution are found
+        in its directory, as codejail finds them.
+        """
+        sys_path = []
+        for pydir in python_path:
+            name = os.path.basename(pydir)
+            if name in extra_names:
+                sys_path.append(name)
+                continue
+            copy = self._python_path_copies.get(pydir)
+            if copy is None:
+                copy_dir = tempfile.mkdtemp(dir=self.tmpdir)
+                os.chmod(copy_dir, 0o755)
+                copy = os.path.join(copy_dir, name)
+                if os.path.isdir(pydir):
+                    shutil.copytree(pydir, copy)
+                else:
+                    shutil.copy(pydir, copy)
+                self._python_path_copies[pydir] = copy
+            sys_path.append(copy)
+        return sys_path
+
+    def kill(self):
+        """
+        Kill the worker process, without waiting for it to finish.
+        """
+        try:
+            self.process.kill()
+        except OSError:
+            log.exception('Could not kill the sandbox worker')
+
+    def stop(self):
+        """
+        Stop the worker process.
+        """
+        try:
+            self.process.stdin.close()
+            self.process.stdout.close()
+            self.process.wait()
+        except (IOError, OSError):
+            log.exception('Could not stop the sandbox worker')
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+class SandboxWorkerPool(object):
+    """
+    A pool of up to `size` sandbox workers, started as they are needed.
+    """
+    def __init__(self, size, max_executions, max_memory, unsafely=False, preload_modules=()):
+        self.size = size
+        self.max_executions = max_executions
+        self.max_memory = max_memory
+        self.unsafely = unsafely
+        self.preload_modules = list(preload_modules)
+        self.pid = os.getpid()
+        self._idle_workers = Queue()
+        self._num_workers = 0
+        self._lock = threading.Lock()
+
+    def safe_exec(self, code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Execute code in a worker, as `codejail.safe_exec.safe_exec` does.
+
+        Any changes the code makes to the globals are visible in
+        `globals_dict` when this function returns.  Raise SafeExecException
+        if the code raised an exception, or if the worker failed or timed
+        out while running it.  The code is executed by codejail instead
+        only if no worker can be started.
+        """
+        try:
+            worker = self._get_worker()
+        except WorkerError:
+            log.exception('Could not start a sandbox worker for %s, running it with codejail instead', slug)
+            exec_fn = codejail_not_safe_exec if self.unsafely else codejail_safe_exec
+            exec_fn(code, globals_dict, python_path=python_path, extra_files=extra_files, slug=slug)
+            return
+
+        tmpdir = self._make_tmpdir(extra_files or ())
+        request = {
+            'code': code,
+            'globals': json_safe(globals_dict),
+            'tmpdir': tmpdir,
+            'limits': {} if self.unsafely else dict(getattr(jail_code, 'LIMITS', {})),
+        }
+        extra_names = set(name for name, _ in extra_files or ())
+        try:
+            response = self._execute(worker, request, python_path or (), extra_names)
+        except WorkerError as error:
+            # The code may have crashed or hung the worker, so the failure is
+            # its result, as running it again with codejail would repeat it.
+            log.warning('Sandbox worker failed on %s: %s', slug, error)
+            raise SafeExecException("Couldn't execute jailed code: {}".format(error))
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+        if 'error' in response:
+            raise SafeExecException("Couldn't execute jailed code: {}".format(response['error']))
+        globals_dict.update(response['globals'])
+
+    def stop(self):
+        """
+        Stop all the idle workers.
+        """
+        while True:
+            try:
+                worker = self._idle_workers.get_nowait()
+            except Empty:
+                return
+            self._retire(worker)
+
+    def _execute(self, worker, request, python_path, extra_names):
+        """
+        Run the request, with the given python path, in the given worker
+        taken from the pool, and return its response.
+        """
+        try:
+            request['python_path'] = worker.python_path(python_path, extra_names)
+        except Exception:
+            self._idle_workers.put(worker)
+            raise
+        try:
+            response = worker.execute(request)
+        except WorkerError:
+            self._retire(worker)
+            raise
+        if worker.executions >= self.max_executions or worker.memory > self.max_memory:
+            self._retire(worker)
+        else:
+            self._idle_workers.put(worker)
+        return response
+
+    def _get_worker(self):
+        """
+        Return a running worker, as returned by `_take_worker`.
+        """
+        while True:
+            worker = self._take_worker()
+            # A worker that died while idle hasn't run the code yet, so it
+            # is replaced rather than failing the code.
+            if worker.process.poll() is None:
+                return worker
+            self._retire(worker)
+
+    def _take_worker(self):
+        """
+        Return an idle worker, starting one if the pool isn't full, or
+        waiting for one to be returned or retired if it is.
+        """
+        while True:
+            try:
+                return self._idle_workers.get_nowait()
+            except Empty:
+                pass
+            with self._lock:
+                start_worker = self._num_workers < self.size
+                if start_worker:
+                    self._num_workers += 1
+            if start_worker:
+                break
+            try:
+                return self._idle_workers.get(timeout=IDLE_WORKER_POLL_INTERVAL)
+            except Empty:
+                # A retired worker makes room for a new one without
+                # returning anything to the queue.
+                pass
+        try:
+            return SandboxWorker(self.unsafely, self.preload_modules)
+        except (WorkerError, OSError):
+            with self._lock:
+                self._num_workers -= 1
+            raise WorkerError('Could not start a sandbox worker')
+
+    def _retire(self, worker):
+        """
+        Stop a worker, making room for a new one.
+        """
+        worker.stop()
+        with self._lock:
+            self._num_workers -= 1
+
+    def _make_tmpdir(self, extra_files):
+        """
+        Return a new directory with the extra files of the execution, as
+        codejail creates them for its sandboxed processes.
+        """
+        tmpdir = tempfile.mkdtemp(prefix='codejail-')
+        os.chmod(tmpdir, 0o755)
+        os.mkdir(os.path.join(tmpdir, 'tmp'))
+        os.chmod(os.path.join(tmpdir, 'tmp'), 0o777)
+        for name, contents in extra_files:
+            with open(os.path.join(tmpdir, name), 'wb') as extra_file:
+                extra_file.write(contents)
+        return tmpdir
+
+
+_POOLS = {}
@@ -4,10 +4,12 @@ Test capa problem.
 import ddt
 import textwrap
 from lxml import etree
-from mock import patch
+from mock import Mock, patch
+from StringIO import StringIO
 import unittest
 
-from capa.tests.helpers import new_loncapa_problem
+from capa import capa_problem
+from capa.tests.helpers import new_loncapa_problem, test_capa_system
 from openedx.core.djangolib.markup import HTML
 
 
@@ -708,3 +710,124 @@ class CAPAProblemReportHelpersTest(unittest.TestCase):
             """
         )
         self.assertEquals(problem.find_answer_text('1_2_1', 'hide'), 'hide')
+
+
+class CAPAProblemTreeCacheTest(unittest.TestCase):
+    """ TestCase for the cache of parsed problem trees """
+
+    XML = textwrap.dedent("""
+        <problem>
+            <stringresponse answer="hide" type="ci">
+                <label>What to do?</label>
+                <textline size="40"/>
+            </stringresponse>
+        </problem>
+    """)
+
+    def setUp(self):
+        super(CAPAProblemTreeCacheTest, self).setUp()
+        capa_problem._PROBLEM_TREES.clear()  # pylint: disable=protected-access
+        capa_problem._PREPROCESSED_PROBLEM_TREES.clear()  # pylint: disable=protected-access
+
+    def count_parses(self):
+        """
+        Returns a patch that counts the problem texts parsed into trees.
+        """
+        return patch.object(
+            capa_problem.LoncapaProblem, 'make_xml_compatible', autospec=True,
+            side_effect=capa_problem.LoncapaProblem.make_xml_compatible,
+        )
+
+    def test_problems_share_parsed_tree(self):
+        with self.count_parses() as mock_parse:
+            first_problem = new_loncapa_problem(self.XML, problem_id='first')
+            second_problem = new_loncapa_problem(self.XML, problem_id='second')
+        self.assertEqual(mock_parse.call_count, 1)
+
+        # Each problem has its own copy of the tree, with its own ids.
+        self.assertIsNot(first_problem.tree, second_problem.tree)
+        self.assertEqual(first_problem.tree.xpath('//textline/@id'), ['first_2_1'])
+        self.assertEqual(second_problem.tree.xpath('//textline/@id'), ['second_2_1'])
+        self.assertEqual(
+            etree.tostring(new_loncapa_problem(self.XML, problem_id='first').tree),
+            etree.tostring(first_problem.tree),
+        )
+
+    def test_problems_share_preprocessed_tree(self):
+        with patch.object(
+            capa_problem.LoncapaProblem, '_preprocess_problem', autospec=True,
+            side_effect=capa_problem.LoncapaProblem._preprocess_problem,  # pylint: disable=protected-access
+        ) as mock_preprocess:
+            first_problem = new_loncapa_problem(self.XML, problem_id='first', seed=1)
+            second_problem = new_loncapa_problem(self.XML, problem_id='first', seed=2)
+            new_loncapa_problem(self.XML, problem_id='second')
+        self.assertEqual(mock_preprocess.call_count, 2)
+
+        # Each problem has its own copy of the tree, a11y data and responders.
+        self.assertIsNot(first_problem.tree, second_problem.tree)
+        self.assertIsNot(first_problem.problem_data, second_problem.problem_data)
+        self.assertEqual(first_problem.problem_data, second_problem.problem_data)
+        self.assertEqual(second_problem.problem_data['first_2_1']['label'], 'What to do?')
+        self.assertEqual(second_problem.tree.xpath('//label'), [])
+        responder = second_problem.responders.values()[0]
+        self.assertIs(responder.xml.getroottree().getroot(), second_problem.tree)
+        self.assertEqual(responder.answer_ids, ['first_2_1'])
+
+    def test_problems_with_includes_not_cached(self):
+        xml = '<problem><include file="included.xml"/></problem>'
+        capa_system = test_capa_system()
+        capa_system.filestore = Mock(open=lambda filename: StringIO('<p>Included</p>'))
+        with self.count_parses() as mock_parse:
+            problem = new_loncapa_problem(xml, capa_system=capa_system)
+            new_loncapa_problem(xml, capa_system=capa_system)
+        self.assertEqual(mock_parse.call_count, 2)
+        self.assertEqual(problem.tree.xpath('//p/text()'), ['Included'])
+
+
+class CAPAProblemBatchGradingTest(unittest.TestCase):
+    """ TestCase for grading many submissions to a problem at once """
+
+    def test_grade_answers_batch(self):
+        xml = textwrap.dedent("""
+            <problem>
+                <stringresponse answer="hide" type="ci">
+                    <textline size="40"/>
+                </stringresponse>
+                <numericalresponse answer="4">
+                    <textline size="40"/>
+                </numericalresponse>
+            </problem>
+        """)
+        problem = new_loncapa_problem(xml)
+        self.assertTrue(problem.supports_batch_grading())
+        results = problem.grade_answers_batch([
+            {'1_2_1': 'Hide', '1_3_1': '4'},
+            {'1_2_1': 'show', '1_3_1': '2*2'},
+            {'1_2_1': 'hide', '1_3_1': 'four'},
+        ])
+        self.assertEqual(results[0].get_correctness('1_2_1'), 'correct')
+        self.assertEqual(results[0].get_correctness('1_3_1'), 'correct')
+        self.assertEqual(results[1].get_correctness('1_2_1'), 'incorrect')
+        self.assertEqual(results[1].get_correctness('1_3_1'), 'correct')
+        self.assertIsInstance(results[2], capa_problem.responsetypes.StudentInputError)
+
+        # The problem's state is not changed.
+        self.assertEqual(problem.student_answers, {})
+        self.assertEqual(problem.correct_map.get_dict(), {})
+
+    def test_unsupported_response_type(self):
+        xml = textwrap.dedent("""
+            <problem>
+                <customresponse cfn="check">
+                    <script type="loncapa/python">
+def check(expect, ans):
+    return True
+                    </script>
+                    <textline size="40"/>
+                </customresponse>
+            </problem>
+        """)
+        problem = new_loncapa_problem(xml)
+        self.assertFalse(problem.supports_batch_grading())
+        with self.assertRaises(capa_problem.responsetypes.LoncapaProblemError):
+            problem.grade_answers_batch([{'1_2_1': 'answer'}])
@@ -99,6 +99,25 @@ class ResponseTest(unittest.TestCase):
             result = problem.grade_answers({'1_2_1': input_str}).get_correctness('1_2_1')
             self.assertEqual(result, 'partially-correct')
 
+    def assert_batch_grade(self, problem, submissions):
+        """
+        Asserts that grading the submissions together, with
+        `grade_answers_batch`, gives the same results as grading them one by one.
+        """
+        self.assertTrue(problem.supports_batch_grading())
+        results = problem.grade_answers_batch([{'1_2_1': submission} for submission in submissions])
+        self.assertEqual(len(results), len(submissions))
+        for submission, result in zip(submissions, results):
+            try:
+                expected = problem.grade_answers({'1_2_1': submission})
+            except (StudentInputError, ResponseError) as err:
+                self.assertEqual(type(result), type(err), submission)
+                self.assertEqual(text_type(result), text_type(err))
+            else:
+                self.assertIsInstance(result, CorrectMap, submission)
+                self.assertEqual(result.get_correctness('1_2_1'), expected.get_correctness('1_2_1'), submission)
+                self.assertEqual(result.get_npoints('1_2_1'), expected.get_npoints('1_2_1'), submission)
+
     def _get_random_number_code(self):
         """Returns code to be used to generate a random result."""
         return "str(random.randint(0, 1e9))"
@@ -431,6 +450,16 @@ class FormulaResponseTest(ResponseTest):
     """
     xml_factory_class = FormulaResponseXMLFactory
 
+    def test_batch_grade(self):
+        sample_dict = {'x': (-10, 10), 'y': (-10, 10)}
+        problem = self.build_problem(sample_dict=sample_dict, num_samples=10, tolerance=0.01, answer="x+2*y")
+        self.assert_batch_grade(problem, ['2*x - x + y + y', 'x+2*y', 'x+y', 'x+2*z', 'x+(', '', 'fact(x)'])
+
+    def test_batch_grade_missing_answer(self):
+        problem = self.build_problem(sample_dict={'x': (-10, 10)}, num_samples=10, tolerance=0.01, answer="2*x")
+        results = problem.grade_answers_batch([{}, {'1_2_1': 'x+x'}])
+        self.assertEqual([result.get_correctness('1_2_1') for result in results], ['incorrect', 'correct'])
+
     def test_grade(self):
         """
         Test basic functionality of FormulaResponse
@@ -579,6 +608,23 @@ class FormulaResponseTest(ResponseTest):
 class StringResponseTest(ResponseTest):  # pylint: disable=missing-docstring
     xml_factory_class = StringResponseXMLFactory
 
+    def test_batch_grade(self):
+        submissions = ['Michigan', 'michigan', ' Michigan ', 'Ohio', 'Mich', '']
+        for case_sensitive in (True, False):
+            problem = self.build_problem(answer='Michigan', case_sensitive=case_sensitive,
+                                         additional_answers=['Ohio'])
+            self.assert_batch_grade(problem, submissions)
+            problem = self.build_problem(answer='Mich.*', case_sensitive=case_sensitive, regexp=True)
+            self.assert_batch_grade(problem, submissions)
+
+        # Backward compatible answers are graded one by one.
+        problem = self.build_problem(answer='Michigan_or_Ohio', case_sensitive=False)
+        self.assert_batch_grade(problem, submissions)
+
+    def test_batch_grade_invalid_regexp(self):
+        problem = self.build_problem(answer='Mich(', regexp=True)
+        self.assert_batch_grade(problem, ['Mich(', ''])
+
     def test_backward_compatibility_for_multiple_answers(self):
         """
         Remove this test, once support for _or_ separator will be removed.
@@ -1300,6 +1346,22 @@ class ChoiceResponseTest(ResponseTest):  # pylint: disable=missing-docstring
 class NumericalResponseTest(ResponseTest):  # pylint: disable=missing-docstring
     xml_factory_class = NumericalResponseXMLFactory
 
+    def test_batch_grade(self):
+        submissions = ['4', '4.0001', '4.1', '5', '2*2', '4+0j', '4j', 'x', '4)', 'fact(-1)', 'abc', 'inf']
+        for tolerance in (None, '0.1', '1%', 0):
+            problem = self.build_problem(answer='4', tolerance=tolerance, additional_answers={'5': ''})
+            self.assert_batch_grade(problem, submissions)
+
+        # Range tolerances and partial credit are graded one by one.
+        problem = self.build_problem(answer='[3, 5)')
+        self.assert_batch_grade(problem, submissions)
+        problem = self.build_problem(answer='4', tolerance='0.01', credit_type='close')
+        self.assert_batch_grade(problem, submissions)
+
+    def test_batch_grade_invalid_staff_answer(self):
+        problem = self.build_problem(answer='four')
+        self.assert_batch_grade(problem, ['4', 'x', ''])
+
     # We blend the line between integration (using evaluator) and exclusively
     # unit testing the NumericalResponse (mocking out the evaluator)
     # For simple things its not worth the effort.
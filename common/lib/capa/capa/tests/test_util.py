@@ -5,7 +5,13 @@ import unittest
 from lxml import etree
 
 from capa.tests.helpers import test_capa_system
-from capa.util import compare_with_tolerance, sanitize_html, get_inner_html_from_xpath, remove_markup
+from capa.util import (
+    compare_many_with_tolerance,
+    compare_with_tolerance,
+    get_inner_html_from_xpath,
+    remove_markup,
+    sanitize_html
+)
 
 
 class UtilTest(unittest.TestCase):
@@ -106,6 +112,23 @@ class UtilTest(unittest.TestCase):
         result = compare_with_tolerance(111.0, complex(100.0, 0), '10%', True)
         self.assertTrue(result)
 
+    def test_compare_many_with_tolerance(self):
+        infinity = float('Inf')
+        students = [
+            100.0, 100.001, 101.0, 109.9, 110.0, 110.1, 90.0, complex(100, 5), infinity, -infinity, float('nan'),
+            0.1 + 0.2, 0.3, 100.00099999999999, 100.001000000001,
+        ]
+        for instructor in (100.0, complex(100.0, 0), 0.3, 0.0, infinity):
+            for tolerance in ('0.001%', '10%', '10.0', 10.0, 0.001, '0', 0):
+                for relative_tolerance in (False, True):
+                    expected = [
+                        compare_with_tolerance(student, instructor, tolerance, relative_tolerance)
+                        for student in students
+                    ]
+                    result = compare_many_with_tolerance(students, instructor, tolerance, relative_tolerance)
+                    self.assertEqual(result, expected, (instructor, tolerance, relative_tolerance))
+        self.assertEqual(compare_many_with_tolerance([], 1.0), [])
+
     def test_sanitize_html(self):
         """
         Test for html sanitization with bleach.
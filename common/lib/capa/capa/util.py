@@ -5,6 +5,7 @@ import re
 from decimal import Decimal
 
 import bleach
+import numpy
 from lxml import etree
 
 from calc import evaluator
@@ -94,6 +95,55 @@ def compare_with_tolerance(student_complex, instructor_complex, tolerance=defaul
         return abs(student_complex - instructor_complex) <= tolerance
 
 
+def compare_many_with_tolerance(student_complexes, instructor_complex, tolerance=default_tolerance,
+                                relative_tolerance=False):
+    """
+    Compare each of student_complexes to instructor_complex, as
+    `compare_with_tolerance` does, and return the list of the results.
+
+    The comparisons are made together with NumPy arrays.  The values that are
+    not finite, or too close to the bounds of the tolerance for the result to
+    be sure (`compare_with_tolerance` compares real values as decimals), are
+    compared with `compare_with_tolerance` instead.
+    """
+    compare_one = lambda student_complex: compare_with_tolerance(
+        student_complex, instructor_complex, tolerance, relative_tolerance
+    )
+    if isinf(instructor_complex) or isnan(instructor_complex):
+        return [compare_one(student_complex) for student_complex in student_complexes]
+
+    tolerance_value = tolerance
+    if isinstance(tolerance, str):
+        if tolerance == default_tolerance:
+            relative_tolerance = True
+        if tolerance.endswith('%'):
+            tolerance_value = evaluator(dict(), dict(), tolerance[:-1]) * 0.01
+            if not relative_tolerance:
+                tolerance_value = tolerance_value * abs(instructor_complex)
+        else:
+            tolerance_value = evaluator(dict(), dict(), tolerance)
+    if not isinstance(tolerance_value, (int, long, float)):
+        return [compare_one(student_complex) for student_complex in student_complexes]
+
+    students = numpy.array(student_complexes, dtype=complex)
+    instructor_abs = abs(complex(instructor_complex))
+    with numpy.errstate(all='ignore'):
+        students_abs = numpy.abs(students)
+        if relative_tolerance:
+            tolerances = tolerance_value * numpy.maximum(students_abs, instructor_abs)
+        else:
+            tolerances = numpy.ones(len(students)) * tolerance_value
+        differences = numpy.abs(students - complex(instructor_complex))
+        margins = 1e-9 * numpy.maximum(numpy.maximum(students_abs, instructor_abs), numpy.abs(tolerances))
+        results = differences <= tolerances
+        sure = numpy.isfinite(students) & (numpy.abs(differences - tolerances) > margins)
+
+    return [
+        bool(result) if is_sure else compare_one(student_complex)
+        for student_complex, result, is_sure in zip(student_complexes, results, sure)
+    ]
+
+
 def contextualize_text(text, context):  # private
     """
     Takes a string with variables. E.g. $a+$b.
@@ -64,6 +64,18 @@ def randomization_bin(seed, problem_id):
     return int(r_hash.hexdigest()[:7], 16) % NUM_RANDOMIZATION_BINS
 
 
+def randomization_seeds(rerandomize):
+    """
+    Return the seeds that `CapaMixin.choose_new_seed` can choose for a problem
+    with the given rerandomize setting, in the LMS.
+    """
+    if rerandomize == RANDOMIZATION.NEVER:
+        return [1]
+    elif rerandomize == RANDOMIZATION.PER_STUDENT:
+        return range(NUM_RANDOMIZATION_BINS)
+    return range(MAX_RANDOMIZATION_BINS)
+
+
 class Randomization(String):
     """
     Define a field to store how to randomize a problem.
@@ -1582,7 +1594,7 @@ class CapaMixin(ScorableXBlockMixin, CapaFields):
 
     # ScorableXBlockMixin methods
 
-    def rescore(self, only_if_higher=False):
+    def rescore(self, only_if_higher=False, new_correct_map=None):
         """
         Checks whether the existing answers to a problem are correct.
 
@@ -1592,6 +1604,10 @@ class CapaMixin(ScorableXBlockMixin, CapaFields):
         If only_if_higher is True, the answer and grade are updated
         only if the resulting score is higher than before.
 
+        If new_correct_map is given, it is used as the CorrectMap of the
+        existing answers, which are then not graded again (for instance,
+        because they have already been graded in another process).
+
         Returns a dict with one key:
             {'success' : 'correct' | 'incorrect' | AJAX alert msg string }
 
@@ -1623,7 +1639,7 @@ class CapaMixin(ScorableXBlockMixin, CapaFields):
         event_info['orig_score'] = orig_score.raw_earned
         event_info['orig_total'] = orig_score.raw_possible
         try:
-            self.update_correctness()
+            self.update_correctness(new_correct_map)
             calculated_score = self.calculate_score()
         except (StudentInputError, ResponseError, LoncapaProblemError) as inst:
             log.warning("Input error in capa_module:problem_rescore", exc_info=True)
@@ -1673,13 +1689,15 @@ class CapaMixin(ScorableXBlockMixin, CapaFields):
         """
         return self.score
 
-    def update_correctness(self):
+    def update_correctness(self, new_correct_map=None):
         """
         Updates correct map of the LCP.
         Operates by creating a new correctness map based on the current
-        state of the LCP, and updating the old correctness map of the LCP.
+        state of the LCP, unless one is given, and updating the old
+        correctness map of the LCP.
         """
-        new_correct_map = self.lcp.get_grade_from_current_answers(None)
+        if new_correct_map is None:
+            new_correct_map = self.lcp.get_grade_from_current_answers(None)
         self.lcp.correct_map.update(new_correct_map)
 
     def calculate_score(self):
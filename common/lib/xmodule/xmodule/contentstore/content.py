@@ -314,26 +314,38 @@ class StaticContentStream(StaticContent):
                                                   length=length, locked=locked, content_digest=content_digest)
         self._stream = stream
 
-    def stream_data(self):
+    def _read_chunks(self):
+        """
+        Yield the data of the stream from its current position.
+
+        GridFS files are read a GridFS chunk at a time, each with a single query.  Reading
+        them in smaller pieces copies the rest of the current GridFS chunk for each piece.
+        """
+        read_chunk = getattr(self._stream, 'readchunk', None)
+        if read_chunk is None:
+            read_chunk = lambda: self._stream.read(STREAM_DATA_CHUNK_SIZE)
         while True:
-            chunk = self._stream.read(STREAM_DATA_CHUNK_SIZE)
+            chunk = read_chunk()
             if len(chunk) == 0:
                 break
             yield chunk
 
+    def stream_data(self):
+        for chunk in self._read_chunks():
+            yield chunk
+
     def stream_data_in_range(self, first_byte, last_byte):
         """
-        Stream the data between first_byte and last_byte (included)
+        Stream the data between first_byte and last_byte (included), starting from
+        the GridFS chunk that first_byte is in.
         """
         self._stream.seek(first_byte)
-        position = first_byte
-        while True:
-            if last_byte < position + STREAM_DATA_CHUNK_SIZE - 1:
-                chunk = self._stream.read(last_byte - position + 1)
-                yield chunk
+        remaining = last_byte - first_byte + 1
+        for chunk in self._read_chunks():
+            if len(chunk) >= remaining:
+                yield chunk[:remaining]
                 break
-            chunk = self._stream.read(STREAM_DATA_CHUNK_SIZE)
-            position += STREAM_DATA_CHUNK_SIZE
+            remaining -= len(chunk)
             yield chunk
 
     def close(self):
@@ -153,22 +153,30 @@ class MongoContentStore(ContentStore):
                 return None
 
     def export(self, location, output_directory):
-        content = self.find(location)
-
-        filename = content.name
-        if content.import_path is not None:
-            output_directory = output_directory + '/' + os.path.dirname(content.import_path)
-
         if not os.path.exists(output_directory):
             os.makedirs(output_directory)
+        self.export_to_fs(location, OSFS(output_directory))
 
-        # Escape invalid char from filename.
-        export_name = escape_invalid_characters(name=filename, invalid_char_list=['/', '\\'])
-
-        disk_fs = OSFS(output_directory)
+    @autoretry_read()
+    def export_to_fs(self, location, static_fs):
+        """
+        Write an asset to the filesystem `static_fs`, under its import path if it has one.
 
-        with disk_fs.open(export_name, 'wb') as asset_file:
-            asset_file.write(content.data)
+        The asset's data is streamed from GridFS, without reading all of it in memory.
+        """
+        content_id, __ = self.asset_db_key(location)
+        try:
+            with self.fs.get(content_id) as fp:
+                import_path = getattr(fp, 'import_path', None)
+                output_dir = os.path.dirname(import_path) if import_path is not None else u''
+                if output_dir:
+                    static_fs.makedirs(output_dir, recreate=True)
+
+                # Escape invalid char from filename.
+                export_name = escape_invalid_characters(name=fp.displayname, invalid_char_list=['/', '\\'])
+                static_fs.setbinfile(u'/'.join([output_dir, export_name]) if output_dir else export_name, fp)
+        except NoFile:
+            raise NotFoundError(content_id)
 
     def export_all_for_course(self, course_key, output_directory, assets_policy_file):
         """
@@ -181,6 +189,30 @@ class MongoContentStore(ContentStore):
             assets_policy_file: the filename for the policy file which should be in the same
                 directory as the other policy files.
         """
+        if not os.path.exists(output_directory):
+            os.makedirs(output_directory)
+        policy = self._export_all_for_course_to_fs(course_key, OSFS(output_directory))
+
+        with open(assets_policy_file, 'w') as f:
+            json.dump(policy, f, sort_keys=True, indent=4)
+
+    def export_all_for_course_to_fs(self, course_key, static_fs, policies_fs):
+        """
+        Export all of this course's assets to the filesystem `static_fs`, and all of the
+        assets' attributes to `assets.json` in the filesystem `policies_fs`.
+
+        Unlike `export_all_for_course`, this doesn't need a local disk to write to: the
+        filesystems can be, for instance, directories of a :class:`TarStreamFS`.
+        """
+        policy = self._export_all_for_course_to_fs(course_key, static_fs)
+
+        with policies_fs.open(u'assets.json', 'wb') as policy_file:
+            policy_file.write(json.dumps(policy, sort_keys=True, indent=4))
+
+    def _export_all_for_course_to_fs(self, course_key, static_fs):
+        """
+        Export all of this course's assets to `static_fs`, and return their assets policy.
+        """
         policy = {}
         assets, __ = self.get_all_content_for_course(course_key)
 
@@ -193,13 +225,12 @@ class MongoContentStore(ContentStore):
             #
             # When debugging course exports, this might be a good place
             # to look. -- pmitros
-            self.export(asset['asset_key'], output_directory)
+            self.export_to_fs(asset['asset_key'], static_fs)
             for attr, value in asset.iteritems():
                 if attr not in ['_id', 'md5', 'uploadDate', 'length', 'chunkSize', 'asset_key']:
                     policy.setdefault(asset['asset_key'].block_id, {})[attr] = value
 
-        with open(assets_policy_file, 'w') as f:
-            json.dump(policy, f, sort_keys=True, indent=4)
+        return policy
 
     def get_all_content_thumbnails_for_course(self, course_key):
         return self._get_all_content_for_course(course_key, get_thumbnails=True)[0]
@@ -12,6 +12,7 @@ import sys
 from collections import OrderedDict
 from datetime import datetime
 
+import numpy
 from contracts import contract
 from pytz import UTC
 from django.utils.translation import ugettext_lazy as _
@@ -143,6 +144,35 @@ def aggregate_scores(scores):
     return all_total, graded_total
 
 
+def aggregate_score_matrices(earned, possible, graded):
+    """
+    Vectorized variant of aggregate_scores, for a cohort of learners.
+
+    earned, possible: (learners x problems) arrays of the weighted scores
+        of the problems in a subsection.  A problem that has no score for
+        a learner must have 0 earned and 0 possible.
+    graded: A boolean array of whether each problem is graded.
+    returns: A tuple (all_earned, all_possible, graded_earned, graded_possible)
+        of arrays of the totals of each learner, equal to the earned and
+        possible values of the AggregatedScores returned by aggregate_scores.
+    """
+    earned = numpy.asarray(earned, dtype=float)
+    possible = numpy.asarray(possible, dtype=float)
+    num_learners = earned.shape[0]
+    totals = [numpy.zeros(num_learners) for _ in range(4)]
+    all_earned, all_possible, graded_earned, graded_possible = totals
+
+    # Problems are added one at a time, in order, so that the floating
+    # point totals are exactly those computed by aggregate_scores.
+    for problem_index, problem_graded in enumerate(graded):
+        all_earned += earned[:, problem_index]
+        all_possible += possible[:, problem_index]
+        if problem_graded:
+            graded_earned += earned[:, problem_index]
+            graded_possible += possible[:, problem_index]
+    return all_earned, all_possible, graded_earned, graded_possible
+
+
 def invalid_args(func, argdict):
     """
     Given a function and a dictionary of arguments, returns a set of arguments
@@ -242,6 +272,19 @@ class CourseGrader(object):
         '''Given a grade sheet, return a dict containing grading information'''
         raise NotImplementedError
 
+    def grade_cohort(self, percents_by_type, num_learners):
+        """
+        Vectorized variant of grade, for a cohort of learners.  Returns an
+        array of the 'percent' value that grade returns for each learner.
+
+        percents_by_type is a dict of each section format to a
+        (learners x sections) array of the learners' graded percents of the
+        sections of the format, in the order of their grade sheets.  Each
+        learner's row is padded at its end with NaN for the sections that
+        are not in the learner's grade sheet.
+        """
+        raise NotImplementedError
+
 
 class WeightedSubsectionsGrader(CourseGrader):
     """
@@ -297,6 +340,12 @@ class WeightedSubsectionsGrader(CourseGrader):
             'grade_breakdown': grade_breakdown
         }
 
+    def grade_cohort(self, percents_by_type, num_learners):
+        total_percents = numpy.zeros(num_learners)
+        for subgrader, _, weight in self.subgraders:
+            total_percents += subgrader.grade_cohort(percents_by_type, num_learners) * weight
+        return total_percents
+
 
 class AssignmentFormatGrader(CourseGrader):
     """
@@ -457,6 +506,59 @@ class AssignmentFormatGrader(CourseGrader):
             # No grade_breakdown here
         }
 
+    def total_with_drops_cohort(self, percents):
+        """
+        Vectorized variant of total_with_drops, for a cohort of learners.
+
+        percents is a (learners x sections) array of the percents of each
+        learner's breakdown, in order.  Each learner's row is padded at its
+        end with NaN for the sections that are not in the learner's
+        breakdown.  Returns an array of the total percent of each learner.
+        """
+        percents = numpy.asarray(percents, dtype=float)
+        num_learners, num_columns = percents.shape
+        absent = numpy.isnan(percents)
+        num_sections = (~absent).sum(axis=1)
+        percents = numpy.where(absent, 0.0, percents)
+
+        kept = ~absent
+        if self.drop_count > 0:
+            # Drop the lowest scores, and the last ones of equal scores,
+            # as total_with_drops does.
+            column_indices = numpy.arange(num_columns)
+            sort_keys = numpy.where(absent, numpy.inf, percents)
+            tie_break_keys = numpy.tile(-column_indices, (num_learners, 1))
+            order = numpy.lexsort((tie_break_keys, sort_keys), axis=-1)
+            dropped = order[:, :self.drop_count]
+            kept[numpy.arange(num_learners)[:, numpy.newaxis], dropped] = False
+
+        # Scores are added one at a time, in order, so that the floating
+        # point totals are exactly those computed by total_with_drops.
+        total_percents = numpy.zeros(num_learners)
+        for column_index in range(num_columns):
+            total_percents += numpy.where(kept[:, column_index], percents[:, column_index], 0.0)
+
+        num_counted = num_sections - self.drop_count
+        has_counted = num_counted > 0
+        total_percents[has_counted] /= num_counted[has_counted]
+        return total_percents
+
+    def grade_cohort(self, percents_by_type, num_learners):
+        percents = percents_by_type.get(self.type)
+        if percents is None:
+            percents = numpy.zeros((num_learners, 0))
+        percents = numpy.asarray(percents, dtype=float)
+
+        # As in grade, each learner's sections are padded with scores
+        # of 0 up to min_count sections.
+        if self.min_count > percents.shape[1]:
+            padding = numpy.empty((num_learners, self.min_count - percents.shape[1]))
+            padding.fill(numpy.nan)
+            percents = numpy.hstack([percents, padding])
+        unreleased = numpy.isnan(percents) & (numpy.arange(percents.shape[1]) < self.min_count)
+        percents = numpy.where(unreleased, 0.0, percents)
+        return self.total_with_drops_cohort(percents)
+
 
 def _iter_graded(scores):
     """
@@ -606,6 +606,18 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
         except NotImplementedError:
             return None, None
 
+    def get_block_update_versions(self, course_key):
+        """
+        Returns a map of the usage key of each block in the course to the
+        version in which the block was last changed, or None if the course's
+        modulestore doesn't version individual blocks.
+        """
+        try:
+            store = self._verify_modulestore_support(course_key, 'get_block_update_versions')
+            return store.get_block_update_versions(course_key)
+        except NotImplementedError:
+            return None
+
     def get_modulestore_type(self, course_id):
         """
         Returns a type which identifies which modulestore is servicing the given course_id.
@@ -12,7 +12,6 @@ structure:
 }
 """
 
-import copy
 from datetime import datetime
 from importlib import import_module
 import logging
@@ -46,6 +45,7 @@ from xmodule.modulestore.draft_and_published import ModuleStoreDraftAndPublished
 from xmodule.modulestore.edit_info import EditInfoRuntimeMixin
 from xmodule.modulestore.exceptions import ItemNotFoundError, DuplicateCourseError, ReferentialIntegrityError
 from xmodule.modulestore.inheritance import InheritanceMixin, inherit_metadata, InheritanceKeyValueStore
+from xmodule.modulestore.mongo.inheritance_index import InheritanceIndex, compute_inheritance_tree
 from xmodule.partitions.partitions_service import PartitionService
 from xmodule.modulestore.xml import CourseLocationManager
 from xmodule.modulestore.store_utilities import DETACHED_XBLOCK_TYPES
@@ -547,9 +547,13 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                  user_service=None,
                  signal_handler=None,
                  retry_wait_time=0.1,
+                 inheritance_index=False,
                  **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param inheritance_index: whether to keep an incremental index of the inheritable metadata of
+            the courses, in the `<collection>.inheritance` collection, and compute the inherited metadata
+            of the blocks being loaded from it rather than from the whole course's inheritance tree.
         """
 
         super(MongoModuleStore, self).__init__(contentstore=contentstore, **kwargs)
@@ -577,6 +581,11 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 asset_collection = self.DEFAULT_ASSET_COLLECTION_NAME
             self.asset_collection = self.database[asset_collection]
 
+            # Collection which stores the inheritance index.
+            self.inheritance_index = None
+            if inheritance_index:
+                self.inheritance_index = InheritanceIndex(self.database[collection + '.inheritance'])
+
         do_connection(**doc_store_config)
 
         if default_class is not None:
@@ -629,8 +638,12 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             connection.drop_database(self.collection.database.proxied_object)
         elif collections:
             self.collection.drop()
+            if self.inheritance_index is not None:
+                self.inheritance_index.collection.drop()
         else:
             self.collection.remove({})
+            if self.inheritance_index is not None:
+                self.inheritance_index.collection.remove({})
 
         if connections:
             connection.close()
@@ -681,12 +694,12 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         else:
             return ParentLocationCache()
 
-    def _compute_metadata_inheritance_tree(self, course_id):
+    def _find_inheritable_containers(self, course_id, published_only):
         '''
-        Find all inheritable fields from all xblocks in the course which may define inheritable data
+        Find the location, children and inheritable metadata of all xblocks in the course
+        which may define inheritable data
         '''
         # get all collections in the course, this query should not return any leaf nodes
-        course_id = self.fill_in_run(course_id)
         query = SON([
             ('_id.tag', 'i4x'),
             ('_id.org', course_id.org),
@@ -694,7 +707,7 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             ('_id.category', {'$in': BLOCK_TYPES_WITH_CHILDREN})
         ])
         # if we're only dealing in the published branch, then only get published containers
-        if self.get_branch_setting() == ModuleStoreEnum.Branch.published_only:
+        if published_only:
             query['_id.revision'] = None
         # we just want the Location, children, and inheritable metadata
         record_filter = {'_id': 1, 'definition.children': 1}
@@ -705,7 +718,16 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             record_filter['metadata.{0}'.format(field_name)] = 1
 
         # call out to the DB
-        resultset = self.collection.find(query, record_filter)
+        return self.collection.find(query, record_filter)
+
+    def _compute_metadata_inheritance_tree(self, course_id):
+        '''
+        Find all inheritable fields from all xblocks in the course which may define inheritable data
+        '''
+        course_id = self.fill_in_run(course_id)
+        resultset = self._find_inheritable_containers(
+            course_id, self.get_branch_setting() == ModuleStoreEnum.Branch.published_only
+        )
 
         # it's ok to keep these as deprecated strings b/c the overall cache is indexed by course_key and this
         # is a dictionary relative to that course
@@ -733,37 +755,16 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 root = location_url
 
         # now traverse the tree and compute down the inherited metadata
-        metadata_to_inherit = {}
-
-        def _compute_inherited_metadata(url):
-            """
-            Helper method for computing inherited metadata for a specific location url
-            """
-            my_metadata = results_by_url[url].get('metadata', {})
-
-            # go through all the children and recurse, but only if we have
-            # in the result set. Remember results will not contain leaf nodes
-            for child in results_by_url[url].get('definition', {}).get('children', []):
-                if child in results_by_url:
-                    new_child_metadata = copy.deepcopy(my_metadata)
-                    new_child_metadata.update(results_by_url[child].get('metadata', {}))
-                    results_by_url[child]['metadata'] = new_child_metadata
-                    metadata_to_inherit[child] = new_child_metadata
-                    _compute_inherited_metadata(child)
-                else:
-                    # this is likely a leaf node, so let's record what metadata we need to inherit
-                    metadata_to_inherit[child] = my_metadata.copy()
-                # WARNING: 'parent' is not part of inherited metadata, but
-                # we're piggybacking on this recursive traversal to grab
-                # and cache the child's parent, as a performance optimization.
-                # The 'parent' key will be popped out of the dictionary during
-                # CachingDescriptorSystem.load_item
-                metadata_to_inherit[child].setdefault('parent', {})[self.get_branch_setting()] = url
-
-        if root is not None:
-            _compute_inherited_metadata(root)
-
-        return metadata_to_inherit
+        if root is None:
+            return {}
+        blocks = dict(
+            (location_url, {
+                'metadata': result.get('metadata', {}),
+                'children': result.get('definition', {}).get('children', []),
+            })
+            for location_url, result in results_by_url.iteritems()
+        )
+        return compute_inheritance_tree(blocks, root, self.get_branch_setting())
 
     def _get_cached_metadata_inheritance_tree(self, course_id, force_refresh=False):
         '''
@@ -806,15 +807,92 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
 
         return tree
 
-    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None):
+    def _get_inheritance_tree(self, course_id, locations):
+        '''
+        Get the metadata inheritance tree for (at least) the subtrees of the course rooted at
+        the given locations.
+
+        Uses the inheritance index if there is one, or else the cached inheritance tree of
+        the whole course.
+        '''
+        course_id = self.fill_in_run(course_id)
+        if self.inheritance_index is None:
+            return self._get_cached_metadata_inheritance_tree(course_id)
+
+        # The request cache has the subtrees computed so far, and the urls of the blocks they cover.
+        branch = self.get_branch_setting()
+        cache_key = (unicode(course_id), branch)
+        if self.request_cache is not None:
+            subtrees = self.request_cache.data.setdefault('metadata_inheritance_subtrees', {})
+        else:
+            subtrees = {}
+
+        if cache_key not in subtrees:
+            if not self.inheritance_index.is_indexed(course_id):
+                if self._is_in_bulk_operation(course_id):
+                    # Don't index a course while it is being written to.
+                    return self._get_cached_metadata_inheritance_tree(course_id)
+                self._build_inheritance_index(course_id)
+            subtrees[cache_key] = ({}, set())
+
+        tree, covered_urls = subtrees[cache_key]
+        missing_urls = set(unicode(as_published(location)) for location in locations) - covered_urls
+        if missing_urls:
+            subtree, subtree_urls = self.inheritance_index.get_inheritance_tree(
+                missing_urls, branch, published_only=branch == ModuleStoreEnum.Branch.published_only
+            )
+            tree.update(subtree)
+            covered_urls.update(subtree_urls)
+        return tree
+
+    def _build_inheritance_index(self, course_id):
+        '''
+        Add all the container blocks of a course that isn't indexed yet to the inheritance index.
+        '''
+        log.info(u'Building the inheritance index of %s', course_id)
+        self.inheritance_index.build_course(course_id, [
+            (
+                BlockUsageLocator._from_deprecated_son(result['_id'], course_id.run),
+                result.get('metadata', {}),
+                result.get('definition', {}).get('children', []),
+            )
+            for result in self._find_inheritable_containers(course_id, published_only=False)
+        ])
+
+    def _update_inheritance_index(self, location, metadata, children, new_block=False):
+        '''
+        Update the document of the container block at location in the inheritance index,
+        given the serialized metadata and children it was just written with.
+        '''
+        new_course = new_block and location.block_type == 'course'
+        if not new_course and not self.inheritance_index.is_indexed(self.fill_in_run(location.course_key)):
+            # The whole course will be indexed when it is next loaded.
+            return
+        self.inheritance_index.update_block(location, metadata, children, new_course=new_course)
+
+    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None, location=None):
         """
         Refresh the cached metadata inheritance tree for the org/course combination
         for location
 
         If given a runtime, it replaces the cached_metadata in that runtime. NOTE: failure to provide
         a runtime may mean that some objects report old values for inherited data.
+
+        With an inheritance index, which is kept up to date as blocks are written, this only
+        forgets the subtrees computed in the current request, and recomputes the subtree rooted
+        at `location`, if given, for the runtime.
         """
         course_id = course_id.for_branch(None)
+        if self.inheritance_index is not None and self.inheritance_index.is_indexed(self.fill_in_run(course_id)):
+            if self.request_cache is not None:
+                subtrees = self.request_cache.data.get('metadata_inheritance_subtrees', {})
+                for cache_key in subtrees.keys():
+                    if cache_key[0] == unicode(self.fill_in_run(course_id)):
+                        del subtrees[cache_key]
+            if runtime and location and not self._is_in_bulk_operation(course_id):
+                runtime.cached_metadata.update(self._get_inheritance_tree(course_id, [location]))
+            return
+
         if not self._is_in_bulk_operation(course_id):
             # below is done for side effects when runtime is None
             cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
@@ -914,7 +992,7 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
 
         cached_metadata = {}
         if apply_cached_metadata:
-            cached_metadata = self._get_cached_metadata_inheritance_tree(course_key)
+            cached_metadata = self._get_inheritance_tree(course_key, [location])
 
         if using_descriptor_system is None:
             services = {}
@@ -969,6 +1047,13 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         course_key = self.fill_in_run(course_key)
         data_cache = self._cache_children(course_key, items, depth)
 
+        if self.inheritance_index is not None and len(items) > 1:
+            # get the inherited metadata of all the items at once
+            self._get_inheritance_tree(course_key, [
+                BlockUsageLocator._from_deprecated_son(item['location'], course_key.run)
+                for item in items if self._should_apply_cached_metadata(item, depth)
+            ])
+
         # if we are loading a course object, if we're not prefetching children (depth != 0) then don't
         # bother with the metadata inheritance
         return [
@@ -1493,6 +1578,7 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         )
         if result['n'] == 0:
             raise ItemNotFoundError(location)
+        return result
 
     def _update_ancestors(self, location, update):
         """
@@ -1550,7 +1636,12 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 for child in xblock.children:
                     parent_cache.set(unicode(child), xblock.location)
 
-            self._update_single_item(xblock.scope_ids.usage_id, payload, allow_not_found=allow_not_found)
+            result = self._update_single_item(xblock.scope_ids.usage_id, payload, allow_not_found=allow_not_found)
+            if self.inheritance_index is not None and xblock.has_children:
+                self._update_inheritance_index(
+                    xblock.scope_ids.usage_id, payload['metadata'], payload['definition.children'],
+                    new_block=not result.get('updatedExisting', True),
+                )
 
             # update subtree edited info for ancestors
             # don't update the subtree info for descendants of the publish root for efficiency
@@ -1565,7 +1656,9 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             xblock._edit_info = payload['edit_info']
 
             # recompute (and update) the metadata inheritance tree which is cached
-            self.refresh_cached_metadata_inheritance_tree(xblock.scope_ids.usage_id.course_key, xblock.runtime)
+            self.refresh_cached_metadata_inheritance_tree(
+                xblock.scope_ids.usage_id.course_key, xblock.runtime, location=xblock.scope_ids.usage_id
+            )
             # fire signal that we've written to DB
         except ItemNotFoundError:
             if not allow_not_found:
@@ -1627,6 +1720,8 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                         multi=False,
                         upsert=True,
                     )
+                    if self.inheritance_index is not None:
+                        self.inheritance_index.remove_children(parent_loc)
                 elif ancestor_loc.block_type == 'course':
                     # once we reach the top location of the tree and if the location is not an orphan then the
                     # parent is not an orphan either
@@ -2026,6 +2121,9 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         # To allow prioritizing draft vs published material
         create_collection_index(self.collection, '_id.revision', background=True)
 
+        if self.inheritance_index is not None:
+            self.inheritance_index.ensure_indexes()
+
     # Some overrides that still need to be implemented by subclasses
     def convert_to_draft(self, location, user_id):
         raise NotImplementedError()
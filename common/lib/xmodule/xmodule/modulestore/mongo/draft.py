@@ -167,6 +167,8 @@ class DraftModuleStore(MongoModuleStore):
         # delete all of the db records for the course
         course_query = self._course_key_to_son(course_key)
         self.collection.remove(course_query, multi=True)
+        if self.inheritance_index is not None:
+            self.inheritance_index.remove_course(course_key)
         self.delete_all_asset_metadata(course_key, user_id)
 
         self._emit_course_deleted_signal(course_key)
@@ -441,6 +443,13 @@ class DraftModuleStore(MongoModuleStore):
                 # prevent re-creation of DRAFT versions, unless explicitly requested to ignore
                 if not ignore_if_draft:
                     raise DuplicateItemError(item['_id'], self, 'collection')
+            else:
+                if self.inheritance_index is not None and 'children' in item.get('definition', {}):
+                    self._update_inheritance_index(
+                        BlockUsageLocator._from_deprecated_son(item['_id'], location.course_key.run),
+                        item.get('metadata', {}),
+                        item['definition']['children'],
+                    )
 
             # delete the old PUBLISHED version if requested
             if delete_published:
@@ -640,6 +649,8 @@ class DraftModuleStore(MongoModuleStore):
             bulk_record = self._get_bulk_ops_record(root_usages[0].course_key)
             bulk_record.dirty = True
             self.collection.remove({'_id': {'$in': to_be_deleted}}, safe=self.collection.safe)
+            if self.inheritance_index is not None:
+                self.inheritance_index.remove_blocks(to_be_deleted)
 
     @memoize_in_request_cache('request_cache')
     def has_changes(self, xblock):
@@ -744,6 +755,8 @@ class DraftModuleStore(MongoModuleStore):
         if len(to_be_deleted) > 0:
             bulk_record.dirty = True
             self.collection.remove({'_id': {'$in': to_be_deleted}})
+            if self.inheritance_index is not None:
+                self.inheritance_index.remove_blocks(to_be_deleted)
 
         self._flag_publish_event(course_key)
 
@@ -0,0 +1,281 @@
+"""
+An incremental index of the inheritable metadata of old Mongo courses.
+
+Without it, the inherited metadata of any block of a course is found by loading
+the inheritable metadata of all the course's container blocks and computing the
+whole course's inheritance tree, which is then cached as one large blob.
+
+The index has a document for each revision of each container block, with:
+
+    '_id': the block's id in the modulestore collection,
+    'location': the url of the published version of the block,
+    'metadata': only the inheritable fields set on the block itself,
+    'children': the urls of the block's children,
+    'ancestors': the urls of the block's ancestors, from the course root down to its parent.
+
+Documents are updated as blocks are written, and the inheritance tree of just
+the subtrees of a course that are being loaded is computed from the documents
+of their ancestors and of the container blocks under them.
+"""
+import copy
+
+from xmodule.modulestore.inheritance import InheritanceMixin
+from xmodule.mongo_utils import create_collection_index
+
+
+def compute_inheritance_tree(blocks, root, branch):
+    """
+    Compute the metadata that the descendants of `root` inherit.
+
+    Arguments:
+        blocks (dict): maps the urls of container blocks to dicts with the inheritable
+            'metadata' set on them and the urls of their 'children'
+        root (unicode): the url of the block to compute the tree under
+        branch (unicode): the branch setting the blocks were read with
+
+    Returns a dict mapping the url of each descendant of `root` to the metadata it
+    inherits, plus a 'parent' entry mapping `branch` to the url of its parent.
+    """
+    tree = {}
+    visited = set()
+    to_process = [(root, blocks[root]['metadata'])]
+    while to_process:
+        url, metadata = to_process.pop()
+        visited.add(url)
+        for child in blocks[url]['children']:
+            if child in blocks:
+                child_metadata = copy.deepcopy(metadata)
+                child_metadata.update(blocks[child]['metadata'])
+                if child not in visited:
+                    to_process.append((child, child_metadata))
+                tree[child] = dict(child_metadata)
+            else:
+                # this is likely a leaf node, so let's record what metadata it needs to inherit
+                tree[child] = metadata.copy()
+            # WARNING: 'parent' is not part of inherited metadata, but we're piggybacking on
+            # this traversal to grab and cache the child's parent, as a performance optimization.
+            tree[child]['parent'] = {branch: url}
+    return tree
+
+
+def inheritable_metadata(metadata):
+    """
+    Returns the inheritable fields of the serialized metadata of a block.
+    """
+    return dict(
+        (field_name, value) for field_name, value in metadata.iteritems()
+        if field_name in InheritanceMixin.fields
+    )
+
+
+class InheritanceIndex(object):
+    """
+    The inheritance index of a Mongo modulestore, stored in its own collection.
+    """
+    def __init__(self, collection):
+        self.collection = collection
+
+    def ensure_indexes(self):
+        """
+        Ensure that the indexes needed to query the inheritance index exist.
+        """
+        create_collection_index(self.collection, 'location', background=True)
+        create_collection_index(self.collection, 'ancestors', background=True)
+        create_collection_index(self.collection, 'children', background=True)
+
+    def is_indexed(self, course_key):
+        """
+        Returns whether the index has all of the container blocks of the course.
+        """
+        root_url = unicode(course_key.make_usage_key('course', course_key.run))
+        return self.collection.find_one({'location': root_url, 'indexed': True}, {'_id': True}) is not None
+
+    def update_block(self, location, metadata, children, new_course=False):
+        """
+        Update the document of the container block at `location` (including its revision)
+        with its current serialized metadata and children.  If children were added to
+        the block, the ancestors of their subtrees are updated.
+
+        Set `new_course` when creating the root of a new course, so that it is
+        known to be indexed.
+        """
+        url = unicode(location.replace(revision=None))
+        children = [unicode(child) for child in children]
+        update = {
+            'location': url,
+            'metadata': inheritable_metadata(metadata),
+            'children': children,
+        }
+        if new_course:
+            update['indexed'] = True
+
+        previous = self.collection.find_one(
+            {'_id': location.to_deprecated_son()}, {'ancestors': True, 'children': True}
+        )
+        if previous is None:
+            ancestors = update['ancestors'] = self._find_ancestors(url)
+            previous_children = []
+        else:
+            ancestors = previous.get('ancestors', [])
+            previous_children = previous.get('children', [])
+
+        self.collection.update({'_id': location.to_deprecated_son()}, {'$set': update}, upsert=True)
+
+        added_children = set(children) - set(previous_children)
+        if added_children:
+            self._set_subtree_ancestors(added_children, ancestors + [url])
+
+    def remove_children(self, location):
+        """
+        Remove the children of the document of the container block at `location` (including
+        its revision), as when the block is found to be an orphan.
+        """
+        self.collection.update({'_id': location.to_deprecated_son()}, {'$set': {'children': []}})
+
+    def remove_blocks(self, block_ids):
+        """
+        Remove the documents of the blocks with the given modulestore ids, if any.
+        """
+        self.collection.remove({'_id': {'$in': block_ids}})
+
+    def remove_course(self, course_key):
+        """
+        Remove the documents of all the blocks of the course.
+        """
+        self.collection.remove({'_id.tag': 'i4x', '_id.org': course_key.org, '_id.course': course_key.course})
+
+    def build_course(self, course_key, blocks):
+        """
+        Add all the container blocks of a course to the index.
+
+        `blocks` is a list of (location, metadata, children) tuples, with the location
+        (including its revision), serialized metadata and children of every container
+        block of the course.
+
+        Blocks written since `blocks` were read keep their documents' metadata and children.
+        """
+        root_url = unicode(course_key.make_usage_key('course', course_key.run))
+        children_by_url = {}
+        for location, __, children in blocks:
+            children_by_url.setdefault(unicode(location.replace(revision=None)), []).extend(
+                unicode(child) for child in children
+            )
+
+        ancestors_by_url = {root_url: []}
+        to_process = [root_url]
+        while to_process:
+            url = to_process.pop()
+            for child in children_by_url.get(url, []):
+                if child in children_by_url and child not in ancestors_by_url:
+                    ancestors_by_url[child] = ancestors_by_url[url] + [url]
+                    to_process.append(child)
+
+        for location, metadata, children in blocks:
+            url = unicode(location.replace(revision=None))
+            self.collection.update(
+                {'_id': location.to_deprecated_son()},
+                {
+                    '$set': {'location': url, 'ancestors': ancestors_by_url.get(url, [])},
+                    '$setOnInsert': {
+                        'metadata': inheritable_metadata(metadata),
+                        'children': [unicode(child) for child in children],
+                    },
+                },
+                upsert=True,
+            )
+
+        self.collection.update({'location': root_url}, {'$set': {'indexed': True}}, multi=True)
+
+    def get_inheritance_tree(self, urls, branch, published_only):
+        """
+        Compute the inheritance tree of the subtrees rooted at the blocks with the given
+        published urls, in the given branch setting.
+
+        Returns the tree, in the format of `compute_inheritance_tree`, and the set of the
+        urls of the blocks whose inherited metadata it has.
+        """
+        urls = set(urls)
+
+        # Find the ancestors of the subtrees from their roots' or their roots' parents' documents.
+        ancestors = set()
+        query = {'$or': [{'location': {'$in': list(urls)}}, {'children': {'$in': list(urls)}}]}
+        for document in self._find_in_branch(query, published_only, {'location': True, 'ancestors': True}):
+            ancestors.update(document.get('ancestors', []))
+            if document['location'] not in urls:
+                ancestors.add(document['location'])
+
+        # Then get the documents of the ancestors and of all of the container blocks of the subtrees.
+        blocks = {}
+        covered = set(urls)
+        query = {'$or': [{'location': {'$in': list(urls | ancestors)}}, {'ancestors': {'$in': list(urls)}}]}
+        for document in self._find_in_branch(query, published_only):
+            blocks[document['location']] = {
+                'metadata': document.get('metadata', {}),
+                'children': document.get('children', []),
+                'ancestors': document.get('ancestors', []),
+            }
+
+        tree = {}
+        for url, block in blocks.iteritems():
+            if url in urls or urls.intersection(block['ancestors']):
+                covered.add(url)
+                covered.update(block['children'])
+            if not block['ancestors']:
+                tree.update(compute_inheritance_tree(blocks, url, branch))
+        return tree, covered
+
+    def _find_in_branch(self, query, published_only, fields=None):
+        """
+        Returns the documents matching `query` of the blocks as they are in the branch: the
+        documents of their draft revisions if they have one, unless `published_only`, or else
+        of their published revisions.
+        """
+        if published_only:
+            return list(self.collection.find(dict(query, **{'_id.revision': None}), fields))
+
+        documents = list(self.collection.find(query, fields))
+        published_urls = [document['location'] for document in documents if document['_id'].get('revision') is None]
+        if not published_urls:
+            return documents
+        # A published document doesn't count for a block with a draft, even if the draft doesn't match.
+        draft_urls = set(
+            document['location'] for document in self.collection.find(
+                {'location': {'$in': published_urls}, '_id.revision': {'$ne': None}}, {'location': True}
+            )
+        )
+        return [
+            document for document in documents
+            if document['_id'].get('revision') is not None or document['location'] not in draft_urls
+        ]
+
+    def _find_ancestors(self, url):
+        """
+        Returns the ancestors of the block with the given url, from the document of
+        another revision of the block or else of its parent.
+        """
+        document = self.collection.find_one({'location': url}, {'ancestors': True})
+        if document is not None:
+            return document.get('ancestors', [])
+        parent = self.collection.find_one({'children': url}, {'location': True, 'ancestors': True})
+        if parent is not None:
+            return parent.get('ancestors', []) + [parent['location']]
+        return []
+
+    def _set_subtree_ancestors(self, root_urls, ancestors):
+        """
+        Set the ancestors of the subtrees rooted at the given blocks, which are
+        children of the block whose ancestors, and url, are `ancestors`.
+        """
+        query = {'$or': [{'location': {'$in': list(root_urls)}}, {'ancestors': {'$in': list(root_urls)}}]}
+        for document in self.collection.find(query, {'location': True, 'ancestors': True}):
+            previous_ancestors = document.get('ancestors', [])
+            if document['location'] in root_urls:
+                new_ancestors = ancestors
+            else:
+                # Keep the ancestors from the root of the subtree down.
+                root_index = next(
+                    index for index, ancestor in enumerate(previous_ancestors) if ancestor in root_urls
+                )
+                new_ancestors = ancestors + previous_ancestors[root_index:]
+            if new_ancestors != previous_ancestors:
+                self.collection.update({'_id': document['_id']}, {'$set': {'ancestors': new_ancestors}})
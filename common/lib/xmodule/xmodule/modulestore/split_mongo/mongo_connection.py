@@ -15,6 +15,7 @@ from time import time
 from pymongo.errors import DuplicateKeyError  # pylint: disable=unused-import
 
 try:
+    from django.conf import settings
     from django.core.cache import caches, InvalidCacheBackendError
     DJANGO_AVAILABLE = True
 except ImportError:
@@ -29,6 +30,7 @@ from xmodule.exceptions import HeartbeatFailure
 from xmodule.modulestore import BlockData
 from xmodule.modulestore.split_mongo import BlockKey
 from xmodule.mongo_utils import connect_to_mongodb, create_collection_index
+from xmodule.util.lru_cache import LRUCache
 
 
 new_contract('BlockData', BlockData)
@@ -225,24 +227,81 @@ def structure_to_mongo(structure, course_context=None):
         return new_structure
 
 
+class StructureMemoryCache(LRUCache):
+    """
+    A per-process, least-recently-used cache of pickled course structures,
+    bounded by the total size in bytes of the pickles it holds.
+
+    Structures are keyed by their ``_id``, and a structure document is never
+    modified once written, so entries never need to be invalidated.  The
+    structures are kept pickled, rather than as the converted objects, because
+    split modulestore loads definitions into the blocks of the structures it's
+    given; each caller gets its own copy to do that to.
+    """
+    def __init__(self, max_size):
+        """
+        Arguments:
+            max_size (int): The maximum total size, in bytes, of the pickled
+                structures held in the cache. A value of 0 disables the cache.
+        """
+        super(StructureMemoryCache, self).__init__(max_size=max_size)
+
+    @property
+    def enabled(self):
+        """
+        Return whether this cache holds anything at all.
+        """
+        return self.max_size > 0
+
+
+_STRUCTURE_MEMORY_CACHE = None
+
+
+def get_structure_memory_cache():
+    """
+    Return the process-wide :class:`StructureMemoryCache`, sized by the
+    ``COURSE_STRUCTURE_MEMORY_CACHE_MAX_BYTES`` setting (disabled if the
+    setting is missing or Django isn't available).
+    """
+    global _STRUCTURE_MEMORY_CACHE  # pylint: disable=global-statement
+    if _STRUCTURE_MEMORY_CACHE is None:
+        max_size = 0
+        if DJANGO_AVAILABLE:
+            max_size = getattr(settings, 'COURSE_STRUCTURE_MEMORY_CACHE_MAX_BYTES', 0)
+        _STRUCTURE_MEMORY_CACHE = StructureMemoryCache(max_size)
+    return _STRUCTURE_MEMORY_CACHE
+
+
 class CourseStructureCache(object):
     """
     Wrapper around django cache object to cache course structure objects.
     The course structures are pickled and compressed when cached.
 
-    If the 'course_structure_cache' doesn't exist, then don't do anything for
-    for set and get.
+    In front of the django cache sits a per-process :class:`StructureMemoryCache`
+    of the uncompressed pickles, so that repeated loads of the same structure in
+    a process don't pay for fetching and decompressing it.
+
+    If the 'course_structure_cache' doesn't exist, then only the in-memory
+    tier (if configured) is used for set and get.
     """
-    def __init__(self):
+    def __init__(self, memory_cache=None):
         self.cache = None
         if DJANGO_AVAILABLE:
             try:
                 self.cache = get_cache('course_structure_cache')
             except InvalidCacheBackendError:
                 pass
+        self.memory_cache = memory_cache if memory_cache is not None else get_structure_memory_cache()
 
     def get(self, key, course_context=None):
-        """Pull the compressed, pickled struct data from cache and deserialize."""
+        """
+        Return the structure from the in-memory tier if present, otherwise pull
+        the compressed, pickled struct data from cache and deserialize.
+        """
+        pickled_data = self._get_from_memory(key, course_context)
+        if pickled_data is not None:
+            return pickle.loads(pickled_data)
+
         if self.cache is None:
             return None
 
@@ -260,23 +319,60 @@ class CourseStructureCache(object):
             pickled_data = zlib.decompress(compressed_pickled_data)
             tagger.measure('uncompressed_size', len(pickled_data))
 
-            return pickle.loads(pickled_data)
+            structure = pickle.loads(pickled_data)
+
+        self._set_in_memory(key, pickled_data, course_context)
+        return structure
 
     def set(self, key, structure, course_context=None):
         """Given a structure, will pickle, compress, and write to cache."""
-        if self.cache is None:
+        if self.cache is None and not self.memory_cache.enabled:
             return None
 
         with TIMER.timer("CourseStructureCache.set", course_context) as tagger:
             pickled_data = pickle.dumps(structure, pickle.HIGHEST_PROTOCOL)
             tagger.measure('uncompressed_size', len(pickled_data))
 
-            # 1 = Fastest (slightly larger results)
-            compressed_pickled_data = zlib.compress(pickled_data, 1)
-            tagger.measure('compressed_size', len(compressed_pickled_data))
+            if self.cache is not None:
+                # 1 = Fastest (slightly larger results)
+                compressed_pickled_data = zlib.compress(pickled_data, 1)
+                tagger.measure('compressed_size', len(compressed_pickled_data))
+
+                # Stuctures are immutable, so we set a timeout of "never"
+                self.cache.set(key, compressed_pickled_data, None)
+
+        self._set_in_memory(key, pickled_data, course_context)
 
-            # Stuctures are immutable, so we set a timeout of "never"
-            self.cache.set(key, compressed_pickled_data, None)
+    def _get_from_memory(self, key, course_context):
+        """
+        Return the pickled structure for ``key`` from the in-memory tier, or None.
+        """
+        if not self.memory_cache.enabled:
+            return None
+
+        with TIMER.timer("CourseStructureCache.memory_get", course_context) as tagger:
+            pickled_data = self.memory_cache.get(key)
+            tagger.tag(from_memory_cache=str(pickled_data is not None).lower())
+            tagger.measure('memory_cache_hits', self.memory_cache.hits)
+            tagger.measure('memory_cache_misses', self.memory_cache.misses)
+            return pickled_data
+
+    def _set_in_memory(self, key, pickled_data, course_context):
+        """
+        Add the pickled structure for ``key`` to the in-memory tier, recording evictions.
+        """
+        if not self.memory_cache.enabled:
+            return
+
+        with TIMER.timer("CourseStructureCache.memory_set", course_context) as tagger:
+            evicted = self.memory_cache.set(key, pickled_data, len(pickled_data))
+            tagger.measure('uncompressed_size', len(pickled_data))
+            tagger.measure('memory_cache_size', self.memory_cache.size)
+            tagger.measure('memory_cache_evictions', self.memory_cache.evictions)
+            if evicted:
+                # Evictions mean the cache is too small for the working set
+                tagger.sample_rate = 1
+                tagger.tag(evicted=evicted)
 
 
 class MongoConnection(object):
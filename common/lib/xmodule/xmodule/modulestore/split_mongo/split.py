@@ -118,6 +118,9 @@ log = logging.getLogger(__name__)
 # When blacklists are this, all children should be excluded
 EXCLUDE_ALL = '*'
 
+# The most definitions fetched by a single query when loading definitions in bulk
+DEFINITION_PREFETCH_CHUNK_SIZE = 500
+
 
 new_contract('BlockUsageLocator', BlockUsageLocator)
 new_contract('BlockKey', BlockKey)
@@ -759,7 +762,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
 
         self.db_connection._drop_database(database, collections, connections)  # pylint: disable=protected-access
 
-    def cache_items(self, system, base_block_ids, course_key, depth=0, lazy=True):
+    def cache_items(self, system, base_block_ids, course_key, depth=0, lazy=True, prefetch_fields=None):
         """
         Handles caching of items once inheritance and any other one time
         per course per fetch operations are done.
@@ -770,6 +773,8 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             course_key: the destination course providing the context
             depth: how deep below these to prefetch
             lazy: whether to load definitions now or later
+            prefetch_fields: when lazy, the names of fields that the caller will need; the
+                definitions of the blocks that have any of them as content fields are loaded now
         """
         with self.bulk_operations(course_key, emit_signals=False):
             new_module_data = {}
@@ -785,37 +790,70 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             # until they're actually needed.
             if not lazy:
                 # Non-lazy loading: Load all descendants by id.
-                descendent_definitions = self.get_definitions(
+                self._load_definitions(course_key, new_module_data.values())
+            elif prefetch_fields:
+                self._load_definitions(
                     course_key,
-                    [
-                        block.definition
-                        for block in new_module_data.itervalues()
-                    ]
+                    self._plan_definition_prefetch(system, new_module_data.values(), prefetch_fields),
                 )
-                # Turn definitions into a map.
-                definitions = {definition['_id']: definition
-                               for definition in descendent_definitions}
-
-                for block in new_module_data.itervalues():
-                    if block.definition in definitions:
-                        definition = definitions[block.definition]
-                        # convert_fields gets done later in the runtime's xblock_from_json
-                        block.fields.update(definition.get('fields'))
-                        block.definition_loaded = True
 
             system.module_data.update(new_module_data)
             return system.module_data
 
+    def _plan_definition_prefetch(self, system, blocks, field_names):
+        """
+        Returns those of the given blocks whose definitions haven't been loaded yet
+        and have any of the named fields as content fields.
+        """
+        field_names = set(field_names)
+        needs_definition = {}
+        planned = []
+        for block in blocks:
+            if block.definition is None or block.definition_loaded:
+                continue
+            if block.block_type not in needs_definition:
+                block_class = system.mixologist.mix(system.load_block_type(block.block_type))
+                needs_definition[block.block_type] = any(
+                    field.scope == Scope.content
+                    for field_name, field in block_class.fields.iteritems()
+                    if field_name in field_names
+                )
+            if needs_definition[block.block_type]:
+                planned.append(block)
+        return planned
+
+    def _load_definitions(self, course_key, blocks):
+        """
+        Load the definitions of the given blocks into their fields, querying
+        for at most DEFINITION_PREFETCH_CHUNK_SIZE definitions at a time.
+        """
+        definition_ids = list(set(block.definition for block in blocks if block.definition is not None))
+        definitions = {}
+        for start in range(0, len(definition_ids), DEFINITION_PREFETCH_CHUNK_SIZE):
+            chunk = definition_ids[start:start + DEFINITION_PREFETCH_CHUNK_SIZE]
+            for definition in self.get_definitions(course_key, chunk):
+                definitions[definition['_id']] = definition
+
+        for block in blocks:
+            if block.definition in definitions:
+                definition = definitions[block.definition]
+                # convert_fields gets done later in the runtime's xblock_from_json
+                block.fields.update(definition.get('fields'))
+                block.definition_loaded = True
+
     @contract(course_entry=CourseEnvelope, block_keys="list(BlockKey)", depth="int | None")
     def _load_items(self, course_entry, block_keys, depth=0, **kwargs):
         """
         Load & cache the given blocks from the course. May return the blocks in any order.
 
         Load the definitions into each block if lazy is in kwargs and is False;
-        otherwise, do not load the definitions - they'll be loaded later when needed.
+        otherwise, do not load the definitions - they'll be loaded later when needed,
+        except for those of the blocks that have any of the content fields named in
+        prefetch_fields, if it is in kwargs.
         """
         lazy = kwargs.pop('lazy', True)
-        should_cache_items = not lazy
+        prefetch_fields = kwargs.pop('prefetch_fields', None)
+        should_cache_items = not lazy or bool(prefetch_fields)
 
         runtime = self._get_cache(course_entry.structure['_id'])
         if runtime is None:
@@ -824,7 +862,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             should_cache_items = True
 
         if should_cache_items:
-            self.cache_items(runtime, block_keys, course_entry.course_key, depth, lazy)
+            self.cache_items(runtime, block_keys, course_entry.course_key, depth, lazy, prefetch_fields)
 
         with self.bulk_operations(course_entry.course_key, emit_signals=False):
             return [runtime.load_item(block_key, course_entry, **kwargs) for block_key in block_keys]
@@ -1211,6 +1249,10 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             in the request. The depth is counted in the number of
             calls to get_children() to cache. None indicates to cache all
             descendants.
+        prefetch_fields (iterable): The names of fields that will be read from
+            the item and those descendants. The definitions of those that have
+            any of them as content fields are loaded in bulk up front, rather
+            than one at a time when the fields are first read.
         raises InsufficientSpecificationError or ItemNotFoundError
         """
         if not isinstance(usage_key, BlockUsageLocator) or usage_key.deprecated:
@@ -1600,6 +1642,21 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         # TODO implement
         pass
 
+    def get_block_update_versions(self, course_key):
+        """
+        Returns a map of the usage key of each block in the course's structure
+        to the version of the structure in which the block was last changed
+        (the block's edit_info.update_version).
+
+        The usage keys are branch and version agnostic.
+        """
+        structure = self._lookup_course(course_key).structure
+        agnostic_course_key = course_key.replace(branch=None, version_guid=None)
+        return {
+            agnostic_course_key.make_usage_key(block_key.type, block_key.id): block.edit_info.update_version
+            for block_key, block in structure['blocks'].iteritems()
+        }
+
     def get_block_original_usage(self, usage_key):
         """
         If a block was inherited into another structure using copy_from_template,
@@ -313,6 +313,13 @@ class DraftVersioningModuleStore(SplitMongoModuleStore, ModuleStoreDraftAndPubli
         usage_key = self._map_revision_to_branch(usage_key)
         return super(DraftVersioningModuleStore, self).get_block_original_usage(usage_key)
 
+    def get_block_update_versions(self, course_key):
+        """
+        See :py:meth `xmodule.modulestore.split_mongo.split.SplitMongoModuleStore.get_block_update_versions`
+        """
+        course_key = self._map_revision_to_branch(course_key)
+        return super(DraftVersioningModuleStore, self).get_block_update_versions(course_key)
+
     def get_orphans(self, course_key, **kwargs):
         course_key = self._map_revision_to_branch(course_key)
         return super(DraftVersioningModuleStore, self).get_orphans(course_key, **kwargs)
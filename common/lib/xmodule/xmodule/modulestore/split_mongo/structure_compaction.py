@@ -0,0 +1,169 @@
+"""
+Compaction of the history of split Mongo course structures.
+
+Every write to a split course creates a new structure, so the structures collection
+holds the whole history of every course and library.  A structure is reachable if it
+is the head of a branch of a course index, one of the `keep_versions` versions before
+a head, a library version that a library content block of a reachable structure is
+pinned to, or the original version of a reachable structure; the rest of the history
+can be archived or deleted.
+"""
+import logging
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+from pymongo.errors import DuplicateKeyError
+from pytz import UTC
+
+log = logging.getLogger(__name__)
+
+StructureCompactionReport = namedtuple(
+    'StructureCompactionReport',
+    ['total_structures', 'reachable_structures', 'unreachable_structures', 'estimated_size'],
+)
+
+
+class StructureCompactor(object):
+    """
+    Finds the unreachable structures of a split modulestore, and archives or deletes them.
+
+    Arguments:
+        db_connection (MongoConnection): the connection of the split modulestore
+        keep_versions (int): the number of versions before each branch head to keep
+        min_age (timedelta): structures created more recently than this are kept, as
+            they may be about to be referenced by a course index being written
+        batch_size (int): the number of structures to read or remove per query
+        batch_delay (float): seconds to wait between batches of removals
+    """
+    def __init__(self, db_connection, keep_versions=10, min_age=timedelta(days=1), batch_size=1000, batch_delay=1.0):
+        if keep_versions < 0:
+            raise ValueError(u'keep_versions must not be negative')
+        self.db_connection = db_connection
+        self.structures = db_connection.structures
+        self.keep_versions = keep_versions
+        self.min_age = min_age
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+
+    @property
+    def archive(self):
+        """
+        The collection that structures are archived to.
+        """
+        return self.db_connection.database[self.structures.name + '_archive']
+
+    def find_reachable_structures(self):
+        """
+        Returns the set of the ids of the reachable structures.
+        """
+        frontier = set()
+        for course_index in self.db_connection.course_index.find({}, {'versions': True}):
+            frontier.update(course_index.get('versions', {}).values())
+
+        reachable = set()
+        original_versions = set()
+        for __ in range(self.keep_versions + 1):
+            frontier -= reachable
+            if not frontier:
+                break
+            reachable |= frontier
+            previous_versions = set()
+            for batch in self._batches(frontier):
+                query = {'_id': {'$in': batch}}
+                for structure in self.structures.find(query, {'previous_version': True, 'original_version': True}):
+                    previous_versions.add(structure.get('previous_version'))
+                    original_versions.add(structure.get('original_version'))
+            frontier = previous_versions - {None}
+
+        reachable |= original_versions - {None}
+
+        # Library content blocks refresh their children from the library version they
+        # are pinned to, which may be far older than the library's head.
+        pinned_versions = self._find_pinned_library_versions(reachable) - reachable
+        for batch in self._batches(pinned_versions):
+            query = {'_id': {'$in': batch}}
+            for structure in self.structures.find(query, {'original_version': True}):
+                original_versions.add(structure.get('original_version'))
+        return reachable | pinned_versions | (original_versions - {None})
+
+    def find_unreachable_structures(self, reachable=None):
+        """
+        Yields the ids of the unreachable structures that are older than `min_age`.
+        """
+        if reachable is None:
+            reachable = self.find_reachable_structures()
+        cutoff = ObjectId.from_datetime(datetime.now(UTC) - self.min_age)
+        cursor = self.structures.find({'_id': {'$lt': cutoff}}, {'_id': True}).batch_size(self.batch_size)
+        for structure in cursor:
+            if structure['_id'] not in reachable:
+                yield structure['_id']
+
+    def report(self):
+        """
+        Returns a StructureCompactionReport of what compacting the structures would remove,
+        with the size of the unreachable structures estimated from the collection's
+        average document size.
+        """
+        reachable = self.find_reachable_structures()
+        unreachable = sum(1 for __ in self.find_unreachable_structures(reachable))
+        stats = self.db_connection.database.command('collstats', self.structures.name)
+        return StructureCompactionReport(
+            total_structures=stats.get('count', 0),
+            reachable_structures=len(reachable),
+            unreachable_structures=unreachable,
+            estimated_size=int(unreachable * stats.get('avgObjSize', 0)),
+        )
+
+    def compact(self, archive=False):
+        """
+        Delete the unreachable structures in batches, first copying them to the
+        archive collection if `archive` is set.
+
+        Returns the number of structures removed.
+        """
+        removed = 0
+        for batch in self._batches(self.find_unreachable_structures()):
+            if archive:
+                try:
+                    self.archive.insert(self.structures.find({'_id': {'$in': batch}}), continue_on_error=True)
+                except DuplicateKeyError:
+                    # Structures archived by an earlier, interrupted run.
+                    pass
+            self.structures.remove({'_id': {'$in': batch}})
+            removed += len(batch)
+            log.info(u'Removed %d unreachable structures', removed)
+            time.sleep(self.batch_delay)
+        return removed
+
+    def _find_pinned_library_versions(self, structure_ids):
+        """
+        Returns the set of the ids of the library versions that the library content
+        blocks of the given structures are pinned to.
+        """
+        pinned_versions = set()
+        projection = {'blocks.block_type': True, 'blocks.fields.source_library_version': True}
+        for batch in self._batches(structure_ids):
+            query = {'_id': {'$in': batch}, 'blocks.block_type': 'library_content'}
+            for structure in self.structures.find(query, projection):
+                for block in structure.get('blocks', []):
+                    if block.get('block_type') != 'library_content':
+                        continue
+                    version = block.get('fields', {}).get('source_library_version')
+                    if version and ObjectId.is_valid(version):
+                        pinned_versions.add(ObjectId(version))
+        return pinned_versions
+
+    def _batches(self, ids):
+        """
+        Yields lists of at most `batch_size` of the given ids.
+        """
+        batch = []
+        for structure_id in ids:
+            batch.append(structure_id)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
@@ -0,0 +1,192 @@
+"""
+A write-only filesystem that streams the files written to it into a tar archive.
+
+Exporting a course to a :class:`TarStreamFS` writes the .tar.gz archive of the
+export as the course is exported, instead of staging the whole export on disk
+and then compressing it.
+"""
+import io
+import os
+import tarfile
+import time
+from tempfile import SpooledTemporaryFile
+
+from fs import errors
+from fs.base import FS
+from fs.info import Info
+from fs.mode import Mode
+from fs.path import abspath, basename, dirname, normpath, relpath
+
+# Files written with `open` are added to the archive when they are closed.
+# Until then, they are kept in memory up to this size, then in a temporary file.
+MAX_IN_MEMORY_FILE_SIZE = 10 * 1024 * 1024
+
+
+class TarStreamFS(FS):
+    """
+    A pyfilesystem filesystem that adds each directory and file written to it
+    to a tar archive, written to `fileobj` as a stream.
+
+    Files can't be read back, nor removed.  Call `close` to finish the archive;
+    `fileobj` itself is not closed.
+    """
+    _meta = {
+        'case_insensitive': False,
+        'invalid_path_chars': '\0',
+        'network': False,
+        'read_only': False,
+        'thread_safe': True,
+        'unicode_paths': True,
+        'virtual': False,
+    }
+
+    def __init__(self, fileobj, compression='gz'):
+        super(TarStreamFS, self).__init__()
+        self._tar = tarfile.open(fileobj=fileobj, mode='w|' + compression)
+        self._dirs = set([u'/'])
+        self._files = set()
+
+    def __repr__(self):
+        return "TarStreamFS({!r})".format(self._tar.fileobj)
+
+    def getinfo(self, path, namespaces=None):
+        _path = self._abspath(path)
+        if _path not in self._dirs and _path not in self._files:
+            raise errors.ResourceNotFound(path)
+        return Info({'basic': {'name': basename(_path), 'is_dir': _path in self._dirs}})
+
+    def listdir(self, path):
+        _path = self._abspath(path)
+        if _path not in self._dirs:
+            if _path in self._files:
+                raise errors.DirectoryExpected(path)
+            raise errors.ResourceNotFound(path)
+        return sorted(
+            basename(resource) for resource in self._dirs | self._files
+            if resource != u'/' and dirname(resource) == _path
+        )
+
+    def makedir(self, path, permissions=None, recreate=False):
+        _path = self._abspath(path)
+        with self._lock:
+            if _path in self._dirs:
+                if not recreate:
+                    raise errors.DirectoryExists(path)
+            else:
+                self._check_new_resource(path, _path)
+                self._dirs.add(_path)
+                self._add(_path, tarfile.DIRTYPE)
+        return self.opendir(path)
+
+    def openbin(self, path, mode='r', buffering=-1, **options):
+        _mode = Mode(mode)
+        _mode.validate_bin()
+        if _mode.reading or _mode.appending:
+            raise errors.Unsupported(u'files in a tar stream can only be written')
+        _path = self._abspath(path)
+        with self._lock:
+            if _path not in self._files:
+                self._check_new_resource(path, _path)
+            return _TarMemberFile(self, _path)
+
+    def setbinfile(self, path, file):
+        """
+        Add the contents of a binary file to the archive.  If the file is
+        seekable, its contents are streamed into the archive from it directly.
+        """
+        try:
+            start = file.tell()
+            file.seek(0, os.SEEK_END)
+            size = file.tell() - start
+            file.seek(start)
+        except (AttributeError, IOError, ValueError):
+            super(TarStreamFS, self).setbinfile(path, file)
+            return
+
+        _path = self._abspath(path)
+        with self._lock:
+            if _path not in self._files:
+                self._check_new_resource(path, _path)
+            self._add_file(_path, file, size)
+
+    def remove(self, path):
+        raise errors.ResourceReadOnly(path)
+
+    def removedir(self, path):
+        raise errors.ResourceReadOnly(path)
+
+    def setinfo(self, path, info):
+        self.getinfo(path)
+
+    def close(self):
+        if not self.isclosed():
+            self._tar.close()
+        super(TarStreamFS, self).close()
+
+    def _abspath(self, path):
+        """
+        Returns the normalized, absolute form of the path.
+        """
+        self.check()
+        return abspath(normpath(path))
+
+    def _check_new_resource(self, path, _path):
+        """
+        Check that a new file or directory can be made at the path.
+        """
+        if _path in self._dirs:
+            raise errors.FileExpected(path)
+        if _path in self._files:
+            raise errors.DirectoryExists(path)
+        if dirname(_path) not in self._dirs:
+            raise errors.ResourceNotFound(path)
+
+    def _add_file(self, _path, fileobj, size):
+        """
+        Add a file to the archive, with `size` bytes read from `fileobj`.
+        """
+        with self._lock:
+            self._files.add(_path)
+            self._add(_path, tarfile.REGTYPE, fileobj, size)
+
+    def _add(self, _path, member_type, fileobj=None, size=0):
+        """
+        Write a member to the archive.
+        """
+        info = tarfile.TarInfo(relpath(_path).encode('utf-8'))
+        info.type = member_type
+        info.size = size
+        info.mtime = time.time()
+        info.mode = 0o755 if member_type == tarfile.DIRTYPE else 0o644
+        self._tar.addfile(info, fileobj)
+
+
+class _TarMemberFile(io.RawIOBase):
+    """
+    A file being written to a :class:`TarStreamFS`, added to its archive
+    when closed.
+    """
+    def __init__(self, tar_fs, path):
+        super(_TarMemberFile, self).__init__()
+        self._tar_fs = tar_fs
+        self._path = path
+        self._buffer = SpooledTemporaryFile(MAX_IN_MEMORY_FILE_SIZE)
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        # Buffered writers pass memoryviews, which aren't written as bytes in Python 2.
+        data = memoryview(data).tobytes()
+        self._buffer.write(data)
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            try:
+                size = self._buffer.tell()
+                self._buffer.seek(0)
+                self._tar_fs._add_file(self._path, self._buffer, size)  # pylint: disable=protected-access
+            finally:
+                self._buffer.close()
+        super(_TarMemberFile, self).close()
@@ -781,6 +781,91 @@ class TestMongoModuleStoreWithNoAssetCollection(TestMongoModuleStore):
         self.assertRaises(ItemNotFoundError, lambda: self.draft_store.get_all_asset_metadata(course_key, 'asset')[:1])
 
 
+class TestMongoInheritanceIndex(TestCase):
+    """
+    Tests of the inheritance index of the Mongo modulestore.
+    """
+    shard = 2
+
+    def setUp(self):
+        super(TestMongoInheritanceIndex, self).setUp()
+        self.db_name = 'test_mongo_inheritance_%s' % uuid4().hex[:5]
+        self.store = DraftModuleStore(
+            None,
+            {'host': HOST, 'db': self.db_name, 'port': PORT, 'collection': COLLECTION},
+            FS_ROOT, RENDER_TEMPLATE,
+            default_class=DEFAULT_CLASS,
+            branch_setting_func=lambda: ModuleStoreEnum.Branch.draft_preferred,
+            xblock_mixins=(EditInfoMixin, InheritanceMixin, LocationMixin, XModuleMixin),
+            inheritance_index=True,
+        )
+        self.addCleanup(self.store._drop_database)
+        self.user_id = ModuleStoreEnum.UserID.test
+
+        self.course = self.store.create_course('edX', 'inheritance', 'run', self.user_id, fields={'graded': False})
+        chapter = self.store.create_child(self.user_id, self.course.location, 'chapter', 'chapter')
+        self.sequential = self.store.create_child(
+            self.user_id, chapter.location, 'sequential', 'sequential', fields={'graded': True}
+        )
+        self.vertical = self.store.create_child(self.user_id, self.sequential.location, 'vertical', 'vertical')
+        self.html = self.store.create_child(self.user_id, self.vertical.location, 'html', 'html')
+
+    def test_inherited_from_index(self):
+        with patch.object(self.store, '_compute_metadata_inheritance_tree') as compute_tree:
+            self.assertTrue(self.store.get_item(self.vertical.location).graded)
+            self.assertTrue(self.store.get_item(self.html.location).graded)
+        compute_tree.assert_not_called()
+
+    def test_updated_on_write(self):
+        sequential = self.store.get_item(self.sequential.location)
+        sequential.graded = False
+        self.store.update_item(sequential, self.user_id)
+        self.assertFalse(self.store.get_item(self.html.location).graded)
+
+        # Moving the vertical under another sequential changes what it inherits.
+        chapter = self.store.get_item(sequential.parent)
+        other_sequential = self.store.create_child(
+            self.user_id, chapter.location, 'sequential', 'other', fields={'graded': True}
+        )
+        sequential.children = []
+        self.store.update_item(sequential, self.user_id)
+        other_sequential.children = [self.vertical.location]
+        self.store.update_item(other_sequential, self.user_id)
+        self.assertTrue(self.store.get_item(self.html.location).graded)
+
+    def test_index_built_when_loaded(self):
+        self.store.inheritance_index.remove_course(self.course.id)
+        self.assertFalse(self.store.inheritance_index.is_indexed(self.course.id))
+        self.assertTrue(self.store.get_item(self.html.location).graded)
+        self.assertTrue(self.store.inheritance_index.is_indexed(self.course.id))
+
+    def test_branches_kept_separate(self):
+        # Move the html to another vertical in the draft branch only.
+        self.store.publish(self.vertical.location, self.user_id)
+        chapter = self.store.get_item(self.store.get_item(self.sequential.location).parent)
+        other_sequential = self.store.create_child(
+            self.user_id, chapter.location, 'sequential', 'other', fields={'graded': False}
+        )
+        other_vertical = self.store.create_child(self.user_id, other_sequential.location, 'vertical', 'other')
+        vertical = self.store.get_item(self.vertical.location)
+        vertical.children = []
+        self.store.update_item(vertical, self.user_id)
+        other_vertical.children = [self.html.location]
+        self.store.update_item(other_vertical, self.user_id)
+
+        self.assertFalse(self.store.get_item(self.html.location).graded)
+        with self.store.branch_setting(ModuleStoreEnum.Branch.published_only):
+            self.assertTrue(self.store.get_item(self.html.location).graded)
+
+    def test_orphan_children_removed(self):
+        orphan = self.store.create_item(
+            self.user_id, self.course.id, 'sequential', 'orphan', fields={'children': [self.vertical.location]}
+        )
+        self.assertEqual(self.store.get_parent_location(self.vertical.location), self.sequential.location)
+        document = self.store.inheritance_index.collection.find_one({'location': unicode(orphan.location)})
+        self.assertEqual(document['children'], [])
+
+
 class TestMongoKeyValueStore(TestCase):
     """
     Tests for MongoKeyValueStore.
@@ -32,6 +32,7 @@ from xmodule.fields import Date, Timedelta
 from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
 from xmodule.modulestore.tests.test_modulestore import check_has_course_method
 from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.mongo_connection import StructureMemoryCache
 from xmodule.modulestore.tests.factories import check_mongo_calls
 from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
 from xmodule.modulestore.tests.utils import mock_tab_from_json
@@ -773,6 +774,30 @@ class SplitModuleCourseTests(SplitModuleTest):
         self.assertIn(BlockKey('chapter', 'chapter1'), block_map)
         self.assertIn(BlockKey('problem', 'problem3_2'), block_map)
 
+    @patch('xmodule.tabs.CourseTab.from_json', side_effect=mock_tab_from_json)
+    @patch('xmodule.modulestore.split_mongo.split.DEFINITION_PREFETCH_CHUNK_SIZE', 2)
+    def test_prefetch_fields(self, _from_json):
+        """
+        Test that the definitions of the blocks with the prefetched content fields
+        are loaded in chunks, and aren't loaded again when the fields are read.
+        """
+        chapter_locator = BlockUsageLocator(
+            CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT),
+            block_type='chapter',
+            block_id='chapter3'
+        )
+        db_connection = modulestore().db_connection
+        with patch.object(db_connection, 'get_definitions', wraps=db_connection.get_definitions) as get_definitions:
+            chapter = modulestore().get_item(chapter_locator, depth=None, prefetch_fields=['data'])
+        # The chapter has no `data` field, so only the definitions of its 3 problems are loaded.
+        self.assertEqual(get_definitions.call_count, 2)
+        self.assertEqual(sum(len(call[0][0]) for call in get_definitions.call_args_list), 3)
+
+        with patch.object(db_connection, 'get_definition') as get_definition:
+            for problem in chapter.get_children():
+                self.assertIsNotNone(problem.data)
+        self.assertFalse(get_definition.called)
+
     @patch('xmodule.tabs.CourseTab.from_json', side_effect=mock_tab_from_json)
     def test_course_successors(self, _from_json):
         """
@@ -1003,6 +1028,62 @@ class TestCourseStructureCache(SplitModuleTest):
         # now make sure that you get the same structure
         self.assertEqual(cached_structure, not_cached_structure)
 
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_structure_memory_cache')
+    def test_memory_cache(self, mock_get_memory_cache):
+        memory_cache = StructureMemoryCache(10 ** 8)
+        mock_get_memory_cache.return_value = memory_cache
+
+        with check_mongo_calls(1):
+            not_cached_structure = self._get_structure(self.new_course)
+
+        # the django cache is a dummy cache, but the in-memory tier holds the
+        # converted structure, so no mongo call is needed
+        with check_mongo_calls(0):
+            cached_structure = self._get_structure(self.new_course)
+
+        self.assertEqual(cached_structure, not_cached_structure)
+        self.assertEqual(memory_cache.hits, 1)
+        self.assertEqual(memory_cache.misses, 1)
+
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_cache')
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_structure_memory_cache')
+    def test_memory_cache_filled_from_django_cache(self, mock_get_memory_cache, mock_get_cache):
+        mock_get_cache.return_value = self.cache
+        mock_get_memory_cache.return_value = StructureMemoryCache(0)
+        with check_mongo_calls(1):
+            not_cached_structure = self._get_structure(self.new_course)
+
+        # Now enable the in-memory tier: the first load comes from the django
+        # cache, and populates the in-memory tier for the next one.
+        memory_cache = StructureMemoryCache(10 ** 8)
+        mock_get_memory_cache.return_value = memory_cache
+        with check_mongo_calls(0):
+            from_django_cache = self._get_structure(self.new_course)
+        self.assertEqual(from_django_cache, not_cached_structure)
+        self.assertEqual(len(memory_cache), 1)
+
+        with check_mongo_calls(0):
+            from_memory_cache = self._get_structure(self.new_course)
+        self.assertEqual(from_memory_cache, from_django_cache)
+
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_structure_memory_cache')
+    def test_memory_cache_returns_copies(self, mock_get_memory_cache):
+        mock_get_memory_cache.return_value = StructureMemoryCache(10 ** 8)
+        self._get_structure(self.new_course)
+
+        # Changes made to one structure, as when its definitions are loaded, are
+        # not seen by the next caller.
+        with check_mongo_calls(0):
+            structure = self._get_structure(self.new_course)
+        block = structure['blocks'][structure['root']]
+        block.fields['display_name'] = 'Changed'
+        block.definition_loaded = True
+
+        with check_mongo_calls(0):
+            structure = self._get_structure(self.new_course)
+        self.assertNotEqual(structure['blocks'][structure['root']].fields.get('display_name'), 'Changed')
+        self.assertFalse(structure['blocks'][structure['root']].definition_loaded)
+
     def _get_structure(self, course):
         """
         Helper function to get a structure from a course.
@@ -1012,6 +1093,62 @@ class TestCourseStructureCache(SplitModuleTest):
         )
 
 
+class TestStructureMemoryCache(unittest.TestCase):
+    """Tests for the StructureMemoryCache"""
+
+    def test_disabled(self):
+        cache = StructureMemoryCache(0)
+        self.assertFalse(cache.enabled)
+        cache.set('a', {'_id': 'a'}, 1)
+        self.assertIsNone(cache.get('a'))
+
+    def test_get_and_set(self):
+        cache = StructureMemoryCache(100)
+        structure = {'_id': 'a'}
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', structure, 10)
+        self.assertIs(cache.get('a'), structure)
+        self.assertEqual((cache.hits, cache.misses, cache.size), (1, 1, 10))
+
+    def test_lru_eviction(self):
+        cache = StructureMemoryCache(30)
+        for key in 'abc':
+            cache.set(key, {'_id': key}, 10)
+
+        # touch 'a' so that 'b' becomes the least recently used
+        cache.get('a')
+        self.assertEqual(cache.set('d', {'_id': 'd'}, 10), 1)
+
+        self.assertNotIn('b', cache)
+        for key in 'acd':
+            self.assertIn(key, cache)
+        self.assertEqual(cache.size, 30)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_replace_entry(self):
+        cache = StructureMemoryCache(30)
+        cache.set('a', {'_id': 'a'}, 10)
+        cache.set('a', {'_id': 'a'}, 20)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.size, 20)
+
+    def test_oversized_structure(self):
+        cache = StructureMemoryCache(30)
+        cache.set('a', {'_id': 'a'}, 10)
+        cache.set('b', {'_id': 'b'}, 40)
+        self.assertNotIn('b', cache)
+        self.assertIn('a', cache)
+        self.assertEqual(cache.evictions, 0)
+
+    def test_clear(self):
+        cache = StructureMemoryCache(30)
+        cache.set('a', {'_id': 'a'}, 10)
+        cache.get('a')
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual((cache.hits, cache.misses, cache.size), (0, 0, 0))
+
+
 @attr(shard=2)
 class SplitModuleItemTests(SplitModuleTest):
     '''
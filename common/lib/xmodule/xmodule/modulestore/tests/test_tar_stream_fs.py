@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for tar_stream_fs.py
+"""
+import io
+import tarfile
+import unittest
+
+from fs import errors
+
+from xmodule.modulestore.tar_stream_fs import TarStreamFS
+
+
+class TestTarStreamFS(unittest.TestCase):
+    """
+    Tests that files written to a TarStreamFS end up in its archive.
+    """
+    def setUp(self):
+        super(TestTarStreamFS, self).setUp()
+        self.archive = io.BytesIO()
+        self.tar_fs = TarStreamFS(self.archive)
+
+    def _read_archive(self):
+        """
+        Finish the archive and return it, opened for reading.
+        """
+        self.tar_fs.close()
+        self.archive.seek(0)
+        return tarfile.open(fileobj=self.archive, mode='r:gz')
+
+    def test_write_files(self):
+        course_dir = self.tar_fs.makedir(u'course')
+        with course_dir.open(u'course.xml', 'wb') as course_xml:
+            course_xml.write(b'<course/>')
+        course_dir.makedirs(u'html/intro', recreate=True)
+        with course_dir.open(u'html/intro/welcome.html', 'w') as html_file:
+            html_file.write(u'Bienvenue à tous')
+        course_dir.makedir(u'static').setbinfile(u'video.mp4', io.BytesIO(b'x' * 100000))
+
+        self.assertTrue(self.tar_fs.isdir(u'course/html'))
+        self.assertEqual(course_dir.listdir(u'/'), [u'course.xml', u'html', u'static'])
+
+        tar_file = self._read_archive()
+        self.assertEqual(
+            tar_file.getnames(),
+            [
+                'course', 'course/course.xml', 'course/html', 'course/html/intro',
+                'course/html/intro/welcome.html', 'course/static', 'course/static/video.mp4',
+            ]
+        )
+        self.assertEqual(tar_file.extractfile('course/course.xml').read(), b'<course/>')
+        self.assertEqual(
+            tar_file.extractfile('course/html/intro/welcome.html').read().decode('utf-8'), u'Bienvenue à tous'
+        )
+        self.assertEqual(tar_file.getmember('course/static/video.mp4').size, 100000)
+
+    def test_write_only(self):
+        with self.tar_fs.open(u'course.xml', 'wb') as course_xml:
+            course_xml.write(b'<course/>')
+        with self.assertRaises(errors.Unsupported):
+            self.tar_fs.open(u'course.xml', 'rb')
+        with self.assertRaises(errors.ResourceReadOnly):
+            self.tar_fs.remove(u'course.xml')
+
+    def test_missing_directory(self):
+        with self.assertRaises(errors.ResourceNotFound):
+            self.tar_fs.open(u'missing/course.xml', 'wb')
@@ -17,6 +17,8 @@ from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOS
 from opaque_keys.edx.keys import CourseKey
 from xmodule.tests import DATA_DIR
 import os
+import shutil
+from tempfile import mkdtemp
 from uuid import uuid4
 from path import Path as path
 import unittest
@@ -389,3 +391,54 @@ class StaticContentImporterTest(unittest.TestCase):
             )
             mock_file.assert_called_with(full_file_path, 'rb')
             self.mocked_content_store.assert_called_once()
+
+
+class StaticContentUploadTest(unittest.TestCase):
+    """
+    Tests uploading static content in the background.
+    """
+    shard = 2
+
+    def setUp(self):
+        super(StaticContentUploadTest, self).setUp()
+        self.course_data_path = path(mkdtemp())
+        self.addCleanup(shutil.rmtree, self.course_data_path)
+        (self.course_data_path / 'static').makedirs()
+        self.mocked_content_store = mock.Mock()
+        self.mocked_content_store.generate_thumbnail.return_value = (None, None)
+        self.saved = {}
+
+        def save(content):
+            """ Save the content's data, read in chunks. """
+            self.saved[content.location.block_id] = ''.join(content.data)
+        self.mocked_content_store.save.side_effect = save
+
+        self.static_content_importer = StaticContentImporter(
+            static_content_store=self.mocked_content_store,
+            course_data_path=self.course_data_path,
+            target_id=CourseKey.from_string('course-v1:edX+DemoX+Demo_Course'),
+            upload_workers=2,
+        )
+
+    def test_upload_static_content_directory(self):
+        files = {'file1.txt': 'a' * 10, 'image.png': 'b' * 100, 'big.txt': 'c' * 3 * 1024 * 1024}
+        for filename, data in files.items():
+            (self.course_data_path / 'static' / filename).write_bytes(data)
+
+        remap_dict = self.static_content_importer.import_static_content_directory('static')
+        self.static_content_importer.finish_uploads()
+
+        self.assertEqual(sorted(remap_dict), sorted(files))
+        self.assertEqual(self.saved, {'file1.txt': files['file1.txt'], 'image.png': files['image.png'],
+                                      'big.txt': files['big.txt']})
+        # Only images get thumbnails, built from the file on disk.
+        self.mocked_content_store.generate_thumbnail.assert_called_once_with(
+            mock.ANY, tempfile_path=self.course_data_path / 'static' / 'image.png'
+        )
+
+    def test_upload_errors(self):
+        self.static_content_importer.upload_static_file(
+            self.course_data_path / 'static' / 'missing.txt', base_dir=self.course_data_path / 'static'
+        )
+        with self.assertRaises(IOError):
+            self.static_content_importer.finish_uploads()
@@ -13,10 +13,10 @@ from xmodule.assetstore import AssetMetadata
 from xmodule.modulestore import EdxJSONEncoder, ModuleStoreEnum
 from xmodule.modulestore.inheritance import own_metadata
 from xmodule.modulestore.store_utilities import draft_node_constructor, get_draft_subtree_roots
+from xmodule.modulestore.tar_stream_fs import TarStreamFS
 from xmodule.modulestore import LIBRARY_ROOT
 from fs.osfs import OSFS
 from json import dumps
-import os
 
 from xmodule.modulestore.draft_and_published import DIRECT_ONLY_CATEGORIES
 from opaque_keys.edx.locator import CourseLocator, LibraryLocator
@@ -26,6 +26,12 @@ PUBLISHED_DIR = "published"
 
 DEFAULT_CONTENT_FIELDS = ['metadata', 'data']
 
+# The phases of an export, as reported to an ExportManager's progress callback.
+EXPORT_PHASE_BLOCKS = u'Exporting blocks'
+EXPORT_PHASE_ASSETS = u'Exporting assets'
+EXPORT_PHASE_EXTRA_CONTENT = u'Exporting extra content'
+EXPORT_PHASE_DRAFTS = u'Exporting drafts'
+
 
 def _export_drafts(modulestore, course_key, export_fs, xml_centric_course_key):
     """
@@ -105,7 +111,8 @@ class ExportManager(object):
     """
     Manages XML exporting for courselike objects.
     """
-    def __init__(self, modulestore, contentstore, courselike_key, root_dir, target_dir):
+    def __init__(self, modulestore, contentstore, courselike_key, root_dir, target_dir,
+                 root_fs=None, progress_callback=None):
         """
         Export all modules from `modulestore` and content from `contentstore` as xml to `root_dir`.
 
@@ -114,12 +121,17 @@ class ExportManager(object):
         `courselike_key`: The Locator of the Descriptor to export
         `root_dir`: The directory to write the exported xml to
         `target_dir`: The name of the directory inside `root_dir` to write the content to
+        `root_fs`: The filesystem to write the exported xml to instead of `root_dir`, if given
+            (for instance a `TarStreamFS`, to write the export straight into an archive)
+        `progress_callback`: A function called with the name of each phase of the export as it starts
         """
         self.modulestore = modulestore
         self.contentstore = contentstore
         self.courselike_key = courselike_key
         self.root_dir = root_dir
         self.target_dir = text_type(target_dir)
+        self.root_fs = root_fs
+        self.progress_callback = progress_callback
 
     @abstractmethod
     def get_key(self):
@@ -149,16 +161,24 @@ class ExportManager(object):
         Get the target courselike object for this export.
         """
 
+    def report_progress(self, phase):
+        """
+        Report the start of a phase of the export to the progress callback, if any.
+        """
+        if self.progress_callback is not None:
+            self.progress_callback(phase)
+
     def export(self):
         """
         Perform the export given the parameters handed to this class at init.
         """
         with self.modulestore.bulk_operations(self.courselike_key):
 
-            fsm = OSFS(self.root_dir)
+            fsm = self.root_fs if self.root_fs is not None else OSFS(self.root_dir)
             root = lxml.etree.Element('unknown')
 
             # export only the published content
+            self.report_progress(EXPORT_PHASE_BLOCKS)
             with self.modulestore.branch_setting(ModuleStoreEnum.Branch.published_only, self.courselike_key):
                 courselike = self.get_courselike()
                 export_fs = courselike.runtime.export_fs = fsm.makedir(self.target_dir, recreate=True)
@@ -172,7 +192,7 @@ class ExportManager(object):
             self.process_root(root, export_fs)
 
             # Process extra items-- drafts, assets, etc
-            root_courselike_dir = self.root_dir + '/' + self.target_dir
+            root_courselike_dir = self.root_dir + '/' + self.target_dir if self.root_dir is not None else None
             self.process_extra(root, courselike, root_courselike_dir, xml_centric_courselike_key, export_fs)
 
             # Any last pass adjustments
@@ -202,26 +222,22 @@ class CourseExportManager(ExportManager):
 
     def process_extra(self, root, courselike, root_courselike_dir, xml_centric_courselike_key, export_fs):
         # Export the modulestore's asset metadata.
-        asset_dir = root_courselike_dir + '/' + AssetMetadata.EXPORTED_ASSET_DIR + '/'
-        if not os.path.isdir(asset_dir):
-            os.makedirs(asset_dir)
+        self.report_progress(EXPORT_PHASE_ASSETS)
+        asset_dir = export_fs.makedir(AssetMetadata.EXPORTED_ASSET_DIR, recreate=True)
         asset_root = lxml.etree.Element(AssetMetadata.ALL_ASSETS_XML_TAG)
         course_assets = self.modulestore.get_all_asset_metadata(self.courselike_key, None)
         for asset_md in course_assets:
             # All asset types are exported using the "asset" tag - but their asset type is specified in each asset key.
             asset = lxml.etree.SubElement(asset_root, AssetMetadata.ASSET_XML_TAG)
             asset_md.to_xml(asset)
-        with OSFS(asset_dir).open(AssetMetadata.EXPORTED_ASSET_FILENAME, 'wb') as asset_xml_file:
+        with asset_dir.open(AssetMetadata.EXPORTED_ASSET_FILENAME, 'wb') as asset_xml_file:
             lxml.etree.ElementTree(asset_root).write(asset_xml_file, encoding='utf-8')
 
         # export the static assets
         policies_dir = export_fs.makedir('policies', recreate=True)
         if self.contentstore:
-            self.contentstore.export_all_for_course(
-                self.courselike_key,
-                root_courselike_dir + '/static/',
-                root_courselike_dir + '/policies/assets.json',
-            )
+            static_dir = export_fs.makedir('static', recreate=True)
+            self.contentstore.export_all_for_course_to_fs(self.courselike_key, static_dir, policies_dir)
 
             # If we are using the default course image, export it to the
             # legacy location to support backwards compatibility.
@@ -236,13 +252,12 @@ class CourseExportManager(ExportManager):
                 except NotFoundError:
                     pass
                 else:
-                    output_dir = root_courselike_dir + '/static/images/'
-                    if not os.path.isdir(output_dir):
-                        os.makedirs(output_dir)
-                    with OSFS(output_dir).open(u'course_image.jpg', 'wb') as course_image_file:
+                    output_dir = static_dir.makedir(u'images', recreate=True)
+                    with output_dir.open(u'course_image.jpg', 'wb') as course_image_file:
                         course_image_file.write(course_image.data)
 
         # export the static tabs
+        self.report_progress(EXPORT_PHASE_EXTRA_CONTENT)
         export_extra_content(
             export_fs, self.modulestore, self.courselike_key, xml_centric_courselike_key,
             'static_tab', 'tabs', '.html'
@@ -283,6 +298,7 @@ class CourseExportManager(ExportManager):
             policy = {'course/' + courselike.location.block_id: own_metadata(courselike)}
             course_policy.write(dumps(policy, cls=EdxJSONEncoder, sort_keys=True, indent=4).encode('utf-8'))
 
+        self.report_progress(EXPORT_PHASE_DRAFTS)
         _export_drafts(self.modulestore, self.courselike_key, export_fs, xml_centric_courselike_key)
 
 
@@ -317,14 +333,12 @@ class LibraryExportManager(ExportManager):
         to ease in duck typing during import. This may be expanded as a useful feature eventually.
         """
         # export the static assets
-        export_fs.makedir('policies', recreate=True)
+        policies_dir = export_fs.makedir('policies', recreate=True)
 
         if self.contentstore:
-            self.contentstore.export_all_for_course(
-                self.courselike_key,
-                self.root_dir + '/' + self.target_dir + '/static/',
-                self.root_dir + '/' + self.target_dir + '/policies/assets.json',
-            )
+            self.report_progress(EXPORT_PHASE_ASSETS)
+            static_dir = export_fs.makedir('static', recreate=True)
+            self.contentstore.export_all_for_course_to_fs(self.courselike_key, static_dir, policies_dir)
 
     def post_process(self, root, export_fs):
         """
@@ -353,6 +367,30 @@ def export_library_to_xml(modulestore, contentstore, library_key, root_dir, libr
     LibraryExportManager(modulestore, contentstore, library_key, root_dir, library_dir).export()
 
 
+def export_courselike_to_tarball(modulestore, contentstore, courselike_key, fileobj, target_dir,
+                                 progress_callback=None):
+    """
+    Export a course or library as a .tar.gz archive written to the file object `fileobj`,
+    with its content under `target_dir`.
+
+    The archive is written as the export goes, without staging the export on a local disk.
+    See ExportManager for details.
+    """
+    if isinstance(courselike_key, LibraryLocator):
+        manager_class = LibraryExportManager
+    else:
+        manager_class = CourseExportManager
+
+    tar_fs = TarStreamFS(fileobj)
+    try:
+        manager_class(
+            modulestore, contentstore, courselike_key, None, target_dir,
+            root_fs=tar_fs, progress_callback=progress_callback,
+        ).export()
+    finally:
+        tar_fs.close()
+
+
 def adapt_references(subtree, destination_course_key, export_fs):
     """
     Map every reference in the subtree into destination_course_key and set it back into the xblock fields
@@ -26,6 +26,7 @@ import mimetypes
 import os
 import re
 from abc import abstractmethod
+from multiprocessing.pool import ThreadPool
 
 import xblock
 from lxml import etree
@@ -57,6 +58,9 @@ log = logging.getLogger(__name__)
 
 DEFAULT_STATIC_CONTENT_SUBDIR = 'static'
 
+# The size of the chunks static files are read and uploaded in, when uploaded concurrently.
+STATIC_CONTENT_CHUNK_SIZE = 1024 * 1024
+
 
 class LocationMixin(XBlockMixin):
     """
@@ -80,7 +84,16 @@ class LocationMixin(XBlockMixin):
 
 
 class StaticContentImporter:
-    def __init__(self, static_content_store, course_data_path, target_id):
+    """
+    Imports the static files of a courselike into the static content store.
+
+    By default, each file is read into memory and saved in turn.  With
+    `upload_workers`, files are instead uploaded in the background by that
+    many threads, which stream each file from disk in chunks, while the
+    thumbnails of images are built by `thumbnail_workers` threads; call
+    `finish_uploads` to wait for the uploads to complete.
+    """
+    def __init__(self, static_content_store, course_data_path, target_id, upload_workers=0, thumbnail_workers=1):
         self.static_content_store = static_content_store
         self.target_id = target_id
         self.course_data_path = course_data_path
@@ -96,6 +109,14 @@ class StaticContentImporter:
         mimetypes.add_type('application/octet-stream', '.srt')
         self.mimetypes_list = mimetypes.types_map.values()
 
+        self.upload_pool = self.thumbnail_pool = None
+        self.pending_uploads = []
+        if upload_workers:
+            self.upload_pool = ThreadPool(upload_workers)
+            # PIL releases the GIL while it decodes and resizes images, so
+            # thumbnails are built concurrently by threads too.
+            self.thumbnail_pool = ThreadPool(max(thumbnail_workers, 1))
+
     def import_static_content_directory(self, content_subdir=DEFAULT_STATIC_CONTENT_SUBDIR, verbose=False):
         remap_dict = {}
 
@@ -113,7 +134,10 @@ class StaticContentImporter:
                 if verbose:
                     log.debug('importing static content %s...', file_path)
 
-                imported_file_attrs = self.import_static_file(file_path, base_dir=static_dir)
+                if self.upload_pool is not None:
+                    imported_file_attrs = self.upload_static_file(file_path, base_dir=static_dir)
+                else:
+                    imported_file_attrs = self.import_static_file(file_path, base_dir=static_dir)
 
                 if imported_file_attrs:
                     # store the remapping information which will be needed
@@ -135,12 +159,74 @@ class StaticContentImporter:
             # Not a 'hidden file', then re-raise exception
             raise
 
+        file_subpath, asset_key = self._file_location(full_file_path, base_dir)
+        content = self._static_content(full_file_path, file_subpath, asset_key, data)
+
+        # first let's save a thumbnail so we can get back a thumbnail location
+        self._save_thumbnail(content)
+
+        # then commit the content
+        self._save_content(content, file_subpath)
+
+        return file_subpath, asset_key
+
+    def upload_static_file(self, full_file_path, base_dir):
+        """
+        Like `import_static_file`, but uploads the file in the background.
+        """
+        filename = os.path.basename(full_file_path)
+        if filename.startswith('._') and not os.access(full_file_path, os.R_OK):
+            return None
+
+        file_subpath, asset_key = self._file_location(full_file_path, base_dir)
+        self.pending_uploads.append(self.upload_pool.apply_async(
+            self._upload_static_file, (full_file_path, file_subpath, asset_key)
+        ))
+        return file_subpath, asset_key
+
+    def finish_uploads(self, raise_errors=True):
+        """
+        Wait for the files uploaded in the background to be saved, and stop
+        the upload threads.  Raises the first error reading a file, unless
+        `raise_errors` is False.
+        """
+        if self.upload_pool is None:
+            return
+        self.upload_pool.close()
+        self.upload_pool.join()
+        self.thumbnail_pool.close()
+        self.thumbnail_pool.join()
+        pending_uploads, self.pending_uploads = self.pending_uploads, []
+        if raise_errors:
+            for upload in pending_uploads:
+                upload.get()
+
+    def _upload_static_file(self, full_file_path, file_subpath, asset_key):
+        """
+        Upload a static file, streaming its contents from disk.
+        """
+        with open(full_file_path, 'rb') as f:
+            chunks = iter(lambda: f.read(STATIC_CONTENT_CHUNK_SIZE), b'')
+            content = self._static_content(full_file_path, file_subpath, asset_key, chunks)
+            if content.content_type is not None and content.content_type.split('/')[0] == 'image':
+                self.thumbnail_pool.apply(self._save_thumbnail, (content, full_file_path))
+            self._save_content(content, file_subpath)
+
+    def _file_location(self, full_file_path, base_dir):
+        """
+        Returns the path of the file relative to `base_dir`, and its asset key.
+        """
         # strip away leading path from the name
         file_subpath = full_file_path.replace(base_dir, '')
         if file_subpath.startswith('/'):
             file_subpath = file_subpath[1:]
-        asset_key = StaticContent.compute_location(self.target_id, file_subpath)
+        return file_subpath, StaticContent.compute_location(self.target_id, file_subpath)
 
+    def _static_content(self, full_file_path, file_subpath, asset_key, data):
+        """
+        Returns the StaticContent of a file, with its policy applied.
+        """
+        filename = os.path.basename(full_file_path)
         policy_ele = self.policy.get(asset_key.path, {})
 
         # During export display name is used to create files, strip away slashes from name
@@ -154,18 +240,26 @@ class StaticContentImporter:
         # Check extracted contentType in list of all valid mimetypes
         if not mime_type or mime_type not in self.mimetypes_list:
             mime_type = mimetypes.guess_type(filename)[0]  # Assign guessed mimetype
-        content = StaticContent(
+        return StaticContent(
             asset_key, displayname, mime_type, data,
             import_path=file_subpath, locked=locked
         )
 
-        # first let's save a thumbnail so we can get back a thumbnail location
-        thumbnail_content, thumbnail_location = self.static_content_store.generate_thumbnail(content)
+    def _save_thumbnail(self, content, tempfile_path=None):
+        """
+        Save the thumbnail of the content, if it has one, and note its location.
+        """
+        thumbnail_content, thumbnail_location = self.static_content_store.generate_thumbnail(
+            content, tempfile_path=tempfile_path
+        )
 
         if thumbnail_content is not None:
             content.thumbnail_location = thumbnail_location
 
-        # then commit the content
+    def _save_content(self, content, file_subpath):
+        """
+        Save the content, logging rather than raising errors.
+        """
         try:
             self.static_content_store.save(content)
         except Exception as err:
@@ -173,8 +267,6 @@ class StaticContentImporter:
                 file_subpath, err
             ))
 
-        return file_subpath, asset_key
-
 
 class ImportManager(object):
     """
@@ -217,6 +309,12 @@ class ImportManager(object):
         python_lib_filename: The filename of the courselike's python library. Course authors can optionally
             create this file to implement custom logic in their course.
 
+        static_upload_workers: If more than 0, the number of threads that upload the static files in the
+            background, streaming them from disk, while the courselike's blocks are imported.
+
+        thumbnail_workers: The number of threads that build the thumbnails of images uploaded in the
+            background.
+
         default_class, load_error_modules: are arguments for constructing the XMLModuleStore (see its doc)
     """
     store_class = XMLModuleStore
@@ -230,6 +328,7 @@ class ImportManager(object):
             create_if_not_present=False, raise_on_failure=False,
             static_content_subdir=DEFAULT_STATIC_CONTENT_SUBDIR,
             python_lib_filename='python_lib.zip',
+            static_upload_workers=0, thumbnail_workers=1,
     ):
         self.store = store
         self.user_id = user_id
@@ -245,6 +344,8 @@ class ImportManager(object):
         self.do_import_python_lib = do_import_python_lib
         self.create_if_not_present = create_if_not_present
         self.raise_on_failure = raise_on_failure
+        self.static_upload_workers = static_upload_workers
+        self.thumbnail_workers = thumbnail_workers
         self.xml_module_store = self.store_class(
             data_dir,
             default_class=default_class,
@@ -268,15 +369,19 @@ class ImportManager(object):
     def import_static(self, data_path, dest_id):
         """
         Import all static items into the content store.
+
+        Returns the StaticContentImporter, whose uploads may still be running.
         """
         if self.static_content_store is None:
             log.warning("Static content store is None. Skipping static content import...")
-            return
+            return None
 
         static_content_importer = StaticContentImporter(
             self.static_content_store,
             course_data_path=data_path,
-            target_id=dest_id
+            target_id=dest_id,
+            upload_workers=self.static_upload_workers,
+            thumbnail_workers=self.thumbnail_workers,
         )
         if self.do_import_static:
             if self.verbose:
@@ -315,6 +420,8 @@ class ImportManager(object):
                 content_subdir=simport, verbose=self.verbose
             )
 
+        return static_content_importer
+
     def import_asset_metadata(self, data_dir, course_id):
         """
         Read in assets XML file, parse it, and add all asset metadata to the modulestore.
@@ -495,28 +602,38 @@ class ImportManager(object):
             except DuplicateCourseError:
                 continue
 
-            # This bulk operation wraps all the operations to populate the published branch.
-            with self.store.bulk_operations(dest_id):
-                # Retrieve the course itself.
-                source_courselike, courselike, data_path = self.get_courselike(courselike_key, runtime, dest_id)
-
-                # Import all static pieces.
-                self.import_static(data_path, dest_id)
-
-                # Import asset metadata stored in XML.
-                self.import_asset_metadata(data_path, dest_id)
-
-                # Import all children
-                self.import_children(source_courselike, courselike, courselike_key, dest_id)
+            static_content_importer = None
+            try:
+                # This bulk operation wraps all the operations to populate the published branch.
+                with self.store.bulk_operations(dest_id):
+                    # Retrieve the course itself.
+                    source_courselike, courselike, data_path = self.get_courselike(courselike_key, runtime, dest_id)
+
+                    # Import all static pieces.  Static files uploaded in the
+                    # background are uploaded while the blocks are imported.
+                    static_content_importer = self.import_static(data_path, dest_id)
+
+                    # Import asset metadata stored in XML.
+                    self.import_asset_metadata(data_path, dest_id)
+
+                    # Import all children
+                    self.import_children(source_courselike, courselike, courselike_key, dest_id)
+
+                # This bulk operation wraps all the operations to populate the draft branch with any items
+                # from the /drafts subdirectory.
+                # Drafts must be imported in a separate bulk operation from published items to import properly,
+                # due to the recursive_build() above creating a draft item for each course block
+                # and then publishing it.
+                with self.store.bulk_operations(dest_id):
+                    # Import all draft items into the courselike.
+                    courselike = self.import_drafts(courselike, courselike_key, data_path, dest_id)
+            except Exception:
+                if static_content_importer is not None:
+                    static_content_importer.finish_uploads(raise_errors=False)
+                raise
 
-            # This bulk operation wraps all the operations to populate the draft branch with any items
-            # from the /drafts subdirectory.
-            # Drafts must be imported in a separate bulk operation from published items to import properly,
-            # due to the recursive_build() above creating a draft item for each course block
-            # and then publishing it.
-            with self.store.bulk_operations(dest_id):
-                # Import all draft items into the courselike.
-                courselike = self.import_drafts(courselike, courselike_key, data_path, dest_id)
+            if static_content_importer is not None:
+                static_content_importer.finish_uploads()
 
             yield courselike
 
@@ -87,6 +87,27 @@ class FakeGridFsItem(object):
         return chunk
 
 
+class FakeGridOut(FakeGridFsItem):
+    """
+    A GridFS item that can also be read a GridFS chunk at a time, like a GridOut
+    """
+    def __init__(self, string_data, chunk_size):
+        super(FakeGridOut, self).__init__(string_data)
+        self.chunk_size = chunk_size
+        self.chunks_read = 0
+
+    def readchunk(self):
+        """
+        Read the rest of the chunk that the cursor is in and move the cursor
+        """
+        chunk_end = (self.cursor // self.chunk_size + 1) * self.chunk_size
+        chunk = self.data[self.cursor:chunk_end]
+        self.cursor = min(chunk_end, self.length)
+        if chunk:
+            self.chunks_read += 1
+        return chunk
+
+
 class MockImage(Mock):
     """
     This class pretends to be PIL.Image for purposes of thumbnails testing.
@@ -216,6 +237,21 @@ class ContentTest(unittest.TestCase):
 
         self.assertEqual(total_length, last_byte - first_byte + 1)
 
+    def test_static_content_stream_stream_data_in_range_chunks(self):
+        """
+        Test that StaticContentStream stream_data_in_range reads GridFS files a
+        GridFS chunk at a time, from the chunk that first_byte is in
+        """
+        item = FakeGridOut(SAMPLE_STRING, chunk_size=256)
+        static_content_stream = StaticContentStream('loc', 'name', 'type', item, length=item.length)
+
+        data = ''.join(static_content_stream.stream_data_in_range(300, 700))
+        self.assertEqual(data, SAMPLE_STRING[300:701])
+        self.assertEqual(item.chunks_read, 2)
+
+        item.seek(0)
+        self.assertEqual(''.join(static_content_stream.stream_data()), SAMPLE_STRING)
+
     def test_static_content_write_js(self):
         """
         Test that only one filename starts with 000.
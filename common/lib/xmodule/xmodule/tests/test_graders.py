@@ -2,6 +2,7 @@
 Grading tests
 """
 
+import random
 import unittest
 from datetime import datetime, timedelta
 
@@ -303,6 +304,53 @@ class GraderTest(unittest.TestCase):
         self.assertAlmostEqual(graded['percent'], 0.11)
         self.assertEqual(len(graded['section_breakdown']), 12 + 1)
 
+    def test_grade_cohort(self):
+        homework_grader = graders.AssignmentFormatGrader("Homework", 12, 2)
+        lab_grader = graders.AssignmentFormatGrader("Lab", 7, 3)
+        midterm_grader = graders.AssignmentFormatGrader("Midterm", 1, 0)
+        weighted_grader = graders.WeightedSubsectionsGrader([
+            (homework_grader, homework_grader.category, 0.25),
+            (lab_grader, lab_grader.category, 0.25),
+            (midterm_grader, midterm_grader.category, 0.5),
+        ])
+        grade_sheets = [self.empty_gradesheet, self.incomplete_gradesheet, self.test_gradesheet]
+
+        # Each learner's percents are in the order of its grade sheet,
+        # padded with NaN up to the number of columns.
+        percents_by_type = {}
+        for section_type in ('Homework', 'Lab', 'Midterm'):
+            rows = [
+                [grade.percent_graded for grade in grade_sheet.get(section_type, {}).values()]
+                for grade_sheet in grade_sheets
+            ]
+            num_columns = max(len(row) for row in rows)
+            percents_by_type[section_type] = [row + [float('nan')] * (num_columns - len(row)) for row in rows]
+
+        for grader in (homework_grader, lab_grader, midterm_grader, weighted_grader):
+            self.assertEqual(
+                list(grader.grade_cohort(percents_by_type, len(grade_sheets))),
+                [grader.grade(grade_sheet)['percent'] for grade_sheet in grade_sheets],
+            )
+        self.assertEqual(list(weighted_grader.grade_cohort({}, 2)), [0.0, 0.0])
+
+    @ddt.data(0, 1, 3, 6)
+    def test_total_with_drops_cohort(self, drop_count):
+        grader = graders.AssignmentFormatGrader("Homework", 4, drop_count)
+        rng = random.Random(drop_count)
+        # Few distinct percents, so that there are ties among the dropped scores.
+        breakdowns = [
+            [{'percent': rng.choice([0.0, 0.25, 0.5, 0.33, 1.0])} for _ in range(rng.randint(0, 5))]
+            for _ in range(20)
+        ]
+        percents = [
+            [mark['percent'] for mark in breakdown] + [float('nan')] * (5 - len(breakdown))
+            for breakdown in breakdowns
+        ]
+        self.assertEqual(
+            list(grader.total_with_drops_cohort(percents)),
+            [grader.total_with_drops(breakdown)[0] for breakdown in breakdowns],
+        )
+
     @ddt.data(
         (
             # empty
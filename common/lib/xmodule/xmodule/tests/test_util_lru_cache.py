@@ -0,0 +1,54 @@
+"""
+Tests for the LRU cache utility.
+"""
+
+import unittest
+
+from ..util.lru_cache import LRUCache
+
+
+class LRUCacheTest(unittest.TestCase):
+    """
+    Test the LRU cache
+    """
+    def test_max_entries(self):
+        cache = LRUCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.set('c', 3), 1)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual((cache.hits, cache.misses, cache.evictions), (3, 1, 1))
+
+    def test_max_size(self):
+        cache = LRUCache(max_size=30)
+        cache.set('a', 1, 10)
+        cache.set('b', 2, 10)
+        cache.set('a', 3, 15)
+        self.assertEqual(cache.size, 25)
+        self.assertEqual(cache.set('c', 4, 10), 1)
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.get('a'), 3)
+        self.assertEqual(cache.size, 25)
+
+    def test_items_too_large_are_not_cached(self):
+        cache = LRUCache(max_entries=0)
+        self.assertEqual(cache.set('a', 1), 0)
+        self.assertEqual(len(cache), 0)
+
+        cache = LRUCache(max_size=10)
+        cache.set('a', 1, 5)
+        self.assertEqual(cache.set('b', 2, 11), 0)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertNotIn('b', cache)
+
+    def test_clear(self):
+        cache = LRUCache(max_entries=2)
+        cache.set('a', 1, 10)
+        cache.get('a')
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual((cache.size, cache.hits, cache.misses, cache.evictions), (0, 0, 0, 0))
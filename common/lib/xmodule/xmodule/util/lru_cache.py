@@ -0,0 +1,88 @@
+"""
+A thread-safe, in-process LRU cache.
+"""
+import threading
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    A thread-safe dictionary of at most `max_entries` items, whose sizes total
+    at most `max_size`, which evicts its least recently used items to make
+    room for new ones.
+
+    Either limit may be None, for no limit.  An item that would not fit in
+    the cache even if it were empty is not cached, so that one large item
+    never flushes out all the others.
+    """
+    def __init__(self, max_entries=None, max_size=None):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        """
+        Return the value for the key, or `default`, and mark it as recently used.
+        """
+        with self._lock:
+            item = self._items.pop(key, None)
+            if item is None:
+                self.misses += 1
+                return default
+            self._items[key] = item
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value, size=0):
+        """
+        Set the value, of the given size, for the key, evicting the least
+        recently used items as needed, and return how many were evicted.
+        """
+        if not self._fits(1, size):
+            return 0
+
+        evicted = 0
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            while self._items and not self._fits(len(self._items) + 1, self.size + size):
+                __, (__, evicted_size) = self._items.popitem(last=False)
+                self.size -= evicted_size
+                evicted += 1
+            self._items[key] = (value, size)
+            self.size += size
+            self.evictions += evicted
+        return evicted
+
+    def clear(self):
+        """
+        Remove all the items, and reset the counters.
+        """
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def _fits(self, num_items, size):
+        """
+        Return whether the given number of items, of the given total size,
+        fit in the cache.
+        """
+        return (
+            (self.max_entries is None or num_items <= self.max_entries) and
+            (self.max_size is None or size <= self.max_size)
+        )
@@ -26,6 +26,7 @@ class ContentLibraryTransformer(FilteringTransformerMixin, BlockStructureTransfo
     """
     WRITE_VERSION = 1
     READ_VERSION = 1
+    SUPPORTS_INCREMENTAL_COLLECT = True
 
     @classmethod
     def name(cls):
@@ -64,6 +65,9 @@ class ContentLibraryTransformer(FilteringTransformerMixin, BlockStructureTransfo
         ):
             xblock = block_structure.get_xblock(block_key)
             for child_key in xblock.children:
+                if child_key not in block_structure:
+                    # An unchanged child of a partial block structure.
+                    continue
                 summary = summarize_block(child_key)
                 block_structure.set_transformer_block_field(child_key, cls, 'block_analytics_summary', summary)
 
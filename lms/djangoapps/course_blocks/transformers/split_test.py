@@ -24,6 +24,7 @@ class SplitTestTransformer(FilteringTransformerMixin, BlockStructureTransformer)
     """
     WRITE_VERSION = 1
     READ_VERSION = 1
+    SUPPORTS_INCREMENTAL_COLLECT = True
 
     @classmethod
     def name(cls):
@@ -68,6 +69,10 @@ class SplitTestTransformer(FilteringTransformerMixin, BlockStructureTransformer)
             # Set group access for each child using its group_access
             # field so the user partitions transformer enforces it.
             for child_location in xblock.children:
+                if child_location not in block_structure:
+                    # An unchanged child of a partial block structure,
+                    # whose group access was collected before.
+                    continue
                 child = block_structure.get_xblock(child_location)
                 group = child_to_group.get(child_location, None)
                 child.group_access[partition_for_this_block.id] = [group] if group is not None else []
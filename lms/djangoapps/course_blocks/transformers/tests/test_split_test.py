@@ -5,12 +5,15 @@ import ddt
 from nose.plugins.attrib import attr
 
 import openedx.core.djangoapps.user_api.course_tag.api as course_tag_api
+from openedx.core.djangoapps.content.block_structure.factory import BlockStructureFactory
 from openedx.core.djangoapps.user_api.partition_schemes import RandomUserPartitionScheme
 from student.tests.factories import CourseEnrollmentFactory
+from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.factories import check_mongo_calls
 from xmodule.partitions.partitions import Group, UserPartition
 
 from ...api import get_course_blocks
+from ..split_test import SplitTestTransformer
 from ..user_partitions import UserPartitionTransformer, _get_user_partition_groups
 from .helpers import CourseStructureTestCase, create_location
 
@@ -224,3 +227,21 @@ class SplitTestTransformerTestCase(CourseStructureTestCase):
             set(block_structure1.get_block_keys()),
             set(block_structure2.get_block_keys()),
         )
+
+    def test_collect_partial_block_structure(self):
+        # Only the subtree of J, under the split_test BSplit, is in the
+        # partial block structure, along with its ancestors F, BSplit and
+        # the course; BSplit's other children E and G are not.
+        full_block_structure = BlockStructureFactory.create_from_modulestore(self.course.location, modulestore())
+        partial_block_structure = BlockStructureFactory.create_from_modulestore_subtrees(
+            self.course.location,
+            modulestore(),
+            [self.blocks['J'].location],
+            full_block_structure.get_parents,
+        )
+        self.assertNotIn(self.blocks['E'].location, partial_block_structure)
+
+        SplitTestTransformer.collect(partial_block_structure)
+
+        group_access = partial_block_structure.get_xblock(self.blocks['F'].location).group_access
+        self.assertEqual(group_access[self.TEST_PARTITION_ID], [1])
@@ -23,6 +23,7 @@ class UserPartitionTransformer(FilteringTransformerMixin, BlockStructureTransfor
     """
     WRITE_VERSION = 1
     READ_VERSION = 1
+    SUPPORTS_INCREMENTAL_COLLECT = True
 
     @classmethod
     def name(cls):
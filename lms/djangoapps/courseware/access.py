@@ -9,10 +9,18 @@ Note: The access control logic in this file does NOT check for enrollment in
 
   If enrollment is to be checked, use get_course_with_access in courseware.courses.
   It is a wrapper around has_access that additionally checks for enrollment.
+
+Access decisions for blocks, and the user's roles and partition groups that they
+depend on, are cached for the rest of the request.  Use has_access_many to check
+access to a list of blocks outside of a request.
 """
 import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
 
+import crum
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from pytz import UTC
@@ -34,12 +42,13 @@ from courseware.access_utils import (
     in_preview_mode,
     check_course_open_for_learner,
 )
-from courseware.masquerade import get_masquerade_role, is_masquerading_as_student
+from courseware.masquerade import get_course_masquerade, get_masquerade_role, is_masquerading_as_student
 from lms.djangoapps.ccx.custom_exception import CCXLocatorValidationException
 from lms.djangoapps.ccx.models import CustomCourseForEdX
 from mobile_api.models import IgnoreMobileAvailableFlagConfig
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 from openedx.core.djangoapps.external_auth.models import ExternalAuthMap
+from openedx.core.djangoapps.request_cache import clear_cache, get_cache
 from student import auth
 from student.models import CourseEnrollmentAllowed
 from student.roles import (
@@ -65,6 +74,19 @@ from xmodule.x_module import XModule
 
 log = logging.getLogger(__name__)
 
+# The name of the request cache of access decisions.
+ACCESS_CACHE_NAMESPACE = u'courseware.access'
+
+
+class _AccessCacheScopes(threading.local):
+    """
+    The number of calls of has_access_many in progress on this thread.
+    """
+    depth = 0
+
+
+_ACCESS_CACHE_SCOPES = _AccessCacheScopes()
+
 
 def has_ccx_coach_role(user, course_key):
     """
@@ -143,14 +165,14 @@ def has_access(user, action, obj, course_key=None):
         return _has_access_course(user, action, obj)
 
     if isinstance(obj, ErrorDescriptor):
-        return _has_access_error_desc(user, action, obj, course_key)
+        return _has_cached_access_to_block(_has_access_error_desc, user, action, obj, course_key)
 
     if isinstance(obj, XModule):
         return _has_access_xmodule(user, action, obj, course_key)
 
     # NOTE: any descriptor access checkers need to go above this
     if isinstance(obj, XBlock):
-        return _has_access_descriptor(user, action, obj, course_key)
+        return _has_cached_access_to_block(_has_access_descriptor, user, action, obj, course_key)
 
     if isinstance(obj, CourseKey):
         return _has_access_course_key(user, action, obj)
@@ -167,6 +189,25 @@ def has_access(user, action, obj, course_key=None):
                     .format(type(obj)))
 
 
+def has_access_many(user, action, blocks, course_key=None):
+    """
+    Check whether a user has the access to do action on each of a list of blocks, as
+    has_access does, looking up the user's roles, masquerade and partition groups only
+    once for the whole list, even outside of a request.
+
+    Returns an OrderedDict of the AccessResponse for each block, keyed by its location.
+    """
+    # Just in case user is passed in as None, make them anonymous
+    if not user:
+        user = AnonymousUser()
+
+    with _access_cache_scope():
+        return OrderedDict(
+            (block.location, has_access(user, action, block, course_key))
+            for block in blocks
+        )
+
+
 def has_staff_access_to_preview_mode(user, course_key):
     """
     Checks if given user can access course in preview mode.
@@ -405,7 +446,9 @@ def _has_group_access(descriptor, user, course_key):
     sufficient group memberships to "load" a block (the `descriptor`)
     """
     # Allow staff and instructors roles group access, as they are not masquerading as a student.
-    if get_user_role(user, course_key) in ['staff', 'instructor']:
+    user_key = _access_cache_user_key(user, course_key)
+    user_role = _cached_access(('role', user_key, course_key), lambda: get_user_role(user, course_key))
+    if user_role in ['staff', 'instructor']:
         return ACCESS_GRANTED
 
     # use merged_group_access which takes group access on the block's
@@ -455,10 +498,9 @@ def _has_group_access(descriptor, user, course_key):
     # look up the user's group for each partition
     user_groups = {}
     for partition, groups in partition_groups:
-        user_groups[partition.id] = partition.scheme.get_group_for_user(
-            course_key,
-            user,
-            partition,
+        user_groups[partition.id] = _cached_access(
+            ('group', user_key, course_key, partition.id),
+            lambda partition=partition: partition.scheme.get_group_for_user(course_key, user, partition),
         )
 
     # finally: check that the user has a satisfactory group assignment
@@ -604,6 +646,64 @@ def _has_access_string(user, action, perm):
 
 #####  Internal helper methods below
 
+@contextmanager
+def _access_cache_scope():
+    """
+    A context manager within which access decisions are cached, even outside of a
+    request.  The decisions are cleared at the end unless there is a request, whose
+    end clears them instead.
+    """
+    _ACCESS_CACHE_SCOPES.depth += 1
+    try:
+        yield
+    finally:
+        _ACCESS_CACHE_SCOPES.depth -= 1
+        if not _ACCESS_CACHE_SCOPES.depth and crum.get_current_request() is None:
+            clear_cache(ACCESS_CACHE_NAMESPACE)
+
+
+def _cached_access(key, check):
+    """
+    Returns the result of calling check, cached under the given key for the rest of the
+    request or call of has_access_many, if there is one.
+    """
+    if crum.get_current_request() is None and not _ACCESS_CACHE_SCOPES.depth:
+        return check()
+
+    access_cache = get_cache(ACCESS_CACHE_NAMESPACE)
+    if key not in access_cache:
+        access_cache[key] = check()
+    return access_cache[key]
+
+
+def _access_cache_user_key(user, course_key):
+    """
+    Returns the part of access cache keys that identifies the user, including any masquerade
+    they have set up in the course, so that decisions are not reused when it changes.
+    """
+    course_masquerade = get_course_masquerade(user, course_key)
+    if course_masquerade is None:
+        return user.id, None
+    return user.id, (
+        course_masquerade.role,
+        course_masquerade.user_partition_id,
+        course_masquerade.group_id,
+        course_masquerade.user_name,
+    )
+
+
+def _has_cached_access_to_block(checker, user, action, block, course_key):
+    """
+    Returns checker(user, action, block, course_key), caching the decision by the user,
+    action, block and course.
+    """
+    user_key = _access_cache_user_key(user, course_key or block.location.course_key)
+    return _cached_access(
+        ('block', user_key, action, block.location, course_key),
+        lambda: checker(user, action, block, course_key),
+    )
+
+
 def _dispatch(table, action, user, obj):
     """
     Helper: call table[action], raising a nice pretty error if there is no such key.
@@ -671,6 +771,18 @@ def _has_access_to_course(user, access_level, course_key):
         debug("Deny: no user or anon user")
         return ACCESS_DENIED
 
+    return _cached_access(
+        ('course', _access_cache_user_key(user, course_key), access_level, course_key),
+        lambda: _has_role_access_to_course(user, access_level, course_key),
+    )
+
+
+def _has_role_access_to_course(user, access_level, course_key):
+    """
+    Returns True if the given authenticated user has access_level (= staff
+    or instructor) access to the course with the given course_key, by their
+    global staff status or their course or organization roles.
+    """
     if is_masquerading_as_student(user, course_key):
         return ACCESS_DENIED
 
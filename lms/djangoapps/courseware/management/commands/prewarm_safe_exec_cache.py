@@ -0,0 +1,95 @@
+"""
+Pre-warm the cache of sandboxed code results for the problems of a course.
+
+Runs the <script> code of each problem of the course once for each random
+seed that the problem's rerandomize setting lets learners get, so that the
+results are in the shared cache before learners load the problems.
+"""
+import logging
+from textwrap import dedent
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import translation
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from capa.capa_problem import LoncapaProblem, LoncapaSystem
+from capa.safe_exec import result_cache
+from edxmako.shortcuts import render_to_string
+from util.sandboxing import can_execute_unsafe_code, get_python_lib_zip
+from xmodule.capa_base import randomization_seeds
+from xmodule.contentstore.django import contentstore
+from xmodule.modulestore.django import modulestore
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = dedent(__doc__).strip()
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_id',
+                            help='the course whose problems to pre-warm')
+        parser.add_argument('--max-seeds',
+                            type=int,
+                            default=None,
+                            help='the maximum number of seeds to run each problem with')
+
+    def handle(self, *args, **options):
+        try:
+            course_key = CourseKey.from_string(options['course_id'])
+        except InvalidKeyError:
+            raise CommandError("Invalid course_id")
+
+        store = modulestore()
+        if store.get_course(course_key) is None:
+            raise CommandError("Invalid course_id")
+
+        num_runs = num_errors = 0
+        for problem in store.get_items(course_key, qualifiers={'category': 'problem'}):
+            capa_system = self._capa_system(problem, course_key)
+            seeds = randomization_seeds(problem.rerandomize)[:options['max_seeds']]
+            for seed in seeds:
+                num_runs += 1
+                try:
+                    LoncapaProblem(
+                        problem.data,
+                        id=problem.location.html_id(),
+                        capa_system=capa_system,
+                        capa_module=None,
+                        seed=seed,
+                        extract_tree=False,
+                    )
+                except Exception:  # pylint: disable=broad-except
+                    num_errors += 1
+                    log.exception(u'Could not run the code of %s with seed %s', problem.location, seed)
+                    # The other seeds would fail the same way.
+                    break
+
+        return u'Ran {} problem variants, with {} errors. Cache outcomes: {}'.format(
+            num_runs, num_errors, result_cache.CACHE_STATS,
+        )
+
+    def _capa_system(self, problem, course_key):
+        """
+        Returns the LoncapaSystem to run the problem's code with, as the LMS
+        would but without a learner.
+        """
+        return LoncapaSystem(
+            ajax_url=None,
+            anonymous_student_id=None,
+            cache=cache,
+            can_execute_unsafe_code=lambda: can_execute_unsafe_code(course_key),
+            get_python_lib_zip=lambda: get_python_lib_zip(contentstore, course_key),
+            DEBUG=settings.DEBUG,
+            filestore=problem.runtime.resources_fs,
+            i18n=translation,
+            node_path=settings.NODE_PATH,
+            render_template=render_to_string,
+            seed=None,
+            STATIC_URL=settings.STATIC_URL,
+            xqueue=None,
+            matlab_api_key=problem.matlab_api_key,
+        )
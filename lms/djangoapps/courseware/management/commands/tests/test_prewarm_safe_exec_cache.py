@@ -0,0 +1,62 @@
+"""
+Tests for the prewarm_safe_exec_cache management command.
+"""
+import ddt
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from mock import patch
+from nose.plugins.attrib import attr
+
+from capa.safe_exec.tests.test_safe_exec import DictCache
+from xmodule.capa_base import NUM_RANDOMIZATION_BINS
+from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+PROBLEM_XML = """
+<problem>
+  <script type="loncapa/python">
+x = random.randint(0, 100)
+  </script>
+  <stringresponse answer="$x">
+    <textline size="5"/>
+  </stringresponse>
+</problem>
+"""
+
+
+@attr(shard=1)
+@ddt.ddt
+class PrewarmSafeExecCacheTest(SharedModuleStoreTestCase):
+    """
+    Tests that the command caches the results of the problems' code.
+    """
+    def setUp(self):
+        super(PrewarmSafeExecCacheTest, self).setUp()
+        self.course = CourseFactory.create()
+        self.cache = DictCache()
+        patcher = patch(
+            'courseware.management.commands.prewarm_safe_exec_cache.cache', self.cache
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @ddt.data(
+        ('never', None, 1),
+        ('per_student', None, NUM_RANDOMIZATION_BINS),
+        ('always', 5, 5),
+    )
+    @ddt.unpack
+    def test_prewarm(self, rerandomize, max_seeds, expected_runs):
+        ItemFactory.create(
+            parent_location=self.course.location,
+            category='problem',
+            data=PROBLEM_XML,
+            metadata={'rerandomize': rerandomize},
+        )
+        output = call_command('prewarm_safe_exec_cache', unicode(self.course.id), max_seeds=max_seeds)
+        self.assertIn(u'Ran {} problem variants, with 0 errors'.format(expected_runs), output)
+        self.assertEqual(len(self.cache.cache), expected_runs)
+
+    def test_invalid_course(self):
+        with self.assertRaises(CommandError):
+            call_command('prewarm_safe_exec_cache', 'not/a/course')
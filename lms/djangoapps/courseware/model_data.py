@@ -21,10 +21,12 @@ UserInfoCache: A cache for Scope.user_info
 DjangoOrmFieldCache: A base-class for single-row-per-field caches.
 """
 
+import itertools
 import json
 import logging
 from abc import ABCMeta, abstractmethod
-from collections import defaultdict, namedtuple
+from collections import OrderedDict, defaultdict, namedtuple
+from operator import attrgetter
 
 from contracts import contract, new_contract
 from django.db import DatabaseError, IntegrityError, transaction
@@ -39,7 +41,13 @@ from xblock.runtime import KeyValueStore
 from courseware.user_state_client import DjangoXBlockUserStateClient
 from xmodule.modulestore.django import modulestore
 
-from .models import StudentModule, XModuleStudentInfoField, XModuleStudentPrefsField, XModuleUserStateSummaryField
+from .models import (
+    StudentModule,
+    XModuleStudentInfoField,
+    XModuleStudentPrefsField,
+    XModuleUserStateSummaryField,
+    chunks
+)
 
 log = logging.getLogger(__name__)
 
@@ -67,6 +75,41 @@ def _all_usage_keys(descriptors, aside_types):
     return usage_ids
 
 
+def _descriptor_descendents(descriptor, depth, descriptor_filter):
+    """
+    Return a list of all descendant descriptors of `descriptor` down to the
+    specified depth that match the descriptor filter. Includes `descriptor`
+
+    descriptor: The parent to search inside
+    depth: The number of levels to descend, or None for infinite depth
+    descriptor_filter(descriptor): A function that returns True
+        if descriptor should be included in the results
+    """
+    if descriptor_filter(descriptor):
+        descriptors = [descriptor]
+    else:
+        descriptors = []
+
+    if depth is None or depth > 0:
+        new_depth = depth - 1 if depth is not None else depth
+
+        for child in descriptor.get_children() + descriptor.get_required_module_descriptors():
+            descriptors.extend(_descriptor_descendents(child, new_depth, descriptor_filter))
+
+    return descriptors
+
+
+def _fields_to_cache(descriptors):
+    """
+    Returns a map of scopes to fields in that scope that should be cached
+    """
+    scope_map = defaultdict(set)
+    for descriptor in descriptors:
+        for field in descriptor.fields.values():
+            scope_map[field.scope].add(field)
+    return scope_map
+
+
 def _all_block_types(descriptors, aside_types):
     """
     Return a set of all block_types for the supplied `descriptors` and for
@@ -368,6 +411,34 @@ class UserStateCache(object):
         for user_state in block_field_state:
             self._cache[user_state.block_key] = user_state.state
 
+    def cache_student_modules(self, student_modules):
+        """
+        Load the state stored in the supplied, already fetched, ``student_modules``
+        into this cache, skipping empty and deleted state as ``cache_fields`` does.
+
+        Arguments:
+            student_modules (list of :class:`~StudentModule`): The user's StudentModules to cache.
+        """
+        for student_module in student_modules:
+            if student_module.state is None:
+                continue
+            state = json.loads(student_module.state)
+            if state == {}:
+                continue
+            usage_key = student_module.module_state_key.map_into_course(student_module.course_id)
+            self._cache[usage_key] = state
+
+    def update_cached_state(self, block_keys_to_state):
+        """
+        Overlay the supplied state dicts, already saved by the caller,
+        over the cached state.
+
+        Arguments:
+            block_keys_to_state (dict): A dict mapping UsageKeys to state dicts.
+        """
+        for block_key, state in block_keys_to_state.iteritems():
+            self._cache[block_key].update(state)
+
     @contract(kvs_key=DjangoKeyValueStore.Key)
     def set(self, kvs_key, value):
         """
@@ -748,31 +819,8 @@ class FieldDataCache(object):
                 should be cached
         """
 
-        def get_child_descriptors(descriptor, depth, descriptor_filter):
-            """
-            Return a list of all child descriptors down to the specified depth
-            that match the descriptor filter. Includes `descriptor`
-
-            descriptor: The parent to search inside
-            depth: The number of levels to descend, or None for infinite depth
-            descriptor_filter(descriptor): A function that returns True
-                if descriptor should be included in the results
-            """
-            if descriptor_filter(descriptor):
-                descriptors = [descriptor]
-            else:
-                descriptors = []
-
-            if depth is None or depth > 0:
-                new_depth = depth - 1 if depth is not None else depth
-
-                for child in descriptor.get_children() + descriptor.get_required_module_descriptors():
-                    descriptors.extend(get_child_descriptors(child, new_depth, descriptor_filter))
-
-            return descriptors
-
         with modulestore().bulk_operations(descriptor.location.course_key):
-            descriptors = get_child_descriptors(descriptor, depth, descriptor_filter)
+            descriptors = _descriptor_descendents(descriptor, depth, descriptor_filter)
 
         self.add_descriptors_to_cache(descriptors)
 
@@ -797,11 +845,7 @@ class FieldDataCache(object):
         """
         Returns a map of scopes to fields in that scope that should be cached
         """
-        scope_map = defaultdict(set)
-        for descriptor in descriptors:
-            for field in descriptor.fields.values():
-                scope_map[field.scope].add(field)
-        return scope_map
+        return _fields_to_cache(descriptors)
 
     @contract(key=DjangoKeyValueStore.Key)
     def get(self, key):
@@ -930,6 +974,156 @@ class FieldDataCache(object):
         return sum(len(cache) for cache in self.cache.values())
 
 
+class MultiUserFieldDataCache(object):
+    """
+    A cache of the field data of many users for the same descriptors,
+    which hands out a FieldDataCache for each of the users.
+
+    The Scope.user_state data of all the users is loaded up front, with
+    queries that are chunked on both the users and the blocks, rather
+    than with queries for each user.  The Scope.user_state_summary data,
+    which is shared by all the users, is loaded once.  The data of the
+    preferences and user_info scopes, if the descriptors have any such
+    fields, is loaded when each user's FieldDataCache is handed out.
+    """
+    # Number of users whose StudentModules are loaded by a single query.
+    USER_CHUNK_SIZE = 100
+
+    def __init__(self, descriptors, course_id, users, asides=None, read_only=False):
+        """
+        Arguments
+        descriptors: A list of XModuleDescriptors.
+        course_id: The id of the current course
+        users: The users for which to cache data
+        asides: The list of aside types to load, or None to prefetch no asides.
+        read_only: We should not perform writes (they become a no-op).
+        """
+        assert isinstance(course_id, CourseKey)
+        self.descriptors = descriptors
+        self.course_id = course_id
+        self.users = {user.id: user for user in users if user.is_authenticated}
+        self.asides = asides if asides is not None else []
+        self.read_only = read_only
+
+        self._fields = _fields_to_cache(descriptors)
+        self._user_state_summary_cache = UserStateSummaryCache(self.course_id)
+        if self._fields.get(Scope.user_state_summary):
+            self._user_state_summary_cache.cache_fields(
+                self._fields[Scope.user_state_summary], self.descriptors, self.asides,
+            )
+
+        self._student_modules = defaultdict(list)
+        if self._fields.get(Scope.user_state):
+            self._load_student_modules()
+
+        # The user state caches of the FieldDataCaches handed out so far.
+        self._user_state_caches = {}
+
+    @classmethod
+    def cache_for_descriptor_descendents(cls, course_id, users, descriptor, depth=None,
+                                         descriptor_filter=lambda descriptor: True,
+                                         asides=None, read_only=False):
+        """
+        Returns a MultiUserFieldDataCache of the given users for `descriptor`
+        and its descendants, as FieldDataCache.cache_for_descriptor_descendents
+        does for a single user.
+        """
+        with modulestore().bulk_operations(descriptor.location.course_key):
+            descriptors = _descriptor_descendents(descriptor, depth, descriptor_filter)
+        return cls(descriptors, course_id, users, asides=asides, read_only=read_only)
+
+    def field_data_cache_for_user(self, user):
+        """
+        Returns a FieldDataCache of the field data of `user`, who must be
+        one of the users of this cache, for the descriptors of this cache.
+        """
+        field_data_cache = FieldDataCache([], self.course_id, user, asides=self.asides, read_only=self.read_only)
+        if user.is_authenticated:
+            field_data_cache.scorable_locations.update(desc.location for desc in self.descriptors if desc.has_score)
+
+            user_state_cache = field_data_cache.cache[Scope.user_state]
+            user_state_cache.cache_student_modules(self._student_modules.get(user.id, []))
+            self._user_state_caches[user.id] = user_state_cache
+
+            field_data_cache.cache[Scope.user_state_summary] = self._user_state_summary_cache
+            for scope in (Scope.preferences, Scope.user_info):
+                if self._fields.get(scope):
+                    field_data_cache.cache[scope].cache_fields(self._fields[scope], self.descriptors, self.asides)
+        return field_data_cache
+
+    def kvs_for_user(self, user):
+        """
+        Returns a DjangoKeyValueStore of the field data of `user`, who must
+        be one of the users of this cache.
+        """
+        return DjangoKeyValueStore(self.field_data_cache_for_user(user))
+
+    @contract(kv_dict="dict(DjangoKeyValueStore_Key: *)")
+    def set_many(self, kv_dict):
+        """
+        Set the Scope.user_state fields specified by the keys of `kv_dict`,
+        which may belong to any of the users of this cache, to the values
+        in that dict.
+
+        The StudentModules are saved with the bulk queries of
+        DjangoXBlockUserStateClient.set_many_for_users: they are read with
+        chunked queries for all the users and blocks, updated with batched
+        UPDATEs and the missing ones are created with a bulk INSERT.  The
+        StudentModules are read again, rather than reusing the ones loaded
+        for this cache, so that scores saved since then are not overwritten.
+
+        Arguments:
+            kv_dict (dict): dict mapping from `DjangoKeyValueStore.Key`s to field values
+        Raises: KeyValueMultiSaveError if the fields fail to save
+        """
+        if self.read_only:
+            return
+
+        block_states = OrderedDict()
+        for kvs_key, value in kv_dict.iteritems():
+            if kvs_key.scope != Scope.user_state:
+                raise InvalidScopeError(kvs_key, (Scope.user_state,))
+            block_states.setdefault((kvs_key.user_id, kvs_key.block_scope_id), {})[kvs_key.field_name] = value
+
+        users = {user_id: self.users[user_id] for user_id, _ in block_states}
+        try:
+            DjangoXBlockUserStateClient().set_many_for_users(users, block_states)
+        except DatabaseError:
+            log.exception("Saving user state failed for users %r", users.keys())
+            raise KeyValueMultiSaveError([])
+
+        for (user_id, usage_key), state in block_states.iteritems():
+            user_state_cache = self._user_state_caches.get(user_id)
+            if user_state_cache is not None:
+                user_state_cache.update_cached_state({usage_key: state})
+
+    def _load_student_modules(self):
+        """
+        Loads the StudentModules of all the users for all the blocks.
+        """
+        usage_keys = _all_usage_keys(self.descriptors, self.asides)
+        for student_module in self._query_student_modules(self.users.keys(), usage_keys):
+            self._student_modules[student_module.student_id].append(student_module)
+
+    def _query_student_modules(self, user_ids, usage_keys):
+        """
+        Yields the StudentModules of the given users for the given blocks,
+        with queries chunked on both the users and the blocks.
+        """
+        course_key_func = attrgetter('course_key')
+        by_course = itertools.groupby(sorted(usage_keys, key=course_key_func), course_key_func)
+        for course_key, course_usage_keys in by_course:
+            course_usage_keys = list(course_usage_keys)
+            for user_ids_chunk in chunks(list(user_ids), self.USER_CHUNK_SIZE):
+                for student_module in StudentModule.objects.chunked_filter(
+                        'module_state_key__in',
+                        course_usage_keys,
+                        student_id__in=user_ids_chunk,
+                        course_id=course_key,
+                ):
+                    yield student_module
+
+
 class ScoresClient(object):
     """
     Basic client interface for retrieving Score information.
@@ -988,6 +1182,29 @@ class ScoresClient(object):
         client.fetch_scores(scorable_locations)
         return client
 
+    @classmethod
+    def create_for_users(cls, course_id, user_ids, scorable_locations):
+        """
+        Create ScoresClients with pre-fetched data for the given locations,
+        for each of the given users, with a single query.  Returns a dict
+        mapping each user_id to its ScoresClient.
+        """
+        clients = {user_id: cls(course_id, user_id) for user_id in user_ids}
+        scores_qset = StudentModule.objects.filter(
+            student_id__in=list(clients),
+            course_id=course_id,
+            module_state_key__in=set(scorable_locations),
+        )
+        for user_id, location, correct, total, created in scores_qset.values_list(
+                'student_id', 'module_state_key', 'grade', 'max_grade', 'created'
+        ):
+            clients[user_id]._locations_to_scores[location.map_into_course(course_id)] = cls.Score(
+                correct, total, created,
+            )
+        for client in clients.itervalues():
+            client._has_fetched = True
+        return clients
+
 
 # @contract(user_id=int, usage_key=UsageKey, score="number|None", max_score="number|None")
 def set_score(user_id, usage_key, score, max_score):
@@ -20,6 +20,7 @@ from django.conf import settings
 from django.contrib.auth.models import User
 from django.db import models
 from django.db.models.signals import post_save
+from django.dispatch import Signal
 from django.utils.translation import ugettext_lazy as _
 from model_utils.models import TimeStampedModel
 from six import text_type
@@ -29,6 +30,15 @@ from opaque_keys.edx.django.models import BlockTypeKeyField, CourseKeyField, Usa
 
 log = logging.getLogger("edx.courseware")
 
+# Signal sent after StudentModules have been saved with bulk queries, which
+# don't send post_save.  The receivers that save the history of each saved
+# StudentModule save it for all of the StudentModules at once.
+STUDENT_MODULES_BULK_SAVED = Signal(
+    providing_args=[
+        'student_modules',  # The saved StudentModules, with their ids
+    ]
+)
+
 
 def chunks(items, chunk_size):
     """
@@ -213,6 +223,32 @@ class BaseStudentModuleHistory(models.Model):
 
         return history_entries
 
+    @classmethod
+    def history_entry(cls, student_module):
+        """
+        Returns the unsaved history entry of the current state of the given
+        StudentModule, or None if no history is saved for its module_type.
+        """
+        if student_module.module_type not in cls.HISTORY_SAVING_TYPES:
+            return None
+        return cls(
+            student_module=student_module,
+            version=None,
+            created=student_module.modified,
+            state=student_module.state,
+            grade=student_module.grade,
+            max_grade=student_module.max_grade,
+        )
+
+    @classmethod
+    def bulk_save_history(cls, student_modules):
+        """
+        Creates, with a bulk insert, the history entries that the save_history
+        handler would create when saving each of the given StudentModules.
+        """
+        history_entries = (cls.history_entry(student_module) for student_module in student_modules)
+        cls.objects.bulk_create([history_entry for history_entry in history_entries if history_entry is not None])
+
 
 class StudentModuleHistory(BaseStudentModuleHistory):
     """Keeps a complete history of state changes for a given XModule for a given
@@ -234,20 +270,23 @@ class StudentModuleHistory(BaseStudentModuleHistory):
         StudentModuleHistoryExtended entry if the module_type is one that
         we save.
         """
-        if instance.module_type in StudentModuleHistory.HISTORY_SAVING_TYPES:
-            history_entry = StudentModuleHistory(student_module=instance,
-                                                 version=None,
-                                                 created=instance.modified,
-                                                 state=instance.state,
-                                                 grade=instance.grade,
-                                                 max_grade=instance.max_grade)
+        history_entry = StudentModuleHistory.history_entry(instance)
+        if history_entry is not None:
             history_entry.save()
 
+    def save_bulk_history(sender, student_modules, **kwargs):  # pylint: disable=no-self-argument, unused-argument
+        """
+        Saves the history entries of StudentModules saved with bulk queries,
+        as save_history does for each saved StudentModule.
+        """
+        StudentModuleHistory.bulk_save_history(student_modules)
+
     # When the extended studentmodulehistory table exists, don't save
     # duplicate history into courseware_studentmodulehistory, just retain
     # data for reading.
     if not settings.FEATURES.get('ENABLE_CSMH_EXTENDED'):
         post_save.connect(save_history, sender=StudentModule)
+        STUDENT_MODULES_BULK_SAVED.connect(save_bulk_history, sender=StudentModule)
 
 
 class XBlockFieldBase(models.Model):
@@ -40,6 +40,8 @@ from courseware.masquerade import (
     setup_masquerade
 )
 from courseware.model_data import DjangoKeyValueStore, FieldDataCache
+from courseware.user_state_client import write_behind_user_state
+from courseware.waffle import BUFFER_USER_STATE_WRITES, waffle_flags
 from edxmako.shortcuts import render_to_string
 from eventtracking import tracker
 from lms.djangoapps.grades.signals.signals import SCORE_PUBLISHED
@@ -962,10 +964,14 @@ def handle_xblock_callback(request, course_id, usage_id, handler, suffix=None):
         return _invoke_xblock_handler(request, course_id, usage_id, handler, suffix, course=course)
 
 
-def get_module_by_usage_id(request, course_id, usage_id, disable_staff_debug_info=False, course=None):
+def get_module_by_usage_id(request, course_id, usage_id, disable_staff_debug_info=False, course=None,
+                           prefetch_fields=None):
     """
     Gets a module instance based on its `usage_id` in a course, for a given request/user
 
+    If `prefetch_fields` are given, the module's descendants are loaded along with it,
+    and the definitions of those with any of those content fields are loaded in bulk.
+
     Returns (instance, tracking_context)
     """
     user = request.user
@@ -977,7 +983,10 @@ def get_module_by_usage_id(request, course_id, usage_id, disable_staff_debug_inf
         raise Http404("Invalid location")
 
     try:
-        descriptor = modulestore().get_item(usage_key)
+        if prefetch_fields:
+            descriptor = modulestore().get_item(usage_key, depth=None, prefetch_fields=prefetch_fields)
+        else:
+            descriptor = modulestore().get_item(usage_key)
         descriptor_orig_usage_key, descriptor_orig_version = modulestore().get_block_original_usage(usage_key)
     except ItemNotFoundError:
         log.warn(
@@ -1062,9 +1071,11 @@ def _invoke_xblock_handler(request, course_id, usage_id, handler, suffix, course
 
         tracking_context_name = 'module_callback_handler'
         req = django_to_webob_request(request)
+        buffer_user_state_writes = waffle_flags()[BUFFER_USER_STATE_WRITES].is_enabled(course_key)
         try:
             with tracker.get_tracker().context(tracking_context_name, tracking_context):
-                resp = instance.handle(handler, req, suffix)
+                with write_behind_user_state(active=buffer_user_state_writes):
+                    resp = instance.handle(handler, req, suffix)
                 if suffix == 'problem_check' \
                         and course \
                         and getattr(course, 'entrance_exam_enabled', False) \
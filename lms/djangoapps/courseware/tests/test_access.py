@@ -5,6 +5,7 @@ Test the access control framework
 import datetime
 import itertools
 
+import crum
 import ddt
 import pytz
 from ccx_keys.locator import CCXLocator
@@ -29,6 +30,7 @@ from courseware.tests.factories import (
 )
 from courseware.tests.helpers import LoginEnrollmentTestCase, masquerade_as_group_member
 from lms.djangoapps.ccx.models import CustomCourseForEdX
+from openedx.core.djangoapps.request_cache.middleware import RequestCache
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 from openedx.core.djangoapps.waffle_utils.testutils import WAFFLE_TABLES
 from student.models import CourseEnrollment
@@ -334,6 +336,39 @@ class AccessTestCase(LoginEnrollmentTestCase, ModuleStoreTestCase, MilestonesTes
             bool(access.has_access(self.global_staff, 'load', chapter, course_key=self.course.id))
         )
 
+    def test_has_access_many(self):
+        chapters = [
+            ItemFactory.create(category="chapter", parent_location=self.course.location, visible_to_staff_only=hidden)
+            for hidden in (False, True, False)
+        ]
+
+        with patch('courseware.access.get_user_role', wraps=access.get_user_role) as mock_user_role:
+            decisions = access.has_access_many(self.student, 'load', chapters, course_key=self.course.id)
+            self.assertEqual(mock_user_role.call_count, 1)
+
+        self.assertEqual(decisions.keys(), [chapter.location for chapter in chapters])
+        self.assertEqual([bool(decision) for decision in decisions.values()], [True, False, True])
+        self.assertTrue(all(access.has_access_many(self.course_staff, 'load', chapters, self.course.id).values()))
+
+        # Outside of a request, the decisions are not kept after the call.
+        chapters[1].visible_to_staff_only = False
+        self.assertTrue(access.has_access(self.student, 'load', chapters[1], course_key=self.course.id))
+
+    def test_access_cache_in_request(self):
+        chapter = ItemFactory.create(category="chapter", parent_location=self.course.location)
+        crum.set_current_request(RequestFactory().get('/'))
+        self.addCleanup(crum.set_current_request, None)
+        self.addCleanup(RequestCache.clear_request_cache)
+
+        self.assertTrue(access.has_access(self.student, 'load', chapter, course_key=self.course.id))
+        chapter.visible_to_staff_only = True
+        self.assertTrue(access.has_access(self.student, 'load', chapter, course_key=self.course.id))
+
+        # Decisions are not reused once the user masquerades.
+        self.assertTrue(access.has_access(self.global_staff, 'staff', chapter, course_key=self.course.id))
+        self.global_staff.masquerade_settings = {self.course.id: CourseMasquerade(self.course.id, role='student')}
+        self.assertFalse(access.has_access(self.global_staff, 'staff', chapter, course_key=self.course.id))
+
     def test_has_access_to_course(self):
         self.assertFalse(access._has_access_to_course(
             None, 'staff', self.course.id
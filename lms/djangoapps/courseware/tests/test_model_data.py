@@ -6,14 +6,15 @@ from functools import partial
 
 from django.db import DatabaseError
 from django.test import TestCase
-from mock import Mock, patch
+from mock import ANY, Mock, patch
 from nose.plugins.attrib import attr
 from xblock.core import XBlock
 from xblock.exceptions import KeyValueMultiSaveError
 from xblock.fields import BlockScope, Scope, ScopeIds
 
-from courseware.model_data import DjangoKeyValueStore, FieldDataCache, InvalidScopeError
+from courseware.model_data import DjangoKeyValueStore, FieldDataCache, InvalidScopeError, MultiUserFieldDataCache
 from courseware.models import (
+    BaseStudentModuleHistory,
     StudentModule,
     XModuleStudentInfoField,
     XModuleStudentPrefsField,
@@ -434,3 +435,102 @@ class TestStudentInfoStorage(OtherUserFailureTestMixin, StorageTestBase, TestCas
     storage_class = XModuleStudentInfoField
     other_key_factory = partial(DjangoKeyValueStore.Key, Scope.user_info, 2, 'mock_problem')  # user_id=2, not 1
     existing_field_name = "existing_field"
+
+
+@attr(shard=1)
+class TestMultiUserFieldDataCache(TestCase):
+    """Tests for MultiUserFieldDataCache"""
+    # Tell Django to clean out all databases, not just default
+    multi_db = True
+
+    def setUp(self):
+        super(TestMultiUserFieldDataCache, self).setUp()
+        self.users = [
+            StudentModuleFactory(state=json.dumps({'a_field': index})).student
+            for index in range(5)
+        ]
+        self.users.append(UserFactory.create())
+        self.descriptor = mock_descriptor([mock_field(Scope.user_state, 'a_field')])
+
+    def _user_state_key(self, user, field_name):
+        """Returns the key of the given user's Scope.user_state field"""
+        return DjangoKeyValueStore.Key(Scope.user_state, user.id, location('usage_id'), field_name)
+
+    def test_field_data_cache_for_user(self):
+        # The user state of all of the users is loaded by a single query
+        with self.assertNumQueries(1):
+            multi_user_cache = MultiUserFieldDataCache([self.descriptor], course_id, self.users)
+
+        with self.assertNumQueries(0):
+            for index, user in enumerate(self.users[:-1]):
+                kvs = multi_user_cache.kvs_for_user(user)
+                self.assertEquals(index, kvs.get(self._user_state_key(user, 'a_field')))
+            kvs = multi_user_cache.kvs_for_user(self.users[-1])
+            self.assertFalse(kvs.has(self._user_state_key(self.users[-1], 'a_field')))
+
+    def test_chunked_queries(self):
+        with patch.object(MultiUserFieldDataCache, 'USER_CHUNK_SIZE', 2):
+            with self.assertNumQueries(3):
+                multi_user_cache = MultiUserFieldDataCache([self.descriptor], course_id, self.users)
+        kvs = multi_user_cache.kvs_for_user(self.users[4])
+        self.assertEquals(4, kvs.get(self._user_state_key(self.users[4], 'a_field')))
+
+    def test_set_many(self):
+        multi_user_cache = MultiUserFieldDataCache([self.descriptor], course_id, self.users)
+        kvs = multi_user_cache.kvs_for_user(self.users[0])
+        multi_user_cache.set_many({
+            self._user_state_key(user, field_name): u'{} of {}'.format(field_name, user.id)
+            for user in self.users
+            for field_name in ('a_field', 'b_field')
+        })
+
+        self.assertEquals(len(self.users), StudentModule.objects.count())
+        for user in self.users:
+            student_module = StudentModule.objects.get(student=user)
+            self.assertEquals(
+                {'a_field': u'a_field of {}'.format(user.id), 'b_field': u'b_field of {}'.format(user.id)},
+                json.loads(student_module.state),
+            )
+        self.assertEquals(
+            u'b_field of {}'.format(self.users[0].id),
+            kvs.get(self._user_state_key(self.users[0], 'b_field')),
+        )
+
+    def test_set_many_keeps_scores(self):
+        multi_user_cache = MultiUserFieldDataCache([self.descriptor], course_id, self.users)
+        StudentModule.objects.filter(student=self.users[0]).update(grade=1, max_grade=2)
+
+        multi_user_cache.set_many({self._user_state_key(self.users[0], 'a_field'): 'new_value'})
+        student_module = StudentModule.objects.get(student=self.users[0])
+        self.assertEquals((1, 2), (student_module.grade, student_module.max_grade))
+
+    def test_set_many_other_scope(self):
+        multi_user_cache = MultiUserFieldDataCache([self.descriptor], course_id, self.users)
+        with self.assertRaises(InvalidScopeError):
+            multi_user_cache.set_many({prefs_key('a_field'): 'value'})
+
+    def test_set_many_bulk_queries(self):
+        multi_user_cache = MultiUserFieldDataCache([self.descriptor], course_id, self.users)
+        kv_dict = {self._user_state_key(user, 'a_field'): 'new_value' for user in self.users}
+        with patch('django.db.models.Model.save') as mock_save:
+            with patch(
+                'courseware.user_state_client.DjangoXBlockUserStateClient._report_set_many_totals'
+            ) as mock_report_totals:
+                multi_user_cache.set_many(kv_dict)
+
+        # The rows are updated and created in bulk, and the user state
+        # client's metrics are reported.
+        self.assertFalse(mock_save.called)
+        mock_report_totals.assert_called_once_with(ANY, len(self.users))
+        for user in self.users:
+            self.assertEquals({'a_field': 'new_value'}, json.loads(StudentModule.objects.get(student=user).state))
+        self.assertEquals(
+            len(self.users) + 5,
+            len(BaseStudentModuleHistory.get_history(StudentModule.objects.filter(student__in=self.users))),
+        )
+
+    def test_set_many_failure(self):
+        multi_user_cache = MultiUserFieldDataCache([self.descriptor], course_id, self.users)
+        with patch('django.db.models.query.QuerySet.update', side_effect=DatabaseError):
+            with self.assertRaises(KeyValueMultiSaveError):
+                multi_user_cache.set_many({self._user_state_key(self.users[0], 'a_field'): 'new_value'})
@@ -3,14 +3,20 @@ Black-box tests of the DjangoUserStateClient against the semantics
 defined in edx_user_state_client.
 """
 
+import json
 from collections import defaultdict
 from unittest import skip
 
+from django.db import connections
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from edx_user_state_client.tests import UserStateClientTestBase
+from opaque_keys.edx.locator import CourseLocator
 
+from courseware.model_data import set_score
+from courseware.models import STUDENT_MODULES_BULK_SAVED, BaseStudentModuleHistory, StudentModule
 from courseware.tests.factories import UserFactory
-from courseware.user_state_client import DjangoXBlockUserStateClient
+from courseware.user_state_client import DjangoXBlockUserStateClient, write_behind_user_state
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 
 
@@ -36,3 +42,142 @@ class TestDjangoUserStateClient(UserStateClientTestBase, ModuleStoreTestCase):
         super(TestDjangoUserStateClient, self).setUp()
         self.client = DjangoXBlockUserStateClient()
         self.users = defaultdict(UserFactory.create)
+
+
+class TestWriteBehindUserState(TestCase):
+    """
+    Tests of the writes buffered by write_behind_user_state.
+    """
+    shard = 4
+    # Tell Django to clean out all databases, not just default
+    multi_db = True
+
+    def setUp(self):
+        super(TestWriteBehindUserState, self).setUp()
+        self.user = UserFactory.create()
+        self.client = DjangoXBlockUserStateClient(self.user)
+        self.course_key = CourseLocator('org', 'course', 'run')
+        self.usage_keys = [self.course_key.make_usage_key('problem', 'problem{}'.format(index)) for index in range(5)]
+
+    def _stored_states(self):
+        """
+        Returns the state stored for each of the blocks, or None.
+        """
+        student_modules = {
+            student_module.module_state_key.map_into_course(self.course_key): student_module
+            for student_module in StudentModule.objects.filter(student=self.user)
+        }
+        return [
+            json.loads(student_modules[usage_key].state) if usage_key in student_modules else None
+            for usage_key in self.usage_keys
+        ]
+
+    def _num_history_entries(self):
+        """
+        Returns the number of history entries of the user's blocks.
+        """
+        return len(BaseStudentModuleHistory.get_history(StudentModule.objects.filter(student=self.user)))
+
+    def test_writes_coalesced(self):
+        self.client.set_many(self.user.username, {self.usage_keys[0]: {'a': 0}})
+        with write_behind_user_state():
+            for index in range(3):
+                self.client.set_many(
+                    self.user.username,
+                    {usage_key: {'a': index, 'b': index} for usage_key in self.usage_keys[:index + 2]},
+                )
+            self.assertEqual(self._stored_states(), [{'a': 0}, None, None, None, None])
+
+        self.assertEqual(
+            self._stored_states(),
+            [{'a': 2, 'b': 2}, {'a': 2, 'b': 2}, {'a': 2, 'b': 2}, {'a': 2, 'b': 2}, None],
+        )
+        self.assertEqual(self._num_history_entries(), 1 + 4)
+
+    def test_bulk_saved_signal(self):
+        saved_modules = []
+
+        def receiver(sender, student_modules, **kwargs):  # pylint: disable=unused-argument
+            """
+            Records the StudentModules of each sent signal.
+            """
+            saved_modules.append(student_modules)
+
+        STUDENT_MODULES_BULK_SAVED.connect(receiver, sender=StudentModule)
+        self.addCleanup(STUDENT_MODULES_BULK_SAVED.disconnect, receiver, sender=StudentModule)
+
+        self.client.set_many(self.user.username, {self.usage_keys[0]: {'a': 0}})
+        self.assertEqual(saved_modules, [])
+        with write_behind_user_state():
+            self.client.set_many(self.user.username, {usage_key: {'a': 1} for usage_key in self.usage_keys[:3]})
+
+        # The receivers that save the history of each row on post_save are told
+        # about all of the updated and created rows at once.
+        self.assertEqual(len(saved_modules), 1)
+        self.assertItemsEqual(
+            [student_module.id for student_module in saved_modules[0]],
+            StudentModule.objects.filter(student=self.user).values_list('id', flat=True),
+        )
+
+    def _num_flush_queries(self, usage_keys):
+        """
+        Returns the number of queries made to save buffered state for the given
+        blocks, of which half already have a stored state.
+        """
+        for usage_key in usage_keys[:len(usage_keys) / 2]:
+            self.client.set_many(self.user.username, {usage_key: {'a': 0}})
+
+        with write_behind_user_state():
+            for usage_key in usage_keys:
+                self.client.set_many(self.user.username, {usage_key: {'a': 1}})
+            with CaptureQueriesContext(connections['default']) as default_queries:
+                with CaptureQueriesContext(connections['student_module_history']) as history_queries:
+                    self.client._flush_write_buffer()  # pylint: disable=protected-access
+        return len(default_queries), len(history_queries)
+
+    def test_bulk_queries(self):
+        self.assertEqual(
+            self._num_flush_queries(self.usage_keys[:2]),
+            self._num_flush_queries(
+                [self.course_key.make_usage_key('problem', 'other{}'.format(index)) for index in range(20)]
+            ),
+        )
+        self.assertEqual(self._stored_states(), [{'a': 1}, {'a': 1}, None, None, None])
+        self.assertEqual(self._num_history_entries(), 1 + 2 + 10 + 20)
+
+    def test_scores_not_overwritten(self):
+        self.client.set_many(self.user.username, {self.usage_keys[0]: {'a': 0}})
+        with write_behind_user_state():
+            self.client.set_many(self.user.username, {self.usage_keys[0]: {'a': 1}})
+            set_score(self.user.id, self.usage_keys[0], 3, 4)
+
+        student_module = StudentModule.objects.get(student=self.user, module_state_key=self.usage_keys[0])
+        self.assertEqual((student_module.grade, student_module.max_grade), (3, 4))
+        self.assertEqual(json.loads(student_module.state), {'a': 1})
+
+    def test_read_your_writes(self):
+        with write_behind_user_state():
+            self.client.set_many(self.user.username, {self.usage_keys[0]: {'a': 1}})
+            self.assertEqual(self.client.get(self.user.username, self.usage_keys[0]).state, {'a': 1})
+            self.client.set_many(self.user.username, {self.usage_keys[0]: {'a': 2}})
+            self.client.delete_many(self.user.username, [self.usage_keys[0]], fields=['a'])
+        self.assertEqual(self._stored_states()[0], {})
+
+    def test_nested(self):
+        with write_behind_user_state():
+            with write_behind_user_state():
+                self.client.set_many(self.user.username, {self.usage_keys[0]: {'a': 1}})
+            self.assertEqual(self._stored_states()[0], None)
+        self.assertEqual(self._stored_states()[0], {'a': 1})
+
+    def test_inactive(self):
+        with write_behind_user_state(active=False):
+            self.client.set_many(self.user.username, {self.usage_keys[0]: {'a': 1}})
+            self.assertEqual(self._stored_states()[0], {'a': 1})
+
+    def test_flushed_on_error(self):
+        with self.assertRaises(ValueError):
+            with write_behind_user_state():
+                self.client.set_many(self.user.username, {self.usage_keys[0]: {'a': 1}})
+                raise ValueError
+        self.assertEqual(self._stored_states()[0], {'a': 1})
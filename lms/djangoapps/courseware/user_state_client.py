@@ -5,20 +5,26 @@ data in a Django ORM model.
 
 import itertools
 import logging
+from collections import OrderedDict
+from contextlib import contextmanager
 from operator import attrgetter
 from time import time
 
+from django.apps import apps
 from django.conf import settings
 from django.core.paginator import Paginator
 from django.contrib.auth.models import User
 from django.db import transaction
+from django.db.models import Case, TextField, Value, When
 from django.db.utils import IntegrityError
+from django.utils import timezone
 from edx_user_state_client.interface import XBlockUserState, XBlockUserStateClient
 from xblock.fields import Scope
 
 import dogstats_wrapper as dog_stats_api
-from courseware.models import BaseStudentModuleHistory, StudentModule
+from courseware.models import STUDENT_MODULES_BULK_SAVED, BaseStudentModuleHistory, StudentModule, chunks
 from openedx.core.djangoapps import monitoring_utils
+from openedx.core.djangoapps.request_cache import get_cache
 
 try:
     import simplejson as json
@@ -28,6 +34,12 @@ except ImportError:
 
 log = logging.getLogger(__name__)
 
+# Request cache namespace of the buffer of write_behind_user_state.
+_WRITE_BUFFER_CACHE_NAMESPACE = 'courseware.user_state_client.write_buffer'
+
+# The number of rows updated by each query when saving buffered user state.
+BUFFERED_UPDATE_CHUNK_SIZE = 100
+
 
 class DjangoXBlockUserStateClient(XBlockUserStateClient):
     """
@@ -105,6 +117,35 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
                 usage_key = student_module.module_state_key.map_into_course(student_module.course_id)
                 yield (student_module, usage_key)
 
+    def _get_student_modules_for_users(self, user_block_keys):
+        """
+        Retrieve the :class:`~StudentModule`s for the supplied ``user_block_keys``.
+
+        Arguments:
+            user_block_keys (list of (int, :class:`~UsageKey`)): The (user id, usage key)
+                pairs to load `StudentModule`s for.
+        """
+        user_block_keys = set(user_block_keys)
+        course_key_func = lambda user_block_key: user_block_key[1].course_key
+        by_course = itertools.groupby(
+            sorted(user_block_keys, key=course_key_func),
+            course_key_func,
+        )
+
+        for course_key, course_user_block_keys in by_course:
+            user_ids, usage_keys = zip(*course_user_block_keys)
+            query = StudentModule.objects.chunked_filter(
+                'module_state_key__in',
+                list(set(usage_keys)),
+                student_id__in=list(set(user_ids)),
+                course_id=course_key,
+            )
+
+            for student_module in query:
+                usage_key = student_module.module_state_key.map_into_course(student_module.course_id)
+                if (student_module.student_id, usage_key) in user_block_keys:
+                    yield (student_module, usage_key)
+
     def _ddog_increment(self, evt_time, evt_name):
         """
         DataDog increment method.
@@ -171,6 +212,62 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         """
         self._nr_block_stat_accumulate(function_name, block_type, stat_name, count)
 
+    def _report_set_many_block(  # pylint: disable=too-many-arguments
+            self, evt_time, usage_key, state, stored_state, created, num_fields_before, num_fields_after
+    ):
+        """
+        DataDog and New Relic reporting for a block saved by set_many.
+
+        Arguments:
+            evt_time: The time at which saving the blocks started.
+            usage_key: The usage key of the saved block.
+            state (dict): The state that was set on the block.
+            stored_state (str): The serialized state that was stored for the block.
+            created (bool): Whether the block's row was created.
+            num_fields_before (int): The number of stored fields before the block was saved.
+            num_fields_after (int): The number of stored fields after the block was saved.
+        """
+        # record the size of state modifications
+        self._nr_block_stat_accumulate('set_many', usage_key.block_type, 'size', len(stored_state))
+
+        # Record whether a state row has been created or updated.
+        if created:
+            self._ddog_increment(evt_time, 'set_many.state_created')
+            self._nr_block_stat_increment('set_many', usage_key.block_type, 'blocks_created')
+        else:
+            self._ddog_increment(evt_time, 'set_many.state_updated')
+            self._nr_block_stat_increment('set_many', usage_key.block_type, 'blocks_updated')
+
+        # Event to record number of fields sent in to set/set_many.
+        self._ddog_histogram(evt_time, 'set_many.fields_in', len(state))
+
+        # Event to record number of new fields set in set/set_many.
+        num_new_fields_set = num_fields_after - num_fields_before
+        self._ddog_histogram(evt_time, 'set_many.fields_set', num_new_fields_set)
+
+        # Event to record number of existing fields updated in set/set_many.
+        num_fields_updated = max(0, len(state) - num_new_fields_set)
+        self._ddog_histogram(evt_time, 'set_many.fields_updated', num_fields_updated)
+
+    def _report_set_many_totals(self, evt_time, num_blocks):
+        """
+        DataDog and New Relic reporting for an entire set_many call.
+        """
+        finish_time = time()
+        duration = (finish_time - evt_time) * 1000  # milliseconds
+        self._ddog_histogram(evt_time, 'set_many.blks_updated', num_blocks)
+        self._ddog_histogram(evt_time, 'set_many.response_time', duration)
+        self._nr_stat_accumulate('set_many', 'duration', duration)
+
+    def _flush_write_buffer(self):
+        """
+        Saves the user state buffered by :func:`write_behind_user_state`, if any, so
+        that it can be read.
+        """
+        write_buffer = _current_write_buffer()
+        if write_buffer is not None:
+            write_buffer.flush()
+
     def get_many(self, username, block_keys, scope=Scope.user_state, fields=None):
         """
         Retrieve the stored XBlock state for the specified XBlock usages.
@@ -188,6 +285,8 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported, not {}".format(scope))
 
+        self._flush_write_buffer()
+
         total_block_count = 0
         evt_time = time()
 
@@ -270,6 +369,42 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
             # what we have.
             return
 
+        write_buffer = _current_write_buffer()
+        if write_buffer is not None:
+            self._ddog_histogram(time(), 'set_many.blks_buffered', len(block_keys_to_state))
+            write_buffer.add(user, block_keys_to_state)
+            return
+
+        self._set_many(user, block_keys_to_state)
+
+    def set_many_for_users(self, users, block_states):
+        """
+        Set fields for the XBlocks of many users at once.  The states are saved
+        with the bulk queries used to save the state buffered by
+        :func:`write_behind_user_state`, or are buffered if it is active.
+
+        Arguments:
+            users (dict): A dict mapping user ids to the users whose states are saved.
+            block_states (OrderedDict): A dict mapping (user id, UsageKey) pairs to
+                state dicts, which are overlaid over the stored state.
+        """
+        # count how many times this function gets called
+        self._nr_stat_increment('set_many', 'calls')
+
+        write_buffer = _current_write_buffer()
+        if write_buffer is not None:
+            self._ddog_histogram(time(), 'set_many.blks_buffered', len(block_states))
+            for (user_id, usage_key), state in block_states.iteritems():
+                write_buffer.add(users[user_id], {usage_key: state})
+            return
+
+        self._set_many_buffered(users, block_states)
+
+    def _set_many(self, user, block_keys_to_state):
+        """
+        Saves the given states of the given user's blocks, with a find_or_create
+        and a save of each block's :class:`~StudentModule`.
+        """
         evt_time = time()
 
         for usage_key, state in block_keys_to_state.items():
@@ -293,8 +428,7 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
                 ))
                 return
 
-            num_fields_before = num_fields_after = num_new_fields_set = len(state)
-            num_fields_updated = 0
+            num_fields_before = num_fields_after = len(state)
             if not created:
                 if student_module.state is None:
                     current_state = {}
@@ -319,35 +453,117 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
                     ))
 
             # DataDog and New Relic reporting
+            self._report_set_many_block(
+                evt_time, usage_key, state, student_module.state, created, num_fields_before, num_fields_after,
+            )
 
-            # record the size of state modifications
-            self._nr_block_stat_accumulate('set_many', usage_key.block_type, 'size', len(student_module.state))
+        # Events for the entire set_many call.
+        self._report_set_many_totals(evt_time, len(block_keys_to_state))
 
-            # Record whether a state row has been created or updated.
-            if created:
-                self._ddog_increment(evt_time, 'set_many.state_created')
-                self._nr_block_stat_increment('set_many', usage_key.block_type, 'blocks_created')
+    def _set_many_buffered(self, users, block_states):
+        """
+        Saves the states buffered by :func:`write_behind_user_state` with bulk queries:
+        the existing :class:`~StudentModule`s are read with chunked queries, updated
+        with one UPDATE per chunk of rows and the missing ones are created with a bulk
+        INSERT.  The history entries of the saved rows are then created with a bulk
+        INSERT by the receivers of :data:`~courseware.models.STUDENT_MODULES_BULK_SAVED`,
+        instead of by the post_save receivers of each row.
+
+        As with :meth:`set_many`, the rows are read again before they are updated so
+        that scores changed by some other piece of the code are not overwritten.
+
+        Arguments:
+            users (dict): A dict mapping user ids to the users whose states are saved.
+            block_states (OrderedDict): A dict mapping (user id, UsageKey) pairs to
+                state dicts, which are overlaid over the stored state.
+        """
+        evt_time = time()
+        self._nr_stat_increment('set_many', 'buffered_flushes')
+
+        student_modules = {
+            (student_module.student_id, usage_key): student_module
+            for student_module, usage_key in self._get_student_modules_for_users(block_states)
+        }
+
+        modified = timezone.now()
+        updated_modules = []
+        new_modules = []
+        num_fields = {}  # (user id, UsageKey) -> number of stored fields before and after the update
+        for user_block_key, state in block_states.iteritems():
+            student_module = student_modules.get(user_block_key)
+            if student_module is None:
+                user_id, usage_key = user_block_key
+                new_modules.append(StudentModule(
+                    student_id=user_id,
+                    course_id=usage_key.course_key,
+                    module_state_key=usage_key,
+                    module_type=usage_key.block_type,
+                    state=json.dumps(state),
+                ))
+                num_fields[user_block_key] = (len(state), len(state))
             else:
-                self._ddog_increment(evt_time, 'set_many.state_updated')
-                self._nr_block_stat_increment('set_many', usage_key.block_type, 'blocks_updated')
+                current_state = {} if student_module.state is None else json.loads(student_module.state)
+                num_fields_before = len(current_state)
+                current_state.update(state)
+                num_fields[user_block_key] = (num_fields_before, len(current_state))
+                student_module.state = json.dumps(current_state)
+                student_module.modified = modified
+                updated_modules.append(student_module)
+
+        with transaction.atomic():
+            for chunk in chunks(updated_modules, BUFFERED_UPDATE_CHUNK_SIZE):
+                StudentModule.objects.filter(pk__in=[student_module.pk for student_module in chunk]).update(
+                    state=Case(
+                        *[When(pk=student_module.pk, then=Value(student_module.state)) for student_module in chunk],
+                        output_field=TextField()
+                    ),
+                    modified=modified,
+                )
 
-            # Event to record number of fields sent in to set/set_many.
-            self._ddog_histogram(evt_time, 'set_many.fields_in', len(state))
+            try:
+                with transaction.atomic():
+                    StudentModule.objects.bulk_create(new_modules)
+            except IntegrityError:
+                # Some of the rows have been created by another process since they
+                # were read. Save these blocks one at a time instead.
+                log.warning("set_many: IntegrityError when creating {} buffered block states".format(
+                    len(new_modules)
+                ))
+                conflicting_modules, new_modules = new_modules, []
+            else:
+                conflicting_modules = []
 
-            # Event to record number of new fields set in set/set_many.
-            num_new_fields_set = num_fields_after - num_fields_before
-            self._ddog_histogram(evt_time, 'set_many.fields_set', num_new_fields_set)
+        for student_module in conflicting_modules:
+            user_block_key = (student_module.student_id, student_module.module_state_key)
+            self._set_many(users[student_module.student_id], {user_block_key[1]: block_states[user_block_key]})
 
-            # Event to record number of existing fields updated in set/set_many.
-            num_fields_updated = max(0, len(state) - num_new_fields_set)
-            self._ddog_histogram(evt_time, 'set_many.fields_updated', num_fields_updated)
+        # Read the created rows back, as bulk_create does not set their ids.
+        created_modules = {
+            (student_module.student_id, usage_key): student_module
+            for student_module, usage_key in self._get_student_modules_for_users(
+                (student_module.student_id, student_module.module_state_key) for student_module in new_modules
+            )
+        }
 
-        # Events for the entire set_many call.
-        finish_time = time()
-        duration = (finish_time - evt_time) * 1000  # milliseconds
-        self._ddog_histogram(evt_time, 'set_many.blks_updated', len(block_keys_to_state))
-        self._ddog_histogram(evt_time, 'set_many.response_time', duration)
-        self._nr_stat_accumulate('set_many', 'duration', duration)
+        # The bulk queries don't send post_save, so tell its receivers that save
+        # the history of the rows about all of the saved rows at once.
+        STUDENT_MODULES_BULK_SAVED.send(
+            sender=StudentModule, student_modules=updated_modules + created_modules.values()
+        )
+
+        # DataDog and New Relic reporting
+        for user_block_key, student_module in itertools.chain(student_modules.iteritems(), created_modules.iteritems()):
+            num_fields_before, num_fields_after = num_fields[user_block_key]
+            self._report_set_many_block(
+                evt_time,
+                user_block_key[1],
+                block_states[user_block_key],
+                student_module.state,
+                user_block_key in created_modules,
+                num_fields_before,
+                num_fields_after,
+            )
+        self._report_set_many_totals(evt_time, len(block_states))
 
     def delete_many(self, username, block_keys, scope=Scope.user_state, fields=None):
         """
@@ -362,6 +578,8 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
 
+        self._flush_write_buffer()
+
         evt_time = time()
         if fields is None:
             self._ddog_increment(evt_time, 'delete_many.empty_state')
@@ -408,6 +626,9 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
 
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
+
+        self._flush_write_buffer()
+
         student_modules = list(
             student_module
             for student_module, usage_id
@@ -459,6 +680,8 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
 
+        self._flush_write_buffer()
+
         results = StudentModule.objects.order_by('id').filter(module_state_key=block_key)
         p = Paginator(results, settings.USER_STATE_BATCH_SIZE)
 
@@ -491,6 +714,8 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
 
+        self._flush_write_buffer()
+
         results = StudentModule.objects.order_by('id').filter(course_id=course_key)
         if block_type:
             results = results.filter(module_type=block_type)
@@ -507,3 +732,67 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
                     continue
 
                 yield XBlockUserState(sm.student.username, sm.module_state_key, state, sm.modified, scope)
+
+
+@contextmanager
+def write_behind_user_state(active=True):
+    """
+    Context manager that buffers the user state saved with
+    :meth:`DjangoXBlockUserStateClient.set_many` within it, and saves it when
+    it exits, with bulk queries.  The writes to each block are coalesced, so
+    that each block's row and history are written once.
+
+    Reading, deleting or iterating over user state within the context first
+    saves the buffered state, so that readers see their own writes.  Nested
+    contexts share the buffer of the outermost one.
+
+    Arguments:
+        active (bool): Whether to buffer the writes. If False, the writes are
+            saved immediately, as they are outside of the context.
+    """
+    request_cache = get_cache(_WRITE_BUFFER_CACHE_NAMESPACE)
+    if not active or 'write_buffer' in request_cache:
+        yield
+        return
+
+    write_buffer = request_cache['write_buffer'] = _UserStateWriteBuffer()
+    try:
+        yield
+    finally:
+        request_cache = get_cache(_WRITE_BUFFER_CACHE_NAMESPACE)
+        if request_cache.get('write_buffer') is write_buffer:
+            del request_cache['write_buffer']
+        write_buffer.flush()
+
+
+def _current_write_buffer():
+    """
+    Returns the buffer of the active :func:`write_behind_user_state` context, or None.
+    """
+    return get_cache(_WRITE_BUFFER_CACHE_NAMESPACE).get('write_buffer')
+
+
+class _UserStateWriteBuffer(object):
+    """
+    The user state buffered by :func:`write_behind_user_state`.
+    """
+    def __init__(self):
+        self.users = {}
+        self.block_states = OrderedDict()
+
+    def add(self, user, block_keys_to_state):
+        """
+        Overlays the given states of the given user's blocks over the buffered states.
+        """
+        self.users[user.id] = user
+        for usage_key, state in block_keys_to_state.iteritems():
+            self.block_states.setdefault((user.id, usage_key), {}).update(state)
+
+    def flush(self):
+        """
+        Saves the buffered states, and empties the buffer.
+        """
+        if self.block_states:
+            block_states, self.block_states = self.block_states, OrderedDict()
+            client = DjangoXBlockUserStateClient()
+            client._set_many_buffered(self.users, block_states)  # pylint: disable=protected-access
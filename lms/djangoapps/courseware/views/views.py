@@ -114,6 +114,10 @@ log = logging.getLogger("edx.courseware")
 # credit and verified modes.
 REQUIREMENTS_DISPLAY_MODES = CourseMode.CREDIT_MODES + [CourseMode.VERIFIED]
 
+# The content fields read when rendering a block's descendants, whose definitions
+# are loaded in bulk by render_xblock.
+RENDER_XBLOCK_PREFETCH_FIELDS = ('data',)
+
 CertData = namedtuple(
     "CertData", ["cert_status", "title", "msg", "download_url", "cert_web_view_url"]
 )
@@ -1466,7 +1470,8 @@ def render_xblock(request, usage_key_string, check_if_enrolled=True):
 
         # get the block, which verifies whether the user has access to the block.
         block, _ = get_module_by_usage_id(
-            request, text_type(course_key), text_type(usage_key), disable_staff_debug_info=True, course=course
+            request, text_type(course_key), text_type(usage_key), disable_staff_debug_info=True, course=course,
+            prefetch_fields=RENDER_XBLOCK_PREFETCH_FIELDS,
         )
 
         student_view_context = request.GET.dict()
@@ -0,0 +1,23 @@
+"""
+This module contains various configuration settings via
+waffle flags for the Courseware app.
+"""
+from openedx.core.djangoapps.waffle_utils import CourseWaffleFlag, WaffleFlagNamespace
+
+# Namespace
+WAFFLE_NAMESPACE = u'courseware'
+
+# Course Flags
+BUFFER_USER_STATE_WRITES = u'buffer_user_state_writes'
+
+
+def waffle_flags():
+    """
+    Returns the namespaced, cached, audited Waffle flags dictionary for Courseware.
+    """
+    namespace = WaffleFlagNamespace(name=WAFFLE_NAMESPACE, log_prefix=u'Courseware: ')
+    return {
+        # Buffers the user state written by XBlock handlers, and writes it
+        # with bulk queries once the handler returns.
+        BUFFER_USER_STATE_WRITES: CourseWaffleFlag(namespace, BUFFER_USER_STATE_WRITES),
+    }
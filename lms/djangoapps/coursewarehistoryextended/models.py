@@ -16,7 +16,7 @@ from django.db import models
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from courseware.models import BaseStudentModuleHistory, StudentModule
+from courseware.models import STUDENT_MODULES_BULK_SAVED, BaseStudentModuleHistory, StudentModule
 from coursewarehistoryextended.fields import UnsignedBigIntAutoField
 
 
@@ -44,15 +44,18 @@ class StudentModuleHistoryExtended(BaseStudentModuleHistory):
         StudentModuleHistoryExtended entry if the module_type is one that
         we save.
         """
-        if instance.module_type in StudentModuleHistoryExtended.HISTORY_SAVING_TYPES:
-            history_entry = StudentModuleHistoryExtended(student_module=instance,
-                                                         version=None,
-                                                         created=instance.modified,
-                                                         state=instance.state,
-                                                         grade=instance.grade,
-                                                         max_grade=instance.max_grade)
+        history_entry = StudentModuleHistoryExtended.history_entry(instance)
+        if history_entry is not None:
             history_entry.save()
 
+    @receiver(STUDENT_MODULES_BULK_SAVED, sender=StudentModule)
+    def save_bulk_history(sender, student_modules, **kwargs):  # pylint: disable=no-self-argument, unused-argument
+        """
+        Saves the StudentModuleHistoryExtended entries of StudentModules saved
+        with bulk queries, as save_history does for each saved StudentModule.
+        """
+        StudentModuleHistoryExtended.bulk_save_history(student_modules)
+
     @receiver(post_delete, sender=StudentModule)
     def delete_history(sender, instance, **kwargs):  # pylint: disable=no-self-argument, unused-argument
         """
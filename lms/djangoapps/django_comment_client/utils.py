@@ -14,7 +14,7 @@ from opaque_keys.edx.locations import i4xEncoder
 from six import text_type
 
 from courseware import courses
-from courseware.access import has_access
+from courseware.access import has_access, has_access_many
 from django_comment_client.constants import TYPE_ENTRY, TYPE_SUBCATEGORY
 from django_comment_client.permissions import check_permissions_by_view, get_team, has_permission
 from django_comment_client.settings import MAX_COMMENT_DEPTH
@@ -131,11 +131,12 @@ def get_accessible_discussion_xblocks_by_course_id(course_id, user=None, include
     Checks for the given user's access if include_all is False.
     """
     all_xblocks = modulestore().get_items(course_id, qualifiers={'category': 'discussion'}, include_orphans=False)
+    xblocks = [xblock for xblock in all_xblocks if has_required_keys(xblock)]
+    if include_all:
+        return xblocks
 
-    return [
-        xblock for xblock in all_xblocks
-        if has_required_keys(xblock) and (include_all or has_access(user, 'load', xblock, course_id))
-    ]
+    access = has_access_many(user, 'load', xblocks, course_id)
+    return [xblock for xblock in xblocks if access[xblock.location]]
 
 
 def get_discussion_id_map_entry(xblock):
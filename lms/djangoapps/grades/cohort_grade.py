@@ -0,0 +1,158 @@
+"""
+Vectorized computation of the grades of a cohort of learners.
+
+These functions compute, with NumPy, the same values as the SubsectionGrade
+and CourseGrade classes, but for a whole cohort of learners in one pass over
+(learners x problems) and (learners x subsections) score matrices, instead of
+one learner's score objects at a time.  The results are exactly equal to
+those computed by the grade classes.
+"""
+import numpy
+
+from xmodule.graders import aggregate_score_matrices
+
+from .course_grade import CourseGradeBase
+
+
+def problem_score_matrices(problem_scores_by_learner, problem_locations):
+    """
+    Returns a tuple (earned, possible, graded) for the given problems, where
+    earned and possible are (learners x problems) arrays of the learners'
+    weighted scores and graded is a list of whether each problem is graded.
+
+    Arguments:
+        problem_scores_by_learner: A list of dicts, one per learner, of each
+            problem's location to the learner's ProblemScore.
+        problem_locations: The locations of the problems, in order.
+    """
+    num_learners = len(problem_scores_by_learner)
+    earned = numpy.zeros((num_learners, len(problem_locations)))
+    possible = numpy.zeros((num_learners, len(problem_locations)))
+    graded = [False] * len(problem_locations)
+    for learner_index, problem_scores in enumerate(problem_scores_by_learner):
+        for problem_index, location in enumerate(problem_locations):
+            problem_score = problem_scores.get(location)
+            if problem_score is not None:
+                earned[learner_index, problem_index] = problem_score.earned
+                possible[learner_index, problem_index] = problem_score.possible
+                graded[problem_index] = problem_score.graded
+    return earned, possible, graded
+
+
+def subsection_totals(earned, possible, graded):
+    """
+    Returns a tuple (all_earned, all_possible, graded_earned, graded_possible)
+    of arrays of each learner's all_total and graded_total values for a
+    subsection, from the matrices returned by problem_score_matrices for
+    the problems in the subsection.
+    """
+    return aggregate_score_matrices(earned, possible, graded)
+
+
+def subsection_percents(graded_earned, graded_possible):
+    """
+    Returns an array of each learner's percent_graded for a subsection,
+    from the learners' graded totals of the subsection.
+    """
+    graded_earned = numpy.asarray(graded_earned, dtype=float)
+    graded_possible = numpy.asarray(graded_possible, dtype=float)
+    has_possible = graded_possible > 0
+    percents = numpy.zeros(graded_earned.shape)
+    percents[has_possible] = numpy.around(graded_earned[has_possible] / graded_possible[has_possible], decimals=2)
+    return percents
+
+
+def course_percents(course, subsection_formats, graded_earned, graded_possible):
+    """
+    Returns an array of each learner's CourseGrade percent.
+
+    Arguments:
+        course: The course whose grader is used.
+        subsection_formats: The formats of the graded subsections of the
+            course, in course order.
+        graded_earned, graded_possible: (learners x subsections) arrays of
+            the graded totals of the learners for those subsections.
+    """
+    graded_earned = numpy.asarray(graded_earned, dtype=float)
+    graded_possible = numpy.asarray(graded_possible, dtype=float)
+    num_learners = graded_earned.shape[0]
+    percents = subsection_percents(graded_earned, graded_possible)
+
+    percents_by_type = {}
+    for section_format in set(subsection_formats):
+        columns = [
+            index for index, subsection_format in enumerate(subsection_formats)
+            if subsection_format == section_format
+        ]
+        percents_by_type[section_format] = _grade_sheet_percents(
+            percents[:, columns], graded_possible[:, columns] > 0,
+        )
+
+    course = CourseGradeBase._prep_course_for_grading(course)  # pylint: disable=protected-access
+    grader_percents = course.grader.grade_cohort(percents_by_type, num_learners)
+
+    # Rounds as CourseGrade._compute_percent does, with Python's rounding
+    # of halves away from zero (grader percents are never negative).
+    shifted_percents = grader_percents * 100 + 0.05
+    rounded_percents = numpy.floor(shifted_percents)
+    rounded_percents += (shifted_percents - rounded_percents) >= 0.5
+    return rounded_percents / 100
+
+
+def course_grade_percents(course, course_grades):
+    """
+    Returns an array of the percents of the given CourseGrades of learners
+    in the course, as CourseGrade.update computes them from the graded
+    subsections of each CourseGrade, but with course_percents.
+
+    Note that this computes the graded_subsections_by_format of each
+    CourseGrade, and thereby its subsection grades.
+    """
+    if not course_grades:
+        return numpy.zeros(0)
+
+    # The learners' course structures are all transformed from the same
+    # collected structure, so the subsections in each learner's grade
+    # sheet are in the order of the collected structure.
+    course_data = course_grades[0].course_data
+    subsection_indices = {}
+    for chapter_key in course_data.collected_structure.get_children(course_data.location):
+        for subsection_key in course_data.collected_structure.get_children(chapter_key):
+            subsection_indices.setdefault(subsection_key, len(subsection_indices))
+
+    columns = sorted(
+        {
+            (subsection_format, location)
+            for course_grade in course_grades
+            for subsection_format, subsection_grades in course_grade.graded_subsections_by_format.iteritems()
+            for location in subsection_grades
+        },
+        key=lambda column: subsection_indices[column[1]],
+    )
+    graded_earned = numpy.zeros((len(course_grades), len(columns)))
+    graded_possible = numpy.zeros((len(course_grades), len(columns)))
+    for learner_index, course_grade in enumerate(course_grades):
+        for column_index, (subsection_format, location) in enumerate(columns):
+            subsection_grade = course_grade.graded_subsections_by_format.get(subsection_format, {}).get(location)
+            if subsection_grade is not None:
+                graded_earned[learner_index, column_index] = subsection_grade.graded_total.earned
+                graded_possible[learner_index, column_index] = subsection_grade.graded_total.possible
+
+    return course_percents(
+        course, [subsection_format for subsection_format, _ in columns], graded_earned, graded_possible,
+    )
+
+
+def _grade_sheet_percents(percents, present):
+    """
+    Returns the given (learners x subsections) percents of the subsections
+    of a format, with only the subsections that are present in each
+    learner's grade sheet (those with a positive graded possible value),
+    in order, followed by NaN padding.
+    """
+    num_learners = percents.shape[0]
+    rows = numpy.arange(num_learners)[:, numpy.newaxis]
+    # A stable sort moves each learner's present subsections first,
+    # keeping them in course order.
+    order = numpy.argsort(~present, axis=1, kind='mergesort')
+    return numpy.where(present[rows, order], percents[rows, order], numpy.nan)
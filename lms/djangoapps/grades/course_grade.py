@@ -245,11 +245,15 @@ class CourseGrade(CourseGradeBase):
         super(CourseGrade, self).__init__(user, course_data, *args, **kwargs)
         self._subsection_grade_factory = SubsectionGradeFactory(user, course_data=course_data)
 
-    def update(self):
+    def update(self, percent=None):
         """
         Updates the grade for the course. Also updates subsection grades
         if self.force_update_subsections is true, via the lazy call
         to self.grader_result.
+
+        If the percent is given, as computed for a cohort of learners by
+        cohort_grade.course_grade_percents, the grader isn't run, and the
+        subsection grades must have been computed already.
         """
         # TODO update this code to be more functional and readable.
         # Currently, it is hard to follow since there are plenty of
@@ -257,7 +261,7 @@ class CourseGrade(CourseGradeBase):
         # can be passed through and not confusingly stored and used
         # at a later time.
         grade_cutoffs = self.course_data.course.grade_cutoffs
-        self.percent = self._compute_percent(self.grader_result)
+        self.percent = self._compute_percent(self.grader_result) if percent is None else percent
         self.letter_grade = self._compute_letter_grade(grade_cutoffs, self.percent)
         self.passed = self._compute_passed(grade_cutoffs, self.percent)
         return self
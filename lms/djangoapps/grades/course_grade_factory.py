@@ -2,17 +2,21 @@
 Course Grade Factory Class
 """
 from collections import namedtuple
+from itertools import islice
 from logging import getLogger
 
 import dogstats_wrapper as dog_stats_api
+from django.conf import settings
 from six import text_type
 
 from openedx.core.djangoapps.signals.signals import COURSE_GRADE_CHANGED, COURSE_GRADE_NOW_PASSED
 
+from .cohort_grade import course_grade_percents
 from .config import assume_zero_if_absent, should_persist_grades
 from .course_data import CourseData
 from .course_grade import CourseGrade, ZeroCourseGrade
-from .models import PersistentCourseGrade, prefetch
+from .models import PersistentCourseGrade, PersistentSubsectionGrade, prefetch
+from .subsection_grade_factory import SubsectionGradeFactory
 
 log = getLogger(__name__)
 
@@ -23,6 +27,9 @@ class CourseGradeFactory(object):
     """
     GradeResult = namedtuple('GradeResult', ['student', 'course_grade', 'error'])
 
+    # Number of students whose grading data is loaded together by bulk_iter.
+    BULK_ITER_BATCH_SIZE = 100
+
     def read(
             self,
             user,
@@ -106,6 +113,70 @@ class CourseGradeFactory(object):
             with dog_stats_api.timer('lms.grades.CourseGradeFactory.iter', tags=stats_tags):
                 yield self._iter_grade_result(user, course_data, force_update)
 
+    def bulk_iter(
+            self,
+            users,
+            course=None,
+            collected_block_structure=None,
+            course_key=None,
+            force_update=False,
+    ):
+        """
+        Given a course and an iterable of students (User), yield a GradeResult
+        for every student enrolled in the course, as iter does.
+
+        Students are graded in batches of BULK_ITER_BATCH_SIZE against the
+        same collected course structure.  The persisted course and subsection
+        grades and the scores stored in the user state (in CSM) of all the
+        students in a batch are loaded in a few queries, rather than a few
+        queries per student.  When the grades are updated, the course
+        percents of all the students in a batch are computed together.
+        """
+        course_data = CourseData(
+            user=None, course=course, collected_block_structure=collected_block_structure, course_key=course_key,
+        )
+        stats_tags = [u'action:{}'.format(course_data.course_key)]
+        users = iter(users)
+        while True:
+            batch = list(islice(users, self.BULK_ITER_BATCH_SIZE))
+            if not batch:
+                break
+
+            with dog_stats_api.timer('lms.grades.CourseGradeFactory.bulk_iter.prefetch', tags=stats_tags):
+                self._bulk_prefetch(batch, course_data)
+            try:
+                if force_update:
+                    with dog_stats_api.timer('lms.grades.CourseGradeFactory.bulk_iter.update', tags=stats_tags):
+                        results = self._bulk_update(batch, course_data)
+                    for result in results:
+                        yield result
+                else:
+                    for user in batch:
+                        with dog_stats_api.timer('lms.grades.CourseGradeFactory.iter', tags=stats_tags):
+                            yield self._iter_grade_result(user, course_data, force_update)
+            finally:
+                self._bulk_clear_prefetched(batch, course_data)
+
+    @staticmethod
+    def _bulk_prefetch(users, course_data):
+        """
+        Prefetches the grading data of the given users for the course.
+        """
+        if should_persist_grades(course_data.course_key):
+            PersistentCourseGrade.prefetch(course_data.course_key, users)
+            PersistentSubsectionGrade.prefetch(course_data.course_key, users)
+        SubsectionGradeFactory.prefetch_csm_scores(course_data.course_key, users, course_data.collected_structure)
+
+    @staticmethod
+    def _bulk_clear_prefetched(users, course_data):
+        """
+        Clears the grading data prefetched by _bulk_prefetch, so that it
+        isn't used after the users' grades are computed.
+        """
+        PersistentCourseGrade.clear_prefetched_data(course_data.course_key)
+        PersistentSubsectionGrade.clear_prefetched_data(course_data.course_key, users)
+        SubsectionGradeFactory.clear_prefetched_csm_scores()
+
     def _iter_grade_result(self, user, course_data, force_update):
         try:
             kwargs = {
@@ -121,15 +192,68 @@ class CourseGradeFactory(object):
             course_grade = method(**kwargs)
             return self.GradeResult(user, course_grade, None)
         except Exception as exc:  # pylint: disable=broad-except
-            # Keep marching on even if this student couldn't be graded for
-            # some reason, but log it for future reference.
-            log.exception(
-                'Cannot grade student %s in course %s because of exception: %s',
-                user.id,
-                course_data.course_key,
-                text_type(exc)
-            )
-            return self.GradeResult(user, None, exc)
+            return self._error_result(user, course_data, exc)
+
+    def _bulk_update(self, users, course_data):
+        """
+        Computes, saves, and returns the GradeResults of the given users,
+        whose grading data was prefetched by bulk_iter.  The subsection
+        grades are updated one user at a time, but the course percents of
+        all the users are computed together, by course_grade_percents.
+        """
+        results = [None] * len(users)
+        updated = []
+        for index, user in enumerate(users):
+            try:
+                course_grade = CourseGrade(
+                    user,
+                    CourseData(
+                        user,
+                        course=course_data.course,
+                        collected_block_structure=course_data.collected_structure,
+                        course_key=course_data.course_key,
+                    ),
+                    force_update_subsections=True,
+                )
+                # Updates the user's subsection grades.
+                course_grade.graded_subsections_by_format  # pylint: disable=pointless-statement
+                updated.append((index, course_grade))
+            except Exception as exc:  # pylint: disable=broad-except
+                results[index] = self._error_result(user, course_data, exc)
+
+        course_grades = [course_grade for _, course_grade in updated]
+        percents = [None] * len(course_grades)
+        if not settings.GENERATE_PROFILE_SCORES:
+            try:
+                percents = [float(percent) for percent in course_grade_percents(course_data.course, course_grades)]
+            except NotImplementedError:
+                # The course's grader can't grade a cohort of users, so each
+                # user's percent is computed by the grader as usual.
+                pass
+
+        for (index, course_grade), percent in zip(updated, percents):
+            try:
+                course_grade.update(percent=percent)
+                self._save_updated(course_grade.user, course_grade.course_data, course_grade)
+                results[index] = self.GradeResult(course_grade.user, course_grade, None)
+            except Exception as exc:  # pylint: disable=broad-except
+                results[index] = self._error_result(course_grade.user, course_data, exc)
+        return results
+
+    def _error_result(self, user, course_data, exc):
+        """
+        Logs the given exception raised while grading the user, and returns
+        the GradeResult of the error.
+        """
+        # Keep marching on even if this student couldn't be graded for
+        # some reason, but log it for future reference.
+        log.exception(
+            'Cannot grade student %s in course %s because of exception: %s',
+            user.id,
+            course_data.course_key,
+            text_type(exc)
+        )
+        return self.GradeResult(user, None, exc)
 
     @staticmethod
     def _create_zero(user, course_data):
@@ -167,9 +291,7 @@ class CourseGradeFactory(object):
         Sends a COURSE_GRADE_CHANGED signal to listeners and a
         COURSE_GRADE_NOW_PASSED if learner has passed course.
         """
-        should_persist = should_persist_grades(course_data.course_key)
-
-        if should_persist and force_update_subsections:
+        if should_persist_grades(course_data.course_key) and force_update_subsections:
             prefetch(user, course_data.course_key)
 
         course_grade = CourseGrade(
@@ -178,8 +300,17 @@ class CourseGradeFactory(object):
             force_update_subsections=force_update_subsections
         )
         course_grade = course_grade.update()
+        return CourseGradeFactory._save_updated(user, course_data, course_grade)
 
-        should_persist = should_persist and course_grade.attempted
+    @staticmethod
+    def _save_updated(user, course_data, course_grade):
+        """
+        Saves the given updated CourseGrade of the user, along with its
+        unsaved subsection grades, if grades are persisted and the user
+        attempted the course, and sends the COURSE_GRADE_CHANGED and
+        COURSE_GRADE_NOW_PASSED signals.  Returns the CourseGrade.
+        """
+        should_persist = should_persist_grades(course_data.course_key) and course_grade.attempted
         if should_persist:
             course_grade._subsection_grade_factory.bulk_create_unsaved()
             PersistentCourseGrade.update_or_create(
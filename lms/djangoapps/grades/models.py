@@ -234,6 +234,16 @@ class VisibleBlocks(models.Model):
             user_id=user_id,
             course_id=course_key,
         )
+        return cls._initialize_cache_from_grades(user_id, course_key, grades_with_blocks)
+
+    @classmethod
+    def _initialize_cache_from_grades(cls, user_id, course_key, grades_with_blocks):
+        """
+        Stores the visible blocks of the given subsection grades, which must
+        have been fetched along with their visible blocks, in the cache for
+        the given user and course.  Returns a dictionary mapping hashes of
+        these block records to the block record objects.
+        """
         prefetched = {grade.visible_blocks.hashed: grade.visible_blocks for grade in grades_with_blocks}
         get_cache(cls._CACHE_NAMESPACE)[cls._cache_key(user_id, course_key)] = prefetched
         return prefetched
@@ -309,6 +319,8 @@ class PersistentSubsectionGrade(TimeStampedModel):
     visible_blocks = models.ForeignKey(VisibleBlocks, db_column='visible_blocks_hash', to_field='hashed',
                                        on_delete=models.CASCADE)
 
+    _CACHE_NAMESPACE = u"grades.models.PersistentSubsectionGrade"
+
     @property
     def full_usage_key(self):
         """
@@ -355,15 +367,53 @@ class PersistentSubsectionGrade(TimeStampedModel):
             usage_key=usage_key,
         )
 
+    @classmethod
+    def prefetch(cls, course_key, users):
+        """
+        Prefetches, in a single query, the grades of the given users for
+        the given course, along with their visible blocks and overrides.
+        The visible blocks and overrides caches of each user are
+        initialized with the prefetched data.
+        """
+        grades_by_user = {user.id: [] for user in users}
+        for grade in cls.objects.select_related('visible_blocks', 'override').filter(
+                user_id__in=list(grades_by_user),
+                course_id=course_key,
+        ):
+            grades_by_user[grade.user_id].append(grade)
+
+        grades_cache = get_cache(cls._CACHE_NAMESPACE)
+        for user_id, grades in grades_by_user.iteritems():
+            grades_cache[cls._cache_key(user_id, course_key)] = grades
+            VisibleBlocks._initialize_cache_from_grades(user_id, course_key, grades)
+            PersistentSubsectionGradeOverride.prefetch_from_grades(user_id, course_key, grades)
+
+    @classmethod
+    def clear_prefetched_data(cls, course_key, users):
+        """
+        Clears the grades prefetched, and not yet read, for the given
+        users for the given course.
+        """
+        grades_cache = get_cache(cls._CACHE_NAMESPACE)
+        for user in users:
+            grades_cache.pop(cls._cache_key(user.id, course_key), None)
+
     @classmethod
     def bulk_read_grades(cls, user_id, course_key):
         """
         Reads all grades for the given user and course.
 
+        Prefetched grades are returned, and removed from the cache, if
+        the grades were prefetched for the user and course, since the
+        cached values are not kept up to date with subsequent updates.
+
         Arguments:
             user_id: The user associated with the desired grades
             course_key: The course identifier for the desired grades
         """
+        prefetched = get_cache(cls._CACHE_NAMESPACE).pop(cls._cache_key(user_id, course_key), None)
+        if prefetched is not None:
+            return prefetched
         return cls.objects.select_related('visible_blocks', 'override').filter(
             user_id=user_id,
             course_id=course_key,
@@ -456,6 +506,10 @@ class PersistentSubsectionGrade(TimeStampedModel):
             if override.possible_graded_override is not None:
                 params['possible_graded'] = override.possible_graded_override
 
+    @classmethod
+    def _cache_key(cls, user_id, course_key):
+        return u"subsection_grades_cache.{}.{}".format(course_key, user_id)
+
     @staticmethod
     def _emit_grade_calculated_event(grade):
         events.subsection_grade_calculated(grade)
@@ -526,6 +580,13 @@ class PersistentCourseGrade(TimeStampedModel):
             cls.objects.filter(user_id__in=[user.id for user in users], course_id=course_id)
         }
 
+    @classmethod
+    def clear_prefetched_data(cls, course_id):
+        """
+        Clears the grades prefetched for the given course.
+        """
+        get_cache(cls._CACHE_NAMESPACE).pop(cls._cache_key(course_id), None)
+
     @classmethod
     def read(cls, user_id, course_id):
         """
@@ -618,6 +679,21 @@ class PersistentSubsectionGradeOverride(models.Model):
             cls.objects.filter(grade__user_id=user_id, grade__course_id=course_key)
         }
 
+    @classmethod
+    def prefetch_from_grades(cls, user_id, course_key, grades_with_overrides):
+        """
+        Stores the overrides of the given subsection grades, which must
+        have been fetched along with their overrides, in the cache for
+        the given user and course.
+        """
+        prefetched = {}
+        for grade in grades_with_overrides:
+            try:
+                prefetched[grade.usage_key] = grade.override
+            except cls.DoesNotExist:
+                pass
+        get_cache(cls._CACHE_NAMESPACE)[(user_id, str(course_key))] = prefetched
+
     @classmethod
     def get_override(cls, user_id, usage_key):
         prefetch_values = get_cache(cls._CACHE_NAMESPACE).get((user_id, str(usage_key.course_key)), None)
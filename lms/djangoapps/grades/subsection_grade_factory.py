@@ -7,6 +7,7 @@ from courseware.model_data import ScoresClient
 from lms.djangoapps.grades.config import assume_zero_if_absent, should_persist_grades
 from lms.djangoapps.grades.models import PersistentSubsectionGrade
 from lms.djangoapps.grades.scores import possibly_scored
+from openedx.core.djangoapps.request_cache import clear_cache, get_cache
 from openedx.core.lib.grade_utils import is_score_higher_or_equal
 from student.models import anonymous_id_for_user
 from submissions import api as submissions_api
@@ -21,6 +22,8 @@ class SubsectionGradeFactory(object):
     """
     Factory for Subsection Grades.
     """
+    _CSM_SCORES_CACHE_NAMESPACE = u"grades.subsection_grade_factory.csm_scores"
+
     def __init__(self, student, course=None, course_structure=None, course_data=None):
         self.student = student
         self.course_data = course_data or CourseData(student, course=course, structure=course_structure)
@@ -98,12 +101,37 @@ class SubsectionGradeFactory(object):
 
         return calculated_grade
 
+    @classmethod
+    def prefetch_csm_scores(cls, course_key, users, course_structure):
+        """
+        Queries, in a single query, the scores stored in the user state
+        (in CSM) for the given users in the course, for all the scorable
+        blocks in the given course structure.  The scores are used by
+        the factories of these users until clear_prefetched_csm_scores
+        is called.
+        """
+        scorable_locations = [block_key for block_key in course_structure if possibly_scored(block_key)]
+        scores_clients = ScoresClient.create_for_users(course_key, [user.id for user in users], scorable_locations)
+        cache = get_cache(cls._CSM_SCORES_CACHE_NAMESPACE)
+        for user_id, scores_client in scores_clients.iteritems():
+            cache[(user_id, course_key)] = scores_client
+
+    @classmethod
+    def clear_prefetched_csm_scores(cls):
+        """
+        Clears the scores cached by prefetch_csm_scores.
+        """
+        clear_cache(cls._CSM_SCORES_CACHE_NAMESPACE)
+
     @lazy
     def _csm_scores(self):
         """
         Lazily queries and returns all the scores stored in the user
         state (in CSM) for the course, while caching the result.
         """
+        prefetched = get_cache(self._CSM_SCORES_CACHE_NAMESPACE).get((self.student.id, self.course_data.course_key))
+        if prefetched is not None:
+            return prefetched
         scorable_locations = [block_key for block_key in self.course_data.structure if possibly_scored(block_key)]
         return ScoresClient.create_for_locations(self.course_data.course_key, self.student.id, scorable_locations)
 
@@ -0,0 +1,148 @@
+"""
+Tests for the vectorized cohort grade computations.
+"""
+import random
+from collections import OrderedDict
+from unittest import TestCase
+
+import ddt
+from mock import MagicMock
+from nose.plugins.attrib import attr
+from opaque_keys.edx.locator import CourseLocator
+
+from xmodule.graders import AggregatedScore, ProblemScore, aggregate_scores, grader_from_conf
+
+from ..cohort_grade import (
+    course_grade_percents,
+    course_percents,
+    problem_score_matrices,
+    subsection_percents,
+    subsection_totals
+)
+from ..course_data import CourseData
+from ..course_grade import CourseGrade
+from ..scores import compute_percent
+from .base import GradeTestBase
+from .utils import mock_get_score
+
+
+class MockSubsectionGrade(object):
+    """
+    Mock class for SubsectionGrade objects in a grade sheet.
+    """
+    def __init__(self, earned, possible):
+        self.graded_total = AggregatedScore(tw_earned=earned, tw_possible=possible, graded=True, first_attempted=None)
+        self.display_name = u'Subsection'
+
+    @property
+    def percent_graded(self):
+        return compute_percent(self.graded_total.earned, self.graded_total.possible)
+
+
+@attr(shard=1)
+@ddt.ddt
+class CohortGradeTest(TestCase):
+    """
+    Tests that the cohort grade computations match the grade objects.
+    """
+    GRADER_CONF = [
+        {'type': 'Homework', 'min_count': 4, 'drop_count': 2, 'weight': 0.3},
+        {'type': 'Lab', 'min_count': 2, 'drop_count': 0, 'weight': 0.2},
+        {'type': 'Exam', 'min_count': 1, 'drop_count': 0, 'weight': 0.5},
+    ]
+    NUM_LEARNERS = 30
+
+    def setUp(self):
+        super(CohortGradeTest, self).setUp()
+        self.random = random.Random(2)
+
+    def _random_score(self):
+        """
+        Returns a random (earned, possible) score, possibly with nothing possible.
+        """
+        possible = self.random.choice([0, 1, 2, 5, 7.5])
+        return self.random.uniform(0, possible), possible
+
+    def test_subsection_totals(self):
+        locations = [u'problem{}'.format(index) for index in range(6)]
+        problem_scores_by_learner = []
+        for _ in range(self.NUM_LEARNERS):
+            problem_scores = {}
+            for index, location in enumerate(locations):
+                if self.random.random() < 0.8:
+                    earned, possible = self._random_score()
+                    problem_scores[location] = ProblemScore(
+                        raw_earned=earned,
+                        raw_possible=possible,
+                        weighted_earned=earned,
+                        weighted_possible=possible,
+                        weight=None,
+                        graded=index % 3 != 0,
+                        first_attempted=None,
+                    )
+            problem_scores_by_learner.append(problem_scores)
+
+        all_earned, all_possible, graded_earned, graded_possible = subsection_totals(
+            *problem_score_matrices(problem_scores_by_learner, locations)
+        )
+        percents = subsection_percents(graded_earned, graded_possible)
+        for index, problem_scores in enumerate(problem_scores_by_learner):
+            ordered_scores = [problem_scores[location] for location in locations if location in problem_scores]
+            all_total, graded_total = aggregate_scores(ordered_scores)
+            self.assertEqual(all_earned[index], all_total.earned)
+            self.assertEqual(all_possible[index], all_total.possible)
+            self.assertEqual(graded_earned[index], graded_total.earned)
+            self.assertEqual(graded_possible[index], graded_total.possible)
+            self.assertEqual(percents[index], compute_percent(graded_total.earned, graded_total.possible))
+
+    @ddt.data(0, 3, 8)
+    def test_course_percents(self, num_homeworks):
+        subsection_formats = ['Homework'] * num_homeworks + ['Lab', 'Exam', 'Lab']
+        course = MagicMock(id=CourseLocator('org', 'course', 'run'), grader=grader_from_conf(self.GRADER_CONF))
+
+        scores = [
+            [self._random_score() for _ in subsection_formats]
+            for _ in range(self.NUM_LEARNERS)
+        ]
+        percents = course_percents(
+            course,
+            subsection_formats,
+            [[earned for earned, _ in learner_scores] for learner_scores in scores],
+            [[possible for _, possible in learner_scores] for learner_scores in scores],
+        )
+
+        for index, learner_scores in enumerate(scores):
+            grade_sheet = {}
+            for subsection_index, (earned, possible) in enumerate(learner_scores):
+                if possible > 0:
+                    grade_sheet.setdefault(subsection_formats[subsection_index], OrderedDict())[subsection_index] = (
+                        MockSubsectionGrade(earned, possible)
+                    )
+            expected_percent = CourseGrade._compute_percent(  # pylint: disable=protected-access
+                course.grader.grade(grade_sheet)
+            )
+            self.assertEqual(percents[index], expected_percent)
+
+
+@attr(shard=1)
+@ddt.ddt
+class CourseGradePercentsTest(GradeTestBase):
+    """
+    Tests that course_grade_percents matches the percents of CourseGrade objects.
+    """
+    @ddt.data(0, 1)
+    def test_course_grade_percents(self, drop_count):
+        self.grading_policy['GRADER'][0].update(min_count=3, drop_count=drop_count)
+        self.course.set_grading_policy(self.grading_policy)
+        self.store.update_item(self.course, 0)
+
+        course_grades, expected_percents = [], []
+        for earned, possible in [(0, 1), (1, 3), (1, 2), (2, 2), (0, 0)]:
+            with mock_get_score(earned, possible):
+                course_grade = CourseGrade(self.request.user, CourseData(self.request.user, course=self.course))
+                expected_percents.append(
+                    CourseGrade._compute_percent(course_grade.grader_result)  # pylint: disable=protected-access
+                )
+            course_grades.append(course_grade)
+
+        self.assertEqual(list(course_grade_percents(self.course, course_grades)), expected_percents)
@@ -4,6 +4,7 @@ from nose.plugins.attrib import attr
 import ddt
 import django
 from courseware.access import has_access
+from courseware.model_data import ScoresClient
 from django.conf import settings
 from lms.djangoapps.grades.config.tests.utils import persistent_grades_feature_flags
 from mock import patch
@@ -14,6 +15,7 @@ from student.tests.factories import UserFactory
 from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory
 
+from ..cohort_grade import course_grade_percents
 from ..config.waffle import ASSUME_ZERO_GRADE_IF_ABSENT, waffle
 from ..course_grade import CourseGrade, ZeroCourseGrade
 from ..course_grade_factory import CourseGradeFactory
@@ -152,6 +154,23 @@ class TestCourseGradeFactory(GradeTestBase):
                 self.assertFalse(mocked_get_score.called)  # no calls to CSM/submissions tables
                 self.assertFalse(mocked_course_blocks.called)  # no user-specific transformer calculation
 
+    @ddt.data((1, 2), (1, 3), (2, 2), (0, 0))
+    @ddt.unpack
+    def test_bulk_update_percent(self, earned, possible):
+        with patch(
+            'lms.djangoapps.grades.course_grade_factory.course_grade_percents',
+            wraps=course_grade_percents,
+        ) as mock_course_grade_percents:
+            with mock_get_score(earned, possible):
+                [result] = list(CourseGradeFactory().bulk_iter([self.request.user], self.course, force_update=True))
+
+        self.assertTrue(mock_course_grade_percents.called)
+        course_grade = result.course_grade
+        self.assertEqual(
+            course_grade.percent,
+            CourseGrade._compute_percent(course_grade.grader_result),  # pylint: disable=protected-access
+        )
+
     def test_subsection_grade(self):
         grade_factory = CourseGradeFactory()
         with mock_get_score(1, 2):
@@ -241,6 +260,7 @@ class TestCourseGradeFactory(GradeTestBase):
 
 
 @attr(shard=1)
+@ddt.ddt
 class TestGradeIteration(SharedModuleStoreTestCase):
     """
     Test iteration through student course grades.
@@ -295,6 +315,33 @@ class TestGradeIteration(SharedModuleStoreTestCase):
             self.assertIsNone(course_grade.letter_grade)
             self.assertEqual(course_grade.percent, 0.0)
 
+    @ddt.data(True, False)
+    def test_bulk_iter(self, force_update):
+        expected_grades = {
+            student: course_grade.percent
+            for student, course_grade, _ in CourseGradeFactory().iter(self.students, self.course)
+        }
+        with patch.object(CourseGradeFactory, 'BULK_ITER_BATCH_SIZE', 2):
+            with patch(
+                'lms.djangoapps.grades.subsection_grade_factory.ScoresClient.create_for_users',
+                wraps=ScoresClient.create_for_users,
+            ) as mock_create_for_users:
+                with patch(
+                    'lms.djangoapps.grades.subsection_grade_factory.ScoresClient.create_for_locations',
+                ) as mock_create_for_locations:
+                    grade_results = list(
+                        CourseGradeFactory().bulk_iter(self.students, self.course, force_update=force_update)
+                    )
+
+        self.assertEqual(mock_create_for_users.call_count, 3)
+        self.assertFalse(mock_create_for_locations.called)
+        self.assertEqual([result.student for result in grade_results], self.students)
+        self.assertTrue(all(result.error is None for result in grade_results))
+        self.assertEqual(
+            {result.student: result.course_grade.percent for result in grade_results},
+            expected_grades,
+        )
+
     @patch('lms.djangoapps.grades.course_grade_factory.CourseGradeFactory.read')
     def test_grading_exception(self, mock_course_grade):
         """Test that we correctly capture exception messages that bubble up from
@@ -408,9 +408,10 @@ def coupon_codes_features(features, coupons_list, course_id):
 
 def list_problem_responses(course_key, problem_location, limit_responses=None):
     """
-    Return responses to a given problem as a dict.
+    Yield responses to a given problem as dicts, without holding all of
+    them in memory.
 
-    list_problem_responses(course_key, problem_location)
+    list(list_problem_responses(course_key, problem_location))
 
     would return [
         {'username': u'user1', 'state': u'...'},
@@ -430,7 +431,7 @@ def list_problem_responses(course_key, problem_location, limit_responses=None):
     if not run:
         problem_key = UsageKey.from_string(problem_location).map_into_course(course_key)
     if problem_key.course_key != course_key:
-        return []
+        return
 
     smdat = StudentModule.objects.filter(
         course_id=course_key,
@@ -440,10 +441,8 @@ def list_problem_responses(course_key, problem_location, limit_responses=None):
     if limit_responses is not None:
         smdat = smdat[:limit_responses]
 
-    return [
-        {'username': response.student.username, 'state': response.state}
-        for response in smdat
-    ]
+    for response in smdat.iterator():
+        yield {'username': response.student.username, 'state': response.state}
 
 
 def course_registration_features(features, registration_codes, csv_type):
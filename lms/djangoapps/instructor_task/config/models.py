@@ -12,3 +12,12 @@ class GradeReportSetting(ConfigurationModel):
     with multiple celery workers.
     """
     batch_size = IntegerField(default=100)
+
+
+class ParallelRescoreSetting(ConfigurationModel):
+    """
+    Enables grading the answers of problems whose response types are
+    CPU bound in a pool of processes, when rescoring problems, and sets
+    the number of processes in the pool.
+    """
+    pool_size = IntegerField(default=4)
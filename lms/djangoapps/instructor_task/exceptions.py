@@ -16,3 +16,8 @@ class UpdateProblemModuleStateError(Exception):
 class DuplicateTaskException(Exception):
     """Exception indicating that a task already exists or has already completed."""
     pass
+
+
+class GradeReportPartsFailed(Exception):
+    """Exception indicating that some of the subtasks generating the parts of a grade report failed."""
+    pass
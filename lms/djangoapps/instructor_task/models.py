@@ -18,12 +18,15 @@ import hashlib
 import json
 import logging
 import os.path
+import shutil
+from gzip import GzipFile
+from tempfile import SpooledTemporaryFile
 from uuid import uuid4
 
 from boto.exception import BotoServerError
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.core.files.base import ContentFile
+from django.core.files.base import File
 from django.db import models, transaction
 from opaque_keys.edx.django.models import CourseKeyField
 from six import text_type
@@ -36,6 +39,10 @@ logger = logging.getLogger(__name__)
 QUEUING = 'QUEUING'
 PROGRESS = 'PROGRESS'
 
+# Reports are written to memory up to this size (in bytes) before being
+# spooled to a temporary file on disk.
+REPORT_SPOOL_MAX_SIZE = 16 * 1024 * 1024
+
 
 class InstructorTask(models.Model):
     """
@@ -207,6 +214,7 @@ class ReportStore(object):
                     'querystring_expire': 300,
                     'gzip': True,
                 },
+                gzip=config.get('GZIP', False),
             )
         elif storage_type == 'localfs':
             return DjangoStorageReportStore(
@@ -214,6 +222,7 @@ class ReportStore(object):
                 storage_kwargs={
                     'location': config['ROOT_PATH'],
                 },
+                gzip=config.get('GZIP', False),
             )
         return DjangoStorageReportStore.from_config(config_name)
 
@@ -227,14 +236,28 @@ class ReportStore(object):
             yield [unicode(item).encode('utf-8') for item in row]
 
 
+def _check_gzip_filename(filename, gzip):
+    """
+    Raises a ValueError if a gzipped report would be stored under a name
+    that doesn't end with `.gz`.  Storages such as S3 derive the
+    Content-Type and Content-Encoding of a report from its name.
+    """
+    if gzip and not filename.endswith('.gz'):
+        raise ValueError(u'Gzipped reports must be named *.gz: {}'.format(filename))
+
+
 class DjangoStorageReportStore(ReportStore):
     """
     ReportStore implementation that delegates to django's storage api.
+
+    If `gzip` is True, reports generated by instructor tasks are stored
+    gzipped, with a `.csv.gz` filename.
     """
-    def __init__(self, storage_class=None, storage_kwargs=None):
+    def __init__(self, storage_class=None, storage_kwargs=None, gzip=False):
         if storage_kwargs is None:
             storage_kwargs = {}
         self.storage = get_storage(storage_class, **storage_kwargs)
+        self.gzip = gzip
 
     @classmethod
     def from_config(cls, config_name):
@@ -248,12 +271,14 @@ class DjangoStorageReportStore(ReportStore):
             STORAGE_KWARGS : An optional dict of kwargs to pass to the storage
                              constructor. This can be used to specify a
                              different S3 bucket or root path, for example.
+            GZIP : Whether to gzip reports. Defaults to False.
 
         Reference the setting name when calling `.from_config`.
         """
         return cls(
             getattr(settings, config_name).get('STORAGE_CLASS'),
             getattr(settings, config_name).get('STORAGE_KWARGS'),
+            getattr(settings, config_name).get('GZIP', False),
         )
 
     def store(self, course_id, filename, buff):
@@ -265,18 +290,64 @@ class DjangoStorageReportStore(ReportStore):
         path = self.path_to(course_id, filename)
         self.storage.save(path, buff)
 
-    def store_rows(self, course_id, filename, rows):
+    def store_rows(self, course_id, filename, rows, gzip=False):
         """
         Given a course_id, filename, and rows (each row is an iterable of
         strings), write the rows to the storage backend in csv format.
+        `rows` can be any iterable of rows, including a generator.
+        """
+        self.store_rows_iter(course_id, filename, rows, gzip=gzip)
+
+    def store_rows_iter(self, course_id, filename, rows, gzip=False):
+        """
+        Given a course_id, filename, and an iterable of rows (such as a
+        generator), write the rows to the storage backend in csv format
+        without holding all of them in memory.  The rows are written
+        through a spooled temporary file, which is compressed if `gzip`
+        is True, in which case `filename` must end with `.gz`.
+        """
+        _check_gzip_filename(filename, gzip)
+        with SpooledTemporaryFile(max_size=REPORT_SPOOL_MAX_SIZE) as output_file:
+            output_buffer = GzipFile(fileobj=output_file, mode='wb') if gzip else output_file
+            # Adding unicode signature (BOM) for MS Excel 2013 compatibility
+            output_buffer.write(codecs.BOM_UTF8)
+            csvwriter = csv.writer(output_buffer)
+            csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+            if gzip:
+                output_buffer.close()
+            output_file.seek(0)
+            self.store(course_id, filename, File(output_file))
+
+    def store_merged_rows(self, course_id, filename, header_rows, part_filenames, gzip=False):
+        """
+        Given a course_id, filename, header rows and the filenames of CSVs
+        previously written with `store_rows` (without gzip), write a CSV
+        consisting of the header rows followed by the rows of each part, in
+        order, to the storage backend.  The parts are copied without being
+        parsed.  The CSV is compressed if `gzip` is True, in which case
+        `filename` must end with `.gz`.
+        """
+        _check_gzip_filename(filename, gzip)
+        with SpooledTemporaryFile(max_size=REPORT_SPOOL_MAX_SIZE) as output_file:
+            output_buffer = GzipFile(fileobj=output_file, mode='wb') if gzip else output_file
+            output_buffer.write(codecs.BOM_UTF8)
+            csvwriter = csv.writer(output_buffer)
+            csvwriter.writerows(self._get_utf8_encoded_rows(header_rows))
+            for part_filename in part_filenames:
+                with self.storage.open(self.path_to(course_id, part_filename)) as part_file:
+                    if part_file.read(len(codecs.BOM_UTF8)) != codecs.BOM_UTF8:
+                        part_file.seek(0)
+                    shutil.copyfileobj(part_file, output_buffer)
+            if gzip:
+                output_buffer.close()
+            output_file.seek(0)
+            self.store(course_id, filename, File(output_file))
+
+    def delete(self, course_id, filename):
+        """
+        Delete the file named `filename` for the given course_id, if it exists.
         """
-        output_buffer = ContentFile('')
-        # Adding unicode signature (BOM) for MS Excel 2013 compatibility
-        output_buffer.write(codecs.BOM_UTF8)
-        csvwriter = csv.writer(output_buffer)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
-        output_buffer.seek(0)
-        self.store(course_id, filename, output_buffer)
+        self.storage.delete(self.path_to(course_id, filename))
 
     def links_for(self, course_id):
         """
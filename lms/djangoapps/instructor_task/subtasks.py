@@ -459,10 +459,13 @@ def check_subtask_is_valid(entry_id, current_task_id, new_subtask_status):
         raise DuplicateTaskException(msg)
 
 
-def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_count=0):
+def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_count=0, complete_parent=True):
     """
     Update the status of the subtask in the parent InstructorTask object tracking its progress.
 
+    If `complete_parent` is False, the parent InstructorTask is left in progress when its last
+    subtask completes, for a final step (such as merging the subtasks' output) to complete it.
+
     Because select_for_update is used to lock the InstructorTask object while it is being updated,
     multiple subtasks updating at the same time may time out while waiting for the lock.
     The actual update operation is surrounded by a try/except/else that permits the update to be
@@ -472,7 +475,7 @@ def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_c
     the attempting of retries has concluded.
     """
     try:
-        _update_subtask_status(entry_id, current_task_id, new_subtask_status)
+        _update_subtask_status(entry_id, current_task_id, new_subtask_status, complete_parent)
     except DatabaseError:
         # If we fail, try again recursively.
         retry_count += 1
@@ -480,7 +483,7 @@ def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_c
             TASK_LOG.info("Retrying to update status for subtask %s of instructor task %d with status %s:  retry %d",
                           current_task_id, entry_id, new_subtask_status, retry_count)
             dog_stats_api.increment('instructor_task.subtask.retry_after_failed_update')
-            update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_count)
+            update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_count, complete_parent)
         else:
             TASK_LOG.info("Failed to update status after %d retries for subtask %s of instructor task %d with status %s",
                           retry_count, current_task_id, entry_id, new_subtask_status)
@@ -494,7 +497,7 @@ def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_c
 
 
 @transaction.atomic
-def _update_subtask_status(entry_id, current_task_id, new_subtask_status):
+def _update_subtask_status(entry_id, current_task_id, new_subtask_status, complete_parent=True):
     """
     Update the status of the subtask in the parent InstructorTask object tracking its progress.
 
@@ -514,7 +517,7 @@ def _update_subtask_status(entry_id, current_task_id, new_subtask_status):
     subtasks.  'Total' is expected to have been set at the time the subtasks were created.
     The other three counters are incremented depending on the value of `status`.  Once the counters
     for 'succeeded' and 'failed' match the 'total', the subtasks are done and the InstructorTask's
-    "status" is changed to SUCCESS.
+    "status" is changed to SUCCESS, unless `complete_parent` is False.
 
     The "subtasks" field also contains a 'status' key, that contains a dict that stores status
     information for each subtask.  At the moment, the value for each subtask (keyed by its task_id)
@@ -570,7 +573,7 @@ def _update_subtask_status(entry_id, current_task_id, new_subtask_status):
         # At present, we mark the task as having succeeded.  In future, we should see
         # if there was a catastrophic failure that occurred, and figure out how to
         # report that here.
-        if num_remaining <= 0:
+        if num_remaining <= 0 and complete_parent:
             entry.task_state = SUCCESS
         entry.subtasks = json.dumps(subtask_dict)
         entry.task_output = InstructorTask.create_output_for_success(task_progress)
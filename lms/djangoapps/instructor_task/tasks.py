@@ -27,6 +27,7 @@ from django.conf import settings
 from django.utils.translation import ugettext_noop
 
 from bulk_email.tasks import perform_delegate_email_batches
+from lms.djangoapps.instructor_task.config.models import ParallelRescoreSetting
 from lms.djangoapps.instructor_task.tasks_base import BaseInstructorTask
 from lms.djangoapps.instructor_task.tasks_helper.certs import generate_students_certificates
 from lms.djangoapps.instructor_task.tasks_helper.enrollments import (
@@ -43,9 +44,11 @@ from lms.djangoapps.instructor_task.tasks_helper.misc import (
     upload_proctored_exam_results_report
 )
 from lms.djangoapps.instructor_task.tasks_helper.module_state import (
+    RescorePool,
     delete_problem_module_state,
     perform_module_state_update,
     override_score_module_state,
+    prepare_parallel_rescore,
     rescore_problem_module_state,
     reset_attempts_module_state
 )
@@ -77,8 +80,19 @@ def rescore_problem(entry_id, xmodule_instance_args):
     action_name = ugettext_noop('rescored')
     update_fcn = partial(rescore_problem_module_state, xmodule_instance_args)
 
-    visit_fcn = partial(perform_module_state_update, update_fcn, None)
-    return run_main_task(entry_id, visit_fcn, action_name)
+    parallel_rescore_setting = ParallelRescoreSetting.current()
+    if not parallel_rescore_setting.enabled:
+        visit_fcn = partial(perform_module_state_update, update_fcn, None, prefetch_field_data=True)
+        return run_main_task(entry_id, visit_fcn, action_name)
+
+    # Grade the answers of all of the task's batches in the same pool of processes.
+    with RescorePool(parallel_rescore_setting.pool_size) as rescore_pool:
+        prepare_batch_fcn = partial(prepare_parallel_rescore, xmodule_instance_args, rescore_pool)
+        visit_fcn = partial(
+            perform_module_state_update, update_fcn, None,
+            prefetch_field_data=True, prepare_batch_fcn=prepare_batch_fcn,
+        )
+        return run_main_task(entry_id, visit_fcn, action_name)
 
 
 @task(base=BaseInstructorTask)  # pylint: disable=not-callable
@@ -183,10 +197,34 @@ def calculate_grades_csv(entry_id, xmodule_instance_args):
         xmodule_instance_args.get('task_id'), entry_id, action_name
     )
 
-    task_fn = partial(CourseGradeReport.generate, xmodule_instance_args)
+    task_fn = partial(CourseGradeReport.generate, xmodule_instance_args, part_task=calculate_grades_csv_part)
     return run_main_task(entry_id, task_fn, action_name)
 
 
+@task(routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
+def calculate_grades_csv_part(entry_id, xmodule_instance_args, part_number, user_ids, subtask_status_dict):
+    """
+    Grade a batch of a course's users as part of the grade report of the
+    InstructorTask with the given `entry_id`.  The last part to complete
+    queues the task that merges the parts into the report.
+    """
+    if CourseGradeReport.generate_part(entry_id, xmodule_instance_args, part_number, user_ids, subtask_status_dict):
+        merge_grades_csv_parts.apply_async(
+            (entry_id, xmodule_instance_args),
+            routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+        )
+
+
+@task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
+def merge_grades_csv_parts(entry_id, xmodule_instance_args):
+    """
+    Merge the parts of a grade report generated by calculate_grades_csv_part
+    subtasks, and push the report to an S3 bucket for download.  The
+    InstructorTask is completed by this task, and fails if it fails.
+    """
+    return CourseGradeReport.merge_parts(entry_id, xmodule_instance_args)
+
+
 @task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
 def calculate_problem_grade_report(entry_id, xmodule_instance_args):
     """
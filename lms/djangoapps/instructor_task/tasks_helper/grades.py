@@ -1,15 +1,21 @@
 """
 Functionality for generating grade reports.
 """
+import cPickle as pickle
+import json
 import logging
 import re
 from collections import OrderedDict
 from datetime import datetime
-from itertools import chain, izip, izip_longest
+from itertools import chain, count, izip_longest
+from tempfile import SpooledTemporaryFile
 from time import time
 
+import numpy
+from celery.states import FAILURE, SUCCESS
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.core.cache import cache
 from lazy import lazy
 from opaque_keys.edx.keys import UsageKey
 from pytz import UTC
@@ -19,7 +25,6 @@ from course_blocks.api import get_course_blocks
 from courseware.courses import get_course_by_id
 from courseware.user_state_client import DjangoXBlockUserStateClient
 from instructor_analytics.basic import list_problem_responses
-from instructor_analytics.csvs import format_dictlist
 from lms.djangoapps.certificates.models import CertificateWhitelist, GeneratedCertificate, certificate_info_for_user
 from lms.djangoapps.grades.context import grading_context, grading_context_for_course
 from lms.djangoapps.grades.models import PersistentCourseGrade
@@ -35,8 +40,12 @@ from xmodule.modulestore.django import modulestore
 from xmodule.partitions.partitions_service import PartitionService
 from xmodule.split_test_module import get_split_user_partitions
 
+from ..config.models import GradeReportSetting
+from ..exceptions import GradeReportPartsFailed
+from ..models import REPORT_SPOOL_MAX_SIZE, InstructorTask, ReportStore
+from ..subtasks import SubtaskStatus, check_subtask_is_valid, queue_subtasks_for_query, update_subtask_status
 from .runner import TaskProgress
-from .utils import upload_csv_to_report_store
+from .utils import report_filename, tracker_emit, upload_csv_to_report_store
 
 TASK_LOG = logging.getLogger('edx.celery.task')
 
@@ -44,6 +53,13 @@ ENROLLED_IN_COURSE = 'enrolled'
 
 NOT_ENROLLED_IN_COURSE = 'unenrolled'
 
+# Directory, within a course's report store directory, in which the parts
+# of grade reports generated by subtasks are stored until they are merged.
+GRADE_REPORT_PARTS_DIR = u'grade_report_parts'
+
+# Lock expiration for merging the parts of a grade report.
+GRADE_REPORT_MERGE_LOCK_EXPIRE = 60 * 60  # Lock expires in 1 hour
+
 
 def _user_enrollment_status(user, course_id):
     """
@@ -60,6 +76,42 @@ def _flatten(iterable):
     return list(chain.from_iterable(iterable))
 
 
+def _grade_report_part_filename(task_id, part_number, csv_name):
+    """
+    Returns the report store filename of the given part of the grade
+    report generated by the given task.
+    """
+    return u'{parts_dir}/{task_id}/{csv_name}_{part_number:05d}.csv'.format(
+        parts_dir=GRADE_REPORT_PARTS_DIR,
+        task_id=task_id,
+        csv_name=csv_name,
+        part_number=part_number,
+    )
+
+
+class _SpooledRecords(object):
+    """
+    A list of records that are pickled to a spooled temporary file as they
+    are appended, so that only one of them is held in memory at a time.
+    The records can only be iterated over once all of them are appended.
+    """
+    def __init__(self):
+        self._file = SpooledTemporaryFile(max_size=REPORT_SPOOL_MAX_SIZE)
+        self._count = 0
+
+    def append(self, record):
+        pickle.dump(record, self._file, pickle.HIGHEST_PROTOCOL)
+        self._count += 1
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        self._file.seek(0)
+        for _ in xrange(self._count):
+            yield pickle.load(self._file)
+
+
 class _CourseGradeReportContext(object):
     """
     Internal class that provides a common context to use for a single grade
@@ -198,14 +250,182 @@ class CourseGradeReport(object):
     USER_BATCH_SIZE = 100
 
     @classmethod
-    def generate(cls, _xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
+    def generate(cls, _xmodule_instance_args, _entry_id, course_id, _task_input, action_name, part_task=None):
         """
         Public method to generate a grade report.
+
+        When the GradeReportSetting is enabled and a celery `part_task` is
+        given, the course's users are split into batches of the setting's
+        batch_size, and the rows for each batch are generated by a
+        `part_task` subtask (see generate_part).
         """
         with modulestore().bulk_operations(course_id):
             context = _CourseGradeReportContext(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name)
+            grade_report_setting = GradeReportSetting.current()
+            if part_task is not None and grade_report_setting.enabled:
+                return CourseGradeReport()._generate_in_parallel(
+                    context, _xmodule_instance_args, _entry_id, part_task, grade_report_setting.batch_size,
+                )
             return CourseGradeReport()._generate(context)
 
+    @classmethod
+    def generate_part(cls, entry_id, xmodule_instance_args, part_number, user_ids, subtask_status_dict):
+        """
+        Generates the rows of the grade report of the given InstructorTask
+        for the given users, and stores them as the report's part_number'th
+        part.  The subtask's status is then recorded in the InstructorTask.
+
+        Returns whether this was the last of the report's parts to be
+        completed, in which case the caller is responsible for merging them
+        (see merge_parts).
+        """
+        subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+        current_task_id = subtask_status.task_id
+
+        # Raises a DuplicateTaskException if this part has already been, or
+        # is being, generated by another worker.
+        check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+        entry = InstructorTask.objects.get(pk=entry_id)
+        task_output = json.loads(entry.task_output)
+        try:
+            with modulestore().bulk_operations(entry.course_id):
+                context = _CourseGradeReportContext(
+                    xmodule_instance_args, entry_id, entry.course_id, entry.task_input, task_output['action_name'],
+                )
+                users = get_user_model().objects.filter(id__in=user_ids).select_related('profile').order_by('id')
+                success_rows, error_rows = cls()._rows_for_users(context, list(users))
+
+            report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+            report_store.store_rows(
+                entry.course_id,
+                _grade_report_part_filename(entry.task_id, part_number, 'grade_report'),
+                success_rows,
+            )
+            if error_rows:
+                report_store.store_rows(
+                    entry.course_id,
+                    _grade_report_part_filename(entry.task_id, part_number, 'grade_report_err'),
+                    error_rows,
+                )
+        except Exception:  # pylint: disable=broad-except
+            # The failure is recorded, rather than raised, so that the
+            # report's remaining parts are still merged.
+            TASK_LOG.exception(
+                u'Task: %s, InstructorTask ID: %s, Failed to generate grade report part %s for %s users',
+                current_task_id, entry_id, part_number, len(user_ids),
+            )
+            subtask_status.increment(failed=len(user_ids), state=FAILURE)
+        else:
+            subtask_status.increment(succeeded=len(success_rows), failed=len(error_rows), state=SUCCESS)
+
+        # The InstructorTask is completed once the parts are merged.
+        update_subtask_status(entry_id, current_task_id, subtask_status, complete_parent=False)
+        return cls._all_parts_completed(entry_id)
+
+    @classmethod
+    def merge_parts(cls, entry_id, xmodule_instance_args):
+        """
+        Merges the parts of the grade report of the given InstructorTask,
+        as generated by its subtasks, into the report's CSVs, and completes
+        the InstructorTask.
+
+        Raises GradeReportPartsFailed, and stores no report, if any of the
+        subtasks failed, since the report would be missing their users.
+        """
+        entry = InstructorTask.objects.get(pk=entry_id)
+        task_output = json.loads(entry.task_output)
+        subtask_dict = json.loads(entry.subtasks)
+        num_parts = subtask_dict['total']
+
+        if subtask_dict['failed']:
+            cls()._delete_parts(entry.course_id, entry.task_id, num_parts)
+            raise GradeReportPartsFailed(
+                u'{failed} of the {total} parts of the grade report failed'.format(
+                    failed=subtask_dict['failed'], total=num_parts,
+                )
+            )
+
+        with modulestore().bulk_operations(entry.course_id):
+            context = _CourseGradeReportContext(
+                xmodule_instance_args, entry_id, entry.course_id, entry.task_input, task_output['action_name'],
+            )
+            context.task_progress.start_time = task_output['start_time']
+            for stat_name in ('attempted', 'succeeded', 'skipped', 'failed', 'total'):
+                setattr(context.task_progress, stat_name, task_output[stat_name])
+
+            report = cls()
+            context.update_status(u'Merging grades')
+            report._merge(context, entry.task_id, num_parts, report._success_headers(context), report._error_headers())
+            task_output.update(context.update_status(u'Completed grades'))
+
+        entry.task_output = InstructorTask.create_output_for_success(task_output)
+        entry.task_state = SUCCESS
+        entry.save_now()
+        return task_output
+
+    @classmethod
+    def _all_parts_completed(cls, entry_id):
+        """
+        Returns whether all of the subtasks of the given InstructorTask have
+        completed.  Only the first caller to find them completed gets True.
+        """
+        entry = InstructorTask.objects.get(pk=entry_id)
+        subtask_dict = json.loads(entry.subtasks)
+        if subtask_dict['succeeded'] + subtask_dict['failed'] < subtask_dict['total']:
+            return False
+
+        # Subtasks completing at the same time may each find that all
+        # parts are completed; only one of them gets to merge the parts.
+        # cache.add fails if the key already exists.
+        lock_key = u'grade-report-merge-{}'.format(entry_id)
+        return cache.add(lock_key, 'true', GRADE_REPORT_MERGE_LOCK_EXPIRE)
+
+    def _generate_in_parallel(self, context, xmodule_instance_args, entry_id, part_task, batch_size):
+        """
+        Queues subtasks that each generate the report's rows for a range of
+        users, ordered by id.  Small courses are generated in this task.
+        """
+        entry = InstructorTask.objects.get(pk=entry_id)
+
+        # A task that is requeued (e.g. after losing its connection to the
+        # broker) must not queue a second set of subtasks.
+        if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+            TASK_LOG.warning(u'%s, Grade report subtasks have already been queued', context.task_info_string)
+            return json.loads(entry.task_output)
+
+        users = CourseEnrollment.objects.users_enrolled_in(context.course_id, include_inactive=True).order_by('id')
+        total_num_users = users.count()
+        if total_num_users <= batch_size:
+            return self._generate(context)
+
+        context.update_status(u'Queuing grades subtasks')
+        part_numbers = count()
+
+        def _create_part_subtask(user_list, initial_subtask_status):
+            """Creates a subtask to generate the report's rows for the given users."""
+            return part_task.subtask(
+                (
+                    entry_id,
+                    xmodule_instance_args,
+                    next(part_numbers),
+                    [user['pk'] for user in user_list],
+                    initial_subtask_status.to_dict(),
+                ),
+                task_id=initial_subtask_status.task_id,
+                routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+            )
+
+        return queue_subtasks_for_query(
+            entry,
+            context.action_name,
+            _create_part_subtask,
+            [users],
+            [],
+            batch_size,
+            total_num_users,
+        )
+
     def _generate(self, context):
         """
         Internal method for generating a grade report for the given context.
@@ -215,10 +435,11 @@ class CourseGradeReport(object):
         error_headers = self._error_headers()
         batched_rows = self._batched_rows(context)
 
-        context.update_status(u'Compiling grades')
-        success_rows, error_rows = self._compile(context, batched_rows)
-
-        context.update_status(u'Uploading grades')
+        # The success rows are streamed to the report store as they are
+        # compiled, rather than being held in memory.
+        context.update_status(u'Compiling and uploading grades')
+        error_rows = []
+        success_rows = self._compile(context, batched_rows, error_rows)
         self._upload(context, success_headers, success_rows, error_headers, error_rows)
 
         return context.update_status(u'Completed grades')
@@ -252,33 +473,75 @@ class CourseGradeReport(object):
             users = filter(lambda u: u is not None, users)
             yield self._rows_for_users(context, users)
 
-    def _compile(self, context, batched_rows):
+    def _compile(self, context, batched_rows, error_rows):
         """
-        Compiles and returns the complete list of (success_rows, error_rows) for
-        the given batched_rows and context.
+        A generator of the success rows for the given batched_rows and
+        context.  As each batch is compiled, its error rows are appended to
+        the given error_rows list and the task's progress is updated.
         """
-        # partition and chain successes and errors
-        success_rows, error_rows = izip(*batched_rows)
-        success_rows = list(chain(*success_rows))
-        error_rows = list(chain(*error_rows))
+        for batch_success_rows, batch_error_rows in batched_rows:
+            error_rows.extend(batch_error_rows)
 
-        # update metrics on task status
-        context.task_progress.succeeded = len(success_rows)
-        context.task_progress.failed = len(error_rows)
-        context.task_progress.attempted = context.task_progress.succeeded + context.task_progress.failed
-        context.task_progress.total = context.task_progress.attempted
-        return success_rows, error_rows
+            # update metrics on task status
+            context.task_progress.succeeded += len(batch_success_rows)
+            context.task_progress.failed += len(batch_error_rows)
+            context.task_progress.attempted = context.task_progress.succeeded + context.task_progress.failed
+            context.task_progress.total = context.task_progress.attempted
+
+            for row in batch_success_rows:
+                yield row
 
     def _upload(self, context, success_headers, success_rows, error_headers, error_rows):
         """
-        Creates and uploads a CSV for the given headers and rows.
+        Creates and uploads a CSV for the given headers and rows.  The
+        error rows are uploaded after the success rows, which may be a
+        generator that adds to them, are exhausted.
         """
         date = datetime.now(UTC)
-        upload_csv_to_report_store([success_headers] + success_rows, 'grade_report', context.course_id, date)
+        upload_csv_to_report_store(chain([success_headers], success_rows), 'grade_report', context.course_id, date)
         if len(error_rows) > 0:
             error_rows = [error_headers] + error_rows
             upload_csv_to_report_store(error_rows, 'grade_report_err', context.course_id, date)
 
+    def _merge(self, context, task_id, num_parts, success_headers, error_headers):
+        """
+        Merges the stored parts of the report generated by the given task
+        into the report's CSVs, and deletes the parts.  Parts without any
+        errors have no error CSV, and are skipped in the error report.
+        """
+        date = datetime.now(UTC)
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        for csv_name, headers in (('grade_report', success_headers), ('grade_report_err', error_headers)):
+            part_filenames = [
+                part_filename
+                for part_filename in (
+                    _grade_report_part_filename(task_id, part_number, csv_name) for part_number in range(num_parts)
+                )
+                if report_store.storage.exists(report_store.path_to(context.course_id, part_filename))
+            ]
+            if csv_name == 'grade_report_err' and not part_filenames:
+                continue
+
+            report_store.store_merged_rows(
+                context.course_id,
+                report_filename(csv_name, context.course_id, date, gzip=report_store.gzip),
+                [headers],
+                part_filenames,
+                gzip=report_store.gzip,
+            )
+            tracker_emit(csv_name)
+            for part_filename in part_filenames:
+                report_store.delete(context.course_id, part_filename)
+
+    def _delete_parts(self, course_id, task_id, num_parts):
+        """
+        Deletes any stored parts of the report generated by the given task.
+        """
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        for csv_name in ('grade_report', 'grade_report_err'):
+            for part_number in range(num_parts):
+                report_store.delete(course_id, _grade_report_part_filename(task_id, part_number, csv_name))
+
     def _grades_header(self, context):
         """
         Returns the applicable grades-related headers for this report.
@@ -303,55 +566,62 @@ class CourseGradeReport(object):
         users = users.select_related('profile')
         return grouper(users)
 
-    def _user_grades(self, course_grade, context):
+    def _user_grades(self, course_grade, context, subsection_grades, assignment_averages):
         """
         Returns a list of grade results for the given course_grade corresponding
-        to the headers for this report.
+        to the headers for this report, given the user's subsection grades
+        and assignment averages returned by _subsection_grades and
+        _assignment_averages.
         """
         grade_results = []
         for assignment_type, assignment_info in context.graded_assignments.iteritems():
+            for subsection_location in assignment_info['subsection_headers']:
+                subsection_grade = subsection_grades[subsection_location]
+                if subsection_grade.attempted_graded:
+                    grade_results.append([subsection_grade.percent_graded])
+                else:
+                    grade_results.append([u'Not Attempted'])
 
-            subsection_grades, subsection_grades_results = self._user_subsection_grades(
-                course_grade,
-                assignment_info['subsection_headers'],
-            )
-            grade_results.extend(subsection_grades_results)
-
-            assignment_average = self._user_assignment_average(course_grade, subsection_grades, assignment_info)
-            if assignment_average is not None:
-                grade_results.append([assignment_average])
+            if assignment_type in assignment_averages:
+                grade_results.append([assignment_averages[assignment_type]])
 
         return [course_grade.percent] + _flatten(grade_results)
 
-    def _user_subsection_grades(self, course_grade, subsection_headers):
+    def _subsection_grades(self, course_grade, context):
         """
-        Returns a list of grade results for the given course_grade corresponding
-        to the headers for this report.
+        Returns a dict of the given course_grade's subsection grades for
+        the subsections in the headers of this report.
         """
-        subsection_grades = []
-        grade_results = []
-        for subsection_location in subsection_headers:
-            subsection_grade = course_grade.subsection_grade(subsection_location)
-            if subsection_grade.attempted_graded:
-                grade_result = subsection_grade.percent_graded
-            else:
-                grade_result = u'Not Attempted'
-            grade_results.append([grade_result])
-            subsection_grades.append(subsection_grade)
-        return subsection_grades, grade_results
-
-    def _user_assignment_average(self, course_grade, subsection_grades, assignment_info):
-        if assignment_info['separate_subsection_avg_headers']:
-            if assignment_info['grader']:
-                if course_grade.attempted:
-                    subsection_breakdown = [
-                        {'percent': subsection_grade.percent_graded}
-                        for subsection_grade in subsection_grades
-                    ]
-                    assignment_average, _ = assignment_info['grader'].total_with_drops(subsection_breakdown)
-                else:
-                    assignment_average = 0.0
-                return assignment_average
+        return {
+            subsection_location: course_grade.subsection_grade(subsection_location)
+            for assignment_info in context.graded_assignments.itervalues()
+            for subsection_location in assignment_info['subsection_headers']
+        }
+
+    def _assignment_averages(self, course_grades, subsection_grades, context):
+        """
+        Returns a list, for each of the given course grades, of a dict of
+        the averages of the assignment types that have their own average
+        column in this report.  The averages of each assignment type are
+        computed for all the course grades at once.
+        """
+        averages = [{} for _ in course_grades]
+        for assignment_type, assignment_info in context.graded_assignments.iteritems():
+            if not (assignment_info['separate_subsection_avg_headers'] and assignment_info['grader']):
+                continue
+
+            subsection_headers = assignment_info['subsection_headers']
+            percents = numpy.array(
+                [
+                    [user_subsection_grades[location].percent_graded for location in subsection_headers]
+                    for user_subsection_grades in subsection_grades
+                ],
+                dtype=float,
+            ).reshape(len(course_grades), len(subsection_headers))
+            type_averages = assignment_info['grader'].total_with_drops_cohort(percents)
+            for index, course_grade in enumerate(course_grades):
+                averages[index][assignment_type] = float(type_averages[index]) if course_grade.attempted else 0.0
+        return averages
 
     def _user_cohort_group_names(self, user, context):
         """
@@ -432,7 +702,8 @@ class CourseGradeReport(object):
             bulk_context = _CourseGradeBulkContext(context, users)
 
             success_rows, error_rows = [], []
-            for user, course_grade, error in CourseGradeFactory().iter(
+            graded_users, course_grades = [], []
+            for user, course_grade, error in CourseGradeFactory().bulk_iter(
                 users,
                 course=context.course,
                 collected_block_structure=context.course_structure,
@@ -442,16 +713,23 @@ class CourseGradeReport(object):
                     # An empty gradeset means we failed to grade a student.
                     error_rows.append([user.id, user.username, text_type(error)])
                 else:
-                    success_rows.append(
-                        [user.id, user.email, user.username] +
-                        self._user_grades(course_grade, context) +
-                        self._user_cohort_group_names(user, context) +
-                        self._user_experiment_group_names(user, context) +
-                        self._user_team_names(user, bulk_context.teams) +
-                        self._user_verification_mode(user, context, bulk_context.enrollments) +
-                        self._user_certificate_info(user, context, course_grade, bulk_context.certs) +
-                        [_user_enrollment_status(user, context.course_id)]
-                    )
+                    graded_users.append(user)
+                    course_grades.append(course_grade)
+
+            subsection_grades = [self._subsection_grades(course_grade, context) for course_grade in course_grades]
+            assignment_averages = self._assignment_averages(course_grades, subsection_grades, context)
+            for index, user in enumerate(graded_users):
+                course_grade = course_grades[index]
+                success_rows.append(
+                    [user.id, user.email, user.username] +
+                    self._user_grades(course_grade, context, subsection_grades[index], assignment_averages[index]) +
+                    self._user_cohort_group_names(user, context) +
+                    self._user_experiment_group_names(user, context) +
+                    self._user_team_names(user, bulk_context.teams) +
+                    self._user_verification_mode(user, context, bulk_context.enrollments) +
+                    self._user_certificate_info(user, context, course_grade, bulk_context.certs) +
+                    [_user_enrollment_status(user, context.course_id)]
+                )
             return success_rows, error_rows
 
 
@@ -464,7 +742,6 @@ class ProblemGradeReport(object):
         """
         start_time = time()
         start_date = datetime.now(UTC)
-        status_interval = 100
         enrolled_students = CourseEnrollment.objects.users_enrolled_in(course_id, include_inactive=True)
         task_progress = TaskProgress(action_name, enrolled_students.count(), start_time)
 
@@ -477,15 +754,40 @@ class ProblemGradeReport(object):
         graded_scorable_blocks = cls._graded_scorable_blocks_to_header(course)
 
         # Just generate the static fields for now.
-        rows = [list(header_row.values()) + ['Enrollment Status', 'Grade'] + _flatten(graded_scorable_blocks.values())]
+        header = list(header_row.values()) + ['Enrollment Status', 'Grade'] + _flatten(graded_scorable_blocks.values())
         error_rows = [list(header_row.values()) + ['error_msg']]
+
+        # The rows are streamed to the report store as they are computed,
+        # rather than being held in memory.
+        rows = cls._rows(
+            course, enrolled_students, header_row, graded_scorable_blocks, task_progress, error_rows,
+        )
+
+        # Perform the upload if any students have been successfully graded
+        first_row = next(rows, None)
+        if first_row is not None:
+            upload_csv_to_report_store(chain([header, first_row], rows), 'problem_grade_report', course_id, start_date)
+        # If there are any error rows, write them out as well
+        if len(error_rows) > 1:
+            upload_csv_to_report_store(error_rows, 'problem_grade_report_err', course_id, start_date)
+
+        return task_progress.update_task_state(extra_meta={'step': 'Uploading CSV'})
+
+    @classmethod
+    def _rows(cls, course, enrolled_students, header_row, graded_scorable_blocks, task_progress, error_rows):
+        """
+        A generator of the report's rows for the students who were graded
+        successfully.  Rows for students who could not be graded are
+        appended to the given error_rows list.
+        """
+        status_interval = 100
         current_step = {'step': 'Calculating Grades'}
 
         # Bulk fetch and cache enrollment states so we can efficiently determine
         # whether each user is currently enrolled in the course.
-        CourseEnrollment.bulk_fetch_enrollment_states(enrolled_students, course_id)
+        CourseEnrollment.bulk_fetch_enrollment_states(enrolled_students, course.id)
 
-        for student, course_grade, error in CourseGradeFactory().iter(enrolled_students, course):
+        for student, course_grade, error in CourseGradeFactory().bulk_iter(enrolled_students, course):
             student_fields = [getattr(student, field_name) for field_name in header_row]
             task_progress.attempted += 1
 
@@ -498,7 +800,7 @@ class ProblemGradeReport(object):
                 task_progress.failed += 1
                 continue
 
-            enrollment_status = _user_enrollment_status(student, course_id)
+            enrollment_status = _user_enrollment_status(student, course.id)
 
             earned_possible_values = []
             for block_location in graded_scorable_blocks:
@@ -512,20 +814,11 @@ class ProblemGradeReport(object):
                     else:
                         earned_possible_values.append([u'Not Attempted', problem_score.possible])
 
-            rows.append(student_fields + [enrollment_status, course_grade.percent] + _flatten(earned_possible_values))
-
             task_progress.succeeded += 1
             if task_progress.attempted % status_interval == 0:
                 task_progress.update_task_state(extra_meta=current_step)
 
-        # Perform the upload if any students have been successfully graded
-        if len(rows) > 1:
-            upload_csv_to_report_store(rows, 'problem_grade_report', course_id, start_date)
-        # If there are any error rows, write them out as well
-        if len(error_rows) > 1:
-            upload_csv_to_report_store(error_rows, 'problem_grade_report_err', course_id, start_date)
-
-        return task_progress.update_task_state(extra_meta={'step': 'Uploading CSV'})
+            yield student_fields + [enrollment_status, course_grade.percent] + _flatten(earned_possible_values)
 
     @classmethod
     def _graded_scorable_blocks_to_header(cls, course):
@@ -595,15 +888,17 @@ class ProblemResponses(object):
                 block and it child blocks.
 
         Returns:
-              Tuple[List[Dict], List[str]]: Returns a list of dictionaries
+              Tuple[Iterable[Dict], List[str]]: Returns the dictionaries
                 containing the student data which will be included in the
                 final csv, and the features/keys to include in that CSV.
+                The dictionaries are spooled to a temporary file, since the
+                keys depend on all of them.
         """
         usage_key = UsageKey.from_string(usage_key_str).map_into_course(course_key)
         user = get_user_model().objects.get(pk=user_id)
         course_blocks = get_course_blocks(user, usage_key)
 
-        student_data = []
+        student_data = _SpooledRecords()
         max_count = settings.FEATURES.get('MAX_PROBLEM_RESPONSES_COUNT')
 
         store = modulestore()
@@ -634,10 +929,8 @@ class ProblemResponses(object):
                     except NotImplementedError:
                         pass
 
-                responses = list_problem_responses(course_key, block_key, max_count)
-
-                student_data += responses
-                for response in responses:
+                num_responses = 0
+                for response in list_problem_responses(course_key, block_key, max_count):
                     response['title'] = title
                     # A human-readable location for the current block
                     response['location'] = ' > '.join(path)
@@ -646,8 +939,10 @@ class ProblemResponses(object):
                     user_data = generated_report_data.get(response['username'], {})
                     response.update(user_data)
                     student_data_keys = student_data_keys.union(user_data.keys())
+                    student_data.append(response)
+                    num_responses += 1
                 if max_count is not None:
-                    max_count -= len(responses)
+                    max_count -= num_responses
                     if max_count <= 0:
                         break
 
@@ -683,24 +978,20 @@ class ProblemResponses(object):
             usage_key_str=problem_location
         )
 
-        for data in student_data:
-            for key in student_data_keys:
-                data.setdefault(key, '')
-
-        header, rows = format_dictlist(student_data, student_data_keys)
+        # The header depends on all of the student data, but the rows are
+        # only formatted as they are streamed to the report store.
+        rows = ([data.get(key, '') for key in student_data_keys] for data in student_data)
 
-        task_progress.attempted = task_progress.succeeded = len(rows)
+        task_progress.attempted = task_progress.succeeded = len(student_data)
         task_progress.skipped = task_progress.total - task_progress.attempted
 
-        rows.insert(0, header)
-
         current_step = {'step': 'Uploading CSV'}
         task_progress.update_task_state(extra_meta=current_step)
 
         # Perform the upload
         problem_location = re.sub(r'[:/]', '_', problem_location)
         csv_name = 'student_state_from_{}'.format(problem_location)
-        report_name = upload_csv_to_report_store(rows, csv_name, course_id, start_date)
+        report_name = upload_csv_to_report_store(chain([student_data_keys], rows), csv_name, course_id, start_date)
         current_step = {'step': 'CSV uploaded', 'report_name': report_name}
 
         return task_progress.update_task_state(extra_meta=current_step)
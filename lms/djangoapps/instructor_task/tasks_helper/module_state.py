@@ -3,34 +3,74 @@ Instructor Tasks related to module state.
 """
 import json
 import logging
+import multiprocessing
+import os
+from collections import defaultdict
+from cPickle import PicklingError
+from itertools import islice
+from multiprocessing.pool import MaybeEncodingError
 from time import time
 
 from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.db import connections
+from django.utils import translation
 from django.utils.translation import ugettext_noop
 from opaque_keys.edx.keys import UsageKey
 
 import dogstats_wrapper as dog_stats_api
-from capa.responsetypes import LoncapaProblemError, ResponseError, StudentInputError
+from capa.capa_problem import LoncapaProblem, LoncapaSystem
+from capa.responsetypes import (
+    CustomResponse,
+    FormulaResponse,
+    LoncapaProblemError,
+    ResponseError,
+    StudentInputError,
+    SymbolicResponse
+)
+from capa.safe_exec import result_cache
 from courseware.courses import get_course_by_id, get_problems_in_section
-from courseware.model_data import DjangoKeyValueStore, FieldDataCache
+from courseware.model_data import DjangoKeyValueStore, FieldDataCache, MultiUserFieldDataCache
 from courseware.models import StudentModule
 from courseware.module_render import get_module_for_descriptor_internal
+from edxmako.shortcuts import render_to_string
 from lms.djangoapps.grades.events import GRADES_OVERRIDE_EVENT_TYPE, GRADES_RESCORE_EVENT_TYPE
 from track.event_transaction_utils import create_new_event_transaction_id, set_event_transaction_type
 from track.views import task_track
 from util.db import outer_atomic
+from util.sandboxing import can_execute_unsafe_code, get_python_lib_zip
 
 from xblock.runtime import KvsFieldData
 from xblock.scorable import Score
-from xmodule.modulestore.django import modulestore
+from xmodule.contentstore.django import contentstore
+from xmodule.modulestore.django import ModuleI18nService, modulestore
 from ..exceptions import UpdateProblemModuleStateError
 from .runner import TaskProgress
 from .utils import UNKNOWN_TASK_ID, UPDATE_STATUS_FAILED, UPDATE_STATUS_SKIPPED, UPDATE_STATUS_SUCCEEDED
 
 TASK_LOG = logging.getLogger('edx.celery.task')
 
+# Number of student modules whose field data is prefetched together,
+# when perform_module_state_update prefetches field data, or that are
+# prepared together, when it is given a prepare_batch_fcn.
+FIELD_DATA_PREFETCH_BATCH_SIZE = 100
 
-def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, task_input, action_name):
+# Response types whose grading is CPU bound, through safe_exec, calc and
+# sympy.  Problems whose responses are all of these types are graded in a
+# pool of processes when rescoring in parallel.
+PARALLEL_RESCORE_RESPONSE_TYPES = (CustomResponse, FormulaResponse, SymbolicResponse)
+
+# The database connections inherited by a rescoring pool process, whose
+# file descriptors it closes.  They are kept so that they are never closed
+# or garbage collected, which would also close them for the parent process.
+_RESCORE_POOL_INHERITED_CONNECTIONS = []
+
+# The problem descriptors loaded by a rescoring pool process, by usage key.
+_RESCORE_POOL_DESCRIPTORS = {}
+
+
+def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, task_input, action_name,
+                                prefetch_field_data=False, prepare_batch_fcn=None):
     """
     Performs generic update by visiting StudentModule instances with the update_fcn provided.
 
@@ -42,6 +82,16 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     on the particular student module failed.
     A raised exception indicates a fatal condition -- that no other student modules should be considered.
 
+    If `prefetch_field_data` is True, the field data of the students is loaded in batches of
+    FIELD_DATA_PREFETCH_BATCH_SIZE student modules, and the update_fcn is also passed the
+    student's FieldDataCache, as the `field_data_cache` keyword argument.
+
+    If `prepare_batch_fcn` is provided, the student modules are updated in batches of
+    FIELD_DATA_PREFETCH_BATCH_SIZE, and before each batch is updated, it is passed the
+    batch, as a list of (module_descriptor, student_module, update_kwargs) tuples, and the
+    task_input.  It can add the keyword arguments it computes for each student module to
+    its update_kwargs, which are passed to the update_fcn.
+
     The return value is a dict containing the task's results, with the following keys:
 
           'attempted': number of attempts made
@@ -87,33 +137,335 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     task_progress = TaskProgress(action_name, len(modules_to_update), start_time)
     task_progress.update_task_state()
 
-    for module_to_update in modules_to_update:
-        task_progress.attempted += 1
-        module_descriptor = problems[unicode(module_to_update.module_state_key)]
-        # There is no try here:  if there's an error, we let it throw, and the task will
-        # be marked as FAILED, with a stack trace.
-        with dog_stats_api.timer('instructor_tasks.module.time.step', tags=[u'action:{name}'.format(name=action_name)]):
-            update_status = update_fcn(module_descriptor, module_to_update, task_input)
-            if update_status == UPDATE_STATUS_SUCCEEDED:
-                # If the update_fcn returns true, then it performed some kind of work.
-                # Logging of failures is left to the update_fcn itself.
-                task_progress.succeeded += 1
-            elif update_status == UPDATE_STATUS_FAILED:
-                task_progress.failed += 1
-            elif update_status == UPDATE_STATUS_SKIPPED:
-                task_progress.skipped += 1
-            else:
-                raise UpdateProblemModuleStateError("Unexpected update_status returned: {}".format(update_status))
+    modules_iter = iter(modules_to_update)
+    batched = prefetch_field_data or prepare_batch_fcn is not None
+    batch_size = FIELD_DATA_PREFETCH_BATCH_SIZE if batched else None
+    while True:
+        modules_batch = list(islice(modules_iter, batch_size))
+        if not modules_batch:
+            break
+
+        field_data_caches = None
+        if prefetch_field_data:
+            field_data_caches = _prefetch_field_data(course_id, problems, modules_batch)
+
+        batch = []
+        for module_to_update in modules_batch:
+            module_descriptor = problems[unicode(module_to_update.module_state_key)]
+            update_kwargs = {}
+            if field_data_caches is not None:
+                update_kwargs['field_data_cache'] = field_data_caches[
+                    unicode(module_to_update.module_state_key)
+                ].field_data_cache_for_user(module_to_update.student)
+            batch.append((module_descriptor, module_to_update, update_kwargs))
+
+        if prepare_batch_fcn is not None:
+            prepare_batch_fcn(batch, task_input)
+
+        for module_descriptor, module_to_update, update_kwargs in batch:
+            task_progress.attempted += 1
+            # There is no try here:  if there's an error, we let it throw, and the task will
+            # be marked as FAILED, with a stack trace.
+            with dog_stats_api.timer(
+                    'instructor_tasks.module.time.step', tags=[u'action:{name}'.format(name=action_name)]
+            ):
+                update_status = update_fcn(module_descriptor, module_to_update, task_input, **update_kwargs)
+                if update_status == UPDATE_STATUS_SUCCEEDED:
+                    # If the update_fcn returns true, then it performed some kind of work.
+                    # Logging of failures is left to the update_fcn itself.
+                    task_progress.succeeded += 1
+                elif update_status == UPDATE_STATUS_FAILED:
+                    task_progress.failed += 1
+                elif update_status == UPDATE_STATUS_SKIPPED:
+                    task_progress.skipped += 1
+                else:
+                    raise UpdateProblemModuleStateError("Unexpected update_status returned: {}".format(update_status))
 
     return task_progress.update_task_state()
 
 
+def _prefetch_field_data(course_id, problems, student_modules):
+    """
+    Returns a dict of each problem's usage key string to a
+    MultiUserFieldDataCache of the students of the given student
+    modules of the problem.
+    """
+    students_by_problem = defaultdict(list)
+    for student_module in student_modules:
+        students_by_problem[unicode(student_module.module_state_key)].append(student_module.student)
+
+    with dog_stats_api.timer('instructor_tasks.module.time.prefetch_field_data'):
+        return {
+            problem_key: MultiUserFieldDataCache.cache_for_descriptor_descendents(
+                course_id, students, problems[problem_key],
+            )
+            for problem_key, students in students_by_problem.iteritems()
+        }
+
+
+class RescorePool(object):
+    """
+    The pool of processes in which a rescoring task grades the answers of
+    problems, see prepare_parallel_rescore.
+
+    The processes are started when problems are first graded, and grade the
+    problems of all of the task's batches of student modules, until the pool
+    is closed.  Use it as a context manager to close it.
+    """
+    def __init__(self, pool_size):
+        self.pool_size = pool_size
+        self._pool = None
+        self._failed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(terminate=exc_type is not None)
+
+    def map(self, problems):
+        """
+        Returns the results of _grade_rescore_pool_problem for the given
+        problems, in order.  All of them are None if the pool can't be
+        started, or can't return their results.
+        """
+        if self._failed:
+            return [None] * len(problems)
+        try:
+            if self._pool is None:
+                self._pool = multiprocessing.Pool(self.pool_size, initializer=_init_rescore_pool_process)
+            return self._pool.map(_grade_rescore_pool_problem, problems)
+        except OSError:
+            TASK_LOG.exception(u"Failed to start a rescoring pool; grading problems serially")
+            self._failed = True
+            self.close(terminate=True)
+        except (MaybeEncodingError, PicklingError):
+            TASK_LOG.exception(u"Failed to grade %d problems in a rescoring pool; grading them serially", len(problems))
+        return [None] * len(problems)
+
+    def close(self, terminate=False):
+        """
+        Stops the processes of the pool, once they are done grading, or
+        right away if `terminate` is True.
+        """
+        if self._pool is not None:
+            if terminate:
+                self._pool.terminate()
+            else:
+                self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+
+def prepare_parallel_rescore(xmodule_instance_args, rescore_pool, batch, task_input):  # pylint: disable=unused-argument
+    """
+    Prepares a batch of student modules to be rescored by rescore_problem_module_state,
+    for perform_module_state_update.
+
+    The students' problem instances are created, and the answers to the problems whose
+    responses are all of PARALLEL_RESCORE_RESPONSE_TYPES are graded in the given
+    RescorePool.  Each instance, and its CorrectMap when its answers were graded, are
+    added to the update_kwargs of the student module, so that only saving the new
+    scores is left to rescore_problem_module_state.
+    """
+    course_id = batch[0][1].course_id
+    problems_to_grade = []
+    with modulestore().bulk_operations(course_id):
+        course = get_course_by_id(course_id)
+        for module_descriptor, student_module, update_kwargs in batch:
+            instance = _get_module_instance_for_task(
+                course_id,
+                student_module.student,
+                module_descriptor,
+                xmodule_instance_args,
+                grade_bucket_type='rescore',
+                course=course,
+                field_data_cache=update_kwargs.get('field_data_cache'),
+            )
+            if instance is None:
+                continue
+            update_kwargs['instance'] = instance
+            if _can_grade_in_rescore_pool(instance):
+                problems_to_grade.append((instance, update_kwargs))
+
+    if rescore_pool.pool_size < 2 or len(problems_to_grade) < 2:
+        return
+
+    with dog_stats_api.timer('instructor_tasks.module.time.rescore_pool'):
+        results = _grade_in_rescore_pool(rescore_pool, [instance for instance, _ in problems_to_grade])
+    for (instance, update_kwargs), result in zip(problems_to_grade, results):
+        if result is not None:
+            update_kwargs['new_correct_map'] = _save_rescore_pool_result(instance, result)
+
+
+def _can_grade_in_rescore_pool(instance):
+    """
+    Returns whether the current answers of the given problem instance can
+    be graded in a rescoring pool.
+    """
+    lcp = getattr(instance, 'lcp', None)
+    return (
+        lcp is not None and
+        instance.has_submitted_answer() and
+        lcp.supports_rescoring() and
+        bool(lcp.responders) and
+        all(isinstance(responder, PARALLEL_RESCORE_RESPONSE_TYPES) for responder in lcp.responders.values())
+    )
+
+
+def _grade_in_rescore_pool(rescore_pool, instances):
+    """
+    Grades the current answers of the given problem instances in the given
+    RescorePool, and returns the results of _grade_rescore_pool_problem, in
+    order.  The result of a problem whose grading failed is None, so that
+    the problem is graded again, and its error handled, by this process.
+    """
+    return rescore_pool.map([_rescore_pool_problem(instance) for instance in instances])
+
+
+def _rescore_pool_problem(instance):
+    """
+    Returns the picklable description of the given problem instance, from
+    which a rescoring pool process creates the instance's LoncapaProblem.
+    """
+    lcp = instance.lcp
+    capa_system = lcp.capa_system
+    return {
+        'usage_key': unicode(instance.location),
+        'language': translation.get_language(),
+        'problem_text': lcp.problem_text,
+        'problem_id': lcp.problem_id,
+        'state': lcp.get_state(),
+        'seed': lcp.seed,
+        'system': {
+            'ajax_url': capa_system.ajax_url,
+            'anonymous_student_id': capa_system.anonymous_student_id,
+            'DEBUG': capa_system.DEBUG,
+            'node_path': capa_system.node_path,
+            'seed': capa_system.seed,
+            'STATIC_URL': capa_system.STATIC_URL,
+            'matlab_api_key': capa_system.matlab_api_key,
+        },
+    }
+
+
+def _save_rescore_pool_result(instance, result):
+    """
+    Saves to the given problem instance, and to the safe_exec cache, what
+    grading its answers in a rescoring pool process changed, emits the
+    events that grading them emitted, and returns their CorrectMap.
+    """
+    instance.lcp.input_state = result['input_state']
+    if instance.lcp.capa_system.cache:
+        safe_exec_cache = result_cache.get_result_cache(instance.lcp.capa_system.cache)
+        for key, cached_result in result['cache_writes']:
+            safe_exec_cache.set(key, cached_result)
+    for event_type, event in result['events']:
+        instance.runtime.track_function(event_type, event)
+    return result['correct_map']
+
+
+def _init_rescore_pool_process():
+    """
+    Initializes a rescoring pool process, closing the database, cache and
+    MongoDB connections that it inherited from its parent, so that it opens
+    its own connections instead of sharing them with the parent.
+    """
+    for connection in connections.all():
+        if connection.connection is not None:
+            # Closing the connection would also close it for the parent, so
+            # only close this process's file descriptor of its socket.
+            _RESCORE_POOL_INHERITED_CONNECTIONS.append(connection.connection)
+            try:
+                os.close(connection.connection.fileno())
+            except (AttributeError, OSError, TypeError):
+                pass
+            connection.connection = None
+    for django_cache in caches.all():
+        django_cache.close()
+    # This also closes the connections of the modulestores' contentstore.
+    modulestore().close_all_connections()
+
+
+def _grade_rescore_pool_problem(problem):
+    """
+    Grades the current answers of the problem described by the given result
+    of _rescore_pool_problem, in a rescoring pool process.
+
+    Returns a dict of what the parent process must save: the `correct_map`
+    of the answers, the `input_state` of the problem, the `cache_writes` of
+    safe_exec and the `events` emitted while grading, or None if grading the
+    answers failed.
+    """
+    try:
+        if problem['language']:
+            translation.activate(problem['language'])
+        usage_key = UsageKey.from_string(problem['usage_key'])
+        descriptor = _RESCORE_POOL_DESCRIPTORS.get(usage_key)
+        if descriptor is None:
+            descriptor = _RESCORE_POOL_DESCRIPTORS[usage_key] = modulestore().get_item(usage_key)
+
+        capa_module = _RescorePoolModule(usage_key)
+        capa_system = LoncapaSystem(
+            cache=cache,
+            can_execute_unsafe_code=lambda: can_execute_unsafe_code(usage_key.course_key),
+            get_python_lib_zip=lambda: get_python_lib_zip(contentstore, usage_key.course_key),
+            filestore=descriptor.runtime.resources_fs,
+            i18n=ModuleI18nService(descriptor),
+            render_template=render_to_string,
+            xqueue=None,
+            **problem['system']
+        )
+        with result_cache.recording_writes() as cache_writes:
+            lcp = LoncapaProblem(
+                problem_text=problem['problem_text'],
+                id=problem['problem_id'],
+                capa_system=capa_system,
+                capa_module=capa_module,
+                state=problem['state'],
+                seed=problem['seed'],
+                extract_tree=False,
+            )
+            correct_map = lcp.get_grade_from_current_answers(None)
+        return {
+            'correct_map': correct_map,
+            'input_state': lcp.input_state,
+            'cache_writes': cache_writes,
+            'events': capa_module.events,
+        }
+    except Exception:  # pylint: disable=broad-except
+        return None
+
+
+class _RescorePoolModule(object):
+    """
+    Stands in for the capa module of a problem graded in a rescoring pool
+    process, recording the events that grading its answers emits, so that
+    the parent process emits them.
+    """
+    def __init__(self, location):
+        self.location = location
+        self.runtime = self
+        self.events = []
+
+    def track_function(self, event_type, event):
+        """
+        Records an event emitted by the problem.
+        """
+        self.events.append((event_type, event))
+
+
 @outer_atomic
-def rescore_problem_module_state(xmodule_instance_args, module_descriptor, student_module, task_input):
+def rescore_problem_module_state(xmodule_instance_args, module_descriptor, student_module, task_input,
+                                 field_data_cache=None, instance=None, new_correct_map=None):
     '''
     Takes an XModule descriptor and a corresponding StudentModule object, and
     performs rescoring on the student's problem submission.
 
+    If provided, the student's data is read from the given field_data_cache.
+    If provided, the given problem instance is rescored, rather than a new
+    instance, with the given CorrectMap of its current answers, if any.
+
     Throws exceptions if the rescoring is fatal and should be aborted if in a loop.
     In particular, raises UpdateProblemModuleStateError if module fails to instantiate,
     or if the module doesn't support rescoring.
@@ -127,18 +479,20 @@ def rescore_problem_module_state(xmodule_instance_args, module_descriptor, stude
     usage_key = student_module.module_state_key
 
     with modulestore().bulk_operations(course_id):
-        course = get_course_by_id(course_id)
-        # TODO: Here is a call site where we could pass in a loaded course.  I
-        # think we certainly need it since grading is happening here, and field
-        # overrides would be important in handling that correctly
-        instance = _get_module_instance_for_task(
-            course_id,
-            student,
-            module_descriptor,
-            xmodule_instance_args,
-            grade_bucket_type='rescore',
-            course=course
-        )
+        if instance is None:
+            course = get_course_by_id(course_id)
+            # TODO: Here is a call site where we could pass in a loaded course.  I
+            # think we certainly need it since grading is happening here, and field
+            # overrides would be important in handling that correctly
+            instance = _get_module_instance_for_task(
+                course_id,
+                student,
+                module_descriptor,
+                xmodule_instance_args,
+                grade_bucket_type='rescore',
+                course=course,
+                field_data_cache=field_data_cache,
+            )
 
         if instance is None:
             # Either permissions just changed, or someone is trying to be clever
@@ -168,7 +522,8 @@ def rescore_problem_module_state(xmodule_instance_args, module_descriptor, stude
 
         # specific events from CAPA are not propagated up the stack. Do we want this?
         try:
-            instance.rescore(only_if_higher=task_input['only_if_higher'])
+            rescore_kwargs = {'new_correct_map': new_correct_map} if new_correct_map is not None else {}
+            instance.rescore(only_if_higher=task_input['only_if_higher'], **rescore_kwargs)
         except (LoncapaProblemError, StudentInputError, ResponseError):
             TASK_LOG.warning(
                 u"error processing rescore call for course %(course)s, problem %(loc)s "
@@ -318,16 +673,20 @@ def delete_problem_module_state(xmodule_instance_args, _module_descriptor, stude
 
 
 def _get_module_instance_for_task(course_id, student, module_descriptor, xmodule_instance_args=None,
-                                  grade_bucket_type=None, course=None):
+                                  grade_bucket_type=None, course=None, field_data_cache=None):
     """
     Fetches a StudentModule instance for a given `course_id`, `student` object, and `module_descriptor`.
 
     `xmodule_instance_args` is used to provide information for creating a track function and an XQueue callback.
     These are passed, along with `grade_bucket_type`, to get_module_for_descriptor_internal, which sidesteps
     the need for a Request object when instantiating an xmodule instance.
+
+    The student's data is read from `field_data_cache`, if provided, rather than
+    from a new FieldDataCache.
     """
     # reconstitute the problem's corresponding XModule:
-    field_data_cache = FieldDataCache.cache_for_descriptor_descendents(course_id, student, module_descriptor)
+    if field_data_cache is None:
+        field_data_cache = FieldDataCache.cache_for_descriptor_descendents(course_id, student, module_descriptor)
     student_data = KvsFieldData(DjangoKeyValueStore(field_data_cache))
 
     # get request-related tracking information from args passthrough, and supplement with task-specific
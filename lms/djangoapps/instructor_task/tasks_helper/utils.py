@@ -24,24 +24,39 @@ def upload_csv_to_report_store(rows, csv_name, course_id, timestamp, config_name
                 [row1_colum1, row1_colum2, ...],
                 ...
             ]
+            Any iterable of rows, such as a generator, is streamed to
+            the report store without being held in memory.
         csv_name: Name of the resulting CSV
         course_id: ID of the course
 
+    The CSV is gzipped if the `GZIP` setting of the report store's
+    config is True.
+
     Returns:
         report_name: string - Name of the generated report
     """
     report_store = ReportStore.from_config(config_name)
-    report_name = u"{course_prefix}_{csv_name}_{timestamp_str}.csv".format(
-        course_prefix=course_filename_prefix_generator(course_id),
-        csv_name=csv_name,
-        timestamp_str=timestamp.strftime("%Y-%m-%d-%H%M")
-    )
+    report_name = report_filename(csv_name, course_id, timestamp, gzip=report_store.gzip)
 
-    report_store.store_rows(course_id, report_name, rows)
+    report_store.store_rows(course_id, report_name, rows, gzip=report_store.gzip)
     tracker_emit(csv_name)
     return report_name
 
 
+def report_filename(csv_name, course_id, timestamp, gzip=False):
+    """
+    Returns the ReportStore filename of the CSV with the given name,
+    for the given course, generated at the given timestamp.  Gzipped
+    CSVs are named `.csv.gz`.
+    """
+    return u"{course_prefix}_{csv_name}_{timestamp_str}.csv{gzip_ext}".format(
+        course_prefix=course_filename_prefix_generator(course_id),
+        csv_name=csv_name,
+        timestamp_str=timestamp.strftime("%Y-%m-%d-%H%M"),
+        gzip_ext='.gz' if gzip else '',
+    )
+
+
 def tracker_emit(report_name):
     """
     Emits a 'report.requested' event for the given report.
@@ -7,6 +7,7 @@ paths actually work.
 """
 import json
 import logging
+import os
 import textwrap
 from collections import namedtuple
 
@@ -18,6 +19,7 @@ from mock import patch
 from nose.plugins.attrib import attr
 from six import text_type
 
+from capa.capa_problem import LoncapaProblem
 from capa.responsetypes import StudentInputError
 from capa.tests.response_xml_factory import CodeResponseXMLFactory, CustomResponseXMLFactory
 from courseware.model_data import StudentModule
@@ -28,7 +30,9 @@ from lms.djangoapps.instructor_task.api import (
     submit_rescore_problem_for_student,
     submit_reset_problem_attempts_for_all_students
 )
+from lms.djangoapps.instructor_task.config.models import ParallelRescoreSetting
 from lms.djangoapps.instructor_task.models import InstructorTask
+from lms.djangoapps.instructor_task.tasks_helper import module_state
 from lms.djangoapps.instructor_task.tasks_helper.grades import CourseGradeReport
 from lms.djangoapps.instructor_task.tests.test_base import (
     OPTION_1,
@@ -381,8 +385,11 @@ class TestRescoringTask(TestIntegrationTask):
                                data=problem_xml,
                                metadata={"rerandomize": "per_student"})
 
-    def test_rescoring_randomized_problem(self):
+    @ddt.data(False, True)
+    def test_rescoring_randomized_problem(self, parallel_rescore):
         """Run rescore scenario on custom problem that uses randomize"""
+        # Grade the answers in a pool of processes when rescoring in parallel:
+        ParallelRescoreSetting.objects.create(enabled=parallel_rescore, pool_size=2)
         # First define the custom response problem:
         problem_url_name = 'H1P1'
         self.define_randomized_custom_response_problem(problem_url_name)
@@ -422,12 +429,43 @@ class TestRescoringTask(TestIntegrationTask):
             expected_score = 0 if user.username == 'u1' else 1
             self.check_state(user, descriptor, expected_score, 1, expected_attempts=2)
 
-        # rescore the problem for all students
-        self.submit_rescore_all_student_answers('instructor', problem_url_name)
-
-        # all grades should change to being wrong (with no change in attempts)
+        # rescore the problem for all students, keeping the results graded in a pool, and
+        # recording the process that grades each student's answers in the problem's state
+        pool_results = []
+        grade_in_rescore_pool = module_state._grade_in_rescore_pool  # pylint: disable=protected-access
+        get_grade_from_current_answers = LoncapaProblem.get_grade_from_current_answers
+
+        def record_pool_results(rescore_pool, instances):
+            """Grades the problems in a pool, and records the results it returns."""
+            results = grade_in_rescore_pool(rescore_pool, instances)
+            pool_results.extend(results)
+            return results
+
+        def record_grading_process(lcp, student_answers):
+            """Records the process grading the answers in the input state of the problem."""
+            lcp.input_state['grading_process'] = {'pid': os.getpid()}
+            return get_grade_from_current_answers(lcp, student_answers)
+
+        with patch.object(module_state, '_grade_in_rescore_pool', side_effect=record_pool_results):
+            with patch.object(
+                LoncapaProblem, 'get_grade_from_current_answers', autospec=True, side_effect=record_grading_process
+            ):
+                self.submit_rescore_all_student_answers('instructor', problem_url_name)
+
+        # every student's answers were graded in the pool when rescoring in parallel
+        self.assertEqual(len(pool_results), len(self.users) if parallel_rescore else 0)
+        self.assertNotIn(None, pool_results)
+
+        # all grades should change to being wrong (with no change in attempts), and the
+        # state changed by grading the answers is saved, even in a pool's process
         for user in self.users:
             self.check_state(user, descriptor, 0, 1, expected_attempts=2)
+            state = json.loads(self.get_student_module(user.username, descriptor).state)
+            grading_pid = state['input_state']['grading_process']['pid']
+            if parallel_rescore:
+                self.assertNotEqual(grading_pid, os.getpid())
+            else:
+                self.assertEqual(grading_pid, os.getpid())
 
 
 class TestResetAttemptsTask(TestIntegrationTask):
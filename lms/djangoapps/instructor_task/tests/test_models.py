@@ -1,9 +1,11 @@
 """
 Tests for instructor_task/models.py.
 """
+import codecs
 import copy
 import time
 from cStringIO import StringIO
+from gzip import GzipFile
 
 import boto
 from django.conf import settings
@@ -51,6 +53,52 @@ class ReportStoreTestMixin(object):
             ['new_file', 'middle_file', 'old_file']
         )
 
+    def read_report(self, report_store, filename):
+        """
+        Returns the contents of the given stored report.
+        """
+        with report_store.storage.open(report_store.path_to(self.course_id, filename)) as report_file:
+            return report_file.read()
+
+    def test_store_rows_iter(self):
+        report_store = self.create_report_store()
+        rows = ([u'row{}'.format(index), u'ni\xf1o'] for index in range(3))
+        report_store.store_rows_iter(self.course_id, 'report.csv', rows)
+        self.assertEqual(
+            self.read_report(report_store, 'report.csv'),
+            codecs.BOM_UTF8 + 'row0,ni\xc3\xb1o\r\nrow1,ni\xc3\xb1o\r\nrow2,ni\xc3\xb1o\r\n',
+        )
+
+    def test_store_rows_iter_gzip(self):
+        report_store = self.create_report_store()
+        report_store.store_rows_iter(self.course_id, 'report.csv.gz', iter([[u'a', u'b']]), gzip=True)
+        compressed_report = self.read_report(report_store, 'report.csv.gz')
+        self.assertEqual(GzipFile(fileobj=StringIO(compressed_report)).read(), codecs.BOM_UTF8 + 'a,b\r\n')
+
+    def test_store_merged_rows(self):
+        report_store = self.create_report_store()
+        report_store.store_rows(self.course_id, 'parts/1.csv', [[u'1', u'a'], [u'2', u'b']])
+        report_store.store_rows(self.course_id, 'parts/2.csv', [[u'3', u'c']])
+        report_store.store_merged_rows(self.course_id, 'report.csv', [[u'id', u'name']], ['parts/1.csv', 'parts/2.csv'])
+        self.assertEqual(
+            self.read_report(report_store, 'report.csv'),
+            codecs.BOM_UTF8 + 'id,name\r\n1,a\r\n2,b\r\n3,c\r\n',
+        )
+
+    def test_store_merged_rows_gzip(self):
+        report_store = self.create_report_store()
+        report_store.store_rows(self.course_id, 'parts/1.csv', [[u'1', u'a']])
+        report_store.store_merged_rows(self.course_id, 'report.csv.gz', [[u'id', u'name']], ['parts/1.csv'], gzip=True)
+        compressed_report = self.read_report(report_store, 'report.csv.gz')
+        self.assertEqual(GzipFile(fileobj=StringIO(compressed_report)).read(), codecs.BOM_UTF8 + 'id,name\r\n1,a\r\n')
+
+    def test_gzip_filename(self):
+        report_store = self.create_report_store()
+        with self.assertRaises(ValueError):
+            report_store.store_rows(self.course_id, 'report.csv', [[u'a', u'b']], gzip=True)
+        with self.assertRaises(ValueError):
+            report_store.store_merged_rows(self.course_id, 'report.csv', [[u'a', u'b']], [], gzip=True)
+
 
 class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, SimpleTestCase):
     """
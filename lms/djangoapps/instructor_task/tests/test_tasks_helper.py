@@ -8,16 +8,20 @@ Unit tests for LMS instructor-initiated background tasks helper functions.
 
 """
 
+import json
 import os
 import shutil
 import tempfile
 import urllib
 from contextlib import contextmanager
 from datetime import datetime, timedelta
+from gzip import GzipFile
+from uuid import uuid4
 
 import ddt
 import unicodecsv
 from capa.tests.response_xml_factory import MultipleChoiceResponseXMLFactory
+from celery.states import FAILURE, SUCCESS
 from course_modes.models import CourseMode
 from course_modes.tests.factories import CourseModeFactory
 from courseware.tests.factories import InstructorFactory
@@ -57,6 +61,9 @@ from lms.djangoapps.certificates.models import CertificateStatuses, GeneratedCer
 from lms.djangoapps.certificates.tests.factories import CertificateWhitelistFactory, GeneratedCertificateFactory
 from lms.djangoapps.grades.models import PersistentCourseGrade
 from lms.djangoapps.grades.transformer import GradesTransformer
+from lms.djangoapps.instructor_task.config.models import GradeReportSetting
+from lms.djangoapps.instructor_task.models import PROGRESS, InstructorTask
+from lms.djangoapps.instructor_task.tasks import calculate_grades_csv_part
 from lms.djangoapps.instructor_task.tasks_helper.certs import generate_students_certificates
 from lms.djangoapps.instructor_task.tasks_helper.enrollments import (
     upload_enrollment_report,
@@ -76,6 +83,7 @@ from lms.djangoapps.instructor_task.tasks_helper.misc import (
     upload_course_survey_report,
     upload_ora2_data,
 )
+from lms.djangoapps.instructor_task.tests.factories import InstructorTaskFactory
 from lms.djangoapps.instructor_task.tests.test_base import (
     InstructorTaskCourseTestCase,
     InstructorTaskModuleTestCase,
@@ -141,7 +149,7 @@ class TestInstructorGradeReport(InstructorGradeReportTestCase):
         self.assertDictContainsSubset({'attempted': num_students, 'succeeded': num_students, 'failed': 0}, result)
 
     @patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task')
-    @patch('lms.djangoapps.grades.course_grade_factory.CourseGradeFactory.iter')
+    @patch('lms.djangoapps.grades.course_grade_factory.CourseGradeFactory.bulk_iter')
     def test_grading_failure(self, mock_grades_iter, _mock_current_task):
         """
         Test that any grading errors are properly reported in the
@@ -318,7 +326,7 @@ class TestInstructorGradeReport(InstructorGradeReportTestCase):
         )
 
     @patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task')
-    @patch('lms.djangoapps.grades.course_grade_factory.CourseGradeFactory.iter')
+    @patch('lms.djangoapps.grades.course_grade_factory.CourseGradeFactory.bulk_iter')
     def test_unicode_in_csv_header(self, mock_grades_iter, _mock_current_task):
         """
         Tests that CSV grade report works if unicode in headers.
@@ -443,6 +451,122 @@ class TestInstructorGradeReport(InstructorGradeReportTestCase):
         )
 
 
+class TestParallelGradeReport(InstructorGradeReportTestCase):
+    """
+    Tests that grade reports generated by subtasks are merged correctly.
+    """
+    def setUp(self):
+        super(TestParallelGradeReport, self).setUp()
+        self.course = CourseFactory.create()
+        self.students = [self.create_student(u'student{}'.format(index)) for index in range(5)]
+        GradeReportSetting.objects.create(enabled=True, batch_size=2)
+        self.entry = InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_type='grade_course',
+            task_id=str(uuid4()),
+        )
+
+    def _generate(self):
+        """
+        Generates the grade report for the test course, with subtasks.
+        """
+        with patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task'):
+            return CourseGradeReport.generate(
+                {'task_id': self.entry.task_id},
+                self.entry.id,
+                self.course.id,
+                None,
+                'graded',
+                part_task=calculate_grades_csv_part,
+            )
+
+    def test_parts_merged(self):
+        self._generate()
+
+        entry = InstructorTask.objects.get(pk=self.entry.id)
+        self.assertEqual(entry.task_state, SUCCESS)
+        self.assertEqual(json.loads(entry.subtasks)['total'], 3)
+        self.assertDictContainsSubset(
+            {'attempted': 5, 'succeeded': 5, 'failed': 0, 'step': 'Completed grades'},
+            json.loads(entry.task_output),
+        )
+        self.verify_rows_in_csv(
+            [{'Student ID': unicode(student.id), 'Username': student.username} for student in self.students],
+            ignore_other_columns=True,
+        )
+
+        # Only the merged report is listed, and its parts are deleted.
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        self.assertEqual(len(report_store.links_for(self.course.id)), 1)
+        self.assertEqual(
+            report_store.storage.listdir(report_store.path_to(self.course.id, 'grade_report_parts/' + entry.task_id)),
+            ([], []),
+        )
+
+    def test_parts_merged_gzip(self):
+        with patch.dict(settings.GRADES_DOWNLOAD, {'GZIP': True}):
+            self._generate()
+            report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+
+        [(report_name, _)] = report_store.links_for(self.course.id)
+        self.assertTrue(report_name.endswith('.csv.gz'))
+        with report_store.storage.open(report_store.path_to(self.course.id, report_name)) as report_file:
+            rows = list(unicodecsv.DictReader(GzipFile(fileobj=report_file), encoding='utf-8-sig'))
+        self.assertItemsEqual([row['Username'] for row in rows], [student.username for student in self.students])
+
+    @patch('lms.djangoapps.instructor_task.tasks.merge_grades_csv_parts.apply_async')
+    def test_in_progress_until_merged(self, mock_merge):
+        self._generate()
+
+        # All of the parts are generated, but the report isn't merged yet.
+        self.assertTrue(mock_merge.called)
+        entry = InstructorTask.objects.get(pk=self.entry.id)
+        self.assertEqual(json.loads(entry.subtasks)['succeeded'], 3)
+        self.assertEqual(entry.task_state, PROGRESS)
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        self.assertEqual(report_store.links_for(self.course.id), [])
+
+    def test_failed_parts(self):
+        rows_for_users = CourseGradeReport._rows_for_users  # pylint: disable=protected-access
+
+        def _fail_for_first_student(report, context, users):
+            """Fails to generate the part with the first student in it."""
+            if self.students[0] in users:
+                raise TypeError('Cannot grade students')
+            return rows_for_users(report, context, users)
+
+        with patch.object(CourseGradeReport, '_rows_for_users', _fail_for_first_student):
+            self._generate()
+
+        # No report is stored, since it would be missing the failed part's students.
+        entry = InstructorTask.objects.get(pk=self.entry.id)
+        self.assertEqual(json.loads(entry.subtasks)['failed'], 1)
+        self.assertEqual(entry.task_state, FAILURE)
+        self.assertIn('1 of the 3 parts of the grade report failed', json.loads(entry.task_output)['message'])
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        self.assertEqual(report_store.links_for(self.course.id), [])
+        self.assertEqual(
+            report_store.storage.listdir(report_store.path_to(self.course.id, 'grade_report_parts/' + entry.task_id)),
+            ([], []),
+        )
+
+    @patch('lms.djangoapps.instructor_task.tasks_helper.grades.CourseGradeReport._merge')
+    def test_failed_merge(self, mock_merge):
+        mock_merge.side_effect = IOError('Cannot store the report')
+        self._generate()
+
+        entry = InstructorTask.objects.get(pk=self.entry.id)
+        self.assertEqual(entry.task_state, FAILURE)
+        self.assertEqual(json.loads(entry.task_output)['exception'], 'IOError')
+
+    def test_small_course(self):
+        GradeReportSetting.objects.create(enabled=True, batch_size=10)
+        result = self._generate()
+
+        self.assertDictContainsSubset({'attempted': 5, 'succeeded': 5, 'failed': 0}, result)
+        self.assertEqual(InstructorTask.objects.get(pk=self.entry.id).subtasks, '')
+
+
 class TestTeamGradeReport(InstructorGradeReportTestCase):
     """ Test that teams appear correctly in the grade report when it is enabled for the course. """
 
@@ -547,8 +671,8 @@ class TestProblemResponsesReport(TestReportMixin, InstructorTaskModuleTestCase):
             'location': 'Problem1',
             'block_key': 'i4x://edx/1.23x/problem/Problem1',
             'title': 'Problem1',
-        }, student_data[0])
-        self.assertIn('state', student_data[0])
+        }, list(student_data)[0])
+        self.assertIn('state', list(student_data)[0])
         mock_list_problem_responses.assert_called_with(self.course.id, ANY, ANY)
 
     @patch('xmodule.capa_module.CapaDescriptor.generate_report_data', create=True)
@@ -576,7 +700,7 @@ class TestProblemResponsesReport(TestReportMixin, InstructorTaskModuleTestCase):
             'title': 'Problem1',
             'some': 'state',
             'more': 'state!',
-        }, student_data[0])
+        }, list(student_data)[0])
 
     def test_build_student_data_for_block_with_real_generate_report_data(self):
         """
@@ -600,8 +724,8 @@ class TestProblemResponsesReport(TestReportMixin, InstructorTaskModuleTestCase):
             'Answer': 'Option 1',
             'Correct Answer': u'Option 1',
             'Question': u'The correct answer is Option 1',
-        }, student_data[0])
-        self.assertIn('state', student_data[0])
+        }, list(student_data)[0])
+        self.assertIn('state', list(student_data)[0])
 
     @patch('lms.djangoapps.instructor_task.tasks_helper.grades.list_problem_responses')
     @patch('xmodule.capa_module.CapaDescriptor.generate_report_data', create=True)
@@ -926,7 +1050,7 @@ class TestProblemGradeReport(TestReportMixin, InstructorTaskModuleTestCase):
         ])
 
     @patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task')
-    @patch('lms.djangoapps.grades.course_grade_factory.CourseGradeFactory.iter')
+    @patch('lms.djangoapps.grades.course_grade_factory.CourseGradeFactory.bulk_iter')
     @ddt.data(u'Cannot grade student', '')
     def test_grading_failure(self, error_message, mock_grades_iter, _mock_current_task):
         """
@@ -16,6 +16,7 @@ class LMSXBlockConfig(AppConfig):
     verbose_name = u'LMS XBlock'
 
     def ready(self):
+        from capa.safe_exec.django_integration import configure_safe_exec
         from .runtime import handler_url, local_resource_url
 
         # In order to allow modules to use a handler url, we need to
@@ -24,3 +25,7 @@ class LMSXBlockConfig(AppConfig):
         # https://openedx.atlassian.net/wiki/display/PLAT/Convert+from+Storage-centric+runtimes+to+Application-centric+runtimes
         xmodule.x_module.descriptor_global_handler_url = handler_url
         xmodule.x_module.descriptor_global_local_resource_url = local_resource_url
+
+        # Configure the sandbox worker pool and result cache in every process,
+        # not only in those that serve requests.
+        configure_safe_exec()
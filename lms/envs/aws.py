@@ -204,6 +204,12 @@ if 'loc_cache' not in CACHES:
         'LOCATION': 'edx_location_mem_cache',
     }
 
+COURSE_STRUCTURE_MEMORY_CACHE_MAX_BYTES = ENV_TOKENS.get(
+    'COURSE_STRUCTURE_MEMORY_CACHE_MAX_BYTES', COURSE_STRUCTURE_MEMORY_CACHE_MAX_BYTES
+)
+CONTENTSERVER_DISK_CACHE.update(ENV_TOKENS.get('CONTENTSERVER_DISK_CACHE', {}))
+COURSE_IMAGE_VARIANTS.update(ENV_TOKENS.get('COURSE_IMAGE_VARIANTS', {}))
+
 # Email overrides
 DEFAULT_FROM_EMAIL = ENV_TOKENS.get('DEFAULT_FROM_EMAIL', DEFAULT_FROM_EMAIL)
 DEFAULT_FEEDBACK_EMAIL = ENV_TOKENS.get('DEFAULT_FEEDBACK_EMAIL', DEFAULT_FEEDBACK_EMAIL)
@@ -217,6 +217,9 @@ CACHES = {
     },
 }
 
+# Don't cache the results of sandboxed code in memory, across tests.
+CODE_JAIL['result_cache']['max_entries'] = 0
+
 # Dummy secret key for dev
 SECRET_KEY = '85920908f28904ed733fe576320db18cabd7b6cd'
 
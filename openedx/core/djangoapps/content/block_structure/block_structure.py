@@ -12,7 +12,7 @@ from copy import deepcopy
 from functools import partial
 from logging import getLogger
 
-from openedx.core.lib.graph_traversals import traverse_topologically, traverse_post_order
+from openedx.core.lib.graph_traversals import traverse_topologically, traverse_post_order, traverse_pre_order
 
 from .exceptions import TransformerException
 
@@ -23,6 +23,11 @@ logger = getLogger(__name__)  # pylint: disable=invalid-name
 # A dictionary key value for storing a transformer's version number.
 TRANSFORMER_VERSION_KEY = '_version'
 
+# The name of the xBlock field that holds the version of the modulestore
+# structure in which the block was last changed.  It is collected for
+# all blocks to support incremental collects.
+UPDATE_VERSION_FIELD = 'update_version'
+
 
 class _BlockRelations(object):
     """
@@ -763,6 +768,51 @@ class BlockStructureBlockData(BlockStructure):
             self._block_data_map[usage_key] = block_data
             return block_data
 
+    def _merge_subtrees(self, partial_block_structure, subtree_usage_keys):
+        """
+        Returns a new BlockStructureBlockData with this structure's data,
+        where the relations and block data of the subtrees starting at
+        the given usage keys are replaced with those in the given partial
+        block structure.  The root block's data is always taken from the
+        partial block structure, since its course-wide fields, such as
+        the course version, change with every edit.  Blocks that are no
+        longer reachable from the root are dropped.
+
+        Arguments:
+            partial_block_structure (BlockStructureBlockData) - A block
+                structure containing newly collected data for the
+                subtrees, along with all of their ancestors.
+
+            subtree_usage_keys ([UsageKey]) - Usage keys of the roots of
+                the subtrees that are to be replaced.
+        """
+        replaced_keys = set()
+        for usage_key in subtree_usage_keys:
+            if usage_key not in replaced_keys:
+                replaced_keys.update(partial_block_structure.post_order_traversal(start_node=usage_key))
+
+        def _source_of(usage_key):
+            """
+            Returns the block structure from which to take the given block.
+            """
+            return partial_block_structure if usage_key in replaced_keys else self
+
+        merged = BlockStructureBlockData(self.root_block_usage_key)
+        merged.transformer_data = partial_block_structure.transformer_data
+        for usage_key in traverse_pre_order(
+                start_node=self.root_block_usage_key,
+                get_children=lambda usage_key: _source_of(usage_key).get_children(usage_key),
+        ):
+            source = _source_of(usage_key)
+            for child_key in source.get_children(usage_key):
+                merged._add_relation(usage_key, child_key)
+            if usage_key == self.root_block_usage_key:
+                source = partial_block_structure
+            block_data = source._block_data_map.get(usage_key)
+            if block_data is not None:
+                merged._block_data_map[usage_key] = block_data
+        return merged
+
 
 class BlockStructureModulestoreData(BlockStructureBlockData):
     """
@@ -0,0 +1,369 @@
+"""
+Compact, array-backed serialization format for BlockStructure objects.
+
+The default serialization of a block structure pickles a graph of
+_BlockRelations, BlockData, TransformerDataMap and UsageKey objects, which
+is large and slow to unpickle for big courses.  This format instead stores:
+
+    * The block keys as an interned table of (block_type, block_id) strings,
+      referenced everywhere else by their integer index.
+    * The children and parents relations as CSR-style integer arrays (an
+      offsets array plus a flat array of block indices).
+    * The collected xBlock fields and transformer block fields as columns:
+      for each field, a sorted array of the indices of the blocks that have
+      a value for it, and the list of those values.
+
+BlockData objects are not created when a structure is deserialized.
+Instead, the structure's block data map is a LazyBlockDataMap that
+builds each block's BlockData from the columns when it is first
+accessed.
+
+Serialized data is prefixed with a FORMAT_PREFIX that includes the
+format's version, so that it can be told apart from the pickle format.
+"""
+from array import array
+from bisect import bisect_left
+
+from openedx.core.lib.cache_utils import zpickle, zunpickle
+
+from .block_structure import BlockData, TransformerData, TransformerDataMap, _BlockRelations
+from .factory import BlockStructureFactory
+
+
+# The version of the compact format.  Increment this value whenever the
+# layout of the serialized data changes.
+VERSION = 1
+
+# Prefix for data serialized in this format.  zlib-compressed data (as
+# written for the pickle format) never starts with this prefix.
+FORMAT_PREFIX = 'BSC{}:'.format(VERSION)
+
+# Type code of the integer arrays.
+_ARRAY_TYPE = 'i'
+
+
+class CompactFormatError(ValueError):
+    """
+    Raised when a block structure can not be represented in, or read from,
+    the compact format.
+    """
+    pass
+
+
+def is_compact(serialized_data):
+    """
+    Returns whether the given serialized data is in the compact format.
+    """
+    return serialized_data.startswith(FORMAT_PREFIX)
+
+
+def serialize(block_structure):
+    """
+    Serializes the given block structure in the compact format.
+
+    Raises:
+        CompactFormatError if the block structure contains blocks that
+        are not in the course of its root block.
+    """
+    # pylint: disable=protected-access
+    course_key = block_structure.root_block_usage_key.course_key
+    block_relations = block_structure._block_relations
+    block_data_map = block_structure._block_data_map
+
+    block_keys = list(block_relations)
+    block_keys.extend(key for key in block_data_map if key not in block_relations)
+    index_of_key = {block_key: index for index, block_key in enumerate(block_keys)}
+
+    block_types = _StringTable()
+    key_table = array(_ARRAY_TYPE)
+    block_ids = []
+    for block_key in block_keys:
+        if getattr(block_key, 'course_key', None) != course_key:
+            raise CompactFormatError(u'Block {} is not in course {}.'.format(block_key, course_key))
+        key_table.append(block_types.index(block_key.block_type))
+        block_ids.append(block_key.block_id)
+
+    children = _CSRBuilder()
+    parents = _CSRBuilder()
+    for block_key in block_keys[:len(block_relations)]:
+        relations = block_relations[block_key]
+        children.add_row(index_of_key[child] for child in relations.children)
+        parents.add_row(index_of_key[parent] for parent in relations.parents)
+
+    block_data_indices = array(_ARRAY_TYPE)
+    xblock_fields = {}
+    transformer_block_fields = {}
+    for index, block_key in enumerate(block_keys):
+        block_data = block_data_map.get(block_key)
+        if block_data is None:
+            continue
+        block_data_indices.append(index)
+
+        for field_name, value in block_data.fields.iteritems():
+            _append_to_column(xblock_fields, field_name, index, value)
+
+        for transformer_name, transformer_block_data in block_data.transformer_data.iteritems():
+            present_indices, columns = transformer_block_fields.setdefault(
+                transformer_name, (array(_ARRAY_TYPE), {}),
+            )
+            present_indices.append(index)
+            for key, value in transformer_block_data.fields.iteritems():
+                _append_to_column(columns, key, index, value)
+
+    data = {
+        'num_blocks': len(block_relations),
+        'block_types': block_types.strings,
+        'key_table': key_table.tostring(),
+        'block_ids': block_ids,
+        'children': children.tostrings(),
+        'parents': parents.tostrings(),
+        'block_data_indices': block_data_indices.tostring(),
+        'xblock_fields': _columns_tostrings(xblock_fields),
+        'transformer_block_fields': {
+            transformer_name: (present_indices.tostring(), _columns_tostrings(columns))
+            for transformer_name, (present_indices, columns) in transformer_block_fields.iteritems()
+        },
+        'transformer_data': dict(block_structure.transformer_data),
+    }
+    return FORMAT_PREFIX + zpickle(data)
+
+
+def deserialize(serialized_data, root_block_usage_key):
+    """
+    Deserializes the given compact data and returns the parsed block
+    structure.  The structure's BlockData objects are created lazily.
+
+    Raises:
+        CompactFormatError if the data is not in this version of the
+        compact format.
+    """
+    if not is_compact(serialized_data):
+        raise CompactFormatError(u'Data for {} is not in compact format v{}.'.format(root_block_usage_key, VERSION))
+    data = zunpickle(serialized_data[len(FORMAT_PREFIX):])
+
+    course_key = root_block_usage_key.course_key
+    block_types = data['block_types']
+    block_keys = [
+        course_key.make_usage_key(block_types[type_index], block_id)
+        for type_index, block_id in zip(_to_array(data['key_table']), data['block_ids'])
+    ]
+
+    children_offsets, children_indices = (_to_array(string) for string in data['children'])
+    parents_offsets, parents_indices = (_to_array(string) for string in data['parents'])
+    block_relations = {}
+    for index in xrange(data['num_blocks']):
+        relations = _BlockRelations()
+        relations.children = [
+            block_keys[child] for child in children_indices[children_offsets[index]:children_offsets[index + 1]]
+        ]
+        relations.parents = [
+            block_keys[parent] for parent in parents_indices[parents_offsets[index]:parents_offsets[index + 1]]
+        ]
+        block_relations[block_keys[index]] = relations
+
+    transformer_data = TransformerDataMap()
+    transformer_data.update(data['transformer_data'])
+
+    return BlockStructureFactory.create_new(
+        root_block_usage_key,
+        block_relations,
+        transformer_data,
+        LazyBlockDataMap(block_keys, data),
+    )
+
+
+class LazyBlockDataMap(dict):
+    """
+    A map of a block's usage key to its BlockData, as used for the
+    _block_data_map of BlockStructureBlockData, that creates each
+    BlockData from compact columnar data when it is first accessed.
+
+    Iterating over the map (or copying it) creates all remaining
+    BlockData objects.
+    """
+    def __init__(self, block_keys, data):
+        super(LazyBlockDataMap, self).__init__()
+        self._unloaded = {
+            block_keys[index]: index for index in _to_array(data['block_data_indices'])
+        }
+        self._xblock_fields = _columns_from_strings(data['xblock_fields'])
+        self._transformer_block_fields = {
+            transformer_name: (_to_array(present_indices), _columns_from_strings(columns))
+            for transformer_name, (present_indices, columns) in data['transformer_block_fields'].iteritems()
+        }
+
+    def __missing__(self, usage_key):
+        index = self._unloaded.pop(usage_key)
+        block_data = BlockData(usage_key)
+
+        for field_name, column in self._xblock_fields.iteritems():
+            _set_from_column(block_data, field_name, column, index)
+
+        for transformer_name, (present_indices, columns) in self._transformer_block_fields.iteritems():
+            if _column_position(present_indices, index) is None:
+                continue
+            transformer_block_data = TransformerData()
+            for key, column in columns.iteritems():
+                _set_from_column(transformer_block_data, key, column, index)
+            block_data.transformer_data[transformer_name] = transformer_block_data
+
+        dict.__setitem__(self, usage_key, block_data)
+        return block_data
+
+    def __contains__(self, usage_key):
+        return dict.__contains__(self, usage_key) or usage_key in self._unloaded
+
+    def __len__(self):
+        return dict.__len__(self) + len(self._unloaded)
+
+    def __setitem__(self, usage_key, block_data):
+        self._unloaded.pop(usage_key, None)
+        dict.__setitem__(self, usage_key, block_data)
+
+    def __delitem__(self, usage_key):
+        if self._unloaded.pop(usage_key, None) is None:
+            dict.__delitem__(self, usage_key)
+
+    def __iter__(self):
+        return self.iterkeys()
+
+    def __deepcopy__(self, memo):
+        from copy import deepcopy
+        return deepcopy(dict(self.iteritems()), memo)
+
+    def __reduce__(self):
+        # Pickle as a plain, fully loaded dict.
+        return dict, (dict(self.iteritems()),)
+
+    def get(self, usage_key, default=None):
+        return self[usage_key] if usage_key in self else default
+
+    def pop(self, usage_key, *default):
+        if usage_key in self._unloaded:
+            self.__missing__(usage_key)
+        return dict.pop(self, usage_key, *default)
+
+    def iterkeys(self):
+        self._load_all()
+        return dict.iterkeys(self)
+
+    def itervalues(self):
+        self._load_all()
+        return dict.itervalues(self)
+
+    def iteritems(self):
+        self._load_all()
+        return dict.iteritems(self)
+
+    def keys(self):
+        return list(self.iterkeys())
+
+    def values(self):
+        return list(self.itervalues())
+
+    def items(self):
+        return list(self.iteritems())
+
+    def _load_all(self):
+        """
+        Creates the BlockData of all blocks that haven't been accessed yet.
+        """
+        for usage_key in list(self._unloaded):
+            self.__missing__(usage_key)
+
+
+class _StringTable(object):
+    """
+    An interned table of strings, each of which is stored once and
+    referenced by its index.
+    """
+    def __init__(self):
+        self.strings = []
+        self._indices = {}
+
+    def index(self, string):
+        """
+        Returns the index of the given string, adding it if necessary.
+        """
+        try:
+            return self._indices[string]
+        except KeyError:
+            self._indices[string] = len(self.strings)
+            self.strings.append(string)
+            return self._indices[string]
+
+
+class _CSRBuilder(object):
+    """
+    Builds a compressed sparse row representation of an adjacency list.
+    """
+    def __init__(self):
+        self.offsets = array(_ARRAY_TYPE, [0])
+        self.indices = array(_ARRAY_TYPE)
+
+    def add_row(self, indices):
+        """
+        Adds the row for the next block.
+        """
+        self.indices.extend(indices)
+        self.offsets.append(len(self.indices))
+
+    def tostrings(self):
+        """
+        Returns the offsets and indices arrays as strings.
+        """
+        return self.offsets.tostring(), self.indices.tostring()
+
+
+def _to_array(string):
+    """
+    Returns an integer array read from the given string.
+    """
+    result = array(_ARRAY_TYPE)
+    result.fromstring(string)
+    return result
+
+
+def _append_to_column(columns, name, index, value):
+    """
+    Appends the value for the block at the given index to the named column.
+    """
+    indices, values = columns.setdefault(name, (array(_ARRAY_TYPE), []))
+    indices.append(index)
+    values.append(value)
+
+
+def _columns_tostrings(columns):
+    """
+    Returns the given columns with their indices arrays converted to strings.
+    """
+    return {name: (indices.tostring(), values) for name, (indices, values) in columns.iteritems()}
+
+
+def _columns_from_strings(columns):
+    """
+    Returns the given columns with their indices arrays read from strings.
+    """
+    return {name: (_to_array(indices), values) for name, (indices, values) in columns.iteritems()}
+
+
+def _column_position(indices, index):
+    """
+    Returns the position of the given block index in the sorted indices
+    array of a column, or None if the block has no value in the column.
+    """
+    position = bisect_left(indices, index)
+    if position < len(indices) and indices[position] == index:
+        return position
+    return None
+
+
+def _set_from_column(field_data, name, column, index):
+    """
+    Sets the named field on the given FieldData to the value of the block
+    at the given index in the column, if the block has a value.
+    """
+    indices, values = column
+    position = _column_position(indices, index)
+    if position is not None:
+        setattr(field_data, name, values[position])
@@ -57,6 +57,75 @@ class BlockStructureFactory(object):
         build_block_structure(root_xblock)
         return block_structure
 
+    @classmethod
+    def create_from_modulestore_subtrees(cls, root_block_usage_key, modulestore, subtree_usage_keys, get_parents):
+        """
+        Creates and returns a partial block structure from the modulestore,
+        containing only the subtrees starting at the given
+        subtree_usage_keys along with all of their ancestors.  Only the
+        subtrees are loaded in full from the modulestore; ancestors are
+        related only to the blocks in the partial structure.
+
+        Arguments:
+            root_block_usage_key (UsageKey) - The usage_key for the root
+                of the block structure that is to be created.
+
+            modulestore (ModuleStoreRead) - The modulestore that
+                contains the data for the xBlocks within the block
+                structure.
+
+            subtree_usage_keys ([UsageKey]) - Usage keys of the roots of
+                the subtrees that are to be loaded.
+
+            get_parents ((UsageKey)->[UsageKey]) - Function that returns
+                the parents of the given block, used to find the blocks'
+                ancestors.
+
+        Returns:
+            BlockStructureModulestoreData - The created partial block
+                structure, rooted at root_block_usage_key.
+        """
+        block_structure = BlockStructureModulestoreData(root_block_usage_key)
+        root_xblock = modulestore.get_item(root_block_usage_key)
+        block_structure._add_xblock(root_block_usage_key, root_xblock)  # pylint: disable=protected-access
+        subtree_blocks = set()
+
+        def build_block_structure(xblock):
+            """
+            Recursively update the block structure with the given xBlock
+            and its descendants.
+            """
+            if xblock.location in subtree_blocks:
+                return
+
+            subtree_blocks.add(xblock.location)
+            block_structure._add_xblock(xblock.location, xblock)  # pylint: disable=protected-access
+
+            for child in xblock.get_children():
+                block_structure._add_relation(xblock.location, child.location)  # pylint: disable=protected-access
+                build_block_structure(child)
+
+        for usage_key in subtree_usage_keys:
+            build_block_structure(modulestore.get_item(usage_key, depth=None, lazy=False))
+
+        # Add the ancestors of all blocks in the subtrees, relating each
+        # ancestor only to its children that are in the partial structure.
+        ancestor_blocks = {root_block_usage_key}
+        blocks_to_relate = list(subtree_blocks)
+        while blocks_to_relate:
+            usage_key = blocks_to_relate.pop()
+            for parent_key in get_parents(usage_key):
+                if parent_key in subtree_blocks:
+                    continue
+                block_structure._add_relation(parent_key, usage_key)  # pylint: disable=protected-access
+                if parent_key not in ancestor_blocks:
+                    ancestor_blocks.add(parent_key)
+                    parent_xblock = modulestore.get_item(parent_key)
+                    block_structure._add_xblock(parent_key, parent_xblock)  # pylint: disable=protected-access
+                    blocks_to_relate.append(parent_key)
+
+        return block_structure
+
     @classmethod
     def create_from_store(cls, root_block_usage_key, block_structure_store):
         """
@@ -3,14 +3,19 @@ Top-level module for the Block Structure framework with a class for managing
 BlockStructures.
 """
 from contextlib import contextmanager
+from logging import getLogger
 
 from . import config
+from .block_structure import UPDATE_VERSION_FIELD
 from .exceptions import UsageKeyNotInBlockStructure, TransformerDataIncompatible, BlockStructureNotFound
 from .factory import BlockStructureFactory
 from .store import BlockStructureStore
 from .transformers import BlockStructureTransformers
 
 
+logger = getLogger(__name__)  # pylint: disable=C0103
+
+
 class BlockStructureManager(object):
     """
     Top-level class for managing Block Structures.
@@ -109,10 +114,18 @@ class BlockStructureManager(object):
         """
         The store is updated with newly collected transformers data from
         the modulestore, only if the data in the store is outdated.
+
+        When incremental collects are enabled, only the subtrees of
+        blocks that changed since the stored data was collected are
+        re-collected, if possible.
         """
         with self._bulk_operations():
             if not self.store.is_up_to_date(self.root_block_usage_key, self.modulestore):
-                self._update_collected()
+                if not (
+                    config.waffle().is_enabled(config.INCREMENTAL_COLLECT) and
+                    self._update_collected_incrementally()
+                ):
+                    self._update_collected()
 
     def _update_collected(self):
         """
@@ -128,6 +141,53 @@ class BlockStructureManager(object):
             self.store.add(block_structure)
             return block_structure
 
+    def _update_collected_incrementally(self):
+        """
+        The store is updated with newly collected transformers data for
+        the subtrees of blocks that changed in the modulestore since the
+        stored data was collected.
+
+        Returns the updated block structure, or None if an incremental
+        collect isn't possible, in which case a full collect is needed.
+        """
+        current_versions = self.modulestore.get_block_update_versions(self.root_block_usage_key.course_key)
+        if current_versions is None:
+            return None
+
+        try:
+            block_structure = BlockStructureFactory.create_from_store(self.root_block_usage_key, self.store)
+        except BlockStructureNotFound:
+            return None
+
+        if not BlockStructureTransformers.supports_incremental_collect(block_structure):
+            return None
+
+        changed_keys = [
+            usage_key for usage_key in block_structure
+            if block_structure.get_xblock_field(usage_key, UPDATE_VERSION_FIELD) != current_versions.get(usage_key)
+        ]
+        if self.root_block_usage_key in changed_keys:
+            return None
+
+        logger.info(
+            "BlockStructure: Incrementally collecting %d changed subtrees; %s.",
+            len(changed_keys),
+            self.root_block_usage_key,
+        )
+        partial_block_structure = BlockStructureFactory.create_from_modulestore_subtrees(
+            self.root_block_usage_key,
+            self.modulestore,
+            changed_keys,
+            block_structure.get_parents,
+        )
+        block_structure = BlockStructureTransformers.collect_incrementally(
+            block_structure,
+            partial_block_structure,
+            changed_keys,
+        )
+        self.store.add(block_structure)
+        return block_structure
+
     def clear(self):
         """
         Removes data for the block structure associated with the given
@@ -6,7 +6,7 @@ from logging import getLogger
 
 from openedx.core.lib.cache_utils import zpickle, zunpickle
 
-from . import config
+from . import compact, config
 from .block_structure import BlockStructureBlockData
 from .exceptions import BlockStructureNotFound
 from .factory import BlockStructureFactory
@@ -192,7 +192,16 @@ class BlockStructureStore(object):
     def _serialize(self, block_structure):
         """
         Serializes the data for the given block_structure.
+
+        The compact format is used when enabled, falling back to the
+        pickle format for structures it can not represent.
         """
+        if _is_compact_serialization_enabled():
+            try:
+                return compact.serialize(block_structure)
+            except compact.CompactFormatError as error:
+                logger.warning("BlockStructure: Not using compact format; %s.", error)
+
         data_to_cache = (
             block_structure._block_relations,
             block_structure.transformer_data,
@@ -203,7 +212,13 @@ class BlockStructureStore(object):
     def _deserialize(self, serialized_data, root_block_usage_key):
         """
         Deserializes the given data and returns the parsed block_structure.
+
+        Data in either the compact or the pickle format is accepted,
+        regardless of which format is currently enabled for writes.
         """
+        if compact.is_compact(serialized_data):
+            return compact.deserialize(serialized_data, root_block_usage_key)
+
         block_relations, transformer_data, block_data_map = zunpickle(serialized_data)
         return BlockStructureFactory.create_new(
             root_block_usage_key,
@@ -256,3 +271,10 @@ def _is_storage_backing_enabled():
     Returns whether storage backing for Block Structures is enabled.
     """
     return config.waffle().is_enabled(config.STORAGE_BACKING_FOR_CACHE)
+
+
+def _is_compact_serialization_enabled():
+    """
+    Returns whether Block Structures are to be serialized in the compact format.
+    """
+    return config.waffle().is_enabled(config.COMPACT_SERIALIZATION)
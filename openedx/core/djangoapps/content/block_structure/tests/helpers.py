@@ -9,7 +9,7 @@ from uuid import uuid4
 from opaque_keys.edx.locator import CourseLocator, BlockUsageLocator
 
 from ..api import get_cache
-from ..block_structure import BlockStructureBlockData
+from ..block_structure import UPDATE_VERSION_FIELD, BlockStructureBlockData
 from ..exceptions import BlockStructureNotFound
 from ..models import BlockStructureModel
 from ..store import BlockStructureStore
@@ -100,6 +100,17 @@ class MockModulestore(object):
             raise ItemNotFoundError
         return item
 
+    def get_block_update_versions(self, course_key):  # pylint: disable=unused-argument
+        """
+        Returns a map of block key to the update_version field of its
+        mock XBlock, for those blocks that have one.
+        """
+        return {
+            block_key: block.field_map[UPDATE_VERSION_FIELD]
+            for block_key, block in self.blocks.iteritems()
+            if UPDATE_VERSION_FIELD in block.field_map
+        }
+
     @contextmanager
     def bulk_operations(self, ignore):  # pylint: disable=unused-argument
         """
@@ -0,0 +1,121 @@
+"""
+Tests for compact.py
+"""
+# pylint: disable=protected-access
+from copy import deepcopy
+from unittest import TestCase
+
+import ddt
+from nose.plugins.attrib import attr
+
+from openedx.core.lib.cache_utils import zpickle
+
+from .. import compact
+from ..block_structure import BlockStructureBlockData
+from .helpers import ChildrenMapTestMixin, MockTransformer, UsageKeyFactoryMixin
+
+
+@attr(shard=2)
+@ddt.ddt
+class TestCompactFormat(UsageKeyFactoryMixin, ChildrenMapTestMixin, TestCase):
+    """
+    Tests for the compact serialization format.
+    """
+    def create_collected_structure(self, children_map):
+        """
+        Returns a block structure for the given children_map, with
+        xBlock fields and transformer data set on some of its blocks.
+        """
+        block_structure = self.create_block_structure(children_map)
+        block_structure._add_transformer(MockTransformer)
+        for block_id in range(len(children_map)):
+            block_key = self.block_key_factory(block_id)
+            block_data = block_structure._get_or_create_block(block_key)
+            block_data.display_name = u'Block {}'.format(block_id)
+            if block_id % 2:
+                block_data.graded = True
+                block_structure.set_transformer_block_field(block_key, MockTransformer, 'odd', block_id)
+        return block_structure
+
+    def round_trip(self, block_structure):
+        """
+        Returns the given block structure, serialized and deserialized.
+        """
+        serialized_data = compact.serialize(block_structure)
+        self.assertTrue(compact.is_compact(serialized_data))
+        return compact.deserialize(serialized_data, block_structure.root_block_usage_key)
+
+    @ddt.data(
+        ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP,
+        ChildrenMapTestMixin.LINEAR_CHILDREN_MAP,
+        ChildrenMapTestMixin.DAG_CHILDREN_MAP,
+    )
+    def test_round_trip(self, children_map):
+        block_structure = self.create_collected_structure(children_map)
+        deserialized = self.round_trip(block_structure)
+
+        self.assert_block_structure(deserialized, children_map)
+        for block_id in range(len(children_map)):
+            block_key = self.block_key_factory(block_id)
+            self.assertEqual(deserialized.get_parents(block_key), block_structure.get_parents(block_key))
+            self.assertEqual(deserialized.get_children(block_key), block_structure.get_children(block_key))
+            self.assertEqual(deserialized[block_key].fields, block_structure[block_key].fields)
+            self.assertEqual(
+                deserialized.get_transformer_block_field(block_key, MockTransformer, 'odd'),
+                block_structure.get_transformer_block_field(block_key, MockTransformer, 'odd'),
+            )
+        self.assertEqual(
+            deserialized._get_transformer_data_version(MockTransformer),
+            MockTransformer.WRITE_VERSION,
+        )
+
+    def test_lazy_block_data(self):
+        deserialized = self.round_trip(self.create_collected_structure(self.SIMPLE_CHILDREN_MAP))
+        block_data_map = deserialized._block_data_map
+        self.assertEqual(len(block_data_map), len(self.SIMPLE_CHILDREN_MAP))
+        self.assertEqual(dict.__len__(block_data_map), 0)
+
+        block_key = self.block_key_factory(1)
+        self.assertIn(block_key, block_data_map)
+        self.assertTrue(deserialized.get_xblock_field(block_key, 'graded'))
+        self.assertEqual(dict.__len__(block_data_map), 1)
+
+        self.assertEqual(len(list(deserialized.itervalues())), len(self.SIMPLE_CHILDREN_MAP))
+        self.assertEqual(dict.__len__(block_data_map), len(self.SIMPLE_CHILDREN_MAP))
+
+    def test_block_without_transformer_data(self):
+        deserialized = self.round_trip(self.create_collected_structure(self.SIMPLE_CHILDREN_MAP))
+        block_key = self.block_key_factory(2)
+        self.assertIsNone(deserialized.get_xblock_field(block_key, 'graded'))
+        with self.assertRaises(KeyError):
+            deserialized.get_transformer_block_data(block_key, MockTransformer)
+
+    def test_remove_unloaded_block(self):
+        deserialized = self.round_trip(self.create_collected_structure(self.SIMPLE_CHILDREN_MAP))
+        block_key = self.block_key_factory(1)
+        deserialized.remove_block(block_key, keep_descendants=False)
+        self.assertNotIn(block_key, deserialized._block_data_map)
+        self.assertIsNone(deserialized.get_xblock_field(block_key, 'display_name'))
+
+    def test_copy(self):
+        deserialized = self.round_trip(self.create_collected_structure(self.SIMPLE_CHILDREN_MAP))
+        copied = deserialized.copy()
+        self.assertIs(type(copied._block_data_map), dict)
+        block_key = self.block_key_factory(3)
+        copied.override_xblock_field(block_key, 'display_name', u'Changed')
+        self.assertEqual(deserialized.get_xblock_field(block_key, 'display_name'), u'Block 3')
+        self.assertEqual(set(deepcopy(deserialized._block_data_map)), set(deserialized._block_data_map))
+
+    def test_blocks_from_other_course(self):
+        block_structure = self.create_block_structure(self.SIMPLE_CHILDREN_MAP)
+        block_structure._add_relation(
+            self.block_key_factory(0),
+            self.course_key.replace(run='other').make_usage_key('html', 'other'),
+        )
+        with self.assertRaises(compact.CompactFormatError):
+            compact.serialize(block_structure)
+
+    def test_deserialize_pickle_format(self):
+        block_structure = BlockStructureBlockData(self.block_key_factory(0))
+        with self.assertRaises(compact.CompactFormatError):
+            compact.deserialize(zpickle(('a', 'b', 'c')), block_structure.root_block_usage_key)
@@ -5,13 +5,13 @@ import ddt
 from django.test import TestCase
 from nose.plugins.attrib import attr
 
-from ..block_structure import BlockStructureBlockData
-from ..config import RAISE_ERROR_WHEN_NOT_FOUND, STORAGE_BACKING_FOR_CACHE, waffle
+from ..block_structure import UPDATE_VERSION_FIELD, BlockStructureBlockData
+from ..config import INCREMENTAL_COLLECT, RAISE_ERROR_WHEN_NOT_FOUND, STORAGE_BACKING_FOR_CACHE, waffle
 from ..exceptions import UsageKeyNotInBlockStructure, BlockStructureNotFound
 from ..manager import BlockStructureManager
 from ..transformers import BlockStructureTransformers
 from .helpers import (
-    MockModulestoreFactory, MockCache, MockTransformer,
+    MockModulestoreFactory, MockCache, MockTransformer, MockXBlock,
     ChildrenMapTestMixin, UsageKeyFactoryMixin,
     mock_registered_transformers,
 )
@@ -89,6 +89,21 @@ class TestTransformer1(MockTransformer):
         return data_key + 't1.val1.' + unicode(block_key)
 
 
+class TestIncrementalTransformer(TestTransformer1):
+    """
+    Test Transformer class that supports incremental collects, and keeps
+    track of the blocks that it collected.
+    """
+    SUPPORTS_INCREMENTAL_COLLECT = True
+    collected_block_keys = set()
+
+    @classmethod
+    def collect(cls, block_structure):
+        super(TestIncrementalTransformer, cls).collect(block_structure)
+        block_structure.request_xblock_fields('course_version')
+        cls.collected_block_keys.update(block_structure)
+
+
 @attr(shard=2)
 @ddt.ddt
 class TestBlockStructureManager(UsageKeyFactoryMixin, ChildrenMapTestMixin, TestCase):
@@ -219,3 +234,112 @@ class TestBlockStructureManager(UsageKeyFactoryMixin, ChildrenMapTestMixin, Test
         self.bs_manager.clear()
         self.collect_and_verify(expect_modulestore_called=True, expect_cache_updated=True)
         self.assertEquals(TestTransformer1.collect_call_count, 2)
+
+
+@attr(shard=2)
+class TestBlockStructureManagerIncrementalCollect(UsageKeyFactoryMixin, ChildrenMapTestMixin, TestCase):
+    """
+    Test class for incremental collects by the BlockStructureManager.
+    """
+    def setUp(self):
+        super(TestBlockStructureManagerIncrementalCollect, self).setUp()
+
+        TestIncrementalTransformer.collect_call_count = 0
+        self.registered_transformers = [TestIncrementalTransformer()]
+
+        self.children_map = [[1, 2], [3, 4], [], [], []]
+        self.modulestore = MockModulestoreFactory.create(self.children_map, self.block_key_factory)
+        for block in self.modulestore.blocks.itervalues():
+            block.field_map[UPDATE_VERSION_FIELD] = 'version1'
+        self.modulestore.blocks[self.block_key_factory(0)].field_map['course_version'] = 'version1'
+        self.bs_manager = BlockStructureManager(self.block_key_factory(0), self.modulestore, MockCache())
+
+        self.update_collected()
+
+    def update_collected(self):
+        """
+        Updates the collected block structure, with incremental collects
+        enabled, and returns the block keys that were collected.
+        """
+        TestIncrementalTransformer.collected_block_keys = set()
+        with waffle().override(INCREMENTAL_COLLECT, active=True):
+            with mock_registered_transformers(self.registered_transformers):
+                self.bs_manager.update_collected_if_needed()
+        return TestIncrementalTransformer.collected_block_keys
+
+    def get_collected(self):
+        """
+        Returns the stored collected block structure.
+        """
+        with mock_registered_transformers(self.registered_transformers):
+            return self.bs_manager.get_collected()
+
+    def add_block(self, parent_id, block_id):
+        """
+        Adds a new block as the last child of the given parent in the mock
+        modulestore, updating the versions of both blocks.
+        """
+        parent = self.modulestore.blocks[self.block_key_factory(parent_id)]
+        block_key = self.block_key_factory(block_id)
+        parent.children.append(block_key)
+        parent.field_map[UPDATE_VERSION_FIELD] = 'version2'
+        self.modulestore.blocks[block_key] = MockXBlock(
+            block_key, {UPDATE_VERSION_FIELD: 'version2'}, modulestore=self.modulestore,
+        )
+
+    def block_keys(self, *block_ids):
+        """
+        Returns the set of block keys for the given block ids.
+        """
+        return {self.block_key_factory(block_id) for block_id in block_ids}
+
+    def test_initial_collect_is_full(self):
+        self.assertEqual(TestIncrementalTransformer.collected_block_keys, self.block_keys(0, 1, 2, 3, 4))
+
+    def test_changed_subtree(self):
+        self.add_block(1, 5)
+        self.assertEqual(self.update_collected(), self.block_keys(0, 1, 3, 4, 5))
+
+        block_structure = self.get_collected()
+        self.assert_block_structure(block_structure, [[1, 2], [3, 4, 5], [], [], [], []])
+        TestIncrementalTransformer.assert_collected(block_structure)
+        self.assertEqual(
+            block_structure.get_xblock_field(self.block_key_factory(5), UPDATE_VERSION_FIELD),
+            'version2',
+        )
+
+    def test_root_data_is_updated(self):
+        root_key = self.block_key_factory(0)
+        self.add_block(1, 5)
+        self.modulestore.blocks[root_key].field_map['course_version'] = 'version2'
+        self.assertEqual(self.update_collected(), self.block_keys(0, 1, 3, 4, 5))
+        self.assertEqual(self.get_collected().get_xblock_field(root_key, 'course_version'), 'version2')
+
+    def test_removed_block(self):
+        parent = self.modulestore.blocks[self.block_key_factory(1)]
+        parent.children.remove(self.block_key_factory(4))
+        parent.field_map[UPDATE_VERSION_FIELD] = 'version2'
+        self.assertEqual(self.update_collected(), self.block_keys(0, 1, 3))
+
+        block_structure = self.get_collected()
+        self.assert_block_structure(block_structure, [[1, 2], [3], [], [], []], missing_blocks=[4])
+
+    def test_unchanged(self):
+        self.assertEqual(self.update_collected(), self.block_keys(0))
+        self.assert_block_structure(self.get_collected(), self.children_map)
+
+    def test_changed_root(self):
+        self.add_block(0, 5)
+        self.assertEqual(self.update_collected(), self.block_keys(0, 1, 2, 3, 4, 5))
+
+    def test_unsupported_transformer(self):
+        TestIncrementalTransformer.SUPPORTS_INCREMENTAL_COLLECT = False
+        self.addCleanup(setattr, TestIncrementalTransformer, 'SUPPORTS_INCREMENTAL_COLLECT', True)
+        self.add_block(1, 5)
+        self.assertEqual(self.update_collected(), self.block_keys(0, 1, 2, 3, 4, 5))
+
+    def test_new_transformer_version(self):
+        TestIncrementalTransformer.WRITE_VERSION += 1
+        self.addCleanup(setattr, TestIncrementalTransformer, 'WRITE_VERSION', TestIncrementalTransformer.WRITE_VERSION - 1)
+        self.add_block(1, 5)
+        self.assertEqual(self.update_collected(), self.block_keys(0, 1, 2, 3, 4, 5))
@@ -1,12 +1,15 @@
 """
 Tests for block_structure/cache.py
 """
+import itertools
+
 import ddt
 from nose.plugins.attrib import attr
 
 from openedx.core.djangolib.testing.utils import CacheIsolationTestCase
 
-from ..config import STORAGE_BACKING_FOR_CACHE, waffle
+from .. import compact
+from ..config import COMPACT_SERIALIZATION, STORAGE_BACKING_FOR_CACHE, waffle
 from ..config.models import BlockStructureConfiguration
 from ..exceptions import BlockStructureNotFound
 from ..store import BlockStructureStore
@@ -59,6 +62,23 @@ class TestBlockStructureStore(UsageKeyFactoryMixin, ChildrenMapTestMixin, CacheI
             self.assertIsNotNone(stored_value)
             self.assert_block_structure(stored_value, self.children_map)
 
+    @ddt.data(*itertools.product((True, False), repeat=2))
+    @ddt.unpack
+    def test_add_and_get_compact(self, with_storage_backing, with_compact_serialization):
+        with waffle().override(STORAGE_BACKING_FOR_CACHE, active=with_storage_backing):
+            with waffle().override(COMPACT_SERIALIZATION, active=with_compact_serialization):
+                self.store.add(self.block_structure)
+                cached_value = self.mock_cache.map.values()[0]
+                self.assertEqual(compact.is_compact(cached_value), with_compact_serialization)
+
+            # Reads succeed for either format, regardless of the switch
+            stored_value = self.store.get(self.block_structure.root_block_usage_key)
+            self.assert_block_structure(stored_value, self.children_map)
+            self.assertEqual(
+                stored_value.get_transformer_block_field(self.block_key_factory(0), MockTransformer, 'test'),
+                '{} val'.format(MockTransformer.name()),
+            )
+
     @ddt.data(True, False)
     def test_delete(self, with_storage_backing):
         with waffle().override(STORAGE_BACKING_FOR_CACHE, active=with_storage_backing):
@@ -55,6 +55,27 @@ class BlockStructureTransformer(object):
     WRITE_VERSION = 0
     READ_VERSION = 0
 
+    # Whether the transformer's collect method produces the same data
+    # for a block when it is given a partial block structure that
+    # contains only the block's subtree and all of its ancestors.
+    #
+    # When a course is updated, the block_structure framework may then
+    # re-collect only the subtrees of the changed blocks, rather than
+    # the entire course, and merge them into the stored block
+    # structure. Only the data of the blocks in those subtrees, and of
+    # the root, is taken from the partial block structure; the data of
+    # every other block, including the subtrees' other ancestors, is
+    # kept as it was. So a transformer may set this to True only if
+    # the data it collects for a block depends on nothing but the block
+    # itself and its ancestors, and its non-block-specific data on
+    # nothing but the root. Data that depends on a block's descendants
+    # (such as a count or union of them) or on its siblings would go
+    # stale. The collect method must also cope with blocks, such as the
+    # ancestors' other children, that are not in the partial block
+    # structure. The framework falls back to a full collect if any
+    # registered transformer does not support incremental collects.
+    SUPPORTS_INCREMENTAL_COLLECT = False
+
     @classmethod
     def name(cls):
         """
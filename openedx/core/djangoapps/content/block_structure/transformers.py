@@ -4,6 +4,7 @@ Module for a collection of BlockStructureTransformers.
 import functools
 from logging import getLogger
 
+from .block_structure import UPDATE_VERSION_FIELD
 from .exceptions import TransformerException, TransformerDataIncompatible
 from .transformer import FilteringTransformerMixin
 from .transformer_registry import TransformerRegistry
@@ -79,9 +80,48 @@ class BlockStructureTransformers(object):
             block_structure._add_transformer(transformer)  # pylint: disable=protected-access
             transformer.collect(block_structure)
 
-        # Collect all fields that were requested by the transformers.
+        # Collect all fields that were requested by the transformers,
+        # along with the blocks' versions for incremental collects.
+        block_structure.request_xblock_fields(UPDATE_VERSION_FIELD)
         block_structure._collect_requested_xblock_fields()  # pylint: disable=protected-access
 
+    @classmethod
+    def collect_incrementally(cls, block_structure, partial_block_structure, subtree_usage_keys):
+        """
+        Collects data for each registered transformer for the given
+        partial block structure, and returns a new block structure with
+        the given (previously collected) block structure's data, updated
+        with the newly collected data of the re-collected subtrees.
+
+        Arguments:
+            block_structure (BlockStructureBlockData) - A previously
+                collected block structure for the same root.
+
+            partial_block_structure (BlockStructureModulestoreData) - A
+                block structure containing the subtrees that are to be
+                re-collected, along with all of their ancestors.
+
+            subtree_usage_keys ([UsageKey]) - Usage keys of the roots of
+                the subtrees that are to be re-collected.
+        """
+        cls.collect(partial_block_structure)
+        return block_structure._merge_subtrees(  # pylint: disable=protected-access
+            partial_block_structure, subtree_usage_keys
+        )
+
+    @classmethod
+    def supports_incremental_collect(cls, block_structure):
+        """
+        Returns whether all registered transformers support incremental
+        collects, and the data in the given block structure was collected
+        by their current versions.
+        """
+        get_data_version = block_structure._get_transformer_data_version  # pylint: disable=protected-access
+        return all(
+            transformer.SUPPORTS_INCREMENTAL_COLLECT and get_data_version(transformer) == transformer.WRITE_VERSION
+            for transformer in TransformerRegistry.get_registered_transformers()
+        )
+
     @classmethod
     def verify_versions(cls, block_structure):
         """
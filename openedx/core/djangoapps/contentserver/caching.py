@@ -1,11 +1,14 @@
 """
 Helper functions for caching course assets.
 """
+from collections import namedtuple
+
 from django.core.cache import caches
 from django.core.cache.backends.base import InvalidCacheBackendError
 from opaque_keys import InvalidKeyError
 
 from xmodule.contentstore.content import STATIC_CONTENT_VERSION
+from xmodule.contentstore.django import contentstore
 
 # See if there's a "course_assets" cache configured, and if not, fallback to the default cache.
 CONTENT_CACHE = caches['default']
@@ -14,6 +17,48 @@ try:
 except InvalidCacheBackendError:
     pass
 
+# The metadata of an asset, which is cached separately from its content so that
+# conditional and HEAD requests can be answered without loading the content.
+StaticContentMetadata = namedtuple(
+    'StaticContentMetadata',
+    ['location', 'content_digest', 'length', 'last_modified_at', 'locked', 'content_type'],
+)
+
+# How long, in seconds, to keep the metadata of an asset.  Studio deletes it when an asset is
+# uploaded, deleted or imported; this bounds how stale it gets when an asset changes otherwise.
+CONTENT_METADATA_CACHE_TIMEOUT = 300
+
+# How long, in seconds, to remember that there is no content at a location.
+MISSING_CONTENT_CACHE_TIMEOUT = 300
+
+
+def content_metadata(content):
+    """
+    Returns the StaticContentMetadata of the given piece of content.
+    """
+    return StaticContentMetadata(
+        location=content.location,
+        content_digest=getattr(content, 'content_digest', None),
+        length=content.length,
+        last_modified_at=content.last_modified_at,
+        locked=bool(getattr(content, 'locked', False)),
+        content_type=content.content_type,
+    )
+
+
+def _metadata_key(location):
+    """
+    Returns the cache key of the metadata of the content at the given location.
+    """
+    return (u'metadata:' + unicode(location)).encode("utf-8")
+
+
+def _missing_key(location):
+    """
+    Returns the cache key of the marker that there is no content at the given location.
+    """
+    return (u'missing:' + unicode(location)).encode("utf-8")
+
 
 def set_cached_content(content):
     """
@@ -29,9 +74,41 @@ def get_cached_content(location):
     return CONTENT_CACHE.get(unicode(location).encode("utf-8"), version=STATIC_CONTENT_VERSION)
 
 
+def set_cached_content_metadata(metadata):
+    """
+    Stores, for CONTENT_METADATA_CACHE_TIMEOUT seconds, the given StaticContentMetadata in the cache,
+    using its location as the key.
+    """
+    CONTENT_CACHE.set(
+        _metadata_key(metadata.location), metadata, CONTENT_METADATA_CACHE_TIMEOUT, version=STATIC_CONTENT_VERSION
+    )
+
+
+def get_cached_content_metadata(location):
+    """
+    Retrieves the StaticContentMetadata of the content at the given location if cached.
+    """
+    return CONTENT_CACHE.get(_metadata_key(location), version=STATIC_CONTENT_VERSION)
+
+
+def set_cached_content_missing(location):
+    """
+    Remembers, for MISSING_CONTENT_CACHE_TIMEOUT seconds, that there is no content at the given location.
+    """
+    CONTENT_CACHE.set(_missing_key(location), True, MISSING_CONTENT_CACHE_TIMEOUT, version=STATIC_CONTENT_VERSION)
+
+
+def is_cached_content_missing(location):
+    """
+    Returns whether there was recently found to be no content at the given location.
+    """
+    return bool(CONTENT_CACHE.get(_missing_key(location), version=STATIC_CONTENT_VERSION))
+
+
 def del_cached_content(location):
     """
-    Delete content for the given location, as well versions of the content without a run.
+    Delete content, its metadata and any marker that it's missing for the given location, as well versions
+    of the content without a run.
 
     It's possible that the content could have been cached without knowing the course_key,
     and so without having the run.
@@ -40,11 +117,26 @@ def del_cached_content(location):
         """Force the location to a Unicode string."""
         return unicode(loc).encode("utf-8")
 
-    locations = [location_str(location)]
+    locations = [location]
     try:
-        locations.append(location_str(location.replace(run=None)))
+        locations.append(location.replace(run=None))
     except InvalidKeyError:
         # although deprecated keys allowed run=None, new keys don't if there is no version.
         pass
 
-    CONTENT_CACHE.delete_many(locations, version=STATIC_CONTENT_VERSION)
+    keys = (
+        [location_str(loc) for loc in locations] +
+        [_metadata_key(loc) for loc in locations] +
+        [_missing_key(loc) for loc in locations]
+    )
+    CONTENT_CACHE.delete_many(keys, version=STATIC_CONTENT_VERSION)
+
+
+def del_cached_course_content(course_key):
+    """
+    Delete the content, metadata and missing markers of all the assets of a course, as when
+    they were replaced by a course import.
+    """
+    assets, __ = contentstore().get_all_content_for_course(course_key)
+    for asset in assets:
+        del_cached_content(asset['asset_key'])
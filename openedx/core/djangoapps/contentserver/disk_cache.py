@@ -0,0 +1,298 @@
+"""
+A cache of the contents of course assets on local disk.
+
+Assets too large to be cached in memcache are otherwise read from the contentstore,
+chunk by chunk, on every request.  Cached files are named by the assets' digests, so
+assets with the same contents share a file, and the least recently used files are
+evicted when the cache grows beyond its maximum size.
+
+An asset is written to the cache as it is sent in response to a request, by only one
+request at a time; other requests for it meanwhile are served from the contentstore.
+"""
+import errno
+import logging
+import os
+import re
+import tempfile
+import time
+
+from django.conf import settings
+
+log = logging.getLogger(__name__)
+
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]+$')
+
+# Evicting files lists the whole cache directory, so a process only evicts files once it
+# has added this fraction of the cache's maximum size since it last did, or once this
+# many seconds have passed since then.
+EVICTION_THRESHOLD = 0.1
+EVICTION_INTERVAL = 60
+
+# How long, in seconds, a request can take to write an asset to the cache before other requests
+# assume that it won't finish, and write it themselves.
+LOCK_TIMEOUT = 10 * 60
+
+# The number of bytes that this process has added to each cache directory since it last
+# evicted files from it, and the time it did so.
+_ADDED_SINCE_EVICTION = {}
+
+
+def get_asset_disk_cache():
+    """
+    Returns the AssetDiskCache configured by the CONTENTSERVER_DISK_CACHE setting,
+    or None if it isn't enabled.
+    """
+    config = getattr(settings, 'CONTENTSERVER_DISK_CACHE', None) or {}
+    if not config.get('DIRECTORY'):
+        return None
+    return AssetDiskCache(
+        config['DIRECTORY'],
+        config['MAX_SIZE'],
+        x_accel_redirect_prefix=config.get('X_ACCEL_REDIRECT_PREFIX'),
+    )
+
+
+class AssetDiskCache(object):
+    """
+    A size-bounded, least recently used cache of asset contents in a directory,
+    keyed by the assets' digests.
+
+    Arguments:
+        directory (str): the directory to keep the cached files in
+        max_size (int): the maximum total size of the cached files, in bytes
+        x_accel_redirect_prefix (str): if set, the URL prefix under which the web server
+            serves the directory internally, for the server to send cached files itself
+    """
+    def __init__(self, directory, max_size, x_accel_redirect_prefix=None):
+        self.directory = directory
+        self.max_size = max_size
+        self.x_accel_redirect_prefix = x_accel_redirect_prefix
+
+    def can_cache(self, metadata):
+        """
+        Returns whether the contents of the asset with the given StaticContentMetadata can be cached.
+        """
+        content_digest = metadata.content_digest
+        return (
+            content_digest is not None and DIGEST_PATTERN.match(content_digest) is not None and
+            metadata.length is not None and metadata.length <= self.max_size
+        )
+
+    def relative_path(self, content_digest):
+        """
+        Returns the path of the cached file of the given digest, relative to the cache directory.
+        """
+        return os.path.join(content_digest[:2], content_digest)
+
+    def get(self, content_digest):
+        """
+        Returns the path of the cached file of the given digest, or None if it isn't cached.
+        """
+        path = os.path.join(self.directory, self.relative_path(content_digest))
+        try:
+            # Mark the file as recently used.
+            os.utime(path, None)
+        except OSError:
+            return None
+        return path
+
+    def add(self, content):
+        """
+        Writes the contents of the given StaticContent to the cache, and returns the path of the cached file,
+        or None if they couldn't be written, or are being written by another request.
+        """
+        caching_stream = self.stream_and_add(content)
+        if caching_stream is None:
+            return None
+        for __ in caching_stream:
+            pass
+        return caching_stream.path
+
+    def stream_and_add(self, content):
+        """
+        Returns a CachingStream of the contents of the given StaticContent, which writes them to
+        the cache as they're read, or None if another request is already writing them.
+        """
+        lock_path = self._lock(content.content_digest)
+        if lock_path is None:
+            return None
+        return CachingStream(self, content, lock_path)
+
+    def _lock(self, content_digest):
+        """
+        Creates the marker file that a request is writing the cached file of the given digest,
+        and returns its path, or None if there already is one.
+
+        A marker older than LOCK_TIMEOUT was left by a request that didn't finish, and is replaced.
+        """
+        lock_path = os.path.join(self.directory, '.{}.lock'.format(content_digest))
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+        except OSError:
+            # Created by another process, or it can't be, which creating the marker reports.
+            pass
+
+        for __ in range(2):
+            try:
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return lock_path
+            except OSError as error:
+                if error.errno != errno.EEXIST:
+                    log.exception(u'Unable to lock the disk cache file of digest %s', content_digest)
+                    return None
+            try:
+                if time.time() - os.path.getmtime(lock_path) < LOCK_TIMEOUT:
+                    return None
+                os.remove(lock_path)
+            except OSError:
+                # Removed by the request that created it.
+                pass
+        return None
+
+    def evict(self):
+        """
+        Removes the least recently used files until the size of the cache is at most `max_size`.
+        """
+        cached_files = []
+        for subdirectory in os.listdir(self.directory):
+            subdirectory_path = os.path.join(self.directory, subdirectory)
+            if subdirectory.startswith('.') or not os.path.isdir(subdirectory_path):
+                continue
+            for name in os.listdir(subdirectory_path):
+                path = os.path.join(subdirectory_path, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # Evicted by another process.
+                    continue
+                cached_files.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for __, size, __ in cached_files)
+        for __, size, path in sorted(cached_files):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total_size -= size
+
+    def _evict_if_needed(self, added_size):
+        """
+        Evicts files if this process has added enough to the cache, or if enough time has
+        passed, since it last evicted files.
+        """
+        previously_added_size, evicted_at = _ADDED_SINCE_EVICTION.get(self.directory, (0, 0))
+        added_size += previously_added_size
+        now = time.time()
+        if added_size >= self.max_size * EVICTION_THRESHOLD or now - evicted_at >= EVICTION_INTERVAL:
+            self.evict()
+            added_size, evicted_at = 0, now
+        _ADDED_SINCE_EVICTION[self.directory] = (added_size, evicted_at)
+
+    def x_accel_redirect(self, content_digest):
+        """
+        Returns the internal URL the web server serves the cached file of the given digest at.
+        """
+        return self.x_accel_redirect_prefix.rstrip('/') + '/' + self.relative_path(content_digest)
+
+
+class CachingStream(object):
+    """
+    An iterator over the chunks of the contents of an asset that writes them to the disk
+    cache as they're read.  The file is only added to the cache once all of the contents
+    have been read, and is discarded if the stream is closed before then.
+
+    Arguments:
+        disk_cache (AssetDiskCache): the cache to add the asset's contents to
+        content (StaticContent): the asset
+        lock_path (str): the path of the marker that the asset's contents are being written,
+            which is removed once they are, or once the stream is closed
+    """
+    def __init__(self, disk_cache, content, lock_path):
+        self.disk_cache = disk_cache
+        self.content = content
+        self.path = None
+        self._lock_path = lock_path
+        self._chunks = self._write_chunks()
+
+    def __iter__(self):
+        return self._chunks
+
+    def close(self):
+        """
+        Stops writing the contents, and releases the marker that they're being written.
+        """
+        self._chunks.close()
+        self._unlock()
+
+    def _write_chunks(self):
+        """
+        Yields the chunks of the asset's contents, writing them to a temporary file that is
+        moved into the cache once all of them have been written.
+        """
+        path = os.path.join(self.disk_cache.directory, self.disk_cache.relative_path(self.content.content_digest))
+        temp_file = None
+        size = 0
+        try:
+            try:
+                if not os.path.isdir(os.path.dirname(path)):
+                    os.makedirs(os.path.dirname(path))
+                # Write to a temporary file first, so that a partly written file is never served.
+                temp_file = tempfile.NamedTemporaryFile(dir=self.disk_cache.directory, prefix='.', delete=False)
+            except (IOError, OSError):
+                log.exception(u'Unable to write asset %s to the disk cache', self.content.location)
+
+            for chunk in self.content.stream_data():
+                size += len(chunk)
+                if temp_file is not None:
+                    try:
+                        temp_file.write(chunk)
+                    except (IOError, OSError):
+                        log.exception(u'Unable to write asset %s to the disk cache', self.content.location)
+                        self._discard(temp_file)
+                        temp_file = None
+                yield chunk
+
+            if temp_file is not None:
+                temp_file.close()
+                if size != self.content.length:
+                    log.warning(
+                        u'Asset %s was %d bytes, rather than %d, when written to the disk cache',
+                        self.content.location, size, self.content.length
+                    )
+                else:
+                    try:
+                        os.rename(temp_file.name, path)
+                        self.path = path
+                    except OSError:
+                        log.exception(u'Unable to write asset %s to the disk cache', self.content.location)
+        finally:
+            if temp_file is not None and self.path is None:
+                self._discard(temp_file)
+            self._unlock()
+
+        if self.path is not None:
+            self.disk_cache._evict_if_needed(size)  # pylint: disable=protected-access
+
+    def _discard(self, temp_file):
+        """
+        Closes and removes a partly written temporary file.
+        """
+        try:
+            temp_file.close()
+            os.remove(temp_file.name)
+        except (IOError, OSError):
+            pass
+
+    def _unlock(self):
+        """
+        Removes the marker that the asset's contents are being written, if it hasn't been yet.
+        """
+        if self._lock_path is not None:
+            try:
+                os.remove(self._lock_path)
+            except OSError:
+                pass
+            self._lock_path = None
@@ -0,0 +1,264 @@
+"""
+Resized and re-encoded variants of course images.
+
+Uploaded images are converted in the background to each of the configured widths and
+formats, and the variants are stored as thumbnails of the course, named by the digest of
+the original image so that a changed image never has stale variants.  Images with the same
+contents share their variants, which are locked if any of those images is.  The
+contentserver serves a variant in place of the original when a request asks for a width,
+with the `w` query parameter, or for a format, with the `format` query parameter or its
+Accept header.
+"""
+import logging
+import StringIO
+from collections import namedtuple
+
+from django.conf import settings
+from PIL import Image
+
+from xmodule.contentstore.content import StaticContent
+from xmodule.contentstore.django import contentstore
+from xmodule.exceptions import NotFoundError
+
+from .caching import del_cached_content
+
+log = logging.getLogger(__name__)
+
+# The PIL format, content type and file extension of each format that variants can be encoded in.
+ImageVariantFormat = namedtuple('ImageVariantFormat', ['pil_format', 'content_type', 'extension'])
+IMAGE_VARIANT_FORMATS = {
+    'jpeg': ImageVariantFormat('JPEG', 'image/jpeg', 'jpg'),
+    'png': ImageVariantFormat('PNG', 'image/png', 'png'),
+    'webp': ImageVariantFormat('WEBP', 'image/webp', 'webp'),
+}
+
+# The content types of the images that have variants.  GIFs would lose their animation,
+# and SVGs scale without any.
+SOURCE_CONTENT_TYPES = ('image/jpeg', 'image/png', 'image/bmp', 'image/tiff')
+
+
+def parse_accept_header(accept):
+    """
+    Returns a dict mapping each media range of the given Accept header to its quality value.
+    Media ranges with malformed quality values are left out.
+    """
+    accepted = {}
+    for media_range in accept.split(','):
+        params = media_range.split(';')
+        media_type = params[0].strip().lower()
+        if not media_type:
+            continue
+        quality = 1.0
+        for param in params[1:]:
+            name, __, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    quality = None
+        if quality is not None:
+            accepted[media_type] = quality
+    return accepted
+
+
+def get_image_variants():
+    """
+    Returns the ImageVariants configured by the COURSE_IMAGE_VARIANTS setting, or None if
+    they aren't enabled.
+    """
+    config = getattr(settings, 'COURSE_IMAGE_VARIANTS', None) or {}
+    if not config.get('ENABLED'):
+        return None
+    return ImageVariants(config['WIDTHS'], config['FORMATS'], quality=config.get('QUALITY', 80))
+
+
+class ImageVariants(object):
+    """
+    The variants of course images: each image has a variant in each of the formats at its
+    own size, and at each of the widths that it is wider than.
+
+    Arguments:
+        widths (list): the widths of the variants, in pixels
+        formats (list): the formats of the variants, from IMAGE_VARIANT_FORMATS, in the order
+            they are preferred when a request accepts more than one of them
+        quality (int): the quality of lossy variants, from 1 to 100
+    """
+    def __init__(self, widths, formats, quality=80):
+        self.widths = sorted(widths)
+        self.formats = [image_format for image_format in formats if image_format in IMAGE_VARIANT_FORMATS]
+        self.quality = quality
+
+    def can_vary(self, content_type):
+        """
+        Returns whether images of the given content type have variants.
+        """
+        return content_type in SOURCE_CONTENT_TYPES
+
+    def location(self, course_key, content_digest, width, image_format):
+        """
+        Returns the location of the variant of the given width, or None for the image's own
+        width, and format of the image with the given digest.
+        """
+        extension = IMAGE_VARIANT_FORMATS[image_format].extension
+        if width is None:
+            name = u'{}.{}'.format(content_digest, extension)
+        else:
+            name = u'{}-{}w.{}'.format(content_digest, width, extension)
+        return StaticContent.compute_location(course_key, name, is_thumbnail=True)
+
+    def variants(self):
+        """
+        Returns a list of the (width, format) of each variant.
+        """
+        return [(width, image_format) for width in [None] + self.widths for image_format in self.formats]
+
+    def generate(self, content):
+        """
+        Creates the variants of the given image StaticContent, which must have a digest, that
+        don't exist yet, and returns their locations.  Whether the images are locked is only
+        looked up if a variant is written.
+        """
+        course_key = content.location.course_key
+        locations = []
+        locked = None
+        with Image.open(StringIO.StringIO(content.data)) as image:
+            has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+            converted_images = {}
+            for width, image_format in self.variants():
+                variant_format = IMAGE_VARIANT_FORMATS[image_format]
+                if width is None and variant_format.content_type == content.content_type:
+                    # The original is served for its own size and format.
+                    continue
+                if width is not None and width >= image.width:
+                    # Images are never scaled up; requests for this width get the image's own size.
+                    continue
+                location = self.location(course_key, content.content_digest, width, image_format)
+                if self._exists(location):
+                    # Variants are named by the image's digest, so this one was made from the same image.
+                    continue
+                try:
+                    # JPEG has no alpha channel, and PIL can't save palettes to WebP.
+                    mode = 'RGBA' if has_alpha and variant_format.pil_format != 'JPEG' else 'RGB'
+                    if mode not in converted_images:
+                        converted_images[mode] = image.convert(mode)
+                    variant_image = converted_images[mode]
+                    if width is not None:
+                        height = max(1, int(round(image.height * width / float(image.width))))
+                        variant_image = variant_image.resize((width, height), Image.ANTIALIAS)
+
+                    variant_file = StringIO.StringIO()
+                    variant_image.save(variant_file, variant_format.pil_format, quality=self.quality)
+                except (IOError, KeyError, ValueError):
+                    # Variants are optional, and this PIL may not be able to write the format.
+                    log.exception(u'Failed to create image variant %s of %s', location, content.location)
+                    continue
+
+                if locked is None:
+                    locked = self._count_images(course_key, content.content_digest, locked=True) > 0
+                contentstore().save(StaticContent(
+                    location, location.path, variant_format.content_type, variant_file.getvalue(), locked=locked,
+                ))
+                del_cached_content(location)
+                locations.append(location)
+        return locations
+
+    def delete(self, course_key, content_digest):
+        """
+        Deletes the variants of the image with the given digest, unless another image in
+        the course still has that digest and so shares them.
+        """
+        if self._count_images(course_key, content_digest):
+            return
+        for width, image_format in self.variants():
+            location = self.location(course_key, content_digest, width, image_format)
+            contentstore().delete(location)
+            del_cached_content(location)
+
+    def update_lock(self, course_key, content_digest):
+        """
+        Locks the variants of the image with the given digest if any image in the course
+        with that digest is locked, and unlocks them otherwise, for when an image's lock
+        changes.  Variants can be requested at their own URLs, as well as their images'.
+        """
+        locked = self._count_images(course_key, content_digest, locked=True) > 0
+        for width, image_format in self.variants():
+            location = self.location(course_key, content_digest, width, image_format)
+            try:
+                contentstore().set_attr(location, 'locked', locked)
+            except NotFoundError:
+                # The image is never scaled up to this width, or the variant isn't generated yet.
+                continue
+            del_cached_content(location)
+
+    def _exists(self, location):
+        """
+        Returns whether there is content at the given location, without reading it.
+        """
+        content = contentstore().find(location, throw_on_not_found=False, as_stream=True)
+        if content is None:
+            return False
+        content.close()
+        return True
+
+    def _count_images(self, course_key, content_digest, **filter_params):
+        """
+        Returns the number of images in the course with the given digest that match the
+        filter parameters.
+        """
+        filter_params['md5'] = content_digest
+        __, count = contentstore().get_all_content_for_course(course_key, maxresults=1, filter_params=filter_params)
+        return count
+
+    def choose(self, request, metadata):
+        """
+        Returns the location of the variant of the image with the given StaticContentMetadata
+        that the request asks for, or None if it asks for the original image.
+
+        A `w` query parameter selects the narrowest variant at least that wide, and the
+        `format` query parameter, else the most preferred format that the Accept header
+        lists, else the image's own format, selects the format.
+        """
+        if not self.can_vary(metadata.content_type) or not metadata.content_digest:
+            return None
+
+        width = None
+        try:
+            requested_width = int(request.GET.get('w', ''))
+        except ValueError:
+            pass
+        else:
+            width = next((width for width in self.widths if width >= requested_width), None)
+
+        image_format = self._choose_format(request, metadata.content_type)
+        if image_format is None:
+            return None
+        if width is None and IMAGE_VARIANT_FORMATS[image_format].content_type == metadata.content_type:
+            return None
+        return self.location(metadata.location.course_key, metadata.content_digest, width, image_format)
+
+    def _choose_format(self, request, content_type):
+        """
+        Returns the format of the variant that the request asks for, or None if there
+        are no variants of the image's own format.
+        """
+        image_format = request.GET.get('format')
+        if image_format in self.formats:
+            return image_format
+        # Wildcards don't select variants, since they don't say that a client can decode them.
+        accepted = parse_accept_header(request.META.get('HTTP_ACCEPT', ''))
+        accepted_formats = [
+            image_format for image_format in self.formats
+            if accepted.get(IMAGE_VARIANT_FORMATS[image_format].content_type, 0) > 0
+        ]
+        if accepted_formats:
+            # The formats' own order breaks ties between equally preferred ones.
+            return max(
+                accepted_formats,
+                key=lambda image_format: (
+                    accepted[IMAGE_VARIANT_FORMATS[image_format].content_type], -self.formats.index(image_format)
+                ),
+            )
+        for image_format in self.formats:
+            if IMAGE_VARIANT_FORMATS[image_format].content_type == content_type:
+                return image_format
+        return None
@@ -4,24 +4,30 @@ Middleware to serve assets.
 
 import logging
 import datetime
+from uuid import uuid4
 log = logging.getLogger(__name__)
 try:
     import newrelic.agent
 except ImportError:
     newrelic = None  # pylint: disable=invalid-name
 from django.http import (
-    HttpResponse, HttpResponseNotModified, HttpResponseForbidden,
-    HttpResponseBadRequest, HttpResponseNotFound, HttpResponsePermanentRedirect)
+    FileResponse, HttpResponse, HttpResponseNotModified, HttpResponseForbidden,
+    HttpResponseBadRequest, HttpResponseNotFound, HttpResponsePermanentRedirect, StreamingHttpResponse)
 from six import text_type
 from student.models import CourseEnrollment
 
 from xmodule.assetstore.assetmgr import AssetManager
-from xmodule.contentstore.content import StaticContent, XASSET_LOCATION_TAG
+from xmodule.contentstore.content import StaticContent, StaticContentStream, XASSET_LOCATION_TAG
 from xmodule.modulestore import InvalidLocationError
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.locator import AssetLocator
 from openedx.core.djangoapps.header_control import force_header_for_response
-from .caching import get_cached_content, set_cached_content
+from .caching import (
+    content_metadata, get_cached_content, get_cached_content_metadata, is_cached_content_missing, set_cached_content,
+    set_cached_content_metadata, set_cached_content_missing
+)
+from .disk_cache import get_asset_disk_cache
+from .image_variants import get_image_variants
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.exceptions import NotFoundError
 
@@ -32,6 +38,12 @@ from .models import CourseAssetCacheTtlConfig, CdnUserAgentsConfig
 
 HTTP_DATE_FORMAT = "%a, %d %b %Y %H:%M:%S GMT"
 
+# Assets smaller than this are cached in memcache; larger ones can be cached on disk.
+MAX_MEMCACHED_CONTENT_SIZE = 1048576
+
+# The most ranges of a Range header that are sent, as a multipart/byteranges response.
+MAX_BYTE_RANGES = 50
+
 
 class StaticContentServer(object):
     """
@@ -68,14 +80,13 @@ class StaticContentServer(object):
             except (InvalidLocationError, InvalidKeyError):
                 return HttpResponseBadRequest()
 
-            # Attempt to load the asset to make sure it exists, and grab the asset digest
-            # if we're able to load it.
-            actual_digest = None
+            # Attempt to load the asset's metadata to make sure it exists, and grab the asset digest
+            # if we're able to load it.  The asset itself isn't loaded unless we need to send it.
             try:
-                content = self.load_asset_from_location(loc)
-                actual_digest = getattr(content, "content_digest", None)
+                metadata = self.load_asset_metadata_from_location(loc)
             except (ItemNotFoundError, NotFoundError):
                 return HttpResponseNotFound()
+            actual_digest = metadata.content_digest
 
             # If this was a versioned asset, and the digest doesn't match, redirect
             # them to the actual version.
@@ -100,20 +111,88 @@ class StaticContentServer(object):
                 newrelic.agent.add_custom_parameter('contentserver.from_cdn', is_from_cdn)
 
                 # Check if this content is locked or not.
-                locked = self.is_content_locked(content)
+                locked = self.is_content_locked(metadata)
                 newrelic.agent.add_custom_parameter('contentserver.locked', locked)
 
             # Check that user has access to the content.
-            if not self.is_user_authorized(request, content, loc):
+            if not self.is_user_authorized(request, metadata, loc):
                 return HttpResponseForbidden('Unauthorized')
 
+            # Serve a resized or re-encoded variant of an image instead, if the request asks
+            # for one and it has been generated.
+            image_variants = get_image_variants()
+            vary_on_accept = image_variants is not None and image_variants.can_vary(metadata.content_type)
+            if vary_on_accept:
+                variant_location = image_variants.choose(request, metadata)
+                variant_metadata = None
+                if variant_location is not None:
+                    variant_metadata = self.load_image_variant_metadata_from_location(variant_location)
+                if variant_metadata is not None:
+                    # Variants are locked along with their originals.
+                    loc, metadata = variant_location, variant_metadata._replace(locked=metadata.locked)
+
             # Figure out if the client sent us a conditional request, and let them know
             # if this asset has changed since then.
-            last_modified_at_str = content.last_modified_at.strftime(HTTP_DATE_FORMAT)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
-                if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
-                if if_modified_since == last_modified_at_str:
-                    return HttpResponseNotModified()
+            if self.is_not_modified(request, metadata):
+                response = HttpResponseNotModified()
+                self.set_caching_headers(metadata, response, vary_on_accept)
+                return response
+
+            # Answer HEAD requests from the metadata as well.
+            if request.method == 'HEAD':
+                response = HttpResponse()
+                response['Content-Length'] = metadata.length
+                response['Accept-Ranges'] = 'bytes'
+                response['Content-Type'] = metadata.content_type
+                self.set_caching_headers(metadata, response, vary_on_accept)
+                return response
+
+            # Large assets are served from the local disk cache, if it's enabled.
+            disk_cache = get_asset_disk_cache()
+            cached_path = None
+            content = None
+            caching_stream = None
+            if (
+                disk_cache is not None and metadata.length >= MAX_MEMCACHED_CONTENT_SIZE and
+                disk_cache.can_cache(metadata)
+            ):
+                cached_path = disk_cache.get(metadata.content_digest)
+                if cached_path is None and not request.META.get('HTTP_RANGE'):
+                    # Add the asset to the cache as it's sent, unless another request already is.
+                    # Range requests are served from the contentstore, without adding it.
+                    try:
+                        content = AssetManager.find(loc, as_stream=True)
+                    except (ItemNotFoundError, NotFoundError):
+                        return HttpResponseNotFound()
+                    caching_stream = disk_cache.stream_and_add(content)
+
+            content_file = None
+            if cached_path is not None:
+                if disk_cache.x_accel_redirect_prefix:
+                    # Let the web server send the file, including any requested range.
+                    response = HttpResponse()
+                    response['X-Accel-Redirect'] = disk_cache.x_accel_redirect(metadata.content_digest)
+                    response['Accept-Ranges'] = 'bytes'
+                    response['Content-Type'] = metadata.content_type
+                    self.set_caching_headers(metadata, response, vary_on_accept)
+                    return response
+
+                try:
+                    content_file = open(cached_path, 'rb')
+                except (IOError, OSError):
+                    # The file was evicted, possibly by another process, after it was found.
+                    log.warning(u'Unable to open the disk cache file of asset %s', loc, exc_info=True)
+
+            if content_file is not None:
+                content = StaticContentStream(
+                    loc, loc.path, metadata.content_type, content_file, last_modified_at=metadata.last_modified_at,
+                    length=metadata.length, locked=metadata.locked, content_digest=metadata.content_digest,
+                )
+            elif content is None:
+                try:
+                    content = self.load_asset_from_location(loc)
+                except (ItemNotFoundError, NotFoundError):
+                    return HttpResponseNotFound()
 
             # *** File streaming within a byte range ***
             # If a Range is provided, parse Range attribute of the request
@@ -122,9 +201,10 @@ class StaticContentServer(object):
             # Response -> Content-Range attribute structure: "Content-Range: bytes first-last/totalLength"
             # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35
             response = None
+            content_type = content.content_type
             if request.META.get('HTTP_RANGE'):
                 # If we have a StaticContent, get a StaticContentStream.  Can't manipulate the bytes otherwise.
-                if isinstance(content, StaticContent):
+                if not isinstance(content, StaticContentStream):
                     content = AssetManager.find(loc, as_stream=True)
 
                 header_value = request.META['HTTP_RANGE']
@@ -139,38 +219,65 @@ class StaticContentServer(object):
                     if unit != 'bytes':
                         # Only accept ranges in bytes
                         log.warning(u"Unknown unit in Range header: %s for content: %s", header_value, text_type(loc))
-                    elif len(ranges) > 1:
-                        # According to Http/1.1 spec content for multiple ranges should be sent as a multipart message.
-                        # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
-                        # But we send back the full content.
+                    elif len(ranges) > MAX_BYTE_RANGES:
+                        # Too many ranges, which we may ignore, so we send back the full content.
                         log.warning(
-                            u"More than 1 ranges in Range header: %s for content: %s", header_value, text_type(loc)
+                            u"More than %d ranges in Range header: %s for content: %s",
+                            MAX_BYTE_RANGES, header_value, text_type(loc)
                         )
                     else:
-                        first, last = ranges[0]
+                        # Ignore the ranges that can't be satisfied, if any others can.
+                        ranges = [(first, last) for first, last in ranges if 0 <= first <= last < content.length]
 
-                        if 0 <= first <= last < content.length:
-                            # If the byte range is satisfiable
-                            response = HttpResponse(content.stream_data_in_range(first, last))
-                            response['Content-Range'] = 'bytes {first}-{last}/{length}'.format(
-                                first=first, last=last, length=content.length
+                        if len(ranges) > 1 and sum(last - first + 1 for first, last in ranges) >= content.length:
+                            # The ranges ask for at least the whole content, so we send back the
+                            # full content rather than any of it more than once.
+                            log.warning(
+                                u"Ranges in Range header cover the whole content: %s for content: %s",
+                                header_value, text_type(loc)
                             )
-                            response['Content-Length'] = str(last - first + 1)
-                            response.status_code = 206  # Partial Content
-
-                            if newrelic:
-                                newrelic.agent.add_custom_parameter('contentserver.ranged', True)
-                        else:
+                        elif not ranges:
                             log.warning(
                                 u"Cannot satisfy ranges in Range header: %s for content: %s",
                                 header_value, text_type(loc)
                             )
                             return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                        else:
+                            ranges = merge_byte_ranges(ranges)
+                            if len(ranges) == 1:
+                                # If the byte range is satisfiable
+                                first, last = ranges[0]
+                                response = HttpResponse(content.stream_data_in_range(first, last))
+                                response['Content-Range'] = 'bytes {first}-{last}/{length}'.format(
+                                    first=first, last=last, length=content.length
+                                )
+                                response['Content-Length'] = str(last - first + 1)
+                            else:
+                                # According to Http/1.1 spec content for multiple ranges should be sent
+                                # as a multipart message.
+                                # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
+                                boundary = uuid4().hex
+                                response = StreamingHttpResponse(stream_byteranges(content, ranges, boundary))
+                                response['Content-Length'] = str(byteranges_length(content, ranges, boundary))
+                                content_type = 'multipart/byteranges; boundary={}'.format(boundary)
+                            response.status_code = 206  # Partial Content
+
+                            if newrelic:
+                                newrelic.agent.add_custom_parameter('contentserver.ranged', True)
 
             # If Range header is absent or syntactically invalid return a full content response.
             if response is None:
-                response = HttpResponse(content.stream_data())
+                if content_file is not None:
+                    # Let the WSGI server send the file with its file wrapper, if it has one.
+                    response = FileResponse(content_file)
+                elif caching_stream is not None:
+                    response = StreamingHttpResponse(caching_stream)
+                else:
+                    response = HttpResponse(content.stream_data())
                 response['Content-Length'] = content.length
+            elif content_file is not None and not response.streaming:
+                # A streamed multipart response closes the file once it has been sent.
+                content_file.close()
 
             if newrelic:
                 newrelic.agent.add_custom_parameter('contentserver.content_len', content.length)
@@ -178,19 +285,20 @@ class StaticContentServer(object):
 
             # "Accept-Ranges: bytes" tells the user that only "bytes" ranges are allowed
             response['Accept-Ranges'] = 'bytes'
-            response['Content-Type'] = content.content_type
+            response['Content-Type'] = content_type
 
             # Set any caching headers, and do any response cleanup needed.  Based on how much
             # middleware we have in place, there's no easy way to use the built-in Django
             # utilities and properly sanitize and modify a response to ensure that it is as
             # cacheable as possible, which is why we do it ourselves.
-            self.set_caching_headers(content, response)
+            self.set_caching_headers(metadata, response, vary_on_accept)
 
             return response
 
-    def set_caching_headers(self, content, response):
+    def set_caching_headers(self, content, response, vary_on_accept=False):
         """
-        Sets caching headers based on whether or not the asset is locked.
+        Sets caching headers based on whether or not the asset is locked, and on whether
+        the response depends on the request's Accept header.
         """
 
         is_locked = getattr(content, "locked", False)
@@ -215,10 +323,48 @@ class StaticContentServer(object):
 
         response['Last-Modified'] = content.last_modified_at.strftime(HTTP_DATE_FORMAT)
 
+        etag = StaticContentServer.get_etag(content)
+        if etag is not None:
+            response['ETag'] = etag
+
         # Force the Vary header to only vary responses on Origin, so that XHR and browser requests get cached
         # separately and don't screw over one another. i.e. a browser request that doesn't send Origin, and
-        # caches a version of the response without CORS headers, in turn breaking XHR requests.
-        force_header_for_response(response, 'Vary', 'Origin')
+        # caches a version of the response without CORS headers, in turn breaking XHR requests.  Images
+        # with variants also vary on Accept, which can select the format of the variant.
+        force_header_for_response(response, 'Vary', 'Origin, Accept' if vary_on_accept else 'Origin')
+
+    @staticmethod
+    def get_etag(content):
+        """
+        Returns the strong entity tag of the given content or content metadata, which is its
+        digest, or None if it doesn't have a digest.
+        """
+        content_digest = getattr(content, "content_digest", None)
+        if not content_digest:
+            return None
+        return '"{}"'.format(content_digest)
+
+    @staticmethod
+    def is_not_modified(request, metadata):
+        """
+        Determines whether the client's copy of the asset with the given metadata is current,
+        according to the If-None-Match header of the request or, if there isn't one, its
+        If-Modified-Since header.
+        """
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            etag = StaticContentServer.get_etag(metadata)
+            if etag is None:
+                return False
+            # If-None-Match uses the weak comparison: a weak tag matches our strong tag.
+            requested_etags = [requested_etag.strip() for requested_etag in if_none_match.split(',')]
+            return any(
+                requested_etag == '*' or requested_etag.replace('W/', '', 1) == etag
+                for requested_etag in requested_etags
+            )
+
+        if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
+        return if_modified_since == metadata.last_modified_at.strftime(HTTP_DATE_FORMAT)
 
     @staticmethod
     def is_cdn_request(request):
@@ -267,6 +413,42 @@ class StaticContentServer(object):
 
         return True
 
+    def load_asset_metadata_from_location(self, location):
+        """
+        Loads the metadata of an asset based on its location, either retrieving it from
+        a cache or loading it from the cached asset or the contentstore, without reading
+        the asset's data.
+        """
+        metadata = get_cached_content_metadata(location)
+        if metadata is None:
+            content = get_cached_content(location)
+            if content is None:
+                content = AssetManager.find(location, as_stream=True)
+                try:
+                    metadata = content_metadata(content)
+                finally:
+                    content.close()
+            else:
+                metadata = content_metadata(content)
+            set_cached_content_metadata(metadata)
+
+        return metadata
+
+    def load_image_variant_metadata_from_location(self, location):
+        """
+        Loads the metadata of an image variant based on its location, like
+        load_asset_metadata_from_location, or returns None if it hasn't been generated.
+        Missing variants are remembered for a while, so they aren't looked for on every
+        request for their image.
+        """
+        if is_cached_content_missing(location):
+            return None
+        try:
+            return self.load_asset_metadata_from_location(location)
+        except (ItemNotFoundError, NotFoundError):
+            set_cached_content_missing(location)
+            return None
+
     def load_asset_from_location(self, location):
         """
         Loads an asset based on its location, either retrieving it from a cache
@@ -285,13 +467,76 @@ class StaticContentServer(object):
             # Now that we fetched it, let's go ahead and try to cache it. We cap this at 1MB
             # because it's the default for memcached and also we don't want to do too much
             # buffering in memory when we're serving an actual request.
-            if content.length is not None and content.length < 1048576:
+            if content.length is not None and content.length < MAX_MEMCACHED_CONTENT_SIZE:
                 content = content.copy_to_in_mem()
                 set_cached_content(content)
 
         return content
 
 
+def merge_byte_ranges(ranges):
+    """
+    Returns the given (first, last) byte ranges sorted, with any that overlap or are
+    adjacent merged into one.
+    """
+    merged_ranges = []
+    for first, last in sorted(ranges):
+        if merged_ranges and first <= merged_ranges[-1][1] + 1:
+            merged_ranges[-1] = (merged_ranges[-1][0], max(last, merged_ranges[-1][1]))
+        else:
+            merged_ranges.append((first, last))
+    return merged_ranges
+
+
+def byterange_part_header(content, first, last, boundary):
+    """
+    Returns the boundary and headers that precede the (first, last) range of the content
+    in a multipart/byteranges response.
+    """
+    return (
+        '\r\n--{boundary}\r\n'
+        'Content-Type: {content_type}\r\n'
+        'Content-Range: bytes {first}-{last}/{length}\r\n\r\n'
+    ).format(
+        boundary=boundary, content_type=content.content_type, first=first, last=last, length=content.length
+    ).encode('utf-8')
+
+
+def byteranges_end(boundary):
+    """
+    Returns the closing boundary of a multipart/byteranges response.
+    """
+    return '\r\n--{boundary}--\r\n'.format(boundary=boundary).encode('utf-8')
+
+
+def byteranges_length(content, ranges, boundary):
+    """
+    Returns the length of the body of a multipart/byteranges response with the given
+    (first, last) ranges of the content, without reading the content.
+    """
+    return sum(
+        len(byterange_part_header(content, first, last, boundary)) + last - first + 1 for first, last in ranges
+    ) + len(byteranges_end(boundary))
+
+
+def stream_byteranges(content, ranges, boundary):
+    """
+    Stream the body of a multipart/byteranges response with the given (first, last)
+    ranges of the content, separated by the boundary, and close the content's stream
+    once it has been sent.
+
+    See spec for details: https://tools.ietf.org/html/rfc7233#appendix-A
+    """
+    try:
+        for first, last in ranges:
+            yield byterange_part_header(content, first, last, boundary)
+            for chunk in content.stream_data_in_range(first, last):
+                yield chunk
+        yield byteranges_end(boundary)
+    finally:
+        content.close()
+
+
 def parse_range_header(header_value, content_length):
     """
     Returns the unit and a list of (start, end) tuples of ranges.
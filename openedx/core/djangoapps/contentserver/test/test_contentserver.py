@@ -6,6 +6,9 @@ import copy
 import datetime
 import ddt
 import logging
+import os
+import shutil
+import tempfile
 import unittest
 from uuid import uuid4
 
@@ -16,7 +19,7 @@ from django.test.utils import override_settings
 from mock import patch
 
 from xmodule.contentstore.django import contentstore
-from xmodule.contentstore.content import StaticContent, VERSIONED_ASSETS_PREFIX
+from xmodule.contentstore.content import StaticContent, StaticContentStream, VERSIONED_ASSETS_PREFIX
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
 from xmodule.modulestore.xml_importer import import_course_from_xml
@@ -27,7 +30,9 @@ from xmodule.modulestore.exceptions import ItemNotFoundError
 from student.models import CourseEnrollment
 from student.tests.factories import UserFactory, AdminFactory
 
-from ..middleware import parse_range_header, HTTP_DATE_FORMAT, StaticContentServer
+from ..caching import content_metadata, del_cached_content, del_cached_course_content, get_cached_content_metadata
+from ..image_variants import get_image_variants
+from ..middleware import merge_byte_ranges, parse_range_header, HTTP_DATE_FORMAT, StaticContentServer
 
 log = logging.getLogger(__name__)
 
@@ -242,13 +247,74 @@ class ContentStoreToyCourseTest(SharedModuleStoreTestCase):
 
     def test_range_request_multiple_ranges(self):
         """
-        Test that multiple ranges in request outputs the full content.
+        Test that multiple ranges in request outputs a multipart/byteranges response.
         """
         first_byte = self.length_unlocked / 4
         last_byte = self.length_unlocked / 2
         resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, -100'.format(
             first=first_byte, last=last_byte))
 
+        self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
+        self.assertNotIn('Content-Range', resp)
+        self.assertTrue(resp['Content-Type'].startswith('multipart/byteranges; boundary='))
+        body = b''.join(resp.streaming_content)
+        self.assertEqual(resp['Content-Length'], str(len(body)))
+        self.assertIn(
+            'Content-Range: bytes {first}-{last}/{length}'.format(
+                first=first_byte, last=last_byte, length=self.length_unlocked
+            ),
+            body
+        )
+        self.assertIn(
+            'Content-Range: bytes {first}-{last}/{length}'.format(
+                first=self.length_unlocked - 100, last=self.length_unlocked - 1, length=self.length_unlocked
+            ),
+            body
+        )
+
+    def test_range_request_overlapping_ranges(self):
+        """
+        Test that overlapping and adjacent ranges are merged, and sent in order.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=-100, 20-29, 10-19, 15-25')
+
+        self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
+        body = b''.join(resp.streaming_content)
+        self.assertEqual(resp['Content-Length'], str(len(body)))
+        self.assertEqual(body.count('Content-Range: '), 2)
+        self.assertLess(
+            body.index('Content-Range: bytes 10-29/{length}'.format(length=self.length_unlocked)),
+            body.index('Content-Range: bytes {first}-{last}/{length}'.format(
+                first=self.length_unlocked - 100, last=self.length_unlocked - 1, length=self.length_unlocked
+            ))
+        )
+
+    def test_range_request_merged_into_one_range(self):
+        """
+        Test that ranges merged into one range output a single range response.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=10-19, 0-9')
+
+        self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
+        self.assertEqual(resp['Content-Range'], 'bytes 0-19/{length}'.format(length=self.length_unlocked))
+        self.assertEqual(resp['Content-Length'], '20')
+
+    def test_range_request_ranges_cover_content(self):
+        """
+        Test that ranges asking for at least the length of the content output the full content.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-, 0-0')
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn('Content-Range', resp)
+        self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
+
+    def test_range_request_too_many_ranges(self):
+        """
+        Test that a request with too many ranges outputs the full content.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=' + ', '.join(['0-0'] * 51))
+
         self.assertEqual(resp.status_code, 200)
         self.assertNotIn('Content-Range', resp)
         self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
@@ -294,6 +360,203 @@ class ContentStoreToyCourseTest(SharedModuleStoreTestCase):
         self.assertEqual(resp.status_code, 200)
         self.assertEquals('Origin', resp['Vary'])
 
+    def test_etag_header_sent(self):
+        """
+        Tests that the asset's digest is sent as its ETag.
+        """
+        content_digest = self.contentstore.get_attr(self.unlocked_asset, 'md5')
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['ETag'], '"{}"'.format(content_digest))
+
+    @ddt.data('"{}"', 'W/"{}"', '"other", "{}"', '*')
+    def test_if_none_match(self, if_none_match):
+        """
+        Tests that a request whose If-None-Match header matches the asset's ETag is answered with
+        304 Not Modified, from the asset's metadata alone.
+        """
+        content_digest = self.contentstore.get_attr(self.unlocked_asset, 'md5')
+        metadata = content_metadata(AssetManager.find(self.unlocked_asset, as_stream=True))
+
+        with patch(
+            'openedx.core.djangoapps.contentserver.middleware.get_cached_content_metadata', return_value=metadata
+        ):
+            with patch.object(StaticContentServer, 'load_asset_from_location') as mock_load_asset:
+                with patch.object(AssetManager, 'find') as mock_find:
+                    resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH=if_none_match.format(content_digest))
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], '"{}"'.format(content_digest))
+        self.assertFalse(mock_load_asset.called)
+        self.assertFalse(mock_find.called)
+
+    def test_if_none_match_changed(self):
+        """
+        Tests that a request whose If-None-Match header doesn't match the asset's ETag is
+        answered with the asset, even if it hasn't been modified since If-Modified-Since.
+        """
+        last_modified_at = self.contentstore.get_attr(self.unlocked_asset, 'uploadDate')
+        resp = self.client.get(
+            self.url_unlocked,
+            HTTP_IF_NONE_MATCH='"{}"'.format(FAKE_MD5_HASH),
+            HTTP_IF_MODIFIED_SINCE=last_modified_at.strftime(HTTP_DATE_FORMAT),
+        )
+        self.assertEqual(resp.status_code, 200)
+
+    def test_if_modified_since(self):
+        """
+        Tests that a request for an asset that wasn't modified since If-Modified-Since is
+        answered with 304 Not Modified.
+        """
+        last_modified_at = self.contentstore.get_attr(self.unlocked_asset, 'uploadDate')
+        resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE=last_modified_at.strftime(HTTP_DATE_FORMAT))
+        self.assertEqual(resp.status_code, 304)
+
+    def test_head_request(self):
+        """
+        Tests that HEAD requests are answered from the asset's metadata, without its content.
+        """
+        with patch.object(StaticContentServer, 'load_asset_from_location') as mock_load_asset:
+            resp = self.client.head(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
+        self.assertEqual(resp['Accept-Ranges'], 'bytes')
+        self.assertEqual(resp.content, '')
+        self.assertFalse(mock_load_asset.called)
+
+    def test_metadata_stream_closed(self):
+        """
+        Tests that the stream opened to read an asset's metadata is closed.
+        """
+        del_cached_content(self.unlocked_asset)
+        with patch.object(StaticContentStream, 'close') as mock_close:
+            resp = self.client.head(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(mock_close.called)
+
+    def test_course_import_forgets_metadata(self):
+        """
+        Tests that the cached metadata of a course's assets is deleted, as on a course import.
+        """
+        self.client.head(self.url_unlocked)
+        self.assertIsNotNone(get_cached_content_metadata(self.unlocked_asset))
+        del_cached_course_content(self.course_key)
+        self.assertIsNone(get_cached_content_metadata(self.unlocked_asset))
+
+    def test_head_request_locked_asset_not_logged_in(self):
+        """
+        Tests that HEAD requests for locked assets are checked for access.
+        """
+        self.client.logout()
+        resp = self.client.head(self.url_locked)
+        self.assertEqual(resp.status_code, 403)
+
+    def _enable_disk_cache(self, **config):
+        """
+        Enables the disk cache of asset contents, for assets of any size.
+        """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        config.update({'DIRECTORY': directory, 'MAX_SIZE': 1024 * 1024})
+        settings_override = override_settings(CONTENTSERVER_DISK_CACHE=config)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        size_patcher = patch('openedx.core.djangoapps.contentserver.middleware.MAX_MEMCACHED_CONTENT_SIZE', 0)
+        size_patcher.start()
+        self.addCleanup(size_patcher.stop)
+        return directory
+
+    def test_disk_cache(self):
+        """
+        Tests that assets are served from the disk cache once they're cached.
+        """
+        directory = self._enable_disk_cache()
+        content = AssetManager.find(self.unlocked_asset)
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(b''.join(resp.streaming_content), content.data)
+        self.assertTrue(os.path.exists(os.path.join(directory, content.content_digest[:2], content.content_digest)))
+
+        metadata = content_metadata(content)
+        with patch(
+            'openedx.core.djangoapps.contentserver.middleware.get_cached_content_metadata', return_value=metadata
+        ), patch.object(AssetManager, 'find') as mock_find:
+            resp = self.client.get(self.url_unlocked)
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
+            self.assertEqual(b''.join(resp.streaming_content), content.data)
+
+            resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-0')
+            self.assertEqual(resp.status_code, 206)
+            self.assertEqual(resp.content, content.data[:1])
+        self.assertFalse(mock_find.called)
+
+    def test_disk_cache_not_added_on_range_request(self):
+        """
+        Tests that range requests for assets that aren't cached are served without caching them.
+        """
+        directory = self._enable_disk_cache()
+        content = AssetManager.find(self.unlocked_asset)
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-0')
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp.content, content.data[:1])
+        self.assertFalse(os.path.exists(os.path.join(directory, content.content_digest[:2], content.content_digest)))
+
+    def test_disk_cache_file_evicted(self):
+        """
+        Tests that assets are read from the contentstore when their cached file can't be opened.
+        """
+        self._enable_disk_cache()
+        content = AssetManager.find(self.unlocked_asset)
+        self.client.get(self.url_unlocked)
+        with patch(
+            'openedx.core.djangoapps.contentserver.middleware.open', side_effect=IOError, create=True
+        ) as mock_open:
+            resp = self.client.get(self.url_unlocked)
+        self.assertTrue(mock_open.called)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.content, content.data)
+
+    def test_disk_cache_x_accel_redirect(self):
+        """
+        Tests that the web server is asked to send cached assets when X-Accel-Redirect is configured.
+        """
+        self._enable_disk_cache(X_ACCEL_REDIRECT_PREFIX='/asset-cache/')
+        content_digest = self.contentstore.get_attr(self.unlocked_asset, 'md5')
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['X-Accel-Redirect'], '/asset-cache/{}/{}'.format(content_digest[:2], content_digest))
+        self.assertEqual(resp.content, '')
+
+    @override_settings(COURSE_IMAGE_VARIANTS={'ENABLED': True, 'WIDTHS': [], 'FORMATS': ['webp']})
+    def test_image_variants(self):
+        """
+        Tests that variants of images are served in place of the originals once they're generated.
+        """
+        image_asset = self.course_key.make_asset_key('asset', 'just_a_test.jpg')
+        url = unicode(image_asset)
+        content = AssetManager.find(image_asset)
+        image_variants = get_image_variants()
+
+        resp = self.client.get(url, HTTP_ACCEPT='image/webp,*/*')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], 'image/jpeg')
+        self.assertEqual(resp['Vary'], 'Origin, Accept')
+
+        self.assertEqual(len(image_variants.generate(content)), 1)
+        self.addCleanup(image_variants.delete, self.course_key, content.content_digest)
+
+        resp = self.client.get(url, HTTP_ACCEPT='image/webp,*/*')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], 'image/webp')
+        self.assertEqual(resp['Vary'], 'Origin, Accept')
+
+        resp = self.client.get(url, {'format': 'webp'})
+        self.assertEqual(resp['Content-Type'], 'image/webp')
+
+        resp = self.client.get(url, HTTP_ACCEPT='image/*')
+        self.assertEqual(resp['Content-Type'], 'image/jpeg')
+        self.assertEqual(resp.content, content.data)
+
     @patch('openedx.core.djangoapps.contentserver.models.CourseAssetCacheTtlConfig.get_cache_ttl')
     def test_cache_headers_with_ttl_unlocked(self, mock_get_cache_ttl):
         """
@@ -447,3 +710,20 @@ class ParseRangeHeaderTestCase(unittest.TestCase):
         self.assertRaisesRegexp(
             exception_class, exception_message_regex, parse_range_header, header_value, self.content_length
         )
+
+
+@ddt.ddt
+class MergeByteRangesTestCase(unittest.TestCase):
+    """
+    Tests for the merge_byte_ranges function.
+    """
+    @ddt.data(
+        ([(0, 9)], [(0, 9)]),
+        ([(20, 29), (0, 9)], [(0, 9), (20, 29)]),
+        ([(0, 9), (10, 19)], [(0, 19)]),
+        ([(5, 15), (0, 9), (30, 39), (12, 13)], [(0, 15), (30, 39)]),
+        ([(0, 0), (0, 0)], [(0, 0)]),
+    )
+    @ddt.unpack
+    def test_merge_byte_ranges(self, ranges, expected_ranges):
+        self.assertEqual(merge_byte_ranges(ranges), expected_ranges)
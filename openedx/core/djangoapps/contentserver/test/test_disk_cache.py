@@ -0,0 +1,143 @@
+"""
+Tests for the contentserver's disk cache of asset contents
+"""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import ddt
+from django.test.utils import override_settings
+from mock import patch
+
+from ..caching import StaticContentMetadata
+from ..disk_cache import LOCK_TIMEOUT, AssetDiskCache, get_asset_disk_cache
+
+
+class FakeContent(object):
+    """
+    A StaticContent-like asset.
+    """
+    def __init__(self, content_digest, data, length=None):
+        self.location = u'/c4x/edX/toy/asset/{}'.format(content_digest)
+        self.content_digest = content_digest
+        self.data = data
+        self.length = len(data) if length is None else length
+
+    def stream_data(self):
+        """
+        Yields the asset's data in two chunks.
+        """
+        yield self.data[:len(self.data) // 2]
+        yield self.data[len(self.data) // 2:]
+
+
+@ddt.ddt
+class AssetDiskCacheTestCase(unittest.TestCase):
+    """
+    Tests for AssetDiskCache
+    """
+    def setUp(self):
+        super(AssetDiskCacheTestCase, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.disk_cache = AssetDiskCache(self.directory, 100)
+
+    def _set_last_used(self, path, timestamp):
+        """
+        Sets the time that the cached file at `path` was last used.
+        """
+        os.utime(path, (timestamp, timestamp))
+
+    def test_add_and_get(self):
+        self.assertIsNone(self.disk_cache.get('abc123'))
+        path = self.disk_cache.add(FakeContent('abc123', b'x' * 10))
+        self.assertEqual(path, os.path.join(self.directory, 'ab', 'abc123'))
+        self.assertEqual(self.disk_cache.get('abc123'), path)
+        with open(path, 'rb') as cached_file:
+            self.assertEqual(cached_file.read(), b'x' * 10)
+
+    def test_add_wrong_length(self):
+        self.assertIsNone(self.disk_cache.add(FakeContent('abc123', b'x' * 10, length=20)))
+        self.assertIsNone(self.disk_cache.get('abc123'))
+        self.assertEqual(os.listdir(os.path.join(self.directory, 'ab')), [])
+        self.assertEqual([name for name in os.listdir(self.directory) if name.startswith('.')], [])
+
+    def test_stream_and_add(self):
+        caching_stream = self.disk_cache.stream_and_add(FakeContent('abc123', b'x' * 10))
+        chunks = iter(caching_stream)
+        self.assertEqual(next(chunks), b'x' * 5)
+        # Only one request writes the file at a time.
+        self.assertIsNone(self.disk_cache.stream_and_add(FakeContent('abc123', b'x' * 10)))
+        self.assertIsNone(self.disk_cache.get('abc123'))
+
+        self.assertEqual(list(chunks), [b'x' * 5])
+        self.assertEqual(self.disk_cache.get('abc123'), caching_stream.path)
+        self.assertEqual(os.listdir(self.directory), ['ab'])
+
+    def test_stream_closed_before_end(self):
+        caching_stream = self.disk_cache.stream_and_add(FakeContent('abc123', b'x' * 10))
+        next(iter(caching_stream))
+        caching_stream.close()
+        self.assertIsNone(self.disk_cache.get('abc123'))
+        self.assertEqual(os.listdir(os.path.join(self.directory, 'ab')), [])
+        self.assertEqual([name for name in os.listdir(self.directory) if name.startswith('.')], [])
+        self.assertIsNotNone(self.disk_cache.add(FakeContent('abc123', b'x' * 10)))
+
+    def test_stale_lock_replaced(self):
+        lock_path = os.path.join(self.directory, '.abc123.lock')
+        open(lock_path, 'w').close()
+        self.assertIsNone(self.disk_cache.add(FakeContent('abc123', b'x' * 10)))
+        self._set_last_used(lock_path, time.time() - LOCK_TIMEOUT - 1)
+        self.assertIsNotNone(self.disk_cache.add(FakeContent('abc123', b'x' * 10)))
+        self.assertFalse(os.path.exists(lock_path))
+
+    def test_evict_least_recently_used(self):
+        first_path = self.disk_cache.add(FakeContent('aa11', b'1' * 40))
+        second_path = self.disk_cache.add(FakeContent('bb22', b'2' * 40))
+        self._set_last_used(first_path, 1000)
+        self._set_last_used(second_path, 2000)
+        # Using the first file makes the second one the least recently used.
+        self.disk_cache.get('aa11')
+
+        self.disk_cache.add(FakeContent('cc33', b'3' * 40))
+        self.assertIsNotNone(self.disk_cache.get('aa11'))
+        self.assertIsNone(self.disk_cache.get('bb22'))
+        self.assertIsNotNone(self.disk_cache.get('cc33'))
+
+    def test_eviction_is_throttled(self):
+        disk_cache = AssetDiskCache(self.directory, 1000)
+        with patch.object(AssetDiskCache, 'evict') as mock_evict:
+            disk_cache.add(FakeContent('aa11', b'1' * 10))
+            self.assertEqual(mock_evict.call_count, 1)
+            # Files are only evicted once a tenth of the maximum size has been added.
+            disk_cache.add(FakeContent('bb22', b'2' * 50))
+            self.assertEqual(mock_evict.call_count, 1)
+            disk_cache.add(FakeContent('cc33', b'3' * 50))
+            self.assertEqual(mock_evict.call_count, 2)
+
+    @ddt.data(
+        ('abc123', 50, True),
+        ('abc123', 101, False),
+        ('abc123', None, False),
+        (None, 50, False),
+        ('../abc123', 50, False),
+    )
+    @ddt.unpack
+    def test_can_cache(self, content_digest, length, can_cache):
+        metadata = StaticContentMetadata(None, content_digest, length, None, False, 'application/pdf')
+        self.assertEqual(self.disk_cache.can_cache(metadata), can_cache)
+
+    def test_x_accel_redirect(self):
+        disk_cache = AssetDiskCache(self.directory, 100, x_accel_redirect_prefix='/asset-cache/')
+        self.assertEqual(disk_cache.x_accel_redirect('abc123'), '/asset-cache/ab/abc123')
+
+    def test_get_asset_disk_cache(self):
+        with override_settings(CONTENTSERVER_DISK_CACHE={'DIRECTORY': None, 'MAX_SIZE': 100}):
+            self.assertIsNone(get_asset_disk_cache())
+        with override_settings(CONTENTSERVER_DISK_CACHE={'DIRECTORY': self.directory, 'MAX_SIZE': 100}):
+            disk_cache = get_asset_disk_cache()
+            self.assertEqual(disk_cache.directory, self.directory)
+            self.assertEqual(disk_cache.max_size, 100)
+            self.assertIsNone(disk_cache.x_accel_redirect_prefix)
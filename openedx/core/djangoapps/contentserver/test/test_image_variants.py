@@ -0,0 +1,181 @@
+"""
+Tests for the resized and re-encoded variants of course images
+"""
+import StringIO
+import unittest
+
+import ddt
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from mock import patch
+from opaque_keys.edx.keys import CourseKey
+from PIL import Image
+
+from xmodule.contentstore.content import StaticContent
+from xmodule.exceptions import NotFoundError
+
+from ..caching import StaticContentMetadata
+from ..image_variants import ImageVariants, get_image_variants, parse_accept_header
+
+COURSE_KEY = CourseKey.from_string('course-v1:edX+toy+2012_Fall')
+DIGEST = 'abc123'
+
+
+def make_image(size, mode='RGB', image_format='PNG'):
+    """
+    Returns the data of an image of the given size, mode and format.
+    """
+    image_file = StringIO.StringIO()
+    Image.new(mode, size).save(image_file, image_format)
+    return image_file.getvalue()
+
+
+@ddt.ddt
+class ImageVariantsTestCase(unittest.TestCase):
+    """
+    Tests for ImageVariants
+    """
+    def setUp(self):
+        super(ImageVariantsTestCase, self).setUp()
+        self.image_variants = ImageVariants([640, 320], ['webp', 'jpeg'])
+        self.request_factory = RequestFactory()
+
+    def _location(self, width, image_format):
+        """
+        Returns the location of the variant of the given width and format of the test image.
+        """
+        return self.image_variants.location(COURSE_KEY, DIGEST, width, image_format)
+
+    def test_location(self):
+        self.assertEqual(
+            self._location(None, 'webp'),
+            StaticContent.compute_location(COURSE_KEY, 'abc123.webp', is_thumbnail=True)
+        )
+        self.assertEqual(
+            self._location(320, 'jpeg'),
+            StaticContent.compute_location(COURSE_KEY, 'abc123-320w.jpg', is_thumbnail=True)
+        )
+
+    @ddt.data(
+        ({}, '', 'image/png', None),
+        ({}, 'image/webp,*/*', 'image/png', (None, 'webp')),
+        ({'w': '300'}, '*/*', 'image/jpeg', (320, 'jpeg')),
+        ({'w': '300'}, '*/*', 'image/png', None),
+        ({'w': '321'}, 'image/webp', 'image/jpeg', (640, 'webp')),
+        ({'w': '2000'}, 'image/webp', 'image/jpeg', (None, 'webp')),
+        ({'w': 'wide'}, '*/*', 'image/jpeg', None),
+        ({'format': 'jpeg'}, 'image/webp', 'image/png', (None, 'jpeg')),
+        ({'format': 'webp'}, '', 'image/gif', None),
+        ({}, 'image/webp;q=0, */*', 'image/png', None),
+        ({}, 'image/webpx', 'image/png', None),
+        ({}, 'image/webp;q=0.5, image/jpeg', 'image/png', (None, 'jpeg')),
+        ({}, 'image/jpeg;q=0.8, IMAGE/WEBP;q=0.8', 'image/png', (None, 'webp')),
+    )
+    @ddt.unpack
+    def test_choose(self, params, accept, content_type, variant):
+        request = self.request_factory.get('/asset', params, HTTP_ACCEPT=accept)
+        location = COURSE_KEY.make_asset_key('asset', 'image')
+        metadata = StaticContentMetadata(location, DIGEST, 100, None, False, content_type)
+        expected_location = self._location(*variant) if variant else None
+        self.assertEqual(self.image_variants.choose(request, metadata), expected_location)
+
+    @ddt.data(
+        ('RGB', 'image/png', ['abc123.webp', 'abc123.jpg', 'abc123-320w.webp', 'abc123-320w.jpg']),
+        ('RGBA', 'image/png', ['abc123.webp', 'abc123.jpg', 'abc123-320w.webp', 'abc123-320w.jpg']),
+        ('RGB', 'image/jpeg', ['abc123.webp', 'abc123-320w.webp', 'abc123-320w.jpg']),
+    )
+    @ddt.unpack
+    def test_generate(self, mode, content_type, names):
+        image_format = 'JPEG' if content_type == 'image/jpeg' else 'PNG'
+        content = StaticContent(
+            COURSE_KEY.make_asset_key('asset', 'image'), 'image', content_type,
+            make_image((400, 200), mode, image_format), content_digest=DIGEST,
+        )
+        with patch('openedx.core.djangoapps.contentserver.image_variants.contentstore') as mock_contentstore:
+            mock_contentstore.return_value.find.return_value = None
+            mock_contentstore.return_value.get_all_content_for_course.return_value = ([], 0)
+            locations = self.image_variants.generate(content)
+
+        self.assertEqual([location.path for location in locations], names)
+        saved = {
+            call[0][0].location.path: call[0][0] for call in mock_contentstore.return_value.save.call_args_list
+        }
+        variant = Image.open(StringIO.StringIO(saved['abc123-320w.webp'].data))
+        self.assertEqual(variant.size, (320, 160))
+        self.assertEqual(variant.format, 'WEBP')
+        self.assertEqual(saved['abc123-320w.webp'].content_type, 'image/webp')
+        self.assertFalse(saved['abc123-320w.webp'].locked)
+
+    def test_generate_locked(self):
+        content = StaticContent(
+            COURSE_KEY.make_asset_key('asset', 'image'), 'image', 'image/png', make_image((400, 200)),
+            content_digest=DIGEST,
+        )
+        with patch('openedx.core.djangoapps.contentserver.image_variants.contentstore') as mock_contentstore:
+            mock_contentstore.return_value.find.return_value = None
+            # Another image with the same contents is locked.
+            mock_contentstore.return_value.get_all_content_for_course.return_value = ([], 1)
+            self.image_variants.generate(content)
+
+        saved = [call[0][0] for call in mock_contentstore.return_value.save.call_args_list]
+        self.assertTrue(saved)
+        self.assertTrue(all(variant.locked for variant in saved))
+        mock_contentstore.return_value.get_all_content_for_course.assert_called_once_with(
+            COURSE_KEY, maxresults=1, filter_params={'md5': DIGEST, 'locked': True}
+        )
+
+    def test_generate_existing_variants(self):
+        content = StaticContent(
+            COURSE_KEY.make_asset_key('asset', 'image'), 'image', 'image/png', make_image((400, 200)),
+            content_digest=DIGEST,
+        )
+        with patch('openedx.core.djangoapps.contentserver.image_variants.contentstore') as mock_contentstore:
+            # An image with the same contents was uploaded before.
+            self.assertEqual(self.image_variants.generate(content), [])
+
+        self.assertFalse(mock_contentstore.return_value.save.called)
+        self.assertFalse(mock_contentstore.return_value.get_all_content_for_course.called)
+
+    def test_parse_accept_header(self):
+        self.assertEqual(
+            parse_accept_header('image/webp, image/*;q=0.8, Text/HTML;level=1;q=0, */*;q=bad, ,'),
+            {'image/webp': 1.0, 'image/*': 0.8, 'text/html': 0.0}
+        )
+
+    @ddt.data(0, 1)
+    def test_delete(self, num_images):
+        with patch('openedx.core.djangoapps.contentserver.image_variants.contentstore') as mock_contentstore:
+            mock_contentstore.return_value.get_all_content_for_course.return_value = ([], num_images)
+            self.image_variants.delete(COURSE_KEY, DIGEST)
+
+        deleted = [call[0][0] for call in mock_contentstore.return_value.delete.call_args_list]
+        if num_images:
+            # Another image with the same contents still uses the variants.
+            self.assertEqual(deleted, [])
+        else:
+            self.assertEqual(deleted, [self._location(*variant) for variant in self.image_variants.variants()])
+
+    @ddt.data(0, 1)
+    def test_update_lock(self, num_locked_images):
+        with patch('openedx.core.djangoapps.contentserver.image_variants.contentstore') as mock_contentstore:
+            mock_contentstore.return_value.get_all_content_for_course.return_value = ([], num_locked_images)
+            # Only some of the variants exist.
+            mock_contentstore.return_value.set_attr.side_effect = [None, NotFoundError('missing')] * 3
+            self.image_variants.update_lock(COURSE_KEY, DIGEST)
+
+        self.assertEqual(
+            mock_contentstore.return_value.set_attr.call_args_list,
+            [
+                ((self._location(*variant), 'locked', bool(num_locked_images)),)
+                for variant in self.image_variants.variants()
+            ]
+        )
+
+    def test_get_image_variants(self):
+        with override_settings(COURSE_IMAGE_VARIANTS={'ENABLED': False, 'WIDTHS': [320], 'FORMATS': ['webp']}):
+            self.assertIsNone(get_image_variants())
+        with override_settings(COURSE_IMAGE_VARIANTS={'ENABLED': True, 'WIDTHS': [640, 320], 'FORMATS': ['webp']}):
+            image_variants = get_image_variants()
+            self.assertEqual(image_variants.widths, [320, 640])
+            self.assertEqual(image_variants.formats, ['webp'])
+            self.assertEqual(image_variants.quality, 80)
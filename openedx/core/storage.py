@@ -77,6 +77,40 @@ class S3ReportStorage(S3BotoStorage):  # pylint: disable=abstract-method
             self.custom_domain = custom_domain
         super(S3ReportStorage, self).__init__(acl=acl, bucket=bucket, **settings)
 
+    # Reports larger than this size (in bytes) are uploaded in parts of this
+    # size.  S3 requires all but the last part to be at least 5MB.
+    MULTIPART_UPLOAD_PART_SIZE = 16 * 1024 * 1024
+
+    def _save_content(self, key, content, headers):
+        """
+        Uploads large reports with an S3 multipart upload, reading the
+        content a part at a time.
+        """
+        content_size = content.size
+        if content_size <= self.MULTIPART_UPLOAD_PART_SIZE:
+            return super(S3ReportStorage, self)._save_content(key, content, headers)
+
+        multipart_upload = self.bucket.initiate_multipart_upload(
+            key.name,
+            headers=headers,
+            metadata=key.metadata,
+            reduced_redundancy=self.reduced_redundancy,
+            encrypt_key=self.encryption,
+            policy=self.default_acl,
+        )
+        try:
+            content.seek(0)
+            for part_number, offset in enumerate(xrange(0, content_size, self.MULTIPART_UPLOAD_PART_SIZE), start=1):
+                multipart_upload.upload_part_from_file(
+                    content,
+                    part_number,
+                    size=min(self.MULTIPART_UPLOAD_PART_SIZE, content_size - offset),
+                )
+        except Exception:
+            multipart_upload.cancel_upload()
+            raise
+        multipart_upload.complete_upload()
+
 
 @lru_cache()
 def get_storage(storage_class=None, **kwargs):